@@ -17,6 +17,7 @@ from backend.llm.exceptions import (
     LLMRateLimitError,
     LLMTimeoutError,
 )
+from backend.llm.helpers import metrics_labels
 from backend.llm.portkey_client import LLMClient
 from backend.llm.types import ChatMessage, LLMResponse, MessageRole
 
@@ -43,6 +44,7 @@ class BaseAgent(ABC):
         default_model: str = "gpt-4o",
         default_temperature: float = 0.7,
         enable_metrics: bool = True,
+        enable_response_cache: bool = False,
     ):
         """
         Initialize base agent
@@ -53,17 +55,21 @@ class BaseAgent(ABC):
             default_model: Default model to use for LLM calls
             default_temperature: Default temperature for LLM calls
             enable_metrics: Whether to collect metrics
+            enable_response_cache: Cache LLM responses by default (only
+                deterministic, low-temperature calls are actually cached)
         """
         self.llm_client = llm_client or LLMClient()
         self.agent_name = agent_name
         self.default_model = default_model
         self.default_temperature = default_temperature
         self.enable_metrics = enable_metrics
+        self.enable_response_cache = enable_response_cache
 
         # Metrics
         self._metrics = {
             "total_calls": 0,
             "successful_calls": 0,
+            "cached_calls": 0,
             "failed_calls": 0,
             "total_tokens": 0,
             "total_latency_ms": 0,
@@ -97,6 +103,7 @@ class BaseAgent(ABC):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         prompt_id: Optional[str] = None,
+        cache: Optional[bool] = None,
         **kwargs,
     ) -> str:
         """
@@ -108,6 +115,7 @@ class BaseAgent(ABC):
             temperature: Temperature (defaults to agent's default_temperature)
             max_tokens: Maximum tokens to generate
             prompt_id: Portkey prompt ID (if using prompt templates)
+            cache: Reuse cached responses (defaults to enable_response_cache)
             **kwargs: Additional parameters for LLM call
 
         Returns:
@@ -127,26 +135,31 @@ class BaseAgent(ABC):
             )
 
             # Use prompt template if prompt_id provided
-            if prompt_id:
-                response = await self.llm_client.completion_with_prompt(
-                    prompt_id=prompt_id,
-                    variables=kwargs.get("variables", {}),
-                    model=model,
-                    **kwargs,
-                )
-            else:
-                response = await self.llm_client.chat_completion(
-                    messages=messages,
-                    model=model,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                    **kwargs,
-                )
+            with metrics_labels(agent=self.agent_name):
+                if prompt_id:
+                    response = await self.llm_client.completion_with_prompt(
+                        prompt_id=prompt_id,
+                        variables=kwargs.get("variables", {}),
+                        model=model,
+                        **kwargs,
+                    )
+                else:
+                    response = await self.llm_client.chat_completion(
+                        messages=messages,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        cache=self.enable_response_cache if cache is None else cache,
+                        **kwargs,
+                    )
 
             # Update metrics
             latency_ms = (time.time() - start_time) * 1000
             self._update_metrics(
-                success=True, tokens=response.usage.total_tokens, latency_ms=latency_ms
+                success=True,
+                tokens=response.usage.total_tokens,
+                latency_ms=latency_ms,
+                cached=response.metadata.get("cache_hit", False),
             )
 
             logger.info(
@@ -212,6 +225,7 @@ class BaseAgent(ABC):
         model: Optional[str] = None,
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
+        cache: Optional[bool] = None,
         **kwargs,
     ) -> LLMResponse:
         """
@@ -225,6 +239,7 @@ class BaseAgent(ABC):
             model: Model to use
             temperature: Temperature
             max_tokens: Maximum tokens
+            cache: Reuse cached responses (defaults to enable_response_cache)
             **kwargs: Additional parameters
 
         Returns:
@@ -238,18 +253,23 @@ class BaseAgent(ABC):
         temperature = temperature if temperature is not None else self.default_temperature
 
         try:
-            response = await self.llm_client.chat_completion(
-                messages=messages,
-                model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                **kwargs,
-            )
+            with metrics_labels(agent=self.agent_name):
+                response = await self.llm_client.chat_completion(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    cache=self.enable_response_cache if cache is None else cache,
+                    **kwargs,
+                )
 
             # Update metrics
             latency_ms = (time.time() - start_time) * 1000
             self._update_metrics(
-                success=True, tokens=response.usage.total_tokens, latency_ms=latency_ms
+                success=True,
+                tokens=response.usage.total_tokens,
+                latency_ms=latency_ms,
+                cached=response.metadata.get("cache_hit", False),
             )
 
             return response
@@ -300,6 +320,7 @@ class BaseAgent(ABC):
         tokens: int = 0,
         latency_ms: float = 0,
         error_type: Optional[str] = None,
+        cached: bool = False,
     ) -> None:
         """
         Update agent metrics
@@ -309,6 +330,7 @@ class BaseAgent(ABC):
             tokens: Number of tokens used
             latency_ms: Latency in milliseconds
             error_type: Type of error if failed
+            cached: Whether the response came from the response cache
         """
         if not self.enable_metrics:
             return
@@ -317,6 +339,10 @@ class BaseAgent(ABC):
 
         if success:
             self._metrics["successful_calls"] += 1
+            if cached:
+                # Resposta em cache não consome tokens do provedor
+                self._metrics["cached_calls"] += 1
+                tokens = 0
             self._metrics["total_tokens"] += tokens
             self._metrics["total_latency_ms"] += latency_ms
         else:
@@ -332,6 +358,7 @@ class BaseAgent(ABC):
             Dict containing agent metrics including:
             - total_calls: Total number of LLM calls
             - successful_calls: Number of successful calls
+            - cached_calls: Successful calls served from the response cache
             - failed_calls: Number of failed calls
             - success_rate: Percentage of successful calls
             - total_tokens: Total tokens used
@@ -355,6 +382,10 @@ class BaseAgent(ABC):
             metrics["avg_tokens_per_call"] = 0.0
             metrics["avg_latency_ms"] = 0.0
 
+        response_cache = getattr(self.llm_client, "response_cache", None)
+        if response_cache is not None:
+            metrics["response_cache"] = response_cache.get_stats()
+
         return metrics
 
     def reset_metrics(self) -> None:
@@ -362,6 +393,7 @@ class BaseAgent(ABC):
         self._metrics = {
             "total_calls": 0,
             "successful_calls": 0,
+            "cached_calls": 0,
             "failed_calls": 0,
             "total_tokens": 0,
             "total_latency_ms": 0,
@@ -97,6 +97,7 @@ Analise a elegibilidade do candidato para o visto {visa_type} e retorne o JSON e
                 messages=[{"role": "user", "content": user_msg}],
                 temperature=0.3,
                 max_tokens=4096,
+                agent="carlos",
             )
 
             content = response["content"]
@@ -107,6 +107,7 @@ CONTEXTO — Análise de Elegibilidade do Dr. Carlos:
                 messages=[{"role": "user", "content": user_msg}],
                 temperature=0.2,
                 max_tokens=4096,
+                agent="miguel",
             )
 
             content = response["content"]
@@ -124,6 +124,7 @@ Sintetize as análises e emita sua recomendação estratégica final."""
                 messages=[{"role": "user", "content": user_msg}],
                 temperature=0.2,
                 max_tokens=4096,
+                agent="patricia",
             )
 
             content = response["content"]
@@ -175,6 +175,7 @@ INSTRUÇÕES ADICIONAIS DO ADVOGADO:
                 messages=[{"role": "user", "content": user_msg}],
                 temperature=0.5,
                 max_tokens=8192,
+                agent="ricardo",
             )
 
             content = response["content"]
@@ -17,6 +17,8 @@ class DraPaulaKnowledgeBase:
 
     def __init__(self):
         self.knowledge_base = self._initialize_knowledge_base()
+        # Prefixo estável por tipo de agente (montado uma vez; contexto vai no fim)
+        self._prompt_prefixes: Dict[str, str] = {}
 
     def _initialize_knowledge_base(self) -> Dict[str, Any]:
         """Inicializa a base de conhecimento completa da Dra. Paula"""
@@ -333,6 +335,14 @@ class DraPaulaKnowledgeBase:
         """
         Gera prompt aprimorado com conhecimento da Dra. Paula para qualquer agente específico
         """
+        prefix = self._prompt_prefixes.get(agent_type)
+        if prefix is None:
+            prefix = self._build_prompt_prefix(agent_type)
+            self._prompt_prefixes[agent_type] = prefix
+        return prefix + specific_context
+
+    def _build_prompt_prefix(self, agent_type: str) -> str:
+        """Parte estática do prompt (conhecimento base + específico do agente)"""
         base_enhancement = self.get_system_prompt_enhancement(agent_type)
 
         if agent_type == "document_validation":
@@ -369,7 +379,7 @@ class DraPaulaKnowledgeBase:
         else:
             specific_knowledge = ""
 
-        return base_enhancement + specific_knowledge + specific_context
+        return base_enhancement + specific_knowledge
 
 
 # Instância global da base de conhecimento
@@ -0,0 +1,198 @@
+"""
+Agent Pipeline - executor de pipelines de agentes como grafo de dependências
+
+Cada nó declara de quais outros nós depende; nós independentes rodam em
+paralelo, então a latência total passa a ser o caminho crítico e não a soma
+dos agentes. Cada nó tem timeout próprio; se um ramo falha, os nós que
+dependem dele são pulados e o restante do resultado é devolvido (parcial).
+Saídas bem-sucedidas podem ser memoizadas por revisão do caso.
+
+Exemplo:
+    pipeline = AgentPipeline(
+        [
+            PipelineNode("carlos", run_carlos, timeout=120),
+            PipelineNode("miguel", run_miguel, timeout=120),
+            PipelineNode("patricia", run_patricia, depends_on=("carlos", "miguel")),
+        ]
+    )
+    result = await pipeline.run(revision=revision_key(case_data, visa_type))
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.llm.helpers import CacheManager
+
+logger = logging.getLogger(__name__)
+
+# Memo compartilhado entre requisições (LRU + TTL, single-flight)
+pipeline_memo = CacheManager(ttl_seconds=1800, max_entries=256, max_bytes=32 * 1024 * 1024)
+
+
+def revision_key(*parts: Any) -> str:
+    """Identifica uma revisão do caso pelo conteúdo (hash estável dos dados)"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def result_has_error(result: Any) -> bool:
+    """Convenção dos agentes: dict com ``error`` indica falha"""
+    return isinstance(result, dict) and bool(result.get("error"))
+
+
+@dataclass
+class PipelineNode:
+    """
+    Nó do pipeline
+
+    ``func`` recebe como kwargs as saídas dos nós em ``depends_on``.
+    """
+
+    name: str
+    func: Callable[..., Awaitable[Any]]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    is_failure: Callable[[Any], bool] = result_has_error
+    memoize: bool = True
+
+
+@dataclass
+class PipelineResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    memoized: List[str] = field(default_factory=list)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    @property
+    def status(self) -> str:
+        if not self.errors and not self.skipped:
+            return "completed"
+        succeeded = [name for name in self.results if name not in self.errors]
+        return "partial" if succeeded else "failed"
+
+    def ok(self, name: str) -> bool:
+        return name in self.results and name not in self.errors
+
+
+class _NodeFailed(Exception):
+    def __init__(self, result: Any):
+        super().__init__("node returned a failure result")
+        self.result = result
+
+
+class AgentPipeline:
+    """Executa nós respeitando dependências, com paralelismo máximo"""
+
+    def __init__(self, nodes: List[PipelineNode], memo: Optional[CacheManager] = None):
+        self.nodes = {node.name: node for node in nodes}
+        self.memo = memo if memo is not None else pipeline_memo
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        for node in self.nodes.values():
+            unknown = [dep for dep in node.depends_on if dep not in self.nodes]
+            if unknown:
+                raise ValueError(f"Node '{node.name}' depends on unknown nodes: {unknown}")
+
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle at node '{name}'")
+            state[name] = "visiting"
+            for dep in self.nodes[name].depends_on:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name)
+        return order
+
+    async def run(self, revision: Optional[str] = None, refresh: bool = False) -> PipelineResult:
+        """
+        Executa o pipeline
+
+        Args:
+            revision: Chave da revisão do caso; habilita memoização dos nós
+            refresh: Ignora saídas memoizadas (recalcula e atualiza o memo)
+        """
+        started = time.perf_counter()
+        result = PipelineResult()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        for name in self.order:
+            node = self.nodes[name]
+            deps = [tasks[dep] for dep in node.depends_on]
+            tasks[name] = asyncio.create_task(
+                self._run_node(node, deps, result, revision, refresh), name=f"pipeline:{name}"
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        result.total_ms = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def _run_node(
+        self,
+        node: PipelineNode,
+        deps: List[asyncio.Task],
+        result: PipelineResult,
+        revision: Optional[str],
+        refresh: bool,
+    ) -> None:
+        if deps:
+            await asyncio.gather(*deps)
+        failed_deps = [dep for dep in node.depends_on if not result.ok(dep)]
+        if failed_deps:
+            result.skipped.append(node.name)
+            logger.info(f"[pipeline] Skipping {node.name}: dependencies failed {failed_deps}")
+            return
+
+        inputs = {dep: result.results[dep] for dep in node.depends_on}
+        started = time.perf_counter()
+
+        async def compute() -> Any:
+            output = await asyncio.wait_for(node.func(**inputs), timeout=node.timeout)
+            if node.is_failure(output):
+                raise _NodeFailed(output)
+            return output
+
+        try:
+            if revision and node.memoize:
+                key = f"{revision}:{node.name}"
+                if refresh:
+                    self.memo.invalidate(key)
+                output, source = await self.memo.get_or_compute(key, compute)
+                if source != "computed":
+                    result.memoized.append(node.name)
+            else:
+                output = await compute()
+            result.results[node.name] = output
+
+        except _NodeFailed as e:
+            result.results[node.name] = e.result
+            error = e.result.get("error") if isinstance(e.result, dict) else None
+            result.errors[node.name] = str(error or "failed")
+        except asyncio.TimeoutError:
+            result.errors[node.name] = f"timeout after {node.timeout}s"
+            logger.warning(f"[pipeline] Node {node.name} timed out after {node.timeout}s")
+        except Exception as e:
+            result.errors[node.name] = str(e)
+            logger.error(f"[pipeline] Node {node.name} failed: {e}", exc_info=True)
+        finally:
+            result.timings_ms[node.name] = round((time.perf_counter() - started) * 1000, 1)
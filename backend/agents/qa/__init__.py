@@ -6,14 +6,19 @@ Quality Assurance agents for reviewing and validating immigration applications.
 This package contains:
 - ProfessionalQAAgent: Main QA agent trained with USCIS requirements
 - QAFeedbackOrchestrator: Orchestrates feedback loops between QA and builder agents
+- readiness: Bulk validation of an office's active cases (nightly readiness report)
 """
 
 from .feedback_orchestrator import QAFeedbackOrchestrator, get_qa_orchestrator
 from .professional_qa import ProfessionalQAAgent, get_qa_agent
+from .readiness import build_readiness_report, normalize_visa_type, run_nightly_readiness
 
 __all__ = [
     "ProfessionalQAAgent",
     "QAFeedbackOrchestrator",
     "get_qa_agent",
     "get_qa_orchestrator",
+    "build_readiness_report",
+    "normalize_visa_type",
+    "run_nightly_readiness",
 ]
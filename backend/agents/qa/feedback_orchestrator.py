@@ -9,13 +9,54 @@ AGORA COM SISTEMA DE APRENDIZADO CONTÍNUO:
 - Aplicam correções preventivas baseadas em histórico
 """
 
+import asyncio
 import logging
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
+class QACycleBudget:
+    """
+    Orçamento de um ciclo de QA: chamadas a agentes corretores e tempo total
+
+    Cada passe de correção (que pode acionar LLMs) consome uma chamada.
+    """
+
+    def __init__(self, max_agent_calls: int, max_seconds: float):
+        self.max_agent_calls = max_agent_calls
+        self.max_seconds = max_seconds
+        self.agent_calls = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def remaining_seconds(self) -> float:
+        return max(0.0, self.max_seconds - self.elapsed)
+
+    @property
+    def remaining_calls(self) -> int:
+        return max(0, self.max_agent_calls - self.agent_calls)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining_calls == 0 or self.remaining_seconds == 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "agent_calls": self.agent_calls,
+            "max_agent_calls": self.max_agent_calls,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "max_seconds": self.max_seconds,
+            "exhausted": self.exhausted,
+        }
+
+
 class QAFeedbackOrchestrator:
     """
     Orquestrador de feedback entre QA Agent e Agentes Construtores
@@ -26,6 +67,8 @@ class QAFeedbackOrchestrator:
         """Inicializa o orquestrador com limites e configurações"""
         self.max_iterations = 5  # Máximo de iterações para evitar loops infinitos
         self.minimum_improvement = 0.05  # Melhoria mínima de 5% entre iterações
+        self.max_agent_calls = 12  # Passes de correção por ciclo (todas as iterações)
+        self.max_cycle_seconds = 120.0  # Tempo total do ciclo; depois devolve o melhor resultado
         self.db = db
         self.learning_system = None  # Será inicializado quando necessário
 
@@ -55,22 +98,37 @@ class QAFeedbackOrchestrator:
         logger.info("✅ QA Feedback Orchestrator inicializado com Sistema de Aprendizado")
 
     async def orchestrate_qa_cycle(
-        self, case_data: Dict[str, Any], qa_agent, db, max_iterations: Optional[int] = None
+        self,
+        case_data: Dict[str, Any],
+        qa_agent,
+        db,
+        max_iterations: Optional[int] = None,
+        max_agent_calls: Optional[int] = None,
+        max_seconds: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Orquestra o ciclo completo de QA com feedback loop + APRENDIZADO CONTÍNUO
 
+        Correções de categorias independentes rodam em paralelo e a revisão
+        seguinte só re-pontua as categorias cujos dados mudaram. Se o orçamento
+        (passes de correção ou tempo) acabar, devolve o melhor resultado até ali.
+
         Args:
             case_data: Dados completos do caso
             qa_agent: Instância do Professional QA Agent
             db: Conexão com MongoDB
             max_iterations: Número máximo de iterações (usa padrão se None)
+            max_agent_calls: Máximo de passes de correção no ciclo (usa padrão se None)
+            max_seconds: Tempo máximo do ciclo em segundos (usa padrão se None)
 
         Returns:
             Resultado final do ciclo com histórico de iterações
         """
         case_id = case_data.get("case_id")
         max_iter = max_iterations or self.max_iterations
+        budget = QACycleBudget(
+            max_agent_calls or self.max_agent_calls, max_seconds or self.max_cycle_seconds
+        )
 
         # Inicializar sistema de aprendizado
         if not self.learning_system:
@@ -87,11 +145,14 @@ class QAFeedbackOrchestrator:
         iteration_history = []
         previous_score = 0.0
 
+        # Revisão completa só na primeira vez; depois, incremental
+        qa_report = qa_agent.comprehensive_review(case_data)
+        fingerprints = qa_agent.category_fingerprints(case_data)
+        best_report = qa_report
+
         for iteration in range(1, max_iter + 1):
             logger.info(f"📋 Iteração {iteration}/{max_iter}")
 
-            # 1. Executar revisão QA
-            qa_report = qa_agent.comprehensive_review(case_data)
             current_score = qa_report["overall_score"]
 
             # Salvar iteração no histórico
@@ -101,7 +162,7 @@ class QAFeedbackOrchestrator:
                 "score": current_score,
                 "status": qa_report["status"],
                 "issues_found": len(qa_report.get("missing_items", []))
-                + sum(len(cat["issues"]) for cat in qa_report["categories"].values()),
+                + sum(len(cat["issues"]) for cat in qa_report.get("categories", {}).values()),
                 "actions_taken": [],
             }
 
@@ -121,6 +182,7 @@ class QAFeedbackOrchestrator:
                     "final_score": current_score,
                     "qa_report": qa_report,
                     "iteration_history": iteration_history,
+                    "budget": budget.to_dict(),
                     "message": f"✅ Application approved after {iteration} iteration(s)",
                 }
 
@@ -136,29 +198,53 @@ class QAFeedbackOrchestrator:
                     iteration_history.append(iteration_record)
 
                     await self._save_final_result(
-                        db, case_id, qa_report, iteration_history, "stalled"
+                        db, case_id, best_report, iteration_history, "stalled"
                     )
 
                     return {
                         "success": False,
                         "status": "stalled",
                         "iterations": iteration,
-                        "final_score": current_score,
-                        "qa_report": qa_report,
+                        "final_score": best_report["overall_score"],
+                        "qa_report": best_report,
                         "iteration_history": iteration_history,
+                        "budget": budget.to_dict(),
                         "message": "⚠️  Insufficient improvement between iterations. Manual review required.",
                     }
 
-            # 4. Classificar problemas e encaminhar para agentes
+            # 4. Orçamento esgotado: devolve o melhor resultado até aqui
+            if budget.exhausted:
+                logger.warning(
+                    f"⏱️  Orçamento do ciclo esgotado para case {case_id}: {budget.to_dict()}"
+                )
+                iteration_record["result"] = "budget_exhausted"
+                iteration_history.append(iteration_record)
+
+                await self._save_final_result(
+                    db, case_id, best_report, iteration_history, "budget_exhausted"
+                )
+
+                return {
+                    "success": False,
+                    "status": "budget_exhausted",
+                    "iterations": iteration,
+                    "final_score": best_report["overall_score"],
+                    "qa_report": best_report,
+                    "iteration_history": iteration_history,
+                    "budget": budget.to_dict(),
+                    "message": "⚠️  QA cycle budget exhausted. Returning best result so far.",
+                }
+
+            # 5. Classificar problemas e encaminhar para agentes (em paralelo)
             logger.info(f"🔍 Classificando problemas detectados...")
             problems_by_agent = self._classify_problems(qa_report)
 
-            # 5. Executar correções com cada agente
-            corrections_made = await self._execute_corrections(case_data, problems_by_agent, db)
+            corrections_made = await self._execute_corrections(
+                case_data, problems_by_agent, db, budget
+            )
 
             iteration_record["actions_taken"] = corrections_made
             iteration_record["result"] = "corrections_applied"
-            iteration_history.append(iteration_record)
 
             # 6. Recarregar dados do caso atualizado
             updated_case = await db.auto_cases.find_one({"case_id": case_id})
@@ -168,15 +254,34 @@ class QAFeedbackOrchestrator:
                     updated_case["_id"] = str(updated_case["_id"])
                 case_data = updated_case
 
-            previous_score = current_score
+            # 7. Re-pontuar as categorias cujos dados mudaram e, sem memo, as
+            # tocadas pelos corretores (podem gravar campos fora do fingerprint)
+            new_fingerprints = qa_agent.category_fingerprints(case_data)
+            touched = self._touched_categories(problems_by_agent, corrections_made)
+            changed = [
+                c
+                for c, fp in new_fingerprints.items()
+                if fingerprints.get(c) != fp or c in touched
+            ]
+            fingerprints = new_fingerprints
+            iteration_record["rescored_categories"] = changed
+            iteration_history.append(iteration_record)
+
+            if changed:
+                qa_report = qa_agent.rescore(case_data, qa_report, changed, fresh=touched)
+            else:
+                logger.info("🔁 Nenhuma categoria alterada pelas correções; revisão mantida")
 
-            # Pequena pausa entre iterações
-            logger.info(f"⏳ Aguardando próxima iteração...")
+            if qa_report["overall_score"] > best_report["overall_score"]:
+                best_report = qa_report
+
+            previous_score = current_score
 
         # Se chegou aqui, atingiu máximo de iterações sem aprovação
+        # (qa_report já reflete as correções da última iteração)
         logger.warning(f"❌ Case {case_id} atingiu máximo de iterações ({max_iter})")
 
-        final_qa = qa_agent.comprehensive_review(case_data)
+        final_qa = qa_report if qa_report["approval"]["approved"] else best_report
         await self._save_final_result(
             db, case_id, final_qa, iteration_history, "max_iterations_reached"
         )
@@ -188,6 +293,7 @@ class QAFeedbackOrchestrator:
             "final_score": final_qa["overall_score"],
             "qa_report": final_qa,
             "iteration_history": iteration_history,
+            "budget": budget.to_dict(),
             "message": f"⚠️  Maximum iterations ({max_iter}) reached. Manual review required.",
         }
 
@@ -276,66 +382,96 @@ class QAFeedbackOrchestrator:
 
         return problems_by_agent
 
+    @staticmethod
+    def _touched_categories(
+        problems_by_agent: Dict[str, List[Dict[str, Any]]], actions: List[Dict[str, Any]]
+    ) -> set:
+        """Categorias do QA cujos problemas foram entregues a um corretor que rodou"""
+        ran = {a.get("agent") for a in actions if a.get("status") != "skipped"}
+        touched = set()
+        for agent in ran:
+            for problem in problems_by_agent.get(agent, []):
+                # Itens faltando vêm da categoria de documentos
+                category = problem.get("category")
+                touched.add("documents" if category == "completeness" else category)
+        return touched
+
     async def _execute_corrections(
-        self, case_data: Dict[str, Any], problems_by_agent: Dict[str, List[Dict[str, Any]]], db
+        self,
+        case_data: Dict[str, Any],
+        problems_by_agent: Dict[str, List[Dict[str, Any]]],
+        db,
+        budget: Optional[QACycleBudget] = None,
     ) -> List[Dict[str, str]]:
         """
         Executa correções com agentes apropriados
 
+        Cada agente grava campos próprios do caso, então os passes rodam em
+        paralelo. Com orçamento, os agentes com problemas mais graves vão primeiro
+        e passes que estouram o tempo restante são cancelados.
+
         Args:
             case_data: Dados do caso
             problems_by_agent: Problemas classificados por agente
             db: Conexão MongoDB
+            budget: Orçamento do ciclo (passes de correção e tempo)
 
         Returns:
             Lista de ações/correções realizadas
         """
         case_id = case_data.get("case_id")
-        actions_taken = []
-
-        # 1. Document Analyzer - Correções de documentos
-        if problems_by_agent["document_analyzer"]:
-            logger.info(
-                f"📄 Encaminhando {len(problems_by_agent['document_analyzer'])} problemas para Document Analyzer"
-            )
-
-            action = await self._fix_document_issues(
-                case_id, problems_by_agent["document_analyzer"], case_data, db
-            )
-            actions_taken.append(action)
-
-        # 2. Form Filler - Correções de dados/formulário
-        if problems_by_agent["form_filler"]:
-            logger.info(
-                f"📝 Encaminhando {len(problems_by_agent['form_filler'])} problemas para Form Filler"
-            )
-
-            action = await self._fix_form_issues(
-                case_id, problems_by_agent["form_filler"], case_data, db
-            )
-            actions_taken.append(action)
-
-        # 3. Translation Agent - Correções de linguagem/texto
-        if problems_by_agent["translation_agent"]:
-            logger.info(
-                f"🔤 Encaminhando {len(problems_by_agent['translation_agent'])} problemas para Translation Agent"
-            )
-
-            action = await self._fix_language_issues(
-                case_id, problems_by_agent["translation_agent"], case_data, db
-            )
-            actions_taken.append(action)
+        fixers = {
+            "document_analyzer": ("📄 Document Analyzer", self._fix_document_issues),
+            "form_filler": ("📝 Form Filler", self._fix_form_issues),
+            "translation_agent": ("🔤 Translation Agent", self._fix_language_issues),
+            "specialized_agent": ("🎯 Specialized Agent", self._fix_specialized_issues),
+        }
 
-        # 4. Specialized Agent - Validações específicas
-        if problems_by_agent["specialized_agent"]:
-            logger.info(
-                f"🎯 Encaminhando {len(problems_by_agent['specialized_agent'])} problemas para Specialized Agent"
+        pending = [agent for agent in fixers if problems_by_agent.get(agent)]
+        # Mais problemas críticos/altos primeiro (quando o orçamento não cobre todos)
+        pending.sort(
+            key=lambda agent: -sum(
+                1 for p in problems_by_agent[agent] if p["severity"] in ("critical", "high")
             )
+        )
 
-            action = await self._fix_specialized_issues(
-                case_id, problems_by_agent["specialized_agent"], case_data, db
+        actions_taken = []
+        if budget is not None:
+            for agent in pending[budget.remaining_calls:]:
+                actions_taken.append(
+                    {"agent": agent, "status": "skipped", "reason": "Agent call budget exhausted"}
+                )
+            pending = pending[: budget.remaining_calls]
+            budget.agent_calls += len(pending)
+
+        tasks = {}
+        for agent in pending:
+            label, fix = fixers[agent]
+            logger.info(f"{label}: encaminhando {len(problems_by_agent[agent])} problemas")
+            tasks[agent] = asyncio.create_task(
+                fix(case_id, problems_by_agent[agent], case_data, db)
             )
-            actions_taken.append(action)
+        if not tasks:
+            return actions_taken
+
+        timeout = budget.remaining_seconds if budget is not None else None
+        done, not_done = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in not_done:
+            task.cancel()
+
+        for agent, task in tasks.items():
+            if task in done and task.exception() is None:
+                actions_taken.append(task.result())
+            elif task in done:
+                logger.error(f"❌ Erro no passe de correção de {agent}: {task.exception()}")
+                actions_taken.append(
+                    {"agent": agent, "status": "error", "error": str(task.exception())}
+                )
+            else:
+                logger.warning(f"⏱️  {agent} cancelado: tempo do ciclo esgotado")
+                actions_taken.append(
+                    {"agent": agent, "status": "timeout", "reason": "Cycle time budget exhausted"}
+                )
 
         return actions_taken
 
@@ -4,13 +4,49 @@ Agente de revisão profissional treinado com requisitos USCIS
 Garante que nenhum processo incompleto ou com baixa qualidade seja liberado
 """
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
+QA_CATEGORIES = ("personal_data", "professional_data", "documents", "critical_criteria")
+
+DEFAULT_CATEGORY_WEIGHTS = {
+    "personal_data": 0.15,
+    "professional_data": 0.25,
+    "documents": 0.40,
+    "critical_criteria": 0.20,
+}
+
+# Campos do caso que cada categoria lê (define o que precisa ser re-pontuado)
+CATEGORY_INPUTS = {
+    "personal_data": ("basic_data",),
+    "professional_data": ("form_code", "simplified_form_responses", "qualifications"),
+    "documents": ("form_code", "uploaded_documents", "documents", "simplified_form_responses"),
+    "critical_criteria": (
+        "form_code",
+        "payment_status",
+        "ai_processing_status",
+        "progress_percentage",
+    ),
+}
+
+# Seções memoizadas (LRU) por hash do sub-documento que cada uma lê
+SECTION_MEMO_MAX_ENTRIES = 4096
+
+
+def _revision(fingerprints: Dict[str, str]) -> str:
+    """Revisão do caso vista pelo QA (hash das seções)"""
+    joined = "|".join(fingerprints[c] for c in sorted(fingerprints))
+    return hashlib.sha256(joined.encode()).hexdigest()[:16]
+
 
 class ProfessionalQAAgent:
     """
@@ -34,6 +70,12 @@ class ProfessionalQAAgent:
             self.minimum_approval_score = 0.85  # 85% mínimo para aprovação
             self.critical_threshold = 0.95  # 95% para processos críticos
 
+        # Memo das seções: (categoria, hash do sub-documento) → resultado
+        self._section_memo: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.memo_hits = 0
+        self.memo_misses = 0
+
         logger.info("✅ Professional QA Agent inicializado com base USCIS")
 
     def _load_uscis_requirements(self) -> Dict[str, Any]:
@@ -391,52 +433,139 @@ class ProfessionalQAAgent:
             "approval": {"approved": False, "reason": "", "required_actions": []},
         }
 
-        # Obter pesos dinâmicos por tipo de visto (ou usar defaults)
-        default_weights = {
-            "personal_data": 0.15,
-            "professional_data": 0.25,
-            "documents": 0.40,
-            "critical_criteria": 0.20,
-        }
-        weights = requirements.get("category_weights", default_weights)
-
-        # 1. Verificar completude de dados pessoais
-        personal_score, personal_issues = self._check_personal_data(case_data)
-        report["categories"]["personal_data"] = {
-            "score": personal_score,
-            "weight": weights["personal_data"],
-            "issues": personal_issues,
-        }
+        fingerprints = self.category_fingerprints(case_data)
+        report["revision"] = _revision(fingerprints)
+        report["sections_recomputed"] = []
+        for category in QA_CATEGORIES:
+            self._score_category(report, category, case_data, requirements, fingerprints)
 
-        # 2. Verificar dados profissionais/específicos do visto
-        professional_score, professional_issues = self._check_professional_data(
-            case_data, requirements
-        )
-        report["categories"]["professional_data"] = {
-            "score": professional_score,
-            "weight": weights["professional_data"],
-            "issues": professional_issues,
-        }
+        return self._finalize_report(report, requirements, form_code)
 
-        # 3. Verificar documentos obrigatórios
-        documents_score, documents_issues, missing = self._check_required_documents(
-            case_data, requirements
-        )
-        report["categories"]["documents"] = {
-            "score": documents_score,
-            "weight": weights["documents"],
-            "issues": documents_issues,
+    async def review_async(self, case_data: Dict[str, Any]) -> Dict[str, Any]:
+        """comprehensive_review fora do event loop (seções limpas vêm do memo)"""
+        return await asyncio.to_thread(self.comprehensive_review, case_data)
+
+    def category_fingerprints(self, case_data: Dict[str, Any]) -> Dict[str, str]:
+        """Hash dos campos do caso lidos por cada categoria"""
+        fingerprints = {}
+        for category, fields in CATEGORY_INPUTS.items():
+            payload = json.dumps(
+                [case_data.get(f) for f in fields], sort_keys=True, default=str
+            )
+            fingerprints[category] = hashlib.sha256(payload.encode()).hexdigest()
+        return fingerprints
+
+    def rescore(
+        self,
+        case_data: Dict[str, Any],
+        previous_report: Dict[str, Any],
+        categories: List[str],
+        fresh: Sequence[str] = (),
+    ) -> Dict[str, Any]:
+        """
+        Revisão incremental: recalcula só as categorias indicadas
+
+        As demais categorias são reaproveitadas de ``previous_report``; score
+        geral, aprovação e recomendações são recalculados. Categorias em
+        ``fresh`` ignoram o memo (dados tocados por um corretor).
+        """
+        form_code = case_data.get("form_code", "").upper()
+        if form_code not in self.knowledge_base or "categories" not in previous_report:
+            return self.comprehensive_review(case_data)
+
+        requirements = self.knowledge_base[form_code]
+        fingerprints = self.category_fingerprints(case_data)
+        report = {
+            **previous_report,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "categories": dict(previous_report["categories"]),
+            "revision": _revision(fingerprints),
+            "sections_recomputed": [],
         }
-        report["missing_items"] = missing
-
-        # 4. Verificar critérios críticos do USCIS
-        critical_score, critical_issues = self._check_critical_criteria(case_data, requirements)
-        report["categories"]["critical_criteria"] = {
-            "score": critical_score,
-            "weight": weights["critical_criteria"],
-            "issues": critical_issues,
+        for category in categories:
+            self._score_category(
+                report, category, case_data, requirements, fingerprints,
+                use_memo=category not in fresh,
+            )
+
+        logger.info(f"🔁 Revisão incremental: {', '.join(categories) or 'nenhuma categoria'}")
+        return self._finalize_report(report, requirements, form_code)
+
+    def _score_category(
+        self,
+        report: Dict[str, Any],
+        category: str,
+        case_data: Dict[str, Any],
+        requirements: Dict[str, Any],
+        fingerprints: Optional[Dict[str, str]] = None,
+        use_memo: bool = True,
+    ) -> None:
+        """Calcula uma categoria (ou reaproveita do memo) e grava no relatório"""
+        # Obter pesos dinâmicos por tipo de visto (ou usar defaults)
+        weights = requirements.get("category_weights", DEFAULT_CATEGORY_WEIGHTS)
+
+        fingerprints = fingerprints or self.category_fingerprints(case_data)
+        key = (category, self.test_mode, fingerprints[category])
+        cached = None
+        with self._memo_lock:
+            if use_memo:
+                cached = self._section_memo.get(key)
+            if cached is not None:
+                self._section_memo.move_to_end(key)
+                self.memo_hits += 1
+
+        if cached is None:
+            cached = self._check_category(category, case_data, requirements)
+            report.setdefault("sections_recomputed", []).append(category)
+            with self._memo_lock:
+                self.memo_misses += 1
+                self._section_memo[key] = cached
+                while len(self._section_memo) > SECTION_MEMO_MAX_ENTRIES:
+                    self._section_memo.popitem(last=False)
+
+        score, issues, missing = cached
+        if category == "documents":
+            report["missing_items"] = list(missing)
+
+        report["categories"][category] = {
+            "score": score,
+            "weight": weights[category],
+            "issues": list(issues),
         }
 
+    def _check_category(
+        self, category: str, case_data: Dict[str, Any], requirements: Dict[str, Any]
+    ) -> tuple:
+        """Executa o checker da seção; retorna (score, issues, missing)"""
+        missing: List[str] = []
+        if category == "personal_data":
+            # 1. Verificar completude de dados pessoais
+            score, issues = self._check_personal_data(case_data)
+        elif category == "professional_data":
+            # 2. Verificar dados profissionais/específicos do visto
+            score, issues = self._check_professional_data(case_data, requirements)
+        elif category == "documents":
+            # 3. Verificar documentos obrigatórios
+            score, issues, missing = self._check_required_documents(case_data, requirements)
+        elif category == "critical_criteria":
+            # 4. Verificar critérios críticos do USCIS
+            score, issues = self._check_critical_criteria(case_data, requirements)
+        else:
+            raise ValueError(f"Unknown QA category: {category}")
+        return score, tuple(issues), tuple(missing)
+
+    def get_memo_stats(self) -> Dict[str, Any]:
+        with self._memo_lock:
+            return {
+                "entries": len(self._section_memo),
+                "hits": self.memo_hits,
+                "misses": self.memo_misses,
+            }
+
+    def _finalize_report(
+        self, report: Dict[str, Any], requirements: Dict[str, Any], form_code: str
+    ) -> Dict[str, Any]:
+        """Score geral, aprovação e recomendações a partir das categorias"""
         # Calcular score geral
         overall_score = sum(cat["score"] * cat["weight"] for cat in report["categories"].values())
         report["overall_score"] = overall_score
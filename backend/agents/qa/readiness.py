@@ -0,0 +1,186 @@
+"""
+QA Readiness - validação em lote dos casos ativos de um escritório
+
+Roda o ProfessionalQAAgent sobre todos os casos ativos, em sequência numa
+thread (o event loop fica livre; a revisão é CPU pura e o memo do agente é
+do processo), e grava um relatório de prontidão por escritório em
+``qa_readiness_reports``. Seções que não mudaram desde a
+última validação vêm do memo do agente, então a execução noturna só
+recalcula o que ficou sujo.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from .professional_qa import CATEGORY_INPUTS, get_qa_agent
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = [
+    "intake", "docs_pending", "docs_review", "forms_gen",
+    "attorney_review", "ready_to_file", "filed",
+    "rfe_received", "rfe_response",
+]
+
+MAX_CASES_PER_OFFICE = 2000
+
+# Apenas os campos lidos pelo QA (evita trazer documentos/histórico inteiros)
+QA_CASE_PROJECTION = {
+    "_id": 0,
+    "case_id": 1,
+    "client_name": 1,
+    "visa_type": 1,
+    "status": 1,
+    **{f: 1 for fields in CATEGORY_INPUTS.values() for f in fields},
+}
+
+VISA_TYPE_TO_FORM_CODE = {
+    "H-1B": "H-1B",
+    "H1B": "H-1B",
+    "O-1": "O-1",
+    "O1": "O-1",
+    "O-1A": "O-1",
+    "O-1B": "O-1",
+    "L-1": "L-1",
+    "L1": "L-1",
+    "L-1A": "L-1",
+    "L-1B": "L-1",
+    "EB-1A": "EB-1A",
+    "EB1A": "EB-1A",
+    "EB-1B": "EB-1A",
+    "EB-2 NIW": "EB-2 NIW",
+    "EB2 NIW": "EB-2 NIW",
+    "EB-2NIW": "EB-2 NIW",
+    "EB2NIW": "EB-2 NIW",
+    "EB-2": "EB-2 NIW",
+    "NIW": "EB-2 NIW",
+    "I-140": "EB-1A",
+    "F-1": "F-1",
+    "F1": "F-1",
+    "I-539": "I-539",
+    "I-589": "I-589",
+}
+
+
+def normalize_visa_type(visa_type: str) -> str:
+    """Normalize visa type to QA agent's expected form_code format."""
+    return VISA_TYPE_TO_FORM_CODE.get(visa_type, visa_type)
+
+
+def case_for_qa(case: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Cópia do caso com form_code normalizado (None se não há tipo de visto)"""
+    visa_type = (case.get("visa_type") or case.get("form_code") or "").upper()
+    if not visa_type:
+        return None
+    normalized = dict(case)
+    normalized["form_code"] = normalize_visa_type(visa_type)
+    return normalized
+
+
+async def build_readiness_report(
+    db, office_id: str, save: bool = True
+) -> Dict[str, Any]:
+    """
+    Valida todos os casos ativos do escritório e monta o relatório de prontidão
+
+    Args:
+        db: Conexão MongoDB
+        office_id: Escritório
+        save: Grava o relatório em ``qa_readiness_reports``
+    """
+    started = time.perf_counter()
+    qa_agent = get_qa_agent()
+    memo_before = qa_agent.get_memo_stats()
+
+    cases = await db.b2b_cases.find(
+        {"office_id": office_id, "status": {"$in": ACTIVE_STATUSES}}, QA_CASE_PROJECTION
+    ).to_list(length=MAX_CASES_PER_OFFICE)
+
+    rows: List[Dict[str, Any]] = []
+    skipped: List[str] = []
+    jobs = []
+    for case in cases:
+        normalized = case_for_qa(case)
+        if normalized is None:
+            skipped.append(case.get("case_id"))
+        else:
+            jobs.append((case, normalized))
+
+    def review_all() -> List[Any]:
+        results: List[Any] = []
+        for case, normalized in jobs:
+            try:
+                results.append(qa_agent.comprehensive_review(normalized))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    results = await asyncio.to_thread(review_all)
+
+    for (case, _), report in zip(jobs, results):
+        if isinstance(report, Exception):
+            logger.error(f"❌ QA readiness failed for {case.get('case_id')}: {report}")
+            skipped.append(case.get("case_id"))
+            continue
+        rows.append(
+            {
+                "case_id": case.get("case_id"),
+                "client_name": case.get("client_name"),
+                "visa_type": case.get("visa_type"),
+                "status": case.get("status"),
+                "score": report.get("overall_score", 0.0),
+                "ready": report.get("approval", {}).get("approved", False),
+                "missing_items": report.get("missing_items", []),
+                "revision": report.get("revision"),
+            }
+        )
+
+    rows.sort(key=lambda r: r["score"])
+    missing_counter = Counter(item for r in rows for item in r["missing_items"])
+    memo_after = qa_agent.get_memo_stats()
+
+    result = {
+        "office_id": office_id,
+        "generated_at": datetime.now(timezone.utc),
+        "total_cases": len(cases),
+        "validated": len(rows),
+        "ready": sum(1 for r in rows if r["ready"]),
+        "needs_work": sum(1 for r in rows if not r["ready"]),
+        "average_score": round(sum(r["score"] for r in rows) / len(rows), 4) if rows else 0.0,
+        "top_missing_items": [
+            {"item": item, "cases": count} for item, count in missing_counter.most_common(10)
+        ],
+        "cases": rows,
+        "skipped": skipped,
+        "sections_reused": memo_after["hits"] - memo_before["hits"],
+        "sections_recomputed": memo_after["misses"] - memo_before["misses"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+    if save:
+        await db.qa_readiness_reports.insert_one(dict(result))
+
+    logger.info(
+        f"📋 QA readiness {office_id}: {result['ready']}/{result['validated']} ready "
+        f"({result['sections_recomputed']} sections recomputed) in {result['duration_ms']}ms"
+    )
+    return result
+
+
+async def run_nightly_readiness(db) -> int:
+    """Relatório de prontidão para cada escritório com casos ativos"""
+    office_ids = await db.b2b_cases.distinct("office_id", {"status": {"$in": ACTIVE_STATUSES}})
+    built = 0
+    for office_id in office_ids:
+        if not office_id:
+            continue
+        try:
+            await build_readiness_report(db, office_id)
+            built += 1
+        except Exception as e:
+            logger.error(f"❌ Nightly QA readiness failed for office {office_id}: {e}")
+    return built
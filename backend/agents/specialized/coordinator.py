@@ -8,6 +8,7 @@ import logging
 from typing import Any, Dict, Optional
 
 from agents.base import BaseAgent
+from agents.pipeline import AgentPipeline, PipelineNode, revision_key
 from llm.portkey_client import LLMClient
 
 from .compliance_checker import ComplianceCheckAgent
@@ -20,6 +21,64 @@ from .triage import UrgencyTriageAgent
 
 logger = logging.getLogger(__name__)
 
+# Timeout por agente (segundos)
+AGENT_TIMEOUT = 120
+
+# task_type -> (agente, chave em "analyses", montagem da entrada)
+TASK_ROUTES = {
+    "document_validation": (
+        "document_validator",
+        "document_validation",
+        lambda data, ctx: {
+            "document_data": data.get("document_data"),
+            "document_type": data.get("document_type"),
+            "case_context": ctx,
+        },
+    ),
+    "form_validation": (
+        "form_validator",
+        "form_validation",
+        lambda data, ctx: {
+            "form_data": data.get("form_data"),
+            "form_type": data.get("form_type"),
+            "visa_type": data.get("visa_type"),
+        },
+    ),
+    "eligibility_check": (
+        "eligibility_analyst",
+        "eligibility",
+        lambda data, ctx: {
+            "candidate_data": data.get("candidate_data"),
+            "visa_type": data.get("visa_type"),
+        },
+    ),
+    "compliance_review": (
+        "compliance_checker",
+        "compliance",
+        lambda data, ctx: {
+            "application_data": data.get("application_data"),
+            "visa_type": data.get("visa_type"),
+        },
+    ),
+    "letter_writing": (
+        "letter_writer",
+        "letter_writing",
+        lambda data, ctx: {
+            "letter_type": data.get("letter_type"),
+            "client_facts": data.get("client_facts"),
+            "visa_type": data.get("visa_type"),
+        },
+    ),
+    "form_translation": (
+        "uscis_translator",
+        "form_translation",
+        lambda data, ctx: {
+            "friendly_form_data": data.get("friendly_form_data"),
+            "target_uscis_form": data.get("target_uscis_form"),
+        },
+    ),
+}
+
 
 class SpecializedAgentCoordinator:
     """
@@ -57,7 +116,11 @@ class SpecializedAgentCoordinator:
         logger.info("Initialized SpecializedAgentCoordinator with all agents")
 
     async def analyze_comprehensive(
-        self, task_type: str, data: Dict[str, Any], user_context: Dict[str, Any] = None
+        self,
+        task_type: str,
+        data: Dict[str, Any],
+        user_context: Dict[str, Any] = None,
+        refresh: bool = False,
     ) -> Dict[str, Any]:
         """
         Perform comprehensive analysis using appropriate specialized agents
@@ -66,6 +129,7 @@ class SpecializedAgentCoordinator:
             task_type: Type of task (document_validation, form_validation, etc.)
             data: Task data
             user_context: Optional user context
+            refresh: Ignore memoized agent outputs for this input
 
         Returns:
             Dict containing comprehensive analysis results
@@ -79,73 +143,48 @@ class SpecializedAgentCoordinator:
         }
 
         try:
-            # First, use triage to determine which agents to use
-            triage_result = await self.agents["triage"].process(
-                {
-                    "issue_description": f"Task type: {task_type}, Data: {str(data)[:200]}",
-                    "context": user_context or {},
-                }
-            )
-
-            results["triage"] = triage_result
-
-            # Based on task type, call appropriate agents
-            if task_type == "document_validation":
-                doc_analysis = await self.agents["document_validator"].process(
-                    {
-                        "document_data": data.get("document_data"),
-                        "document_type": data.get("document_type"),
-                        "case_context": user_context,
-                    }
-                )
-                results["analyses"]["document_validation"] = doc_analysis
-
-            elif task_type == "form_validation":
-                form_analysis = await self.agents["form_validator"].process(
-                    {
-                        "form_data": data.get("form_data"),
-                        "form_type": data.get("form_type"),
-                        "visa_type": data.get("visa_type"),
-                    }
-                )
-                results["analyses"]["form_validation"] = form_analysis
-
-            elif task_type == "eligibility_check":
-                eligibility_analysis = await self.agents["eligibility_analyst"].process(
-                    {
-                        "candidate_data": data.get("candidate_data"),
-                        "visa_type": data.get("visa_type"),
-                    }
+            task = TASK_ROUTES.get(task_type)
+            nodes = [
+                PipelineNode(
+                    "triage",
+                    lambda: self.agents["triage"].process(
+                        {
+                            "issue_description": f"Task type: {task_type}, Data: {str(data)[:200]}",
+                            "context": user_context or {},
+                        }
+                    ),
+                    timeout=AGENT_TIMEOUT,
                 )
-                results["analyses"]["eligibility"] = eligibility_analysis
-
-            elif task_type == "compliance_review":
-                compliance_analysis = await self.agents["compliance_checker"].process(
-                    {
-                        "application_data": data.get("application_data"),
-                        "visa_type": data.get("visa_type"),
-                    }
+            ]
+            # Triagem e agente da tarefa são independentes: rodam em paralelo
+            if task:
+                agent_name, analysis_key, build_input = task
+                nodes.append(
+                    PipelineNode(
+                        analysis_key,
+                        lambda: self.agents[agent_name].process(build_input(data, user_context)),
+                        timeout=AGENT_TIMEOUT,
+                    )
                 )
-                results["analyses"]["compliance"] = compliance_analysis
-
-            elif task_type == "letter_writing":
-                letter_result = await self.agents["letter_writer"].process(
-                    {
-                        "letter_type": data.get("letter_type"),
-                        "client_facts": data.get("client_facts"),
-                        "visa_type": data.get("visa_type"),
-                    }
-                )
-                results["analyses"]["letter_writing"] = letter_result
-
-            elif task_type == "form_translation":
-                translation_result = await self.agents["uscis_translator"].process(
-                    {
-                        "friendly_form_data": data.get("friendly_form_data"),
-                        "target_uscis_form": data.get("target_uscis_form"),
-                    }
+
+            run = await AgentPipeline(nodes).run(
+                revision=revision_key("specialized", task_type, data, user_context),
+                refresh=refresh,
+            )
+
+            results["triage"] = run.results.get("triage", {"error": run.errors.get("triage")})
+            if task:
+                analysis_key = task[1]
+                results["analyses"][analysis_key] = run.results.get(
+                    analysis_key, {"error": run.errors.get(analysis_key)}
                 )
-                results["analyses"]["form_translation"] = translation_result
+            results["pipeline"] = {
+                "status": run.status,
+                "errors": run.errors,
+                "memoized": run.memoized,
+                "timings_ms": run.timings_ms,
+                "total_ms": run.total_ms,
+            }
 
             # Generate summary
             results["summary"] = self._generate_summary(results["analyses"])
@@ -25,6 +25,13 @@ from llm.portkey_client import LLMClient
 
 logger = logging.getLogger(__name__)
 
+# Veredito da validação padrão (fallback) -> decisão dos KPIs
+FALLBACK_VERDICTS = {
+    "APROVADO": DecisionType.PASS,
+    "REVISÃO_NECESSÁRIA": DecisionType.ALERT,
+    "REJEITADO": DecisionType.FAIL,
+}
+
 
 class DocumentValidationAgent(BaseAgent):
     """
@@ -382,6 +389,7 @@ class DocumentValidationAgent(BaseAgent):
             Dict containing comprehensive validation results
         """
         start_time = datetime.now(timezone.utc)
+        kpis_recorded = False
 
         try:
             # PHASE 1: Quality Assessment
@@ -389,6 +397,16 @@ class DocumentValidationAgent(BaseAgent):
             quality_result = quality_assessor.assess_file_quality(file_content, file_name)
 
             if quality_result["status"] == "fail":
+                self._record_kpis(
+                    expected_document_type,
+                    None,
+                    0.0,
+                    quality_result.get("overall_quality_score", 0),
+                    DecisionType.FAIL,
+                    False,
+                    (datetime.now(timezone.utc) - start_time).total_seconds() * 1000,
+                    start_time,
+                )
                 return self._create_fail_result(
                     "QUALITY_FAIL", quality_result["issues"], 0.0, quality_result["recommendations"]
                 )
@@ -403,6 +421,10 @@ class DocumentValidationAgent(BaseAgent):
 
             # PHASE 3: Document-specific validation
             validation_result = None
+            # Tipo detectado e escalonamento só existem na análise geral; os
+            # validadores especializados assumem o tipo esperado
+            detected_type = None
+            escalated = False
 
             if expected_document_type in ["passport", "passport_id_page"]:
                 validator = specialized_validators["passport"]
@@ -428,6 +450,8 @@ class DocumentValidationAgent(BaseAgent):
                     applicant_name=applicant_name,
                 )
 
+                detected_type = self._detected_type(enhanced_result)
+                escalated = enhanced_result.get("verdict") == "NECESSITA_REVISÃO"
                 validation_result = {
                     "document_type": expected_document_type,
                     "is_valid": enhanced_result.get("verdict") == "APROVADO",
@@ -466,6 +490,18 @@ class DocumentValidationAgent(BaseAgent):
             else:
                 decision = DecisionType.FAIL
 
+            self._record_kpis(
+                expected_document_type,
+                detected_type,
+                final_confidence,
+                quality_result.get("overall_quality_score", 0),
+                decision,
+                decision == DecisionType.ALERT or (decision == DecisionType.FAIL and escalated),
+                processing_time,
+                start_time,
+            )
+            kpis_recorded = True
+
             # PHASE 7: Generate comprehensive response
             return {
                 "valid": decision == DecisionType.PASS,
@@ -513,6 +549,21 @@ class DocumentValidationAgent(BaseAgent):
                 {"applicant_name": applicant_name, "visa_type": visa_type},
             )
 
+            if not kpis_recorded:
+                fallback_decision = FALLBACK_VERDICTS.get(
+                    fallback_result.get("verdict"), DecisionType.FAIL
+                )
+                self._record_kpis(
+                    expected_document_type,
+                    None,
+                    fallback_result.get("confidence_score", 0) or 0,
+                    0.0,
+                    fallback_decision,
+                    fallback_decision == DecisionType.ALERT,
+                    (datetime.now(timezone.utc) - start_time).total_seconds() * 1000,
+                    start_time,
+                )
+
             fallback_result.update(
                 {
                     "agent": f"{self.agent_name} - Sistema Fallback",
@@ -533,6 +584,55 @@ class DocumentValidationAgent(BaseAgent):
         else:
             return []
 
+    @staticmethod
+    def _detected_type(enhanced_result: Dict[str, Any]) -> Optional[str]:
+        """Tipo identificado pela análise visual (None se ela caiu no fallback)"""
+        analysis = enhanced_result.get("document_analysis") or {}
+        if "error" in analysis or "analysis_note" in analysis:
+            return None
+        return analysis.get("identified_type")
+
+    def _record_kpis(
+        self,
+        expected_type: str,
+        identified_type: Optional[str],
+        confidence: float,
+        quality_score: float,
+        decision: DecisionType,
+        human_review_required: bool,
+        processing_time_ms: float,
+        analyzed_at: datetime,
+    ) -> None:
+        """
+        Registra a análise nos KPIs persistidos (instância do processo, com db)
+
+        Só entra o que este caminho mede: a classificação conta apenas quando
+        o tipo foi detectado (``identified_type``), e não há extrações de
+        campo com valor esperado para calcular exact match.
+        """
+        try:
+            # Sempre o módulo canônico: é nele que core.database chama set_db
+            from backend.documents.metrics import DocumentMetrics, document_metrics
+
+            document_metrics.record(
+                DocumentMetrics(
+                    document_id=f"{expected_type}:{analyzed_at.isoformat()}",
+                    doc_type=expected_type,
+                    classification_confidence=confidence,
+                    classification_correct=(
+                        None if identified_type is None else identified_type == expected_type
+                    ),
+                    field_extractions=[],
+                    quality_score=quality_score,
+                    decision=decision,
+                    human_review_required=human_review_required,
+                    processing_time_ms=processing_time_ms,
+                    analysis_timestamp=analyzed_at,
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record document KPIs: {e}")
+
     def _create_fail_result(
         self, reason: str, issues: List[str], confidence: float, recommendations: List[str]
     ) -> Dict[str, Any]:
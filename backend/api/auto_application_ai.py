@@ -481,7 +481,11 @@ async def run_qa_cycle_with_feedback(case_id: str, request: dict = None):
         orchestrator = get_qa_orchestrator(db)
 
         result = await orchestrator.orchestrate_qa_cycle(
-            case_data=case, qa_agent=qa_agent, db=db, max_iterations=max_iterations
+            case_data=case,
+            qa_agent=qa_agent,
+            db=db,
+            max_iterations=max_iterations,
+            max_seconds=request_data.get("max_seconds"),
         )
 
         if result["status"] == "approved":
@@ -512,6 +516,7 @@ async def run_qa_cycle_with_feedback(case_id: str, request: dict = None):
             "approved": result["status"] == "approved",
             "qa_report": result.get("qa_report"),
             "iteration_history": result.get("iteration_history", []),
+            "budget": result.get("budget"),
             "message": result["message"],
         }
 
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import logging
 import mimetypes
@@ -9,6 +10,7 @@ from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 
 from backend.core.auth import get_current_user
 from backend.core.database import db
+from backend.documents.quality_checker import DocumentQualityChecker
 from backend.models.documents import DocumentStatus, DocumentType, DocumentUpdate, UserDocument
 from backend.services.cases import update_case_status_and_progress
 from backend.services.documents import (
@@ -21,6 +23,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api")
 
+quality_checker = DocumentQualityChecker()
+
 
 @router.post("/case/{case_id}/upload-document")
 async def upload_document_to_case(
@@ -89,33 +93,45 @@ async def upload_document_to_case(
         )
 
         extraction_result = None
-        try:
-            from backend.documents.data_extractor import (
-                process_document_and_update_user,
+        quality_gate = None
+        if mime_type.startswith("image/"):
+            # Análise de imagem é CPU (NumPy): fora do event loop
+            quality_gate = await asyncio.to_thread(
+                quality_checker.precheck_for_ocr, content, file.filename or "document"
             )
-            from integrations.google import GoogleDocumentAIProcessor
+            if not quality_gate["proceed"]:
+                logger.info(f"🚫 OCR skipped for {file.filename}: {quality_gate['reasons']}")
 
-            doc_processor = GoogleDocumentAIProcessor()
-            ocr_result = await doc_processor.process_document(
-                file_content=content, filename=file.filename, mime_type=mime_type
-            )
-
-            if ocr_result.get("success") and ocr_result.get("extracted_text"):
-                user_id = case.get("user_id") or case.get("applicant_email")
-                if user_id:
-                    extraction_result = await process_document_and_update_user(
-                        document_text=ocr_result["extracted_text"],
-                        document_type=document_type,
-                        user_id=user_id,
-                        db=db,
-                    )
+        if quality_gate is None or quality_gate["proceed"]:
+            try:
+                from backend.documents.data_extractor import (
+                    process_document_and_update_user,
+                )
+                from integrations.google import GoogleDocumentAIProcessor
 
-                    if extraction_result.get("auto_corrected"):
-                        logger.info(f"🔄 User data auto-corrected based on {document_type}")
-                        logger.info(f"📝 Corrections: {extraction_result.get('corrections_made')}")
+                doc_processor = GoogleDocumentAIProcessor()
+                ocr_result = await doc_processor.process_document(
+                    file_content=content, filename=file.filename, mime_type=mime_type
+                )
 
-        except Exception as extract_error:
-            logger.warning(f"⚠️ Document extraction/correction failed: {str(extract_error)}")
+                if ocr_result.get("success") and ocr_result.get("extracted_text"):
+                    user_id = case.get("user_id") or case.get("applicant_email")
+                    if user_id:
+                        extraction_result = await process_document_and_update_user(
+                            document_text=ocr_result["extracted_text"],
+                            document_type=document_type,
+                            user_id=user_id,
+                            db=db,
+                        )
+
+                        if extraction_result.get("auto_corrected"):
+                            logger.info(f"🔄 User data auto-corrected based on {document_type}")
+                            logger.info(
+                                f"📝 Corrections: {extraction_result.get('corrections_made')}"
+                            )
+
+            except Exception as extract_error:
+                logger.warning(f"⚠️ Document extraction/correction failed: {str(extract_error)}")
 
         case = await db.auto_cases.find_one({"case_id": case_id})
         if not case:
@@ -147,6 +163,12 @@ async def upload_document_to_case(
                 "message": extraction_result.get("message"),
             }
 
+        if quality_gate:
+            response_data["quality_gate"] = {
+                "passed": quality_gate["proceed"],
+                "reasons": quality_gate["reasons"],
+            }
+
         return response_data
 
     except HTTPException:
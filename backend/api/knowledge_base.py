@@ -69,6 +69,18 @@ async def get_knowledge_categories(admin=Depends(require_admin)):
     return {"categories": KNOWLEDGE_BASE_CATEGORIES, "form_types": SUPPORTED_FORM_TYPES}
 
 
+@router.post("/admin/knowledge-base/reindex")
+async def reindex_knowledge_base(admin=Depends(require_admin)):
+    """Reconstrói o índice de busca da base de conhecimento (admin-only)."""
+    try:
+        from backend.knowledge.manager import KnowledgeBaseManager
+
+        kb_manager = KnowledgeBaseManager(db)
+        return await kb_manager.rebuild_search_index()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/admin/knowledge-base/{document_id}")
 async def get_knowledge_document(document_id: str, admin=Depends(require_admin)):
     """Busca documento específico por ID (admin-only)."""
@@ -0,0 +1,78 @@
+"""
+LLM Metrics API
+
+- GET /api/metrics/llm            — resumo JSON (por modelo, provedor, agente, endpoint)
+- GET /api/metrics/llm/prometheus — exportação no formato texto do Prometheus
+
+Ambos exigem admin (JWT) ou o token de scrape ``LLM_METRICS_SCRAPE_TOKEN``
+no header ``Authorization: Bearer`` (para o Prometheus).
+"""
+
+import hmac
+import os
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from fastapi.security import HTTPAuthorizationCredentials
+
+from backend.admin.security import get_current_user, require_admin, security
+from backend.llm.helpers import get_metrics_collector, metrics_labels
+
+router = APIRouter(prefix="/api/metrics")
+
+METRICS_SCRAPE_TOKEN = os.environ.get("LLM_METRICS_SCRAPE_TOKEN")
+
+
+async def require_metrics_access(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> Dict:
+    """Admin ou o token de scrape configurado"""
+    if METRICS_SCRAPE_TOKEN and hmac.compare_digest(
+        credentials.credentials.encode(), METRICS_SCRAPE_TOKEN.encode()
+    ):
+        return {"role": "metrics_scraper"}
+    return await require_admin(await get_current_user(credentials))
+
+
+def _route_label(scope) -> str:
+    """Template da rota (ex.: /api/cases/{case_id}) para manter a cardinalidade baixa"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", None) or "unmatched"
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or "unmatched"
+
+
+class LLMMetricsLabelMiddleware:
+    """
+    Rotula as chamadas LLM feitas durante a requisição com o endpoint
+
+    Middleware ASGI puro; o rótulo é resolvido só no momento do registro,
+    depois que o roteador já preencheu a rota no escopo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with metrics_labels(endpoint=lambda: _route_label(scope)):
+            await self.app(scope, receive, send)
+
+
+@router.get("/llm")
+async def llm_metrics_summary(_=Depends(require_metrics_access)):
+    """Resumo das métricas LLM desde o início do processo"""
+    return get_metrics_collector().get_metrics_summary()
+
+
+@router.get("/llm/prometheus", response_class=PlainTextResponse)
+async def llm_metrics_prometheus(_=Depends(require_metrics_access)):
+    """Endpoint de scrape (Prometheus text exposition format)"""
+    return PlainTextResponse(
+        get_metrics_collector().render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
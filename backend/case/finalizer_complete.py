@@ -3,6 +3,7 @@ Case Finalizer Complete - Versão Full com PDF Merging, Templates e Knowledge Ba
 Sistema completo para finalização de casos de imigração com merge real de PDFs
 """
 
+import asyncio
 import hashlib
 import logging
 import uuid
@@ -16,6 +17,8 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
 
+from .finalizer_jobs import FinalizerJobRunner, bson_safe
+
 logger = logging.getLogger(__name__)
 
 # Import visa agents for intelligent package generation
@@ -357,14 +360,23 @@ class CaseFinalizerComplete:
             }
         }
 
-        # Armazenar jobs em memória (pode ser substituído por Redis/DB)
-        self.jobs = {}
+        # Jobs persistidos no MongoDB (ligado em set_db; ver finalizer_jobs.py)
+        self.job_runner: Optional[FinalizerJobRunner] = None
 
         # Diretório para arquivos temporários
         self.temp_dir = Path("/tmp/case_finalizer")
         self.temp_dir.mkdir(exist_ok=True)
 
-    def start_finalization(
+    def set_db(self, db) -> None:
+        """Liga o finalizer ao MongoDB (jobs) e ao blob store (artefatos)"""
+        self.job_runner = FinalizerJobRunner(self, db)
+
+    def _require_runner(self) -> FinalizerJobRunner:
+        if self.job_runner is None:
+            raise RuntimeError("Case finalizer job store not initialized")
+        return self.job_runner
+
+    async def start_finalization(
         self,
         case_id: str,
         scenario_key: str,
@@ -375,6 +387,9 @@ class CaseFinalizerComplete:
         """
         Inicia processo de finalização completo com integração dos agentes especializados.
 
+        O job é gravado no MongoDB; no método tradicional os passos rodam em
+        background (pool de processos) e o status fica "running" até terminar.
+
         Args:
             case_id: ID do caso
             scenario_key: Chave do cenário (pode ser auto-detectado do case_data)
@@ -383,6 +398,7 @@ class CaseFinalizerComplete:
             case_data: Dados completos do caso (do MongoDB) - NOVO
         """
         try:
+            runner = self._require_runner()
             job_id = str(uuid.uuid4())
 
             # Se case_data foi fornecido, tentar usar agentes especializados
@@ -397,7 +413,9 @@ class CaseFinalizerComplete:
                     )
 
                     try:
-                        agent_package_result = generate_package_from_case(case_data, enable_qa=True)
+                        agent_package_result = await asyncio.to_thread(
+                            generate_package_from_case, case_data, enable_qa=True
+                        )
 
                         if agent_package_result.get("success"):
                             logger.info(
@@ -443,8 +461,6 @@ class CaseFinalizerComplete:
                 "agent_used": bool(agent_package_result),  # Track if agent was used
             }
 
-            self.jobs[job_id] = job_data
-
             logger.info(
                 f"🚀 Case Finalizer Complete iniciado: job_id={job_id}, case_id={case_id}, scenario={scenario_key}"
             )
@@ -455,19 +471,28 @@ class CaseFinalizerComplete:
                 package_result = agent_package_result.get("package_result", {})
                 qa_report = agent_package_result.get("qa_report", {})
 
+                links = {"qa_report": f"/api/visa/qa-report/{job_id}"}
+                output_pdf = package_result.get("output_pdf", "")
+                artifact = None
+                if output_pdf and Path(output_pdf).exists():
+                    artifact = await runner.store_artifact(
+                        job_id, "package.pdf", Path(output_pdf).read_bytes()
+                    )
+                    links["package"] = f"/download/master-packet/{job_id}"
+
                 job_data.update(
                     {
                         "status": "completed",
-                        "agent_result": agent_package_result,
+                        "completed_at": datetime.now(timezone.utc),
+                        "agent_result": bson_safe(agent_package_result),
                         "qa_score": qa_report.get("overall_score", 0),
-                        "package_path": package_result.get("output_pdf", ""),
-                        "validation": agent_package_result.get("validation", {}),
-                        "links": {
-                            "package": package_result.get("output_pdf", ""),
-                            "qa_report": f"/api/visa/qa-report/{job_id}",
-                        },
+                        "validation": bson_safe(agent_package_result.get("validation", {})),
+                        "links": links,
                     }
                 )
+                if artifact:
+                    job_data["master_packet"] = {"success": True, "artifact": artifact}
+                await runner.store.create(job_data)
 
                 logger.info(
                     f"✅ Case Finalizer Complete (Agent) concluído: job_id={job_id}, QA={qa_report.get('overall_score')}"
@@ -480,45 +505,13 @@ class CaseFinalizerComplete:
                     "used_agent": True,
                 }
 
-            # Método tradicional (fallback)
+            # Método tradicional (fallback): auditoria, instruções, checklist e
+            # merge rodam em background; o progresso sai como eventos do job
             logger.info(f"📝 Usando método tradicional de finalização")
+            await runner.store.create(job_data)
+            runner.start(job_data)
 
-            # Executar auditoria avançada
-            audit_result = self._audit_case_advanced(case_id, scenario_key)
-            job_data["audit_result"] = audit_result
-
-            if audit_result["status"] == "needs_correction":
-                job_data["status"] = "needs_correction"
-                job_data["issues"] = audit_result["missing"] + audit_result["warnings"]
-                logger.warning(f"⚠️ Auditoria falhou para case {case_id}: {job_data['issues']}")
-                return {"success": True, "job_id": job_id, "status": "needs_correction"}
-
-            # Gerar instruções completas baseadas em templates
-            instructions_result = self._generate_instructions_complete(
-                scenario_key, postage, language
-            )
-            checklist_result = self._generate_checklist_advanced(audit_result, language)
-
-            # Executar PDF merge real dos documentos
-            master_packet_result = self._create_master_packet_real(case_id, audit_result)
-
-            job_data.update(
-                {
-                    "status": "completed",
-                    "instructions": instructions_result,
-                    "checklist": checklist_result,
-                    "master_packet": master_packet_result,
-                    "links": {
-                        "instructions": f"/download/instructions/{job_id}",
-                        "checklist": f"/download/checklist/{job_id}",
-                        "master_packet": f"/download/master-packet/{job_id}",
-                    },
-                }
-            )
-
-            logger.info(f"✅ Case Finalizer Complete (Traditional) concluído: job_id={job_id}")
-
-            return {"success": True, "job_id": job_id, "status": "completed", "used_agent": False}
+            return {"success": True, "job_id": job_id, "status": "running", "used_agent": False}
 
         except Exception as e:
             logger.error(f"❌ Erro no Case Finalizer Complete: {e}")
@@ -774,11 +767,14 @@ class CaseFinalizerComplete:
         }
 
     def _create_master_packet_real(
-        self, case_id: str, audit_result: Dict[str, Any]
+        self, case_id: str, audit_result: Dict[str, Any], work_dir: Optional[Path] = None
     ) -> Dict[str, Any]:
         """
         Cria master packet real com PDF merging dos documentos
+
+        ``work_dir`` isola os arquivos de cada job (workers do pool em paralelo)
         """
+        work_dir = work_dir or self.temp_dir
         try:
             # Criar PDF writer
             pdf_writer = PdfWriter()
@@ -793,7 +789,7 @@ class CaseFinalizerComplete:
             ]
 
             # Gerar PDF índice
-            index_pdf_path = self._generate_index_pdf(case_id, mock_documents)
+            index_pdf_path = self._generate_index_pdf(case_id, mock_documents, work_dir)
 
             # Adicionar índice ao packet
             if index_pdf_path.exists():
@@ -805,7 +801,7 @@ class CaseFinalizerComplete:
             total_pages = sum(doc["pages"] for doc in mock_documents)
 
             # Salvar master packet
-            master_packet_path = self.temp_dir / f"master_packet_{case_id}.pdf"
+            master_packet_path = work_dir / f"master_packet_{case_id}.pdf"
 
             # Para demonstração, criar um PDF de exemplo se não há documentos reais
             if not any(doc["path"] for doc in mock_documents):
@@ -831,11 +827,13 @@ class CaseFinalizerComplete:
             logger.error(f"Erro ao criar master packet: {e}")
             return {"success": False, "error": str(e)}
 
-    def _generate_index_pdf(self, case_id: str, documents: List[Dict]) -> Path:
+    def _generate_index_pdf(
+        self, case_id: str, documents: List[Dict], work_dir: Optional[Path] = None
+    ) -> Path:
         """
         Gera PDF índice com lista de documentos incluídos
         """
-        index_path = self.temp_dir / f"index_{case_id}.pdf"
+        index_path = (work_dir or self.temp_dir) / f"index_{case_id}.pdf"
 
         # Criar documento PDF
         doc = SimpleDocTemplate(str(index_path), pagesize=letter)
@@ -939,15 +937,14 @@ class CaseFinalizerComplete:
 
         doc.build(content)
 
-    def get_job_status(self, job_id: str) -> Dict[str, Any]:
+    async def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """
-        Retorna status detalhado do job
+        Retorna status detalhado do job (lido do MongoDB; qualquer worker responde)
         """
-        if job_id not in self.jobs:
+        job = await self._require_runner().store.get(job_id)
+        if not job:
             return {"success": False, "error": "Job not found"}
 
-        job = self.jobs[job_id]
-
         # Adicionar informações de progresso
         progress = self._calculate_job_progress(job)
 
@@ -0,0 +1,318 @@
+"""
+Finalizer Jobs - jobs do CaseFinalizerComplete persistidos no MongoDB
+
+- Jobs na collection ``finalizer_jobs`` (expiram por TTL em ``expires_at``),
+  então status e downloads funcionam em qualquer worker/host e sobrevivem a
+  restart.
+- Passos pesados (auditoria, geração do índice e do master packet) rodam num
+  pool de processos; o event loop só orquestra.
+- Cada passo grava um evento de progresso no job (``events``), consumido por
+  polling do status ou pelo stream SSE ``/cases/finalize/{job_id}/events``.
+- PDFs gerados vão para o blob store (``core.blob_store``), não para /tmp.
+- O job tem lease: se o worker que o executa morre, outro reassume o job
+  depois de ``LEASE_SECONDS`` (até ``MAX_ATTEMPTS`` tentativas).
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import socket
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+
+from backend.core.blob_store import create_blob_store
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = "finalizer_jobs"
+JOB_TTL = timedelta(days=int(os.environ.get("FINALIZER_JOB_TTL_DAYS", "7")))
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+EVENTS_MAX = 50
+RECOVERY_INTERVAL_SECONDS = 60
+FINALIZER_WORKERS = int(os.environ.get("FINALIZER_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+ARTIFACT_PREFIX = "finalizer/"
+TERMINAL_STATUSES = {"completed", "needs_correction", "failed"}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Pool de processos dos passos pesados (forkserver, como page_extraction)"""
+    global _pool
+    if _pool is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+        else:
+            context = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(max_workers=FINALIZER_WORKERS, mp_context=context)
+    return _pool
+
+
+def shutdown_finalizer_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+# ── Passos executados nos processos do pool ──────────────────────
+
+
+def _audit_in_worker(case_id: str, scenario_key: str) -> Dict[str, Any]:
+    from backend.case.finalizer_complete import case_finalizer_complete
+
+    return case_finalizer_complete._audit_case_advanced(case_id, scenario_key)
+
+
+def _packet_in_worker(
+    case_id: str, audit_result: Dict[str, Any]
+) -> Tuple[Dict[str, Any], Optional[bytes], Optional[bytes]]:
+    """Master packet + índice num diretório próprio; devolve os bytes dos PDFs"""
+    from backend.case.finalizer_complete import case_finalizer_complete
+
+    work_dir = Path(tempfile.mkdtemp(prefix="finalizer_"))
+    try:
+        result = case_finalizer_complete._create_master_packet_real(
+            case_id, audit_result, work_dir=work_dir
+        )
+        packet = work_dir / f"master_packet_{case_id}.pdf"
+        index = work_dir / f"index_{case_id}.pdf"
+        return (
+            result,
+            packet.read_bytes() if packet.exists() else None,
+            index.read_bytes() if index.exists() else None,
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def bson_safe(data: Any) -> Any:
+    """Resultados dos agentes podem trazer Path/objetos; grava só JSON"""
+    return json.loads(json.dumps(data, default=str))
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class FinalizerJobStore:
+    """Persistência dos jobs (um documento por job, com eventos embutidos)"""
+
+    def __init__(self, db):
+        self.collection = db[JOBS_COLLECTION]
+
+    async def create(self, job: Dict[str, Any]) -> None:
+        now = _now()
+        await self.collection.insert_one(
+            {
+                **job,
+                "events": [],
+                "attempts": 1,
+                "lease_owner": WORKER_ID,
+                "lease_until": now + timedelta(seconds=LEASE_SECONDS),
+                "expires_at": now + JOB_TTL,
+            }
+        )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"job_id": job_id}, {"_id": 0})
+
+    async def update(self, job_id: str, fields: Dict[str, Any]) -> None:
+        """Grava o resultado de um passo e renova o lease"""
+        fields = {**fields, "lease_until": _now() + timedelta(seconds=LEASE_SECONDS)}
+        await self.collection.update_one({"job_id": job_id}, {"$set": fields})
+
+    async def push_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        await self.collection.update_one(
+            {"job_id": job_id},
+            {"$push": {"events": {"$each": [event], "$slice": -EVENTS_MAX}}},
+        )
+
+    async def claim_stale(self) -> Optional[Dict[str, Any]]:
+        """Reassume um job cujo worker parou de renovar o lease"""
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": MAX_ATTEMPTS}},
+            {
+                "$set": {
+                    "lease_owner": WORKER_ID,
+                    "lease_until": now + timedelta(seconds=LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fail_exhausted(self) -> int:
+        result = await self.collection.update_many(
+            {
+                "status": "running",
+                "lease_until": {"$lt": _now()},
+                "attempts": {"$gte": MAX_ATTEMPTS},
+            },
+            {"$set": {"status": "failed", "error": "Job abandoned by workers"}},
+        )
+        return result.modified_count
+
+
+class FinalizerJobRunner:
+    """Executa jobs de finalização (passos pesados no pool de processos)"""
+
+    def __init__(self, finalizer, db):
+        self.finalizer = finalizer
+        self.store = FinalizerJobStore(db)
+        self.blobs = create_blob_store(db)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self, job: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self.run(job), name=f"finalizer:{job['job_id']}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _emit(self, job: Dict[str, Any], step: int, status: str = "running") -> None:
+        job["_seq"] = job.get("_seq", 0) + 1
+        await self.store.push_event(
+            job["job_id"],
+            {
+                "seq": job["_seq"],
+                "ts": _now().isoformat(),
+                "step": step,
+                "status": status,
+                "percentage": int(step / 5 * 100),
+                "message": self.finalizer._get_status_message(status, step),
+            },
+        )
+
+    async def store_artifact(self, job_id: str, name: str, data: bytes) -> Dict[str, Any]:
+        key = f"{ARTIFACT_PREFIX}{job_id}/{name}"
+        return await self.blobs.put(key, data, content_type="application/pdf")
+
+    async def run(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        case_id = job["case_id"]
+        scenario_key = job["scenario_key"]
+        # Continua a sequência de eventos de uma tentativa anterior
+        job["_seq"] = max((e.get("seq", 0) for e in job.get("events", [])), default=0)
+        loop = asyncio.get_running_loop()
+        try:
+            await self._emit(job, 0)
+            audit_result = await loop.run_in_executor(
+                _get_pool(), _audit_in_worker, case_id, scenario_key
+            )
+            await self.store.update(job_id, {"audit_result": audit_result})
+
+            if audit_result["status"] == "needs_correction":
+                issues = audit_result["missing"] + audit_result["warnings"]
+                await self.store.update(
+                    job_id,
+                    {"status": "needs_correction", "issues": issues, "completed_at": _now()},
+                )
+                await self._emit(job, 1, "needs_correction")
+                logger.warning(f"⚠️ Auditoria falhou para case {case_id}: {issues}")
+                return
+            await self._emit(job, 1)
+
+            instructions = self.finalizer._generate_instructions_complete(
+                scenario_key, job["postage"], job["language"]
+            )
+            await self.store.update(job_id, {"instructions": instructions})
+            await self._emit(job, 2)
+
+            checklist = self.finalizer._generate_checklist_advanced(audit_result, job["language"])
+            await self.store.update(job_id, {"checklist": checklist})
+            await self._emit(job, 3)
+
+            master_packet, packet_pdf, index_pdf = await loop.run_in_executor(
+                _get_pool(), _packet_in_worker, case_id, audit_result
+            )
+            if packet_pdf:
+                master_packet["artifact"] = await self.store_artifact(
+                    job_id, "master_packet.pdf", packet_pdf
+                )
+                master_packet["file_size_mb"] = len(packet_pdf) / (1024 * 1024)
+            if index_pdf:
+                master_packet["index_artifact"] = await self.store_artifact(
+                    job_id, "index.pdf", index_pdf
+                )
+            master_packet.pop("packet_path", None)
+            await self.store.update(job_id, {"master_packet": master_packet})
+            await self._emit(job, 4)
+
+            await self.store.update(
+                job_id,
+                {
+                    "status": "completed",
+                    "completed_at": _now(),
+                    "links": {
+                        "instructions": f"/download/instructions/{job_id}",
+                        "checklist": f"/download/checklist/{job_id}",
+                        "master_packet": f"/download/master-packet/{job_id}",
+                    },
+                },
+            )
+            await self._emit(job, 5, "completed")
+            logger.info(f"✅ Case Finalizer Complete (Traditional) concluído: job_id={job_id}")
+
+        except Exception as e:
+            logger.error(f"❌ Erro no job de finalização {job_id}: {e}")
+            await self.store.update(job_id, {"status": "failed", "error": str(e)})
+            await self._emit(job, 0, "failed")
+
+    async def recover_loop(self, interval: int = RECOVERY_INTERVAL_SECONDS) -> None:
+        """Reassume jobs abandonados e limpa artefatos de jobs expirados"""
+        while True:
+            try:
+                failed = await self.store.fail_exhausted()
+                if failed:
+                    logger.warning(
+                        f"⚠️ {failed} finalizer job(s) failed after {MAX_ATTEMPTS} attempts"
+                    )
+                while True:
+                    job = await self.store.claim_stale()
+                    if not job:
+                        break
+                    logger.info(f"🔁 Resuming finalizer job {job['job_id']} ({WORKER_ID})")
+                    self.start(job)
+                await self.blobs.purge_older_than(_now() - JOB_TTL, prefix=ARTIFACT_PREFIX)
+            except Exception as e:
+                logger.error(f"Finalizer job recovery error: {e}")
+            await asyncio.sleep(interval)
+
+    async def follow_events(
+        self, job_id: str, poll_interval: float = 1.0, timeout: float = 600.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Eventos novos do job até ele terminar (qualquer worker pode servir)"""
+        last_seq = 0
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            job = await self.store.get(job_id)
+            if not job:
+                return
+            for event in job.get("events", []):
+                if event.get("seq", 0) > last_seq:
+                    last_seq = event["seq"]
+                    yield event
+            if job.get("status") in TERMINAL_STATUSES:
+                return
+            if asyncio.get_running_loop().time() > deadline:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def stream_artifact(self, key: str) -> AsyncIterator[bytes]:
+        async for chunk in self.blobs.stream(key):
+            yield chunk
+
@@ -6,11 +6,22 @@ Manage immigration cases per office (multi-tenant).
 import uuid
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from typing import Optional, List
 
+from backend.core.case_events import (
+    CASE_SLIM_PROJECTION,
+    get_case_events,
+    log_case_event,
+    new_case_event,
+    record_case_event,
+    recent_activity_push,
+)
+from backend.core.case_listing import fetch_case_page
+from backend.core.case_name_index import name_index_fields
 from backend.core.database import db
+from backend.core.invalidation import DerivedCache
 from backend.b2b_auth_api import get_b2b_user
 from core.rate_limit import limiter
 
@@ -52,17 +63,28 @@ class DeadlineRequest(BaseModel):
 
 @router.get("")
 async def list_cases(
+    response: Response,
     status: Optional[str] = None,
-    limit: int = Query(default=20, le=100),
-    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_b2b_user),
 ):
+    """
+    Cases of the office, most recently updated first.
+
+    Keyset pagination: when there are more rows, the ``X-Next-Cursor``
+    response header carries the token to pass as ``cursor`` for the next page.
+    """
     query = {"office_id": current_user["office_id"]}
     if status and status in VALID_STATUSES:
         query["status"] = status
 
-    cursor = db.b2b_cases.find(query, {"_id": 0}).sort("updated_at", -1).skip(skip).limit(limit)
-    cases = await cursor.to_list(length=limit)
+    try:
+        cases, next_cursor = await fetch_case_page(db, query, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
     # Add next deadline info
     now = datetime.now(timezone.utc)
@@ -78,7 +100,6 @@ async def list_cases(
             case["deadline_next"] = None
             case["deadline_days"] = None
         # Remove heavy fields from list
-        case.pop("documents", None)
         case.pop("deadlines", None)
 
     return cases
@@ -89,22 +110,29 @@ async def list_cases(
 async def create_case(request: Request, data: CaseCreateRequest, current_user: dict = Depends(get_b2b_user)):
     now = datetime.now(timezone.utc)
     case_id = "CASE-" + str(uuid.uuid4())[:8].upper()
+    event = new_case_event(
+        case_id, current_user["office_id"], "case_created", "Case created",
+        actor=current_user["user_id"], ts=now,
+    )
 
     case_doc = {
         "case_id": case_id,
         "office_id": current_user["office_id"],
         "client_name": data.client_name,
+        **name_index_fields(data.client_name),
         "visa_type": data.visa_type,
         "status": "intake",
         "notes": data.notes or "",
         "documents": [],
         "deadlines": [],
+        "recent_activity": recent_activity_push(event)["recent_activity"]["$each"],
         "created_at": now,
         "updated_at": now,
         "created_by": current_user["user_id"],
     }
 
     await db.b2b_cases.insert_one(case_doc)
+    await log_case_event(db, event)
 
     return {
         "message": "Case created",
@@ -113,9 +141,19 @@ async def create_case(request: Request, data: CaseCreateRequest, current_user: d
     }
 
 
+# Contadores do dashboard; invalidados por mudanças nos casos do escritório
+_stats_cache = DerivedCache("dashboard_stats")
+
+
 @router.get("/stats")
 async def case_stats(current_user: dict = Depends(get_b2b_user)):
     office_id = current_user["office_id"]
+    return await _stats_cache.get_or_compute(
+        office_id, None, "stats", lambda: _compute_case_stats(office_id)
+    )
+
+
+async def _compute_case_stats(office_id: str) -> dict:
     now = datetime.now(timezone.utc)
     week_from_now = now + timedelta(days=7)
 
@@ -149,13 +187,30 @@ async def case_stats(current_user: dict = Depends(get_b2b_user)):
 async def get_case(case_id: str, current_user: dict = Depends(get_b2b_user)):
     case = await db.b2b_cases.find_one(
         {"case_id": case_id, "office_id": current_user["office_id"]},
-        {"_id": 0},
+        CASE_SLIM_PROJECTION,
     )
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
     return case
 
 
+@router.get("/{case_id}/events")
+async def list_case_events(
+    case_id: str,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    current_user: dict = Depends(get_b2b_user),
+):
+    """Full activity log of a case, newest first (pass next_cursor to page)."""
+    try:
+        return await get_case_events(
+            db, case_id, current_user["office_id"], limit=limit, cursor=cursor, action=action
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.patch("/{case_id}")
 async def update_case(case_id: str, data: CaseUpdateRequest, current_user: dict = Depends(get_b2b_user)):
     update_fields = {}
@@ -173,11 +228,20 @@ async def update_case(case_id: str, data: CaseUpdateRequest, current_user: dict
     if not update_fields:
         raise HTTPException(status_code=400, detail="No fields to update")
 
+    # Campos internos de busca não aparecem no detalhe do evento
+    changed = list(update_fields)
+    if data.client_name:
+        update_fields.update(name_index_fields(data.client_name))
     update_fields["updated_at"] = datetime.now(timezone.utc)
 
-    result = await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": current_user["office_id"]},
-        {"$set": update_fields},
+    result = await record_case_event(
+        db,
+        case_id,
+        current_user["office_id"],
+        "status_changed" if data.status else "case_updated",
+        f"Status: {data.status}" if data.status else f"Updated: {', '.join(changed)}",
+        set_fields=update_fields,
+        actor=current_user["user_id"],
     )
 
     if result.matched_count == 0:
@@ -196,12 +260,15 @@ async def add_deadline(case_id: str, data: DeadlineRequest, current_user: dict =
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
 
-    result = await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": current_user["office_id"]},
-        {
-            "$push": {"deadlines": deadline_doc},
-            "$set": {"updated_at": datetime.now(timezone.utc)},
-        },
+    result = await record_case_event(
+        db,
+        case_id,
+        current_user["office_id"],
+        "deadline_added",
+        f"Deadline: {data.title} — {data.due_date}",
+        set_fields={"updated_at": datetime.now(timezone.utc)},
+        push_fields={"deadlines": deadline_doc},
+        actor=current_user["user_id"],
     )
 
     if result.matched_count == 0:
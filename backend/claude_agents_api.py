@@ -6,7 +6,7 @@ Agents:
 - POST /api/agents/miguel/review        — Document review
 - POST /api/agents/patricia/advise      — Strategy & compliance
 - POST /api/agents/ricardo/letter       — Letter writing (on-demand)
-- POST /api/agents/comprehensive-analysis — Carlos → Miguel → Patricia pipeline
+- POST /api/agents/comprehensive-analysis — (Carlos ∥ Miguel) → Patricia pipeline
 
 All endpoints accept either:
   - {"case_id": "..."} to auto-fetch from MongoDB
@@ -22,6 +22,7 @@ from pydantic import BaseModel, Field
 
 from backend.llm.claude_client import ClaudeClient
 from backend.core.database import db
+from backend.agents.pipeline import AgentPipeline, PipelineNode, revision_key
 from backend.agents.claude import (
     CarlosEligibilityAgent,
     MiguelDocumentAgent,
@@ -102,6 +103,7 @@ class CaseAnalysisRequest(BaseModel):
     case_data: Optional[dict] = Field(default=None, description="Case data (client info, docs, notes)")
     visa_type: Optional[str] = Field(default=None, description="Target visa type (H-1B, EB-1A, etc.)")
     office_name: Optional[str] = Field(default=None, description="Law firm name")
+    refresh: bool = Field(default=False, description="Ignore memoized agent outputs")
 
 
 class LetterRequest(BaseModel):
@@ -243,15 +245,28 @@ async def ricardo_letter(req: LetterRequest):
 
 # ── COMPREHENSIVE ANALYSIS PIPELINE ─────────────────────────────
 
+# Timeouts por agente (segundos)
+CARLOS_TIMEOUT = 120
+MIGUEL_TIMEOUT = 120
+PATRICIA_TIMEOUT = 150
+
+
+def _agent_failed(result: dict) -> bool:
+    return "error" in result and not result.get("parse_error")
+
+
 @router.post("/comprehensive-analysis")
 async def comprehensive_analysis(req: CaseAnalysisRequest):
     """
-    Full analysis pipeline: Carlos → Miguel → Patricia.
+    Full analysis pipeline: (Carlos ∥ Miguel) → Patricia.
 
-    Orchestrates three agents in sequence:
-    1. Carlos analyzes eligibility
-    2. Miguel reviews documents (with Carlos context)
-    3. Patricia synthesizes strategy (with Carlos + Miguel context)
+    Runs as a dependency graph:
+    1. Carlos analyzes eligibility and Miguel reviews documents, concurrently
+    2. Patricia synthesizes strategy (with Carlos + Miguel context)
+
+    Agent outputs are memoized per case revision (content hash of the case
+    data); pass refresh=true to recompute. If Carlos or Miguel fails, the
+    other result is still returned and Patricia is skipped.
 
     Accepts either case_id or case_data + visa_type.
     Returns combined result from all three agents.
@@ -265,54 +280,73 @@ async def comprehensive_analysis(req: CaseAnalysisRequest):
     start_time = time.time()
     client = get_claude_client()
 
-    # ── STEP 1: Carlos — Eligibility ─────────────────────────────
-    logger.info(f"[comprehensive] Starting Carlos for {visa_type}")
-    carlos = CarlosEligibilityAgent(claude_client=client)
-    carlos_result = await carlos.analyze(
-        case_data=case_data,
-        visa_type=visa_type,
-        office_name=office_name,
-    )
+    async def run_carlos():
+        logger.info(f"[comprehensive] Starting Carlos for {visa_type}")
+        carlos = CarlosEligibilityAgent(claude_client=client)
+        return await carlos.analyze(
+            case_data=case_data,
+            visa_type=visa_type,
+            office_name=office_name,
+        )
 
-    if "error" in carlos_result and not carlos_result.get("parse_error"):
-        return {
-            "pipeline": "failed",
-            "failed_at": "carlos",
-            "carlos": carlos_result,
-            "miguel": None,
-            "patricia": None,
-        }
+    async def run_miguel():
+        logger.info(f"[comprehensive] Starting Miguel for {visa_type}")
+        miguel = MiguelDocumentAgent(claude_client=client)
+        return await miguel.review(
+            case_data=case_data,
+            visa_type=visa_type,
+            office_name=office_name,
+        )
 
-    # ── STEP 2: Miguel — Documents ───────────────────────────────
-    logger.info(f"[comprehensive] Starting Miguel for {visa_type}")
-    miguel = MiguelDocumentAgent(claude_client=client)
-    miguel_result = await miguel.review(
-        case_data=case_data,
-        visa_type=visa_type,
-        office_name=office_name,
-        carlos_analysis=carlos_result,
+    async def run_patricia(carlos, miguel):
+        logger.info(f"[comprehensive] Starting Patricia for {visa_type}")
+        patricia = PatriciaStrategyAgent(claude_client=client)
+        return await patricia.advise(
+            case_data=case_data,
+            visa_type=visa_type,
+            carlos_analysis=carlos,
+            miguel_analysis=miguel,
+            office_name=office_name,
+        )
+
+    pipeline = AgentPipeline(
+        [
+            PipelineNode("carlos", run_carlos, timeout=CARLOS_TIMEOUT, is_failure=_agent_failed),
+            PipelineNode("miguel", run_miguel, timeout=MIGUEL_TIMEOUT, is_failure=_agent_failed),
+            PipelineNode(
+                "patricia",
+                run_patricia,
+                depends_on=("carlos", "miguel"),
+                timeout=PATRICIA_TIMEOUT,
+                is_failure=_agent_failed,
+            ),
+        ]
+    )
+    run = await pipeline.run(
+        revision=revision_key("comprehensive", case_data, visa_type, office_name),
+        refresh=req.refresh,
     )
 
-    if "error" in miguel_result and not miguel_result.get("parse_error"):
+    carlos_result = run.results.get("carlos") or _node_error(run, "carlos")
+    miguel_result = run.results.get("miguel") or _node_error(run, "miguel")
+    execution = {
+        "timings_ms": run.timings_ms,
+        "memoized": run.memoized,
+        "errors": run.errors,
+    }
+
+    if run.status != "completed":
+        failed_at = next(name for name in ("carlos", "miguel", "patricia") if not run.ok(name))
         return {
-            "pipeline": "partial",
-            "failed_at": "miguel",
+            "pipeline": run.status,
+            "failed_at": failed_at,
             "carlos": carlos_result,
             "miguel": miguel_result,
-            "patricia": None,
+            "patricia": run.results.get("patricia"),
+            "execution": execution,
         }
 
-    # ── STEP 3: Patricia — Strategy ──────────────────────────────
-    logger.info(f"[comprehensive] Starting Patricia for {visa_type}")
-    patricia = PatriciaStrategyAgent(claude_client=client)
-    patricia_result = await patricia.advise(
-        case_data=case_data,
-        visa_type=visa_type,
-        carlos_analysis=carlos_result,
-        miguel_analysis=miguel_result,
-        office_name=office_name,
-    )
-
+    patricia_result = run.results["patricia"]
     total_time = time.time() - start_time
 
     return {
@@ -325,4 +359,12 @@ async def comprehensive_analysis(req: CaseAnalysisRequest):
         "patricia": patricia_result,
         "verdict": patricia_result.get("verdict", "REVISAR_PRIMEIRO"),
         "summary": patricia_result.get("summary", "Análise completa disponível acima."),
+        "execution": execution,
     }
+
+
+def _node_error(run, name: str) -> Optional[dict]:
+    """Nó sem saída (timeout/exceção): devolve o erro no formato dos agentes"""
+    if name in run.errors:
+        return {"error": run.errors[name]}
+    return None
@@ -8,6 +8,7 @@ legal rules validation, inadmissibility screening, and policy enforcement.
 from .advanced_reviewer import AdvancedImmigrationReviewerAgent
 from .inadmissibility import InadmissibilityScreening
 from .legal_rules import ImmigrationLegalRules
+from .policy_bundle import PolicyBundle
 from .policy_engine import PolicyEngine
 from .reviewer import ImmigrationComplianceReviewer
 
@@ -17,4 +18,5 @@ __all__ = [
     "ImmigrationLegalRules",
     "InadmissibilityScreening",
     "PolicyEngine",
+    "PolicyBundle",
 ]
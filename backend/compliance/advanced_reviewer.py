@@ -19,15 +19,75 @@ import re
 from datetime import datetime
 from typing import Dict, List, Tuple
 
+from backend.compliance.near_duplicates import (
+    MinHashLSH,
+    NearDuplicateIndex,
+    NearDuplicateResult,
+    find_near_duplicate_pages,
+)
+from backend.compliance.page_extraction import (
+    PDFPLUMBER_AVAILABLE,
+    PYMUPDF_AVAILABLE,
+    PackagePages,
+)
+
 logger = logging.getLogger(__name__)
 
-try:
-    import pdfplumber
+if not PYMUPDF_AVAILABLE and not PDFPLUMBER_AVAILABLE:
+    logger.warning("⚠️ Nenhum backend de PDF instalado. Instale com: pip install PyMuPDF")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_LED_PATTERN = re.compile(
+    r"(led|manage[sd]?|mentor[ed]*|supervise[sd]*|oversee[s]*)\s+.*?(\d+)\s+engineers?",
+    re.IGNORECASE,
+)
+
+
+class _ConsistencyAccumulator:
+    """
+    Acumula, página a página, as contagens usadas na validação de consistência
+    (valores críticos do modelo e números de engenheiros em contexto de liderança)
+    """
+
+    def __init__(self, critical_data: Dict[str, str]):
+        self.critical_data = critical_data
+        self.counts = {field_name: 0 for field_name in critical_data}
+        self.team_sizes_led = set()
+
+    def add(self, text: str) -> None:
+        for field_name, expected_value in self.critical_data.items():
+            self.counts[field_name] += text.count(expected_value)
+        self.team_sizes_led.update(match[1] for match in _LED_PATTERN.findall(text))
+
+    def errors(self, expected_team_size: str) -> List[str]:
+        errors = []
+
+        for field_name, expected_value in self.critical_data.items():
+            count = self.counts[field_name]
+            if count == 0:
+                errors.append(f"Dado crítico ausente: {field_name} = {expected_value}")
+            elif count < 3:
+                # Valores críticos devem aparecer múltiplas vezes em um documento completo
+                errors.append(
+                    f"Dado crítico aparece poucas vezes ({count}x): {field_name} = {expected_value}"
+                )
+
+        # O número correto é job1_team_size (Technical Lead role)
+        # Outros números podem aparecer para outras posições (job2, job3) e isso é ESPERADO
+        if self.team_sizes_led:
+            if expected_team_size not in self.team_sizes_led:
+                errors.append(
+                    f"INCONSISTÊNCIA: Número de engenheiros LIDERADOS não encontrado. "
+                    f"Esperado: {expected_team_size}, encontrado em contexto de liderança: {', '.join(self.team_sizes_led)}"
+                )
+            elif len(self.team_sizes_led) > 1:
+                wrong_numbers = self.team_sizes_led - {expected_team_size}
+                errors.append(
+                    f"AVISO: Múltiplos tamanhos de equipe mencionados em contexto de liderança. "
+                    f"Esperado: {expected_team_size}, também encontrado: {', '.join(wrong_numbers)}"
+                )
 
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
-    logger.warning("⚠️ pdfplumber não está instalado. Instale com: pip install pdfplumber")
+        return errors
 
 
 class AdvancedImmigrationReviewerAgent:
@@ -46,6 +106,19 @@ class AdvancedImmigrationReviewerAgent:
         self.min_pages = 20  # Mínimo de páginas esperado
         self.max_duplicate_threshold = 0.15  # Máximo 15% de páginas duplicadas
         self.min_content_length_per_page = 200  # Mínimo de caracteres por página
+        self.similarity_threshold = 0.85  # Jaccard mínimo para páginas "similares"
+        self._lsh = MinHashLSH()
+
+        self.required_sections = [
+            "COVER LETTER",
+            "FORM I-129",
+            "LABOR CONDITION APPLICATION",
+            "SUPPORT LETTER",
+            "JOB DESCRIPTION",
+            "RESUME",
+            "EDUCATIONAL CREDENTIALS",
+            "PASSPORT",
+        ]
 
         # Palavras/frases que indicam conteúdo genérico ou placeholder
         self.generic_phrases = [
@@ -60,12 +133,17 @@ class AdvancedImmigrationReviewerAgent:
             "this is a test",
         ]
 
-    def review_package(self, pdf_path: str) -> Dict:
+    def review_package(self, pdf_path: str, fail_fast: bool = False) -> Dict:
         """
         Revisa um pacote H-1B completo
 
+        As páginas são consumidas em streaming (PackagePages): cada
+        verificação acumula o que precisa por página, sem manter o PDF nem o
+        texto completo em memória.
+
         Args:
             pdf_path: Caminho para o arquivo PDF
+            fail_fast: Interrompe a leitura no primeiro erro que já garante REJECTED
 
         Returns:
             Dict com resultado da revisão: {
@@ -76,11 +154,11 @@ class AdvancedImmigrationReviewerAgent:
                 "details": {...}
             }
         """
-        if not PDFPLUMBER_AVAILABLE:
+        if not PYMUPDF_AVAILABLE and not PDFPLUMBER_AVAILABLE:
             return {
                 "status": "ERROR",
                 "score": 0,
-                "errors": ["pdfplumber não está instalado"],
+                "errors": ["Nenhum backend de PDF instalado (PyMuPDF ou pdfplumber)"],
                 "warnings": [],
                 "details": {},
             }
@@ -104,102 +182,122 @@ class AdvancedImmigrationReviewerAgent:
         details = {}
 
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                num_pages = len(pdf.pages)
-                logger.info(f"📃 Total de páginas: {num_pages}")
-
-                # 1. Verificar número mínimo de páginas
-                if num_pages < self.min_pages:
+            pages = PackagePages(pdf_path)
+            num_pages = pages.page_count
+            logger.info(f"📃 Total de páginas: {num_pages} (backend: {pages.backend})")
+
+            # 1. Verificar número mínimo de páginas
+            if num_pages < self.min_pages:
+                errors.append(f"Pacote muito curto: {num_pages} páginas (mínimo: {self.min_pages})")
+
+            # 2. Consumir as páginas em streaming, acumulando cada verificação
+            logger.info(f"\n📖 Analisando páginas em streaming...")
+            pages_hashes = []
+            near_duplicates_index = NearDuplicateIndex(
+                similarity_threshold=self.similarity_threshold, lsh=self._lsh
+            )
+            generic_pages = {}
+            thin_pages = {}
+            found_sections = set()
+            consistency = _ConsistencyAccumulator(self._critical_data()) if self.h1b_data else None
+            max_duplicates = self.max_duplicate_threshold * num_pages
+            stopped_early = False
+
+            for i, text in pages:
+                # Hash do conteúdo para detectar duplicatas exatas
+                pages_hashes.append(hashlib.md5(text.encode("utf-8")).hexdigest())
+                near_duplicates_index.add(i, text)
+
+                phrases = self._generic_phrases_in(text)
+                if phrases:
+                    generic_pages[i] = phrases
+
+                char_count = self._content_length(text)
+                if char_count < self.min_content_length_per_page:
+                    thin_pages[i] = char_count
+
+                found_sections.update(self._sections_in(text))
+                if consistency:
+                    consistency.add(text)
+
+                if (i + 1) % 50 == 0:
+                    logger.info(f"   ✓ Processadas {i + 1} páginas...")
+
+                if fail_fast and (
+                    generic_pages or len(pages_hashes) - len(set(pages_hashes)) > max_duplicates
+                ):
+                    logger.warning(f"   ⛔ Erro bloqueante na página {i + 1} - revisão interrompida")
+                    stopped_early = True
+                    break
+
+            pages_reviewed = len(pages_hashes)
+            logger.info(f"   ✅ {pages_reviewed} de {num_pages} páginas processadas")
+
+            # 3. Detectar páginas duplicadas (exatas)
+            logger.info(f"\n🔎 Detectando páginas duplicadas exatas...")
+            duplicate_pages = self._find_duplicate_pages(pages_hashes)
+            duplicate_percentage = (len(duplicate_pages) / num_pages) * 100 if num_pages else 0.0
+
+            logger.info(
+                f"   📊 Páginas duplicadas exatas: {len(duplicate_pages)} ({duplicate_percentage:.1f}%)"
+            )
+
+            if duplicate_percentage > (self.max_duplicate_threshold * 100):
+                errors.append(
+                    f"Muitas páginas duplicadas: {len(duplicate_pages)} páginas ({duplicate_percentage:.1f}%). "
+                    f"Máximo aceitável: {self.max_duplicate_threshold * 100}%"
+                )
+                # Listar algumas páginas duplicadas
+                for dup_set in list(duplicate_pages.values())[:3]:  # Mostrar até 3 exemplos
                     errors.append(
-                        f"Pacote muito curto: {num_pages} páginas (mínimo: {self.min_pages})"
+                        f"   → Páginas idênticas: {', '.join(map(str, sorted(dup_set)))}"
                     )
 
-                # 2. Extrair texto de todas as páginas
-                logger.info(f"\n📖 Extraindo texto de todas as páginas...")
-                pages_text = []
-                pages_hashes = []
-
-                for i, page in enumerate(pdf.pages):
-                    text = page.extract_text() or ""
-                    pages_text.append(text)
-
-                    # Criar hash do conteúdo para detectar duplicatas
-                    text_hash = hashlib.md5(text.encode("utf-8")).hexdigest()
-                    pages_hashes.append(text_hash)
+            # 3.5. Detectar páginas SIMILARES (conteúdo repetitivo com pequenas variações)
+            logger.info(f"\n🔍 Detectando páginas com conteúdo SIMILAR (repetitivo)...")
+            near_duplicates = near_duplicates_index.result()
+            similar_count = near_duplicates.redundant_pages
+            similar_percentage = (similar_count / num_pages) * 100 if num_pages else 0.0
 
-                    if (i + 1) % 10 == 0:
-                        logger.info(f"   ✓ Processadas {i + 1} páginas...")
+            logger.info(
+                f"   📊 Páginas similares/repetitivas: {similar_count} ({similar_percentage:.1f}%) "
+                f"em {len(near_duplicates.clusters)} grupos "
+                f"({near_duplicates.candidates_checked} pares candidatos verificados)"
+            )
 
-                logger.info(f"   ✅ Todas as {num_pages} páginas processadas")
-
-                # 3. Detectar páginas duplicadas (exatas)
-                logger.info(f"\n🔎 Detectando páginas duplicadas exatas...")
-                duplicate_pages = self._find_duplicate_pages(pages_hashes)
-                duplicate_percentage = (len(duplicate_pages) / num_pages) * 100
-
-                logger.info(
-                    f"   📊 Páginas duplicadas exatas: {len(duplicate_pages)} ({duplicate_percentage:.1f}%)"
+            if similar_percentage > (self.max_duplicate_threshold * 100):
+                errors.append(
+                    f"❌ CONTEÚDO REPETITIVO DETECTADO: {similar_count} páginas ({similar_percentage:.1f}%) "
+                    f"têm conteúdo muito similar. Máximo aceitável: {self.max_duplicate_threshold * 100}%"
                 )
-
-                if duplicate_percentage > (self.max_duplicate_threshold * 100):
-                    errors.append(
-                        f"Muitas páginas duplicadas: {len(duplicate_pages)} páginas ({duplicate_percentage:.1f}%). "
-                        f"Máximo aceitável: {self.max_duplicate_threshold * 100}%"
-                    )
-                    # Listar algumas páginas duplicadas
-                    for dup_set in list(duplicate_pages.values())[:3]:  # Mostrar até 3 exemplos
-                        errors.append(
-                            f"   → Páginas idênticas: {', '.join(map(str, sorted(dup_set)))}"
-                        )
-
-                # 3.5. Detectar páginas SIMILARES (conteúdo repetitivo com pequenas variações)
-                logger.info(f"\n🔍 Detectando páginas com conteúdo SIMILAR (repetitivo)...")
-                similar_pages = self._find_similar_pages(pages_text)
-                similar_percentage = (len(similar_pages) / num_pages) * 100
-
-                logger.info(
-                    f"   📊 Páginas similares/repetitivas: {len(similar_pages)} ({similar_percentage:.1f}%)"
+                # Listar exemplos de grupos de páginas similares
+                for cluster in near_duplicates.clusters[:5]:  # Mostrar até 5 exemplos
+                    errors.append(f"   → Páginas {', '.join(map(str, cluster))} são quase idênticas")
+
+            # 4. Texto genérico ou placeholder
+            if generic_pages:
+                errors.append(f"Texto genérico encontrado em {len(generic_pages)} páginas:")
+                for page_num, phrases in list(generic_pages.items())[:5]:  # Mostrar até 5 exemplos
+                    errors.append(f"   → Página {page_num + 1}: {', '.join(phrases)}")
+
+            # 5. Conteúdo mínimo por página
+            if thin_pages:
+                warnings.append(f"Páginas com pouco conteúdo: {len(thin_pages)}")
+                for page_num, char_count in list(thin_pages.items())[:5]:
+                    warnings.append(f"   → Página {page_num + 1}: apenas {char_count} caracteres")
+
+            if stopped_early:
+                warnings.append(
+                    f"Revisão interrompida na página {pages_reviewed} (fail_fast) - "
+                    "verificações de consistência e seções puladas"
                 )
-
-                if similar_percentage > (self.max_duplicate_threshold * 100):
-                    errors.append(
-                        f"❌ CONTEÚDO REPETITIVO DETECTADO: {len(similar_pages)} páginas ({similar_percentage:.1f}%) "
-                        f"têm conteúdo muito similar. Máximo aceitável: {self.max_duplicate_threshold * 100}%"
-                    )
-                    # Listar exemplos de páginas similares
-                    for i, (page_nums, similarity) in enumerate(
-                        similar_pages[:5]
-                    ):  # Mostrar até 5 exemplos
-                        errors.append(
-                            f"   → Páginas {', '.join(map(str, page_nums))} são {similarity:.0f}% similares"
-                        )
-
-                # 4. Detectar texto genérico ou placeholder
-                logger.info(f"\n🔍 Detectando texto genérico ou placeholder...")
-                generic_pages = self._find_generic_content(pages_text)
-
-                if generic_pages:
-                    errors.append(f"Texto genérico encontrado em {len(generic_pages)} páginas:")
-                    for page_num, phrases in list(generic_pages.items())[
-                        :5
-                    ]:  # Mostrar até 5 exemplos
-                        errors.append(f"   → Página {page_num + 1}: {', '.join(phrases)}")
-
-                # 5. Verificar conteúdo mínimo por página
-                logger.info(f"\n📏 Verificando quantidade de conteúdo por página...")
-                thin_pages = self._find_thin_pages(pages_text)
-
-                if thin_pages:
-                    warnings.append(f"Páginas com pouco conteúdo: {len(thin_pages)}")
-                    for page_num, char_count in list(thin_pages.items())[:5]:
-                        warnings.append(
-                            f"   → Página {page_num + 1}: apenas {char_count} caracteres"
-                        )
-
+            else:
                 # 6. Validar consistência de dados (se modelo fornecido)
                 logger.info(f"\n✅ Validando consistência de dados...")
-                if self.h1b_data:
-                    consistency_errors = self._validate_data_consistency(pages_text)
+                if consistency:
+                    consistency_errors = consistency.errors(
+                        str(self.h1b_data.beneficiary["job1_team_size"])
+                    )
                     if consistency_errors:
                         errors.extend(consistency_errors)
                     else:
@@ -211,20 +309,26 @@ class AdvancedImmigrationReviewerAgent:
 
                 # 7. Verificar seções obrigatórias
                 logger.info(f"\n📋 Verificando seções obrigatórias...")
-                missing_sections = self._check_required_sections(pages_text)
+                missing_sections = [s for s in self.required_sections if s not in found_sections]
                 if missing_sections:
                     errors.append(f"Seções obrigatórias faltando: {', '.join(missing_sections)}")
 
-                # Preparar detalhes
-                details = {
-                    "total_pages": num_pages,
-                    "duplicate_pages": len(duplicate_pages),
-                    "duplicate_percentage": round(duplicate_percentage, 2),
-                    "generic_content_pages": len(generic_pages),
-                    "thin_pages": len(thin_pages),
-                    "file_size_mb": round(os.path.getsize(pdf_path) / (1024 * 1024), 2),
-                    "review_date": datetime.now().isoformat(),
-                }
+            # Preparar detalhes
+            details = {
+                "total_pages": num_pages,
+                "pages_reviewed": pages_reviewed,
+                "duplicate_pages": len(duplicate_pages),
+                "duplicate_percentage": round(duplicate_percentage, 2),
+                "similar_pages": similar_count,
+                "similar_percentage": round(similar_percentage, 2),
+                "similar_page_clusters": near_duplicates.clusters,
+                "generic_content_pages": len(generic_pages),
+                "thin_pages": len(thin_pages),
+                "file_size_mb": round(os.path.getsize(pdf_path) / (1024 * 1024), 2),
+                "text_backend": pages.backend,
+                "text_from_cache": pages.from_cache,
+                "review_date": datetime.now().isoformat(),
+            }
 
         except Exception as e:
             errors.append(f"Erro ao processar PDF: {str(e)}")
@@ -278,6 +382,17 @@ class AdvancedImmigrationReviewerAgent:
         # Retornar apenas hashes que aparecem mais de uma vez
         return {h: pages for h, pages in hash_to_pages.items() if len(pages) > 1}
 
+    def _find_similar_page_clusters(self, pages_text: List[str]) -> NearDuplicateResult:
+        """
+        Agrupa páginas quase idênticas via MinHash/LSH
+
+        Apenas pares candidatos do LSH passam pela verificação exata de
+        Jaccard, então o custo é ~linear no número de páginas.
+        """
+        return find_near_duplicate_pages(
+            pages_text, similarity_threshold=self.similarity_threshold, lsh=self._lsh
+        )
+
     def _find_similar_pages(
         self, pages_text: List[str], similarity_threshold: float = 0.85
     ) -> List[Tuple[List[int], float]]:
@@ -288,67 +403,30 @@ class AdvancedImmigrationReviewerAgent:
         Returns:
             Lista de tuplas: (lista de páginas similares, % de similaridade)
         """
-        similar_groups = []
-        checked_pairs = set()
-
-        # Normalizar textos: remover números de página e espaços extras
-        normalized_texts = []
-        for text in pages_text:
-            # Remover padrões comuns de numeração de página
-            normalized = re.sub(r"Page \d+", "", text)
-            normalized = re.sub(r"- Page \d+", "", normalized)
-            normalized = re.sub(r"\d+\s+of\s+\d+", "", normalized)
-            # Remover espaços múltiplos
-            normalized = re.sub(r"\s+", " ", normalized).strip()
-            normalized_texts.append(normalized)
-
-        # Comparar cada par de páginas
-        for i in range(len(normalized_texts)):
-            for j in range(i + 1, len(normalized_texts)):
-                pair_key = (i, j)
-                if pair_key in checked_pairs:
-                    continue
-
-                checked_pairs.add(pair_key)
-
-                # Calcular similaridade usando Jaccard similarity (words)
-                text1 = normalized_texts[i]
-                text2 = normalized_texts[j]
-
-                if len(text1) < 50 or len(text2) < 50:
-                    # Ignorar páginas muito curtas
-                    continue
+        return find_near_duplicate_pages(
+            pages_text, similarity_threshold=similarity_threshold, lsh=self._lsh
+        ).pairs
 
-                # Dividir em palavras
-                words1 = set(text1.lower().split())
-                words2 = set(text2.lower().split())
+    def _generic_phrases_in(self, text: str) -> List[str]:
+        """Frases genéricas/placeholder presentes em uma página"""
+        text_lower = text.lower()
+        return [phrase for phrase in self.generic_phrases if phrase in text_lower]
 
-                if not words1 or not words2:
-                    continue
+    def _content_length(self, text: str) -> int:
+        """Caracteres da página sem espaços em branco excessivos"""
+        return len(_WHITESPACE_RE.sub(" ", text).strip())
 
-                # Calcular Jaccard similarity
-                intersection = len(words1 & words2)
-                union = len(words1 | words2)
-                similarity = intersection / union if union > 0 else 0
-
-                # Se similaridade for alta, marcar como problema
-                if similarity >= similarity_threshold:
-                    similar_groups.append(([i + 1, j + 1], similarity * 100))
-
-        return similar_groups
+    def _sections_in(self, text: str) -> List[str]:
+        """Seções obrigatórias mencionadas em uma página"""
+        text_upper = text.upper()
+        return [section for section in self.required_sections if section in text_upper]
 
     def _find_generic_content(self, pages_text: List[str]) -> Dict[int, List[str]]:
         """Encontra páginas com texto genérico ou placeholder"""
         generic_pages = {}
 
         for i, text in enumerate(pages_text):
-            text_lower = text.lower()
-            found_phrases = []
-
-            for phrase in self.generic_phrases:
-                if phrase in text_lower:
-                    found_phrases.append(phrase)
-
+            found_phrases = self._generic_phrases_in(text)
             if found_phrases:
                 generic_pages[i] = found_phrases
 
@@ -359,25 +437,15 @@ class AdvancedImmigrationReviewerAgent:
         thin_pages = {}
 
         for i, text in enumerate(pages_text):
-            # Remover espaços em branco excessivos
-            clean_text = re.sub(r"\s+", " ", text).strip()
-            char_count = len(clean_text)
-
+            char_count = self._content_length(text)
             if char_count < self.min_content_length_per_page:
                 thin_pages[i] = char_count
 
         return thin_pages
 
-    def _validate_data_consistency(self, pages_text: List[str]) -> List[str]:
-        """Valida que os dados no PDF batem com o modelo"""
-        if not self.h1b_data:
-            return []
-
-        errors = []
-        full_text = " ".join(pages_text)
-
-        # Validações críticas
-        critical_data = {
+    def _critical_data(self) -> Dict[str, str]:
+        """Valores do modelo que devem aparecer no pacote"""
+        return {
             "Nome completo": self.h1b_data.beneficiary["full_name"],
             "Número de engenheiros liderados": str(self.h1b_data.beneficiary["job1_team_size"]),
             "Budget gerenciado": self.h1b_data.beneficiary["job1_budget_managed"],
@@ -386,69 +454,23 @@ class AdvancedImmigrationReviewerAgent:
             "Certificação LCA": self.h1b_data.lca["certification_number"],
         }
 
-        for field_name, expected_value in critical_data.items():
-            # Contar quantas vezes o valor aparece no documento
-            count = full_text.count(expected_value)
-
-            if count == 0:
-                errors.append(f"Dado crítico ausente: {field_name} = {expected_value}")
-            elif count < 3:
-                # Valores críticos devem aparecer múltiplas vezes em um documento completo
-                errors.append(
-                    f"Dado crítico aparece poucas vezes ({count}x): {field_name} = {expected_value}"
-                )
-
-        # Verificar se há referências ao time size liderado
-        # O número correto é job1_team_size (Technical Lead role)
-        # Outros números podem aparecer para outras posições (job2, job3) e isso é ESPERADO
-        expected_team_size = str(self.h1b_data.beneficiary["job1_team_size"])
-        led_pattern = (
-            r"(led|manage[sd]?|mentor[ed]*|supervise[sd]*|oversee[s]*)\s+.*?(\d+)\s+engineers?"
-        )
-        led_matches = re.findall(led_pattern, full_text, re.IGNORECASE)
-
-        if led_matches:
-            # Extrair apenas os números quando o contexto é sobre LIDERANÇA
-            team_sizes_led = [match[1] for match in led_matches]
-            unique_led_counts = set(team_sizes_led)
-
-            # Verificar se o número correto aparece
-            if expected_team_size not in unique_led_counts:
-                errors.append(
-                    f"INCONSISTÊNCIA: Número de engenheiros LIDERADOS não encontrado. "
-                    f"Esperado: {expected_team_size}, encontrado em contexto de liderança: {', '.join(unique_led_counts)}"
-                )
-            elif len(unique_led_counts) > 1:
-                # Há múltiplos números em contexto de liderança
-                wrong_numbers = unique_led_counts - {expected_team_size}
-                errors.append(
-                    f"AVISO: Múltiplos tamanhos de equipe mencionados em contexto de liderança. "
-                    f"Esperado: {expected_team_size}, também encontrado: {', '.join(wrong_numbers)}"
-                )
+    def _validate_data_consistency(self, pages_text: List[str]) -> List[str]:
+        """Valida que os dados no PDF batem com o modelo"""
+        if not self.h1b_data:
+            return []
 
-        return errors
+        accumulator = _ConsistencyAccumulator(self._critical_data())
+        for text in pages_text:
+            accumulator.add(text)
+        return accumulator.errors(str(self.h1b_data.beneficiary["job1_team_size"]))
 
     def _check_required_sections(self, pages_text: List[str]) -> List[str]:
         """Verifica se todas as seções obrigatórias estão presentes"""
-        full_text = " ".join(pages_text)
-
-        required_sections = [
-            "COVER LETTER",
-            "FORM I-129",
-            "LABOR CONDITION APPLICATION",
-            "SUPPORT LETTER",
-            "JOB DESCRIPTION",
-            "RESUME",
-            "EDUCATIONAL CREDENTIALS",
-            "PASSPORT",
-        ]
-
-        missing = []
-        for section in required_sections:
-            if section not in full_text.upper():
-                missing.append(section)
+        found = set()
+        for text in pages_text:
+            found.update(self._sections_in(text))
 
-        return missing
+        return [section for section in self.required_sections if section not in found]
 
     def _calculate_score(self, errors: List[str], warnings: List[str], details: Dict) -> int:
         """Calcula score de 0-100 baseado nos problemas encontrados"""
@@ -0,0 +1,216 @@
+"""
+Near-Duplicate Page Detection (MinHash + LSH)
+
+Detecta páginas quase idênticas em pacotes grandes sem comparar todos os
+pares: cada página vira um conjunto de shingles, resumido por uma
+assinatura MinHash; o banding LSH gera pares candidatos em tempo
+aproximadamente linear e só esses pares passam pela verificação exata de
+Jaccard. Pares confirmados são agrupados em clusters (union-find).
+"""
+
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+_PAGE_NUMBER_RES = (
+    re.compile(r"Page \d+"),
+    re.compile(r"- Page \d+"),
+    re.compile(r"\d+\s+of\s+\d+"),
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Buckets maiores que isso (ex.: dezenas de páginas idênticas) são ligados em
+# estrela ao primeiro membro em vez de gerar todos os pares
+MAX_PAIRWISE_BUCKET = 32
+
+
+def normalize_page_text(text: str) -> str:
+    """Remove numeração de página e espaços extras"""
+    for pattern in _PAGE_NUMBER_RES:
+        text = pattern.sub("", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def shingle(text: str, size: int = 1) -> Set[str]:
+    """
+    Conjunto de shingles de palavras
+
+    Com ``size=1`` o conjunto é o mesmo usado pela comparação original
+    (Jaccard de palavras), então o LSH aproxima exatamente a métrica
+    verificada.
+    """
+    words = text.lower().split()
+    if size <= 1:
+        return set(words)
+    return {" ".join(words[i : i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _hash32(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class NearDuplicateResult:
+    """Resultado da detecção: pares verificados e clusters (páginas 1-indexed)"""
+
+    pairs: List[Tuple[List[int], float]] = field(default_factory=list)
+    clusters: List[List[int]] = field(default_factory=list)
+    candidates_checked: int = 0
+
+    @property
+    def redundant_pages(self) -> int:
+        """Páginas que sobram além de um representante por cluster"""
+        return sum(len(cluster) - 1 for cluster in self.clusters)
+
+
+class MinHashLSH:
+    """
+    Assinaturas MinHash com banding LSH
+
+    Com ``num_perm=128`` e ``bands=16`` (8 linhas por banda) o limiar
+    efetivo fica em ~0.71, dando recall >99% para Jaccard >= 0.85.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.RandomState(seed)
+        # a, b < 2^32 e hashes de 32 bits: a*x + b cabe em uint64 sem overflow
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Set[str]) -> Optional[np.ndarray]:
+        if not shingles:
+            return None
+        hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return np.bitwise_and(permuted, _MAX_HASH).min(axis=0)
+
+    def candidate_pairs(self, signatures: Dict[int, np.ndarray]) -> Set[Tuple[int, int]]:
+        """Pares que colidem em pelo menos uma banda"""
+        candidates: Set[Tuple[int, int]] = set()
+        for band in range(self.bands):
+            start = band * self.rows
+            buckets: Dict[bytes, List[int]] = {}
+            for idx, sig in signatures.items():
+                buckets.setdefault(sig[start : start + self.rows].tobytes(), []).append(idx)
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                if len(members) > MAX_PAIRWISE_BUCKET:
+                    candidates.update((members[0], other) for other in members[1:])
+                    continue
+                for i, first in enumerate(members):
+                    for second in members[i + 1 :]:
+                        candidates.add((first, second) if first < second else (second, first))
+        return candidates
+
+
+def _cluster(pairs: List[Tuple[int, int]]) -> List[List[int]]:
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    groups: Dict[int, List[int]] = {}
+    for node in parent:
+        groups.setdefault(find(node), []).append(node)
+    return sorted(sorted(g) for g in groups.values())
+
+
+class NearDuplicateIndex:
+    """
+    Versão incremental: páginas são adicionadas uma a uma (ex.: conforme
+    são extraídas do PDF) e só os shingles/assinaturas ficam em memória.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.85,
+        min_chars: int = 50,
+        shingle_size: int = 1,
+        lsh: Optional[MinHashLSH] = None,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.min_chars = min_chars
+        self.shingle_size = shingle_size
+        self.lsh = lsh or MinHashLSH()
+        self._shingles: Dict[int, Set[str]] = {}
+        self._signatures: Dict[int, np.ndarray] = {}
+
+    def add(self, index: int, text: str) -> None:
+        """Adiciona a página ``index`` (0-indexed)"""
+        normalized = normalize_page_text(text or "")
+        if len(normalized) < self.min_chars:
+            return
+        page_shingles = shingle(normalized, self.shingle_size)
+        signature = self.lsh.signature(page_shingles)
+        if signature is None:
+            return
+        self._shingles[index] = page_shingles
+        self._signatures[index] = signature
+
+    def result(self) -> NearDuplicateResult:
+        candidates = self.lsh.candidate_pairs(self._signatures)
+
+        result = NearDuplicateResult(candidates_checked=len(candidates))
+        confirmed = []
+        for i, j in sorted(candidates):
+            similarity = jaccard(self._shingles[i], self._shingles[j])
+            if similarity >= self.similarity_threshold:
+                result.pairs.append(([i + 1, j + 1], similarity * 100))
+                confirmed.append((i + 1, j + 1))
+
+        result.clusters = _cluster(confirmed)
+        return result
+
+
+def find_near_duplicate_pages(
+    pages_text: List[str],
+    similarity_threshold: float = 0.85,
+    min_chars: int = 50,
+    shingle_size: int = 1,
+    lsh: Optional[MinHashLSH] = None,
+) -> NearDuplicateResult:
+    """
+    Encontra páginas quase duplicadas
+
+    Args:
+        pages_text: Texto de cada página (índice 0 = página 1)
+        similarity_threshold: Jaccard mínimo para considerar duplicata
+        min_chars: Páginas com menos caracteres normalizados são ignoradas
+        shingle_size: Tamanho dos shingles de palavras
+        lsh: Instância MinHashLSH (permite reaproveitar as permutações)
+
+    Returns:
+        NearDuplicateResult com pares (páginas, % similaridade) e clusters
+    """
+    index = NearDuplicateIndex(similarity_threshold, min_chars, shingle_size, lsh)
+    for idx, text in enumerate(pages_text):
+        index.add(idx, text)
+    return index.result()
@@ -0,0 +1,262 @@
+"""
+Package Page Extraction - extração de texto por página em streaming
+
+Pipeline usado pelos revisores de pacote:
+- PyMuPDF como backend de texto (pdfplumber como fallback)
+- faixas de páginas extraídas em paralelo num pool de processos
+- páginas entregues em ordem por um gerador (memória constante)
+- cache em disco do texto de cada página, chaveado pelo SHA-256 do PDF
+  (diretório 0700, entradas expiram por TTL e por quantidade de pacotes)
+
+O consumidor pode interromper o gerador a qualquer momento (early exit);
+as faixas ainda pendentes são canceladas.
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fitz  # PyMuPDF
+
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+try:
+    import pdfplumber
+
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+PAGE_TEXT_CACHE_DIR = Path(
+    os.environ.get("PAGE_TEXT_CACHE_DIR", "/tmp/osprey_page_text_cache")
+)
+PAGE_TEXT_CACHE_MAX_PACKAGES = int(os.environ.get("PAGE_TEXT_CACHE_MAX_PACKAGES", "64"))
+PAGE_TEXT_CACHE_TTL_SECONDS = int(os.environ.get("PAGE_TEXT_CACHE_TTL_SECONDS", str(24 * 3600)))
+EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", "0")) or (os.cpu_count() or 1)
+
+PAGES_PER_TASK = 16  # Páginas por tarefa enviada ao pool
+PARALLEL_MIN_PAGES = 32  # Abaixo disso, extrair no próprio processo
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Pool compartilhado entre revisões (processos reaproveitados)
+
+    Usa forkserver: os workers nascem de um processo limpo (sem as threads
+    do servidor) que já importou este módulo, então o fork é seguro e barato.
+    """
+    global _pool
+    if _pool is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+        else:
+            context = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS, mp_context=context)
+    return _pool
+
+
+def shutdown_extraction_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Executado nos workers: texto das páginas [start, end) via PyMuPDF"""
+    with fitz.open(pdf_path) as doc:
+        return [doc.load_page(i).get_text("text") or "" for i in range(start, end)]
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PackagePages:
+    """
+    Páginas de um pacote PDF, iteráveis como ``(índice, texto)`` em ordem
+
+    Exemplo:
+        pages = PackagePages(pdf_path)
+        for index, text in pages:
+            ...
+    """
+
+    def __init__(self, pdf_path: str, workers: Optional[int] = None, use_cache: bool = True):
+        self.pdf_path = str(pdf_path)
+        self.workers = workers or EXTRACTION_WORKERS
+        self.use_cache = use_cache
+        self.sha256 = file_sha256(self.pdf_path) if use_cache else None
+        self.backend = "pymupdf" if PYMUPDF_AVAILABLE else "pdfplumber"
+        self.from_cache = False
+        self.page_count = self._cached_page_count()
+        if self.page_count is not None:
+            self.from_cache = True
+        else:
+            self.page_count = self._count_pages()
+
+    # ------------------------------------------------------------------ cache
+
+    @property
+    def _cache_dir(self) -> Optional[Path]:
+        return PAGE_TEXT_CACHE_DIR / self.sha256 if self.sha256 else None
+
+    def _cached_page_count(self) -> Optional[int]:
+        if not self._cache_dir:
+            return None
+        try:
+            meta_path = self._cache_dir / "meta.json"
+            if _expired(meta_path.stat().st_mtime):
+                shutil.rmtree(self._cache_dir, ignore_errors=True)
+                return None
+            meta = json.loads(meta_path.read_text())
+            return int(meta["page_count"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _cache_page(self, index: int, text: str) -> None:
+        try:
+            _ensure_private_dir(PAGE_TEXT_CACHE_DIR)
+            _ensure_private_dir(self._cache_dir)
+            (self._cache_dir / f"{index:05d}.txt").write_text(text, encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Page text cache write failed: {e}")
+            self.use_cache = False
+
+    def _finalize_cache(self) -> None:
+        try:
+            (self._cache_dir / "meta.json").write_text(
+                json.dumps({"page_count": self.page_count, "backend": self.backend})
+            )
+            prune_page_text_cache()
+        except OSError as e:
+            logger.warning(f"Page text cache finalize failed: {e}")
+
+    # ------------------------------------------------------------- extraction
+
+    def _count_pages(self) -> int:
+        if PYMUPDF_AVAILABLE:
+            with fitz.open(self.pdf_path) as doc:
+                return doc.page_count
+        if PDFPLUMBER_AVAILABLE:
+            with pdfplumber.open(self.pdf_path) as pdf:
+                return len(pdf.pages)
+        raise RuntimeError("Nenhum backend de PDF disponível (instale PyMuPDF ou pdfplumber)")
+
+    def _iter_from_cache(self) -> Iterator[Tuple[int, str]]:
+        for index in range(self.page_count):
+            yield index, (self._cache_dir / f"{index:05d}.txt").read_text(encoding="utf-8")
+
+    def _iter_sequential(self) -> Iterator[Tuple[int, str]]:
+        if PYMUPDF_AVAILABLE:
+            with fitz.open(self.pdf_path) as doc:
+                for index in range(doc.page_count):
+                    yield index, doc.load_page(index).get_text("text") or ""
+        else:
+            with pdfplumber.open(self.pdf_path) as pdf:
+                for index, page in enumerate(pdf.pages):
+                    yield index, page.extract_text() or ""
+                    page.flush_cache()
+
+    def _iter_parallel(self) -> Iterator[Tuple[int, str]]:
+        ranges = [
+            (start, min(start + PAGES_PER_TASK, self.page_count))
+            for start in range(0, self.page_count, PAGES_PER_TASK)
+        ]
+        pool = _get_pool()
+        window = max(2, self.workers * 2)  # faixas em voo (limita memória)
+        pending: Dict[int, Future] = {}
+        next_submit = 0
+
+        try:
+            for position in range(len(ranges)):
+                while next_submit < len(ranges) and len(pending) < window:
+                    start, end = ranges[next_submit]
+                    pending[next_submit] = pool.submit(
+                        _extract_page_range, self.pdf_path, start, end
+                    )
+                    next_submit += 1
+
+                texts = pending.pop(position).result()
+                start = ranges[position][0]
+                for offset, text in enumerate(texts):
+                    yield start + offset, text
+        finally:
+            for future in pending.values():
+                future.cancel()
+
+    def __iter__(self) -> Iterator[Tuple[int, str]]:
+        if self.from_cache:
+            yield from self._iter_from_cache()
+            return
+
+        parallel = (
+            PYMUPDF_AVAILABLE and self.workers > 1 and self.page_count >= PARALLEL_MIN_PAGES
+        )
+        source = self._iter_parallel() if parallel else self._iter_sequential()
+
+        completed = 0
+        for index, text in source:
+            if self.use_cache:
+                self._cache_page(index, text)
+            completed += 1
+            yield index, text
+
+        if self.use_cache and completed == self.page_count:
+            self._finalize_cache()
+
+
+def _ensure_private_dir(path: Path) -> None:
+    """Cria o diretório só para o dono (o texto das páginas tem dados de clientes)"""
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if path.stat().st_mode & 0o077:
+        path.chmod(0o700)
+
+
+def _expired(mtime: float) -> bool:
+    return time.time() - mtime > PAGE_TEXT_CACHE_TTL_SECONDS
+
+
+def prune_page_text_cache() -> int:
+    """
+    Remove pacotes expirados e mantém no máximo PAGE_TEXT_CACHE_MAX_PACKAGES
+
+    Returns:
+        Número de pacotes removidos
+    """
+    try:
+        entries = sorted(
+            ((p, p.stat().st_mtime) for p in PAGE_TEXT_CACHE_DIR.iterdir() if p.is_dir()),
+            key=lambda entry: entry[1],
+            reverse=True,
+        )
+    except OSError:
+        return 0
+    stale = [
+        path
+        for position, (path, mtime) in enumerate(entries)
+        if position >= PAGE_TEXT_CACHE_MAX_PACKAGES or _expired(mtime)
+    ]
+    for path in stale:
+        shutil.rmtree(path, ignore_errors=True)
+    return len(stale)
+
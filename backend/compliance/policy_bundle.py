@@ -0,0 +1,264 @@
+"""
+Policy Bundle - Políticas YAML compiladas para o PolicyEngine
+
+Compila as políticas uma única vez no carregamento: regex de campos já
+compilados, conjuntos de palavras-chave e um scanner por palavras inteiras
+e n-gramas sobre o texto normalizado. O bundle é imutável; quando os
+arquivos de ``policies/`` mudam, um novo bundle é construído e trocado atomicamente.
+"""
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Pattern, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+FIELD_REGEX_FLAGS = re.IGNORECASE | re.MULTILINE
+
+# Palavras-chave das verificações de presença e idioma. As de presença casam
+# por prefixo ("sealed", "officially", "signatures", "assinados"); as formas
+# que mudam o radical (carimbado, selada, assinada) estão listadas
+SEAL_WORDS = (
+    "seal",
+    "stamp",
+    "carimbo",
+    "carimbad",
+    "selo",
+    "selad",
+    "official",
+    "governo",
+)
+SIGNATURE_WORDS = ("signature", "signed", "assinatura", "assinad")
+ENGLISH_WORDS = ("the", "and", "of", "to", "in", "is", "was", "for", "with", "on")
+PORTUGUESE_WORDS = ("de", "da", "do", "em", "para", "com", "por", "uma", "um", "na", "no")
+
+# Intervalo mínimo entre verificações de mudança nos arquivos de política
+RELOAD_CHECK_INTERVAL = 2.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_for_scan(text: str) -> str:
+    """Normaliza o texto uma única vez: minúsculas e espaços colapsados."""
+    return _WHITESPACE_RE.sub(" ", text.lower()) if text else ""
+
+
+class KeywordScanner:
+    """
+    Encontra quais palavras-chave ocorrem no texto, por palavras inteiras
+
+    O texto é quebrado em tokens (``\\w+``) uma vez; palavras simples são
+    uma interseção de conjuntos e expressões de várias palavras são
+    procuradas como n-gramas num ``set`` — O(tokens × tamanhos distintos de
+    n-grama), independente do número de palavras-chave. "U.S." casa com
+    "u s"; "signed" não casa dentro de "unsigned".
+
+    ``prefixes`` são palavras simples que casam com qualquer token que comece
+    por elas ("seal" em "sealed"), conferidas uma vez por token distinto.
+    """
+
+    def __init__(self, keywords: Iterable[str], prefixes: Iterable[str] = ()):
+        self.prefixes: Tuple[str, ...] = tuple(
+            sorted({normalize_for_scan(p).strip() for p in prefixes if p and p.strip()})
+        )
+        self.keywords: FrozenSet[str] = frozenset(
+            normalize_for_scan(k).strip() for k in keywords if k and k.strip()
+        ) | frozenset(self.prefixes)
+        # n -> {tupla de tokens: palavras-chave que ela representa}
+        self._ngrams: Dict[int, Dict[Tuple[str, ...], List[str]]] = {}
+        for keyword in self.keywords - frozenset(self.prefixes):
+            tokens = tuple(_TOKEN_RE.findall(keyword))
+            if tokens:
+                self._ngrams.setdefault(len(tokens), {}).setdefault(tokens, []).append(keyword)
+
+    def scan(self, normalized_text: str) -> FrozenSet[str]:
+        if not self.keywords or not normalized_text:
+            return frozenset()
+
+        tokens = _TOKEN_RE.findall(normalized_text)
+        distinct = set(tokens)
+        found = set()
+        if self.prefixes:
+            for token in distinct:
+                if token.startswith(self.prefixes):
+                    found.update(p for p in self.prefixes if token.startswith(p))
+        for n, grams in self._ngrams.items():
+            if n == 1:
+                for token in grams.keys() & {(t,) for t in distinct}:
+                    found.update(grams[token])
+                continue
+            for i in range(len(tokens) - n + 1):
+                keywords = grams.get(tuple(tokens[i : i + n]))
+                if keywords:
+                    found.update(keywords)
+                    if len(found) == len(self.keywords):
+                        return frozenset(found)
+        return frozenset(found)
+
+
+@dataclass(frozen=True)
+class CompiledField:
+    """Campo de política com regex pré-compilado"""
+
+    name: str
+    regex: str
+    description: str
+    required: bool
+    pattern: Optional[Pattern]
+    error: Optional[str] = None
+
+    def as_policy_field(self) -> Dict[str, Any]:
+        """Formato aceito por FieldExtractionEngine (com ``compiled``)."""
+        return {
+            "name": self.name,
+            "regex": self.regex,
+            "description": self.description,
+            "required": self.required,
+            "compiled": self.pattern,
+        }
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    """Política de um tipo de documento, pronta para validação"""
+
+    doc_type: str
+    source: Mapping[str, Any]
+    fields: Tuple[CompiledField, ...]
+    snippets: Tuple[Tuple[str, str], ...]
+    scanner: KeywordScanner
+    requires_seal: bool
+    requires_signature: bool
+
+    @property
+    def policy_fields(self) -> List[Dict[str, Any]]:
+        return [f.as_policy_field() for f in self.fields]
+
+
+@dataclass(frozen=True)
+class PolicyBundle:
+    """Conjunto imutável de políticas compiladas"""
+
+    policies: Mapping[str, CompiledPolicy]
+    fingerprint: Tuple[Tuple[str, int, int], ...]
+    loaded_at: float = field(default_factory=time.time)
+
+    def get(self, doc_type: str) -> Optional[CompiledPolicy]:
+        return self.policies.get(doc_type)
+
+
+def _compile_field(field_def: Dict[str, Any], required: bool) -> Optional[CompiledField]:
+    name = field_def.get("name")
+    regex = field_def.get("regex")
+    if not name or not regex:
+        return None
+    description = field_def.get("description", "")
+    try:
+        return CompiledField(
+            name, regex, description, required, re.compile(regex, FIELD_REGEX_FLAGS)
+        )
+    except re.error as e:
+        logger.warning(f"Invalid regex for field {name}: {e}")
+        return CompiledField(name, regex, description, required, None, f"Regex inválido: {e}")
+
+
+def compile_policy(policy_data: Dict[str, Any]) -> CompiledPolicy:
+    """Compila uma política YAML já carregada"""
+    fields = [
+        _compile_field(f, required=True) for f in policy_data.get("required_fields", []) or []
+    ] + [_compile_field(f, required=False) for f in policy_data.get("optional_fields", []) or []]
+
+    snippets = tuple(
+        (s, normalize_for_scan(s).strip())
+        for s in policy_data.get("required_text_snippets", []) or []
+        if s
+    )
+    presence = policy_data.get("presence_checks", {}) or {}
+
+    keywords = [normalized for _, normalized in snippets]
+    if policy_data.get("language") == "en_or_translation_required":
+        keywords.extend(ENGLISH_WORDS + PORTUGUESE_WORDS)
+
+    return CompiledPolicy(
+        doc_type=policy_data["doc_type"],
+        source=policy_data,
+        fields=tuple(f for f in fields if f is not None),
+        snippets=snippets,
+        scanner=KeywordScanner(keywords, prefixes=SEAL_WORDS + SIGNATURE_WORDS),
+        requires_seal=bool(presence.get("official_seal_or_stamp")),
+        requires_signature=bool(presence.get("signature")),
+    )
+
+
+def policy_fingerprint(policies_dir: Path) -> Tuple[Tuple[str, int, int], ...]:
+    """Identifica o estado dos arquivos (nome, mtime, tamanho)."""
+    if not policies_dir.exists():
+        return ()
+    entries = []
+    for policy_file in sorted(policies_dir.glob("*.yaml")):
+        try:
+            stat = policy_file.stat()
+        except OSError:
+            continue
+        entries.append((policy_file.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(entries)
+
+
+def load_policy_bundle(policies_dir: Path) -> PolicyBundle:
+    """Carrega e compila todas as políticas YAML do diretório"""
+    fingerprint = policy_fingerprint(policies_dir)
+    if not policies_dir.exists():
+        logger.warning(f"Policies directory not found: {policies_dir}")
+        return PolicyBundle(MappingProxyType({}), fingerprint)
+
+    compiled: Dict[str, CompiledPolicy] = {}
+    for policy_file in sorted(policies_dir.glob("*.yaml")):
+        try:
+            with open(policy_file, "r", encoding="utf-8") as f:
+                policy_data = yaml.safe_load(f)
+
+            if policy_data and policy_data.get("doc_type"):
+                compiled[policy_data["doc_type"]] = compile_policy(policy_data)
+
+        except Exception as e:
+            logger.error(f"Error loading policy {policy_file}: {e}")
+
+    logger.info(f"Loaded {len(compiled)} document policies")
+    return PolicyBundle(MappingProxyType(compiled), fingerprint)
+
+
+class PolicyBundleLoader:
+    """
+    Mantém o bundle atual e recarrega quando os arquivos mudam
+
+    A verificação de mudança é um ``stat`` do diretório, limitada a uma a
+    cada ``check_interval`` segundos.
+    """
+
+    def __init__(self, policies_dir: Path, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.policies_dir = policies_dir
+        self.check_interval = check_interval
+        self._bundle = load_policy_bundle(policies_dir)
+        self._last_check = time.monotonic()
+
+    @property
+    def bundle(self) -> PolicyBundle:
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            if policy_fingerprint(self.policies_dir) != self._bundle.fingerprint:
+                logger.info(f"Policy files changed in {self.policies_dir}, reloading bundle")
+                self._bundle = load_policy_bundle(self.policies_dir)
+        return self._bundle
+
+    def reload(self) -> PolicyBundle:
+        self._bundle = load_policy_bundle(self.policies_dir)
+        self._last_check = time.monotonic()
+        return self._bundle
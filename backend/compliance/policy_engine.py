@@ -4,13 +4,20 @@ Processa políticas de validação de documentos com extração avançada de cam
 """
 
 import logging
-import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-
-import yaml
-
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.compliance.policy_bundle import (
+    ENGLISH_WORDS,
+    PORTUGUESE_WORDS,
+    SEAL_WORDS,
+    SIGNATURE_WORDS,
+    CompiledPolicy,
+    PolicyBundle,
+    PolicyBundleLoader,
+    normalize_for_scan,
+)
 from backend.documents.classifier import document_classifier
 from backend.documents.consistency import cross_document_consistency
 from backend.documents.quality_checker import DocumentQualityChecker
@@ -26,47 +33,45 @@ class PolicyEngine:
     """
 
     def __init__(self, policies_dir: str = None):
-        self.policies_dir = Path(policies_dir or "policies")
-        self.loaded_policies = {}
+        self.policies_dir = (
+            Path(policies_dir)
+            if policies_dir
+            else Path(__file__).resolve().parent.parent / "policies"
+        )
         self.quality_checker = DocumentQualityChecker()
         self.field_extractor = field_extraction_engine
         self.translation_gate = translation_gate
         self.consistency_engine = cross_document_consistency
         self.document_classifier = document_classifier
-        self._load_all_policies()
+        self._bundle_loader = PolicyBundleLoader(self.policies_dir)
 
-    def _load_all_policies(self):
-        """
-        Carrega todas as políticas YAML do diretório
-        """
-        try:
-            if not self.policies_dir.exists():
-                logger.warning(f"Policies directory not found: {self.policies_dir}")
-                return
+    @property
+    def bundle(self) -> PolicyBundle:
+        """Bundle compilado atual (recarregado se os arquivos mudarem)"""
+        return self._bundle_loader.bundle
 
-            for policy_file in self.policies_dir.glob("*.yaml"):
-                try:
-                    with open(policy_file, "r", encoding="utf-8") as f:
-                        policy_data = yaml.safe_load(f)
+    @property
+    def loaded_policies(self) -> Dict[str, Dict[str, Any]]:
+        return {doc_type: p.source for doc_type, p in self.bundle.policies.items()}
 
-                    doc_type = policy_data.get("doc_type")
-                    if doc_type:
-                        self.loaded_policies[doc_type] = policy_data
-                        logger.info(f"Loaded policy for {doc_type}")
-
-                except Exception as e:
-                    logger.error(f"Error loading policy {policy_file}: {e}")
-
-            logger.info(f"Loaded {len(self.loaded_policies)} document policies")
-
-        except Exception as e:
-            logger.error(f"Error loading policies: {e}")
+    def reload_policies(self) -> int:
+        """
+        Força recarga das políticas YAML
+        """
+        return len(self._bundle_loader.reload().policies)
 
     def get_policy(self, doc_type: str) -> Optional[Dict[str, Any]]:
         """
         Retorna política para um tipo de documento
         """
-        return self.loaded_policies.get(doc_type)
+        compiled = self.bundle.get(doc_type)
+        return compiled.source if compiled else None
+
+    def get_compiled_policy(self, doc_type: str) -> Optional[CompiledPolicy]:
+        """
+        Retorna política compilada para um tipo de documento
+        """
+        return self.bundle.get(doc_type)
 
     def validate_document(
         self,
@@ -94,20 +99,23 @@ class PolicyEngine:
             }
 
             # 1. Verificar se política existe
-            policy = self.get_policy(doc_type)
-            if not policy:
+            compiled = self.get_compiled_policy(doc_type)
+            if not compiled:
                 result["status"] = "error"
                 result["decision"] = "FAIL"
                 result["messages"].append(f"Política não encontrada para {doc_type}")
                 return result
+            policy = compiled.source
 
             # 2. Análise de qualidade
-            quality_result = self.quality_checker.analyze_quality(file_content, filename)
+            quality_result = self.quality_checker.analyze_quality(
+                file_content, filename, policy.get("quality")
+            )
             result["quality"] = quality_result
 
             # 3. Verificações de política
             policy_checks = self._apply_policy_checks(
-                policy, quality_result, extracted_text, case_context
+                compiled, quality_result, extracted_text, case_context
             )
             result["policy_checks"] = policy_checks
 
@@ -119,9 +127,6 @@ class PolicyEngine:
 
             # 5. Extração avançada de campos (Phase 2)
             if extracted_text:
-                policy_fields = policy.get("required_fields", []) + policy.get(
-                    "optional_fields", []
-                )
                 extraction_context = {
                     "document_type": doc_type,
                     "case_context": case_context,
@@ -130,7 +135,7 @@ class PolicyEngine:
 
                 # Usar motor avançado de extração
                 fields_result = self.field_extractor.extract_all_fields(
-                    extracted_text, policy_fields, extraction_context
+                    extracted_text, compiled.policy_fields, extraction_context
                 )
                 result["fields"] = fields_result
 
@@ -173,27 +178,37 @@ class PolicyEngine:
             }
 
     def _apply_policy_checks(
-        self, policy: Dict, quality_result: Dict, extracted_text: str, case_context: Dict
+        self,
+        compiled: CompiledPolicy,
+        quality_result: Dict,
+        extracted_text: str,
+        case_context: Dict,
     ) -> List[Dict]:
         """
         Aplica verificações da política
         """
         checks = []
+        policy = compiled.source
+
+        # Texto normalizado e varrido uma única vez para todas as verificações
+        keyword_hits = compiled.scanner.scan(normalize_for_scan(extracted_text))
 
         # 1. Verificações de qualidade
         quality_checks = self._check_quality_requirements(policy, quality_result)
         checks.extend(quality_checks)
 
         # 2. Verificações de idioma
-        language_checks = self._check_language_requirements(policy, extracted_text)
+        language_checks = self._check_language_requirements(
+            policy, extracted_text, keyword_hits
+        )
         checks.extend(language_checks)
 
         # 3. Verificações de presença (selos, assinaturas, etc.)
-        presence_checks = self._check_presence_requirements(policy, extracted_text)
+        presence_checks = self._check_presence_requirements(compiled, keyword_hits)
         checks.extend(presence_checks)
 
         # 4. Verificações de snippets de texto obrigatórios
-        snippet_checks = self._check_text_snippets(policy, extracted_text)
+        snippet_checks = self._check_text_snippets(compiled, keyword_hits)
         checks.extend(snippet_checks)
 
         return checks
@@ -230,6 +245,42 @@ class PolicyEngine:
                     }
                 )
 
+            # Verificar nitidez (variância do Laplaciano)
+            min_blur_var = quality_policy.get("min_blur_var", 100)
+            blur_score = image_data.get("blur_score")
+            if blur_score is not None:
+                blurry = blur_score < min_blur_var
+                checks.append(
+                    {
+                        "rule": "quality:min_blur_var",
+                        "result": "alert" if blurry else "pass",
+                        "message": (
+                            f"Imagem desfocada (score {blur_score:.0f}, mínimo {min_blur_var})"
+                            if blurry
+                            else f"Nitidez adequada (score {blur_score:.0f})"
+                        ),
+                        "severity": "medium" if blurry else "low",
+                    }
+                )
+
+            # Verificar inclinação
+            max_skew_deg = quality_policy.get("max_skew_deg", 5)
+            skew_deg = image_data.get("skew_deg")
+            if skew_deg is not None:
+                skewed = abs(skew_deg) > max_skew_deg
+                checks.append(
+                    {
+                        "rule": "quality:max_skew_deg",
+                        "result": "alert" if skewed else "pass",
+                        "message": (
+                            f"Documento inclinado ({skew_deg:.1f}°, máximo {max_skew_deg}°)"
+                            if skewed
+                            else f"Inclinação adequada ({skew_deg:.1f}°)"
+                        ),
+                        "severity": "medium" if skewed else "low",
+                    }
+                )
+
         # Verificar tamanho do arquivo
         file_size_check = quality_result.get("checks", {}).get("file_size", {})
         if file_size_check.get("status") == "fail":
@@ -253,7 +304,9 @@ class PolicyEngine:
 
         return checks
 
-    def _check_language_requirements(self, policy: Dict, extracted_text: str) -> List[Dict]:
+    def _check_language_requirements(
+        self, policy: Dict, extracted_text: str, keyword_hits: FrozenSet[str]
+    ) -> List[Dict]:
         """
         Verifica requisitos de idioma
         """
@@ -262,25 +315,8 @@ class PolicyEngine:
 
         if language_req == "en_or_translation_required":
             # Heurística simples para detectar se texto está em inglês
-            english_words = ["the", "and", "of", "to", "in", "is", "was", "for", "with", "on"]
-            portuguese_words = [
-                "de",
-                "da",
-                "do",
-                "em",
-                "para",
-                "com",
-                "por",
-                "uma",
-                "um",
-                "na",
-                "no",
-            ]
-
-            text_lower = extracted_text.lower()
-
-            english_score = sum(1 for word in english_words if word in text_lower)
-            portuguese_score = sum(1 for word in portuguese_words if word in text_lower)
+            english_score = sum(1 for word in ENGLISH_WORDS if word in keyword_hits)
+            portuguese_score = sum(1 for word in PORTUGUESE_WORDS if word in keyword_hits)
 
             if portuguese_score > english_score and len(extracted_text) > 100:
                 checks.append(
@@ -303,17 +339,17 @@ class PolicyEngine:
 
         return checks
 
-    def _check_presence_requirements(self, policy: Dict, extracted_text: str) -> List[Dict]:
+    def _check_presence_requirements(
+        self, compiled: CompiledPolicy, keyword_hits: FrozenSet[str]
+    ) -> List[Dict]:
         """
         Verifica requisitos de presença (selos, assinaturas, etc.)
         """
         checks = []
-        presence_checks = policy.get("presence_checks", {})
 
         # Verificar carimbo/selo oficial
-        if presence_checks.get("official_seal_or_stamp"):
-            seal_words = ["seal", "stamp", "carimbo", "selo", "official", "governo"]
-            has_seal = any(word in extracted_text.lower() for word in seal_words)
+        if compiled.requires_seal:
+            has_seal = any(word in keyword_hits for word in SEAL_WORDS)
 
             if not has_seal:
                 checks.append(
@@ -335,9 +371,8 @@ class PolicyEngine:
                 )
 
         # Verificar assinatura
-        if presence_checks.get("signature"):
-            signature_words = ["signature", "signed", "assinatura", "assinado"]
-            has_signature = any(word in extracted_text.lower() for word in signature_words)
+        if compiled.requires_signature:
+            has_signature = any(word in keyword_hits for word in SIGNATURE_WORDS)
 
             if not has_signature:
                 checks.append(
@@ -360,15 +395,16 @@ class PolicyEngine:
 
         return checks
 
-    def _check_text_snippets(self, policy: Dict, extracted_text: str) -> List[Dict]:
+    def _check_text_snippets(
+        self, compiled: CompiledPolicy, keyword_hits: FrozenSet[str]
+    ) -> List[Dict]:
         """
         Verifica snippets de texto obrigatórios
         """
         checks = []
-        required_snippets = policy.get("required_text_snippets", [])
 
-        for snippet in required_snippets:
-            if snippet.lower() in extracted_text.lower():
+        for snippet, normalized in compiled.snippets:
+            if normalized in keyword_hits:
                 checks.append(
                     {
                         "rule": f"snippet:{snippet}",
@@ -389,41 +425,30 @@ class PolicyEngine:
 
         return checks
 
-    def _extract_fields(self, policy: Dict, extracted_text: str) -> Dict[str, Any]:
+    def _extract_fields(self, compiled: CompiledPolicy, extracted_text: str) -> Dict[str, Any]:
         """
-        Extrai campos usando regex da política
+        Extrai campos usando os regex pré-compilados da política
         """
         fields = {}
-        required_fields = policy.get("required_fields", [])
-        optional_fields = policy.get("optional_fields", [])
-
-        all_fields = required_fields + optional_fields
-
-        for field_def in all_fields:
-            field_name = field_def.get("name")
-            field_regex = field_def.get("regex")
-
-            if field_name and field_regex:
-                try:
-                    matches = re.finditer(field_regex, extracted_text, re.IGNORECASE | re.MULTILINE)
-                    found_values = [match.group() for match in matches]
 
-                    fields[field_name] = {
-                        "values": found_values,
-                        "found": len(found_values) > 0,
-                        "confidence": 1.0 if found_values else 0.0,
-                        "required": field_def in required_fields,
-                    }
-
-                except re.error as e:
-                    logger.warning(f"Invalid regex for field {field_name}: {e}")
-                    fields[field_name] = {
-                        "values": [],
-                        "found": False,
-                        "confidence": 0.0,
-                        "required": field_def in required_fields,
-                        "error": f"Regex inválido: {e}",
-                    }
+        for field_def in compiled.fields:
+            if field_def.pattern is None:
+                fields[field_def.name] = {
+                    "values": [],
+                    "found": False,
+                    "confidence": 0.0,
+                    "required": field_def.required,
+                    "error": field_def.error,
+                }
+                continue
+
+            found_values = [match.group() for match in field_def.pattern.finditer(extracted_text)]
+            fields[field_def.name] = {
+                "values": found_values,
+                "found": len(found_values) > 0,
+                "confidence": 1.0 if found_values else 0.0,
+                "required": field_def.required,
+            }
 
         return fields
 
@@ -21,14 +21,16 @@ import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-logger = logging.getLogger(__name__)
+from backend.compliance.near_duplicates import find_near_duplicate_pages
+from backend.compliance.page_extraction import (
+    PDFPLUMBER_AVAILABLE,
+    PYMUPDF_AVAILABLE,
+    PackagePages,
+)
 
-try:
-    import pdfplumber
+logger = logging.getLogger(__name__)
 
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
+_PASSPORT_EXPIRY_RE = re.compile(r"[Pp]assport.{0,100}[Ee]xpir.{0,20}(\d{2}/\d{2}/\d{4})")
 
 
 class ImmigrationComplianceReviewer:
@@ -168,13 +170,17 @@ class ImmigrationComplianceReviewer:
         self.min_compliance_score = 95  # Mínimo 95% de conformidade
         self.max_critical_errors = 0  # Zero erros críticos permitidos
 
-    def comprehensive_review(self, pdf_path: str, user_documents: Optional[Dict] = None) -> Dict:
+    def comprehensive_review(
+        self, pdf_path: str, user_documents: Optional[Dict] = None, fail_fast: bool = False
+    ) -> Dict:
         """
         Revisão COMPLETA e RIGOROSA do pacote de aplicação
 
         Args:
             pdf_path: Caminho para o PDF do pacote gerado
             user_documents: Dict com documentos enviados pelo usuário (opcional)
+            fail_fast: Interrompe a extração no primeiro erro crítico detectável
+                por página (ex.: passaporte expirado)
 
         Returns:
             Dict com resultado detalhado: {
@@ -187,8 +193,8 @@ class ImmigrationComplianceReviewer:
             }
         """
 
-        if not PDFPLUMBER_AVAILABLE:
-            return self._error_response("pdfplumber não está instalado")
+        if not PYMUPDF_AVAILABLE and not PDFPLUMBER_AVAILABLE:
+            return self._error_response("Nenhum backend de PDF instalado (PyMuPDF ou pdfplumber)")
 
         if not os.path.exists(pdf_path):
             return self._error_response(f"Arquivo não encontrado: {pdf_path}")
@@ -204,19 +210,31 @@ class ImmigrationComplianceReviewer:
         detailed_report = {}
 
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                num_pages = len(pdf.pages)
-                logger.info(f"📃 Total de páginas: {num_pages}")
-
-                # Extrair todo o texto
-                logger.info(f"\n📖 Extraindo texto de todas as páginas...")
-                pages_text = []
-                for i, page in enumerate(pdf.pages):
-                    text = page.extract_text() or ""
-                    pages_text.append(text)
-                    if (i + 1) % 20 == 0:
-                        logger.info(f"   ✓ Processadas {i + 1} páginas...")
+            pages = PackagePages(pdf_path)
+            num_pages = pages.page_count
+            logger.info(f"📃 Total de páginas: {num_pages} (backend: {pages.backend})")
+
+            # Extrair texto (streaming, páginas em paralelo, cache por hash do PDF)
+            logger.info(f"\n📖 Extraindo texto de todas as páginas...")
+            pages_text = []
+            for i, text in pages:
+                pages_text.append(text)
+                if fail_fast:
+                    expired = self._expired_passport_dates(text)
+                    if expired:
+                        critical_errors.append(f"❌ PASSAPORTE EXPIRADO: {expired[0]}")
+                        logger.error(
+                            f"   ⛔ Passaporte expirado na página {i + 1} - revisão interrompida"
+                        )
+                        break
+                if (i + 1) % 50 == 0:
+                    logger.info(f"   ✓ Processadas {i + 1} páginas...")
+
+            detailed_report["pages_reviewed"] = len(pages_text)
+            detailed_report["total_pages"] = num_pages
 
+            # Com fail_fast, um erro crítico durante a extração já garante REJECTED
+            if not critical_errors:
                 full_text = " ".join(pages_text)
                 logger.info(f"   ✅ Total: {len(full_text):,} caracteres extraídos")
 
@@ -340,9 +358,10 @@ class ImmigrationComplianceReviewer:
 
         logger.info(f"   Formulários obrigatórios para {self.visa_type}: {len(required_forms)}")
 
+        text_upper = full_text.upper()
         for form_name in required_forms:
             # Verificar se formulário está presente
-            if form_name.upper() in full_text.upper():
+            if form_name.upper() in text_upper:
                 found_forms.append(form_name)
                 logger.info(f"   ✅ {form_name} - ENCONTRADO")
 
@@ -441,9 +460,10 @@ class ImmigrationComplianceReviewer:
 
         logger.info(f"   Documentos obrigatórios: {len(required_docs)}")
 
+        text_upper = full_text.upper()
         for doc_name in required_docs:
             # Buscar documento no texto
-            if doc_name.upper() in full_text.upper():
+            if doc_name.upper() in text_upper:
                 found_documents.append(doc_name)
                 logger.info(f"   ✅ {doc_name}")
             else:
@@ -479,8 +499,7 @@ class ImmigrationComplianceReviewer:
         logger.info(f"   Verificando validade de documentos...")
 
         # Verificar passaporte não expirado
-        passport_pattern = r"[Pp]assport.{0,100}[Ee]xpir.{0,20}(\d{2}/\d{2}/\d{4})"
-        passport_matches = re.findall(passport_pattern, full_text)
+        passport_matches = _PASSPORT_EXPIRY_RE.findall(full_text)
 
         if passport_matches:
             for date_str in passport_matches:
@@ -501,7 +520,8 @@ class ImmigrationComplianceReviewer:
 
         # Verificar LCA certificado (H-1B)
         if self.visa_type == "H-1B":
-            if "CERTIFIED" in full_text.upper() or "CERTIFICATION" in full_text.upper():
+            text_upper = full_text.upper()
+            if "CERTIFIED" in text_upper or "CERTIFICATION" in text_upper:
                 logger.info(f"   ✅ LCA aparece como certificado")
             else:
                 critical_errors.append("❌ LCA não aparece como CERTIFICADO pelo DOL")
@@ -523,6 +543,8 @@ class ImmigrationComplianceReviewer:
 
         logger.info(f"   Requisitos legais a verificar: {len(legal_reqs)}")
 
+        text_lower = full_text.lower()
+
         for requirement in legal_reqs:
             verified = False
 
@@ -548,24 +570,24 @@ class ImmigrationComplianceReviewer:
                         logger.error(f"   ❌ Salário insuficiente")
 
             elif "specialty occupation" in requirement.lower():
-                if "specialty occupation" in full_text.lower() and "bachelor" in full_text.lower():
+                if "specialty occupation" in text_lower and "bachelor" in text_lower:
                     verified = True
                     logger.info(f"   ✅ Posição qualifica como specialty occupation")
 
             elif "bachelor's degree" in requirement.lower():
-                if "bachelor" in full_text.lower() or "master" in full_text.lower():
+                if "bachelor" in text_lower or "master" in text_lower:
                     verified = True
                     logger.info(f"   ✅ Beneficiário possui grau adequado")
 
             elif "ability to pay" in requirement.lower():
-                if "revenue" in full_text.lower() and "assets" in full_text.lower():
+                if "revenue" in text_lower and "assets" in text_lower:
                     verified = True
                     logger.info(f"   ✅ Evidência de capacidade de pagamento presente")
 
             else:
                 # Verificação genérica: buscar palavras-chave do requisito
                 keywords = requirement.lower().split()[:3]
-                if any(kw in full_text.lower() for kw in keywords):
+                if any(kw in text_lower for kw in keywords):
                     verified = True
                     logger.info(f"   ✅ {requirement[:50]}...")
 
@@ -626,13 +648,10 @@ class ImmigrationComplianceReviewer:
 
         logger.info(f"   Verificando qualidade profissional...")
 
-        # Detectar páginas com conteúdo muito similar
-        similar_count = 0
-        for i in range(len(pages_text)):
-            for j in range(i + 1, min(i + 10, len(pages_text))):  # Verificar próximas 10 páginas
-                similarity = self._calculate_similarity(pages_text[i], pages_text[j])
-                if similarity > 0.95:  # 95% similar
-                    similar_count += 1
+        # Detectar páginas com conteúdo muito similar (MinHash/LSH, sem comparar todos os pares)
+        similar_count = len(
+            find_near_duplicate_pages(pages_text, similarity_threshold=0.95, min_chars=1).pairs
+        )
 
         if similar_count > len(pages_text) * 0.1:  # Mais de 10% de páginas muito similares
             major_errors.append(
@@ -671,6 +690,17 @@ class ImmigrationComplianceReviewer:
 
         return {"critical_errors": critical_errors, "major_errors": major_errors}
 
+    def _expired_passport_dates(self, text: str) -> List[str]:
+        """Datas de expiração de passaporte já vencidas encontradas no texto"""
+        expired = []
+        for date_str in _PASSPORT_EXPIRY_RE.findall(text):
+            try:
+                if datetime.strptime(date_str, "%m/%d/%Y") < datetime.now():
+                    expired.append(date_str)
+            except ValueError:
+                continue
+        return expired
+
     def _calculate_similarity(self, text1: str, text2: str) -> float:
         """Calcula similaridade entre dois textos"""
         words1 = set(text1.lower().split())
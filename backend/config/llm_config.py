@@ -131,9 +131,32 @@ class LLMSettings(BaseSettings):
         default=True, description="Enable Portkey integration (disable for local dev)", alias="ENABLE_PORTKEY"
     )
     enable_caching: bool = Field(default=True, description="Enable LLM response caching")
+    cache_max_entries: int = Field(
+        default=1024, ge=1, description="Maximum responses kept in the in-memory cache"
+    )
+    cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, ge=1, description="Maximum serialized size of the in-memory cache"
+    )
+    cache_max_temperature: float = Field(
+        default=0.2, ge=0.0, le=2.0, description="Only calls at or below this temperature are cached"
+    )
+    cache_mongo_enabled: bool = Field(
+        default=False, description="Persist cached responses in MongoDB (second tier)"
+    )
     enable_fallbacks: bool = Field(default=True, description="Enable automatic model fallbacks")
     enable_cost_tracking: bool = Field(default=True, description="Enable cost tracking and budgets")
 
+    # Metrics
+    metrics_max_series: int = Field(
+        default=500, ge=1, description="Maximum (model, provider, agent, endpoint) metric series"
+    )
+    metrics_rollup_enabled: bool = Field(
+        default=True, description="Persist periodic LLM metric rollups in MongoDB"
+    )
+    metrics_rollup_interval_seconds: int = Field(
+        default=60, ge=5, description="Interval between LLM metric rollups"
+    )
+
     # Rate Limiting
     rate_limit_requests_per_minute: int = Field(
         default=60, ge=1, description="Maximum LLM requests per minute"
@@ -278,6 +301,32 @@ DEFAULT_MODELS: Dict[str, ModelConfig] = {
         supports_function_calling=True,
         supports_vision=True,
     ),
+    "gemini-2.0-flash": ModelConfig(
+        name="gemini-2.0-flash",
+        provider=LLMProvider.GOOGLE,
+        max_tokens=8192,
+        context_window=1000000,
+        temperature=0.7,
+        fallback_models=["gemini-2.5-flash"],
+        cost_per_1k_input_tokens=0.0001,
+        cost_per_1k_output_tokens=0.0004,
+        supports_streaming=True,
+        supports_function_calling=True,
+        supports_vision=True,
+    ),
+    "gemini-2.5-flash": ModelConfig(
+        name="gemini-2.5-flash",
+        provider=LLMProvider.GOOGLE,
+        max_tokens=8192,
+        context_window=1000000,
+        temperature=0.7,
+        fallback_models=["gemini-2.0-flash"],
+        cost_per_1k_input_tokens=0.0003,
+        cost_per_1k_output_tokens=0.0025,
+        supports_streaming=True,
+        supports_function_calling=True,
+        supports_vision=True,
+    ),
     "claude-3-opus": ModelConfig(
         name="claude-3-opus-20240229",
         provider=LLMProvider.ANTHROPIC,
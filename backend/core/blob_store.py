@@ -0,0 +1,162 @@
+"""
+Blob store — artefatos gerados (PDFs de pacote, índices) fora do disco local
+
+Os arquivos ficam no GridFS do próprio MongoDB, então qualquer worker/host
+serve o download de um artefato gerado por outro. Em desenvolvimento (ou
+sem GridFS) usa um diretório local (``BLOB_STORE_DIR``).
+
+Configuração:
+    BLOB_STORE=gridfs|local     backend (padrão: gridfs)
+    BLOB_STORE_BUCKET=artifacts bucket do GridFS
+    BLOB_STORE_DIR=/tmp/osprey_blobs
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+    GRIDFS_AVAILABLE = True
+except ImportError:
+    GRIDFS_AVAILABLE = False
+
+BLOB_STORE_BACKEND = os.environ.get("BLOB_STORE", "gridfs").lower()
+BLOB_STORE_BUCKET = os.environ.get("BLOB_STORE_BUCKET", "artifacts")
+BLOB_STORE_DIR = Path(os.environ.get("BLOB_STORE_DIR", "/tmp/osprey_blobs"))
+
+CHUNK_SIZE = 256 * 1024
+
+
+class BlobNotFound(KeyError):
+    """Artefato inexistente (ou já expirado)"""
+
+
+class LocalBlobStore:
+    """Blobs em diretório local (um host; desenvolvimento)"""
+
+    name = "local"
+
+    def __init__(self, root: Path = BLOB_STORE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+
+    async def put(
+        self, key: str, data: bytes, content_type: str = "application/octet-stream"
+    ) -> Dict[str, object]:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return {"key": key, "size": len(data), "content_type": content_type, "store": self.name}
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        path = self._path(key)
+        if not path.exists():
+            raise BlobNotFound(key)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+    async def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    async def purge_older_than(self, cutoff: datetime, prefix: str = "") -> int:
+        removed = 0
+        base = self.root / prefix if prefix else self.root
+        if not base.exists():
+            return 0
+        for path in base.rglob("*"):
+            if not path.is_file():
+                continue
+            mtime = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+            if mtime < cutoff:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+class GridFSBlobStore:
+    """Blobs no GridFS (compartilhado entre workers e hosts)"""
+
+    name = "gridfs"
+
+    def __init__(self, db, bucket: str = BLOB_STORE_BUCKET):
+        self.db = db
+        self.bucket_name = bucket
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        if self._bucket is None:
+            self._bucket = AsyncIOMotorGridFSBucket(self.db, bucket_name=self.bucket_name)
+        return self._bucket
+
+    async def _file_ids(self, key: str):
+        cursor = self.bucket.find({"filename": key}, no_cursor_timeout=False)
+        return [f._id async for f in cursor]
+
+    async def put(
+        self, key: str, data: bytes, content_type: str = "application/octet-stream"
+    ) -> Dict[str, object]:
+        # Mesma chave = nova versão; as anteriores são removidas depois do upload
+        previous = await self._file_ids(key)
+        await self.bucket.upload_from_stream(
+            key, data, chunk_size_bytes=CHUNK_SIZE, metadata={"content_type": content_type}
+        )
+        for file_id in previous:
+            await self.bucket.delete(file_id)
+        return {"key": key, "size": len(data), "content_type": content_type, "store": self.name}
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        try:
+            grid_out = await self.bucket.open_download_stream_by_name(key)
+        except Exception as e:
+            raise BlobNotFound(key) from e
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._file_ids(key))
+
+    async def delete(self, key: str) -> None:
+        for file_id in await self._file_ids(key):
+            await self.bucket.delete(file_id)
+
+    async def purge_older_than(self, cutoff: datetime, prefix: str = "") -> int:
+        query: Dict[str, object] = {"uploadDate": {"$lt": cutoff}}
+        if prefix:
+            query["filename"] = {"$regex": f"^{prefix}"}
+        removed = 0
+        async for grid_out in self.bucket.find(query):
+            await self.bucket.delete(grid_out._id)
+            removed += 1
+        return removed
+
+
+def create_blob_store(db=None, backend: Optional[str] = None):
+    """Blob store configurado; cai para o diretório local sem db/GridFS"""
+    backend = (backend or BLOB_STORE_BACKEND).lower()
+    if backend == "gridfs" and db is not None and GRIDFS_AVAILABLE:
+        return GridFSBlobStore(db)
+    if backend == "gridfs":
+        logger.warning("⚠️ GridFS blob store not available - using local directory")
+    return LocalBlobStore()
@@ -0,0 +1,255 @@
+"""
+Case events — append-only activity log for B2B cases.
+
+Every case action (status change, note, deadline, document, letter, QA run...)
+is written to the ``case_events`` collection, indexed on ``(case_id, ts)``.
+The case document itself only keeps a bounded ``recent_activity`` slice, so
+it no longer grows with each action and hot reads stay small.
+"""
+
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from backend.core.invalidation import Invalidation, invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# Entries kept on the case document (newest last)
+RECENT_ACTIVITY_LIMIT = 20
+
+# Free-text notes keep only the most recent entries; the full text is in case_events
+NOTES_MAX_CHARS = 8000
+NOTES_SEPARATOR = "\n---\n"
+
+# Hot reads: everything except the heavy / unbounded fields
+CASE_SLIM_PROJECTION = {
+    "_id": 0,
+    "history": 0,
+    "qa_review": 0,
+    "name_trigrams": 0,
+    "client_name_folded": 0,
+}
+
+EVENTS_PAGE_MAX = 200
+
+
+def new_case_event(
+    case_id: str,
+    office_id: Optional[str],
+    action: str,
+    detail: str = "",
+    actor: Optional[str] = None,
+    ts: Optional[datetime] = None,
+    event_id: Optional[str] = None,
+    **data: Any,
+) -> Dict[str, Any]:
+    """Build a case event document."""
+    event = {
+        "event_id": event_id or "EVT-" + uuid.uuid4().hex[:12].upper(),
+        "case_id": case_id,
+        "office_id": office_id,
+        "action": action,
+        "detail": detail,
+        "ts": ts or datetime.now(timezone.utc),
+    }
+    if actor:
+        event["actor"] = actor
+    if data:
+        event["data"] = data
+    return event
+
+
+def recent_activity_push(event: Dict[str, Any]) -> Dict[str, Any]:
+    """``$push`` fragment that appends the event to the bounded recent_activity slice."""
+    entry = {
+        "action": event["action"],
+        "timestamp": event["ts"].isoformat(),
+        "detail": event.get("detail", ""),
+    }
+    return {"recent_activity": {"$each": [entry], "$slice": -RECENT_ACTIVITY_LIMIT}}
+
+
+def append_note(existing: Optional[str], note: str, now: datetime) -> str:
+    """Append a timestamped note, trimming the oldest entries beyond NOTES_MAX_CHARS."""
+    if isinstance(existing, list):
+        # Casos do intake wizard começam com notes = []
+        entries = [str(e) for e in existing]
+    else:
+        entries = existing.split(NOTES_SEPARATOR) if existing else []
+    entries.append(f"[{now.strftime('%d/%m/%Y %H:%M')}] {note}")
+    while len(entries) > 1 and len(NOTES_SEPARATOR.join(entries)) > NOTES_MAX_CHARS:
+        entries.pop(0)
+    return NOTES_SEPARATOR.join(entries)
+
+
+async def log_case_event(db, event: Dict[str, Any]) -> None:
+    """Insert an event into case_events (never raises: logging must not break the action)."""
+    try:
+        await db.case_events.insert_one(dict(event))
+    except Exception as e:
+        logger.warning(
+            f"Failed to log case event {event.get('action')} for {event.get('case_id')}: {e}"
+        )
+    # Caches deste worker não esperam o change stream para ver a própria escrita
+    invalidation_bus.publish(
+        Invalidation("b2b_cases", event.get("office_id"), event.get("case_id"), event["action"])
+    )
+
+
+async def record_case_event(
+    db,
+    case_id: str,
+    office_id: Optional[str],
+    action: str,
+    detail: str = "",
+    set_fields: Optional[Dict[str, Any]] = None,
+    push_fields: Optional[Dict[str, Any]] = None,
+    actor: Optional[str] = None,
+    ts: Optional[datetime] = None,
+    **data: Any,
+):
+    """
+    Log an event and apply the matching case update in one call.
+
+    ``set_fields`` / ``push_fields`` are merged into the case update together
+    with the recent_activity slice. Returns the case ``UpdateResult``.
+    """
+    event = new_case_event(case_id, office_id, action, detail, actor=actor, ts=ts, **data)
+    query = {"case_id": case_id}
+    if office_id:
+        query["office_id"] = office_id
+
+    update: Dict[str, Any] = {"$push": {**(push_fields or {}), **recent_activity_push(event)}}
+    if set_fields:
+        update["$set"] = set_fields
+
+    result = await db.b2b_cases.update_one(query, update)
+    if result.matched_count:
+        await log_case_event(db, event)
+    return result
+
+
+def _encode_cursor(event: Dict[str, Any]) -> str:
+    return f"{event['ts'].isoformat()}|{event['event_id']}"
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    ts_raw, event_id = cursor.split("|", 1)
+    ts = datetime.fromisoformat(ts_raw)
+    if ts.tzinfo is not None:
+        # Mongo stores naive UTC
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return {"$or": [{"ts": {"$lt": ts}}, {"ts": ts, "event_id": {"$lt": event_id}}]}
+
+
+async def get_case_events(
+    db,
+    case_id: str,
+    office_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Page through a case's events, newest first.
+
+    Returns ``{"events": [...], "next_cursor": str | None}``; pass
+    ``next_cursor`` back to get the following page.
+    """
+    limit = max(1, min(limit, EVENTS_PAGE_MAX))
+    query: Dict[str, Any] = {"case_id": case_id, "office_id": office_id}
+    if action:
+        query["action"] = action
+    if cursor:
+        try:
+            query.update(_decode_cursor(cursor))
+        except ValueError:
+            raise ValueError("Invalid cursor")
+
+    events: List[Dict[str, Any]] = await db.case_events.find(query, {"_id": 0}).sort(
+        [("ts", -1), ("event_id", -1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = _encode_cursor(events[-1])
+    return {"events": events, "next_cursor": next_cursor}
+
+
+def _parse_legacy_ts(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return datetime.now(timezone.utc)
+
+
+async def migrate_legacy_history(db, batch_size: int = 200) -> int:
+    """
+    Move embedded ``history`` arrays into case_events (idempotent).
+
+    Each migrated case keeps its last RECENT_ACTIVITY_LIMIT entries as
+    ``recent_activity`` and drops ``history``. Returns the number of cases moved.
+    """
+    migrated = 0
+    try:
+        while True:
+            cases = await db.b2b_cases.find(
+                {"history": {"$exists": True}},
+                {"_id": 0, "case_id": 1, "office_id": 1, "history": 1, "recent_activity": 1},
+            ).to_list(length=batch_size)
+            if not cases:
+                break
+
+            for case in cases:
+                await _migrate_case(db, case)
+                migrated += 1
+    except Exception as e:
+        logger.error(f"Case history migration stopped after {migrated} cases: {e}")
+
+    if migrated:
+        logger.info(f"Migrated embedded history of {migrated} cases to case_events")
+    return migrated
+
+
+def legacy_event_id(case_id: str, index: int) -> str:
+    """Deterministic id for the ``index``-th embedded history entry of a case."""
+    return f"EVT-{case_id}-H{index:05d}"
+
+
+async def _migrate_case(db, case: Dict[str, Any]) -> None:
+    history = case.get("history") or []
+    events = [
+        new_case_event(
+            case["case_id"],
+            case.get("office_id"),
+            entry.get("action", "unknown"),
+            entry.get("detail", ""),
+            ts=_parse_legacy_ts(entry.get("timestamp")),
+            event_id=legacy_event_id(case["case_id"], index),
+        )
+        for index, entry in enumerate(history)
+        if isinstance(entry, dict)
+    ]
+    if events:
+        # _id determinístico + upsert: re-executar após uma falha entre as duas
+        # escritas não duplica eventos
+        await db.case_events.bulk_write(
+            [
+                UpdateOne({"_id": event["event_id"]}, {"$setOnInsert": event}, upsert=True)
+                for event in events
+            ],
+            ordered=False,
+        )
+
+    recent = (history + (case.get("recent_activity") or []))[-RECENT_ACTIVITY_LIMIT:]
+    await db.b2b_cases.update_one(
+        {"case_id": case["case_id"], "office_id": case.get("office_id")},
+        {"$set": {"recent_activity": recent}, "$unset": {"history": ""}},
+    )
@@ -0,0 +1,93 @@
+"""
+Case listing — keyset (cursor) pagination over b2b_cases.
+
+Pages are ordered by ``(updated_at desc, case_id desc)`` and continue from
+the last row of the previous page, so every page is a bounded index range
+on ``(office_id, updated_at, case_id)`` instead of a skip over all earlier
+rows. Continuation tokens are opaque (base64url JSON) to clients.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# List-view fields only (no documents, basic_data, qa_review, notes, activity)
+CASE_LIST_PROJECTION = {
+    "_id": 0,
+    "case_id": 1,
+    "client_name": 1,
+    "visa_type": 1,
+    "status": 1,
+    "priority": 1,
+    "qa_score": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "deadlines.title": 1,
+    "deadlines.due_date": 1,
+}
+
+CASE_LIST_SORT = [("updated_at", -1), ("case_id", -1)]
+
+
+def encode_page_token(case: Dict[str, Any]) -> str:
+    """Opaque continuation token for the row a page ended on."""
+    updated_at = case.get("updated_at")
+    if isinstance(updated_at, datetime):
+        updated_at = {"$dt": updated_at.isoformat()}
+    raw = json.dumps({"u": updated_at, "c": case["case_id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_page_token(token: str) -> Tuple[Any, str]:
+    """(updated_at, case_id) from a continuation token; ValueError if malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        updated_at = data["u"]
+        if isinstance(updated_at, dict):
+            updated_at = datetime.fromisoformat(updated_at["$dt"])
+        return updated_at, str(data["c"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid page token") from e
+
+
+def keyset_filter(token: str) -> Dict[str, Any]:
+    """Rows strictly after the token in CASE_LIST_SORT order."""
+    updated_at, case_id = decode_page_token(token)
+    if updated_at is None:
+        # Casos sem updated_at ficam no fim da ordenação descendente
+        return {"updated_at": None, "case_id": {"$lt": case_id}}
+    return {
+        "$or": [
+            {"updated_at": {"$lt": updated_at}},
+            {"updated_at": updated_at, "case_id": {"$lt": case_id}},
+            {"updated_at": None},
+        ]
+    }
+
+
+async def fetch_case_page(
+    db,
+    query: Dict[str, Any],
+    limit: int,
+    page_token: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of cases plus the token for the next page (None on the last page).
+
+    Raises ValueError for a malformed ``page_token``.
+    """
+    if page_token:
+        query = {"$and": [query, keyset_filter(page_token)]}
+
+    cases = await db.b2b_cases.find(query, projection or CASE_LIST_PROJECTION).sort(
+        CASE_LIST_SORT
+    ).limit(limit + 1).to_list(length=limit + 1)
+
+    next_token = None
+    if len(cases) > limit:
+        cases = cases[:limit]
+        next_token = encode_page_token(cases[-1])
+    return cases, next_token
@@ -0,0 +1,217 @@
+"""
+Case name index — resolução fuzzy de clientes por trigramas.
+
+Cada caso guarda ``client_name_folded`` (minúsculas, sem acentos) e
+``name_trigrams`` (trigramas das palavras do nome), com índice multikey em
+``(office_id, name_trigrams)``. "o caso da Silva" vira uma busca indexada
+pelos trigramas da consulta (o servidor ordena por trigramas em comum antes
+de limitar os candidatos, ranqueados depois em memória), em vez de um
+$regex case-insensitive que varre todos os casos do escritório.
+
+Os campos são gravados em create/update via ``name_index_fields``; casos
+antigos são indexados uma vez por ``backfill_name_index`` no startup.
+"""
+
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MAX_CANDIDATES = 200
+MIN_SCORE = 0.45
+# Candidatos a menos disso do melhor score são considerados empate
+AMBIGUITY_MARGIN = 0.08
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+CANDIDATE_PROJECTION = {
+    "_id": 0,
+    "case_id": 1,
+    "client_name": 1,
+    "client_name_folded": 1,
+    "name_trigrams": 1,
+    "visa_type": 1,
+    "status": 1,
+}
+
+
+def fold_name(name: Optional[str]) -> str:
+    """``João  Da-Silva`` -> ``joao da silva``"""
+    if not name:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", name.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM_RE.sub(" ", stripped).strip()
+
+
+def name_trigrams(name: Optional[str]) -> List[str]:
+    """Trigramas das palavras com padding (``silva`` -> ``  s``, `` si``, ``sil``...)"""
+    grams: Set[str] = set()
+    for word in fold_name(name).split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return sorted(grams)
+
+
+def name_index_fields(client_name: Optional[str]) -> Dict[str, Any]:
+    """Campos a gravar junto com ``client_name`` (insert ou $set)"""
+    return {
+        "client_name_folded": fold_name(client_name),
+        "name_trigrams": name_trigrams(client_name),
+    }
+
+
+@dataclass
+class NameMatch:
+    case_id: str
+    client_name: str
+    score: float
+    visa_type: Optional[str] = None
+    status: Optional[str] = None
+    exact: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "case_id": self.case_id,
+            "client_name": self.client_name,
+            "visa_type": self.visa_type,
+            "status": self.status,
+            "score": round(self.score, 3),
+        }
+
+
+class AmbiguousCaseMatch(ValueError):
+    """Mais de um caso corresponde ao nome informado"""
+
+    def __init__(self, query: str, candidates: List[NameMatch]):
+        self.query = query
+        self.candidates = candidates
+        options = "; ".join(
+            f"{c.case_id} ({c.client_name}, {c.visa_type or '-'})" for c in candidates
+        )
+        super().__init__(
+            f"Mais de um caso corresponde a '{query}': {options}. Informe o case_id."
+        )
+
+
+def score_name(query_folded: str, query_grams: Set[str], candidate: Dict[str, Any]) -> float:
+    """
+    Similaridade 0..1: cobertura dos trigramas da consulta (nomes parciais,
+    "Silva" vs "Maria Silva") combinada com Jaccard (penaliza nomes longos)
+    """
+    folded = candidate.get("client_name_folded") or fold_name(candidate.get("client_name"))
+    grams = set(candidate.get("name_trigrams") or name_trigrams(candidate.get("client_name")))
+    if not query_grams or not grams:
+        return 0.0
+
+    shared = len(query_grams & grams)
+    coverage = shared / len(query_grams)
+    jaccard = shared / len(query_grams | grams)
+    score = 0.75 * coverage + 0.25 * jaccard
+
+    # Palavras inteiras da consulta presentes no nome valem mais que trigramas soltos
+    if f" {query_folded} " in f" {folded} ":
+        score = max(score, 0.9 + 0.1 * jaccard)
+    return min(score, 1.0)
+
+
+async def _ranked_candidates(
+    db, office_id: str, grams: List[str], trigram_filter: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Os MAX_CANDIDATES melhores candidatos, ranqueados no servidor: mais
+    trigramas em comum primeiro e, no empate, nomes mais curtos (Jaccard maior)
+    """
+    pipeline = [
+        {"$match": {"office_id": office_id, "name_trigrams": trigram_filter}},
+        {
+            "$addFields": {
+                "_shared": {"$size": {"$setIntersection": ["$name_trigrams", grams]}},
+                "_grams": {"$size": "$name_trigrams"},
+            }
+        },
+        {"$sort": {"_shared": -1, "_grams": 1, "case_id": 1}},
+        {"$limit": MAX_CANDIDATES},
+        {"$project": CANDIDATE_PROJECTION},
+    ]
+    return await db.b2b_cases.aggregate(pipeline).to_list(length=MAX_CANDIDATES)
+
+
+async def find_cases_by_name(
+    db, office_id: str, name: str, limit: int = 5, min_score: float = MIN_SCORE
+) -> List[NameMatch]:
+    """Candidatos ranqueados (maior score primeiro) para um nome de cliente"""
+    query_folded = fold_name(name)
+    grams = name_trigrams(name)
+    if not grams:
+        return []
+
+    # Primeiro os nomes que contêm todos os trigramas (seletivo); se nada, busca tolerante
+    candidates = await _ranked_candidates(db, office_id, grams, {"$all": grams})
+    if not candidates:
+        candidates = await _ranked_candidates(db, office_id, grams, {"$in": grams})
+
+    query_grams = set(grams)
+    matches = []
+    for candidate in candidates:
+        score = score_name(query_folded, query_grams, candidate)
+        if score < min_score:
+            continue
+        folded = candidate.get("client_name_folded") or fold_name(candidate.get("client_name"))
+        matches.append(
+            NameMatch(
+                case_id=candidate["case_id"],
+                client_name=candidate.get("client_name", ""),
+                score=score,
+                visa_type=candidate.get("visa_type"),
+                status=candidate.get("status"),
+                exact=folded == query_folded,
+            )
+        )
+
+    matches.sort(key=lambda m: (-m.score, m.client_name))
+    return matches[:limit]
+
+
+def pick_match(query: str, matches: List[NameMatch]) -> Optional[NameMatch]:
+    """
+    Melhor candidato; levanta AmbiguousCaseMatch quando há empate e nenhum
+    nome bate exatamente com a consulta
+    """
+    if not matches:
+        return None
+    exact = [m for m in matches if m.exact]
+    if len(exact) == 1:
+        return exact[0]
+    best = matches[0]
+    tied = [m for m in matches if best.score - m.score <= AMBIGUITY_MARGIN]
+    if len(tied) > 1:
+        raise AmbiguousCaseMatch(query, tied)
+    return best
+
+
+async def backfill_name_index(db, batch_size: int = 500) -> int:
+    """Indexa casos ainda sem ``name_trigrams`` (idempotente)"""
+    indexed = 0
+    try:
+        while True:
+            cases = await db.b2b_cases.find(
+                {"name_trigrams": {"$exists": False}}, {"_id": 0, "case_id": 1, "client_name": 1}
+            ).to_list(length=batch_size)
+            if not cases:
+                break
+            for case in cases:
+                await db.b2b_cases.update_one(
+                    {"case_id": case["case_id"]},
+                    {"$set": name_index_fields(case.get("client_name"))},
+                )
+                indexed += 1
+    except Exception as e:
+        logger.error(f"Case name index backfill stopped after {indexed} cases: {e}")
+
+    if indexed:
+        logger.info(f"Indexed client names of {indexed} cases")
+    return indexed
@@ -7,11 +7,14 @@ from motor.motor_asyncio import AsyncIOMotorClient
 
 from backend.admin.products import initialize_products_in_db
 from backend.admin.security import init_db as init_admin_security_db
-from backend.agents.maria import api as maria_api
 import osprey_chat_api
 import documents_api
 from backend.utils.proactive_alerts import ProactiveAlertSystem
 from backend.core.auth import set_db as set_auth_db
+from backend.core.index_manifest import manifest_specs
+from backend.core.indexes import reconcile_indexes
+from backend.core.lifecycle import lifecycle
+from backend.core.router_registry import startup_profile
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +26,10 @@ class DBProxy:
     def set(self, db):
         self._db = db
 
+    def get(self):
+        """Database real (APIs que exigem AsyncIOMotorDatabase, como GridFS)"""
+        return self._db
+
     def __getattr__(self, name):
         if self._db is None:
             raise AttributeError("Database not initialized")
@@ -41,75 +48,156 @@ visa_scheduler = None
 
 
 async def startup_db_client():
-    """Startup event to connect to MongoDB with optimized indexes."""
-    global client, db, alert_system, visa_scheduler
+    """
+    Caminho crítico do boot: conecta no MongoDB e liga os módulos ao db
+
+    Índices, seed de produtos, schedulers e workers rodam depois como fases
+    de fundo do ``lifecycle`` (estado em /api/health e /ready).
+    """
+    await lifecycle.run_phase("mongodb", _connect())
+    await lifecycle.run_phase("init_modules", _init_modules())
+
+    lifecycle.start_background("indexes", lambda: _create_indexes(db))
+    lifecycle.start_background("products", lambda: _initialize_products())
+    lifecycle.start_background("visa_scheduler", lambda: _start_visa_scheduler(db))
+    lifecycle.start_background("kb_search_index", _backfill_kb_search_index, after="indexes")
+    lifecycle.start_background("page_text_cache", _prune_page_text_cache)
+    _start_workers()
+
+
+async def _connect():
+    global client
+    mongo_url = os.environ.get("MONGODB_URI") or os.environ.get(
+        "MONGO_URL", "mongodb://localhost:27017/"
+    )
+    client = AsyncIOMotorClient(mongo_url)
+    db_obj = client[
+        os.environ.get("MONGODB_DB") or os.environ.get("DB_NAME", "osprey_immigration_db")
+    ]
+    db.set(db_obj)
 
     try:
-        mongo_url = os.environ.get("MONGODB_URI") or os.environ.get(
-            "MONGO_URL", "mongodb://localhost:27017/"
-        )
-        client = AsyncIOMotorClient(mongo_url)
-        db_obj = client[
-            os.environ.get("MONGODB_DB") or os.environ.get("DB_NAME", "osprey_immigration_db")
-        ]
-        db.set(db_obj)
-
         await client.admin.command("ping")
-        logger.info("Successfully connected to MongoDB!")
+    except Exception as e:
+        logger.error(f"Error connecting to MongoDB: {str(e)}")
+        raise
+    logger.info("Successfully connected to MongoDB!")
+
+
+async def _init_modules():
+    global alert_system
+    alert_system = ProactiveAlertSystem(db)
+    logger.info("Proactive Alert System initialized!")
 
-        alert_system = ProactiveAlertSystem(db)
-        logger.info("Proactive Alert System initialized!")
+    # Router B2C desligado por padrão: só importa a Maria se ela foi registrada
+    if startup_profile.routers.get("maria") == "enabled":
+        from backend.agents.maria import api as maria_api
 
         maria_api.init_db(db)
         logger.info("✅ Maria - Assistente Virtual initialized!")
 
-        osprey_chat_api.init_db(db)
-        logger.info("✅ Osprey Legal Chat initialized!")
+    osprey_chat_api.init_db(db)
+    logger.info("✅ Osprey Legal Chat initialized!")
 
-        documents_api.init_db(db)
-        logger.info("✅ Documents API initialized!")
+    documents_api.init_db(db)
+    logger.info("✅ Documents API initialized!")
 
-        from backend.reminders_worker import start_reminders_worker
-        start_reminders_worker(db)
-        logger.info("✅ Reminders Worker initialized!")
+    from backend import firm_reports_api
+    firm_reports_api.init_db(db.get())
+    logger.info("✅ Firm Reports API initialized!")
 
-        from backend import firm_reports_api
-        firm_reports_api.init_db(db)
-        logger.info("✅ Firm Reports API initialized!")
+    from backend import firm_memory_api
+    firm_memory_api.init_db(db)
+    logger.info("✅ Firm Memory API initialized!")
 
-        from backend import firm_memory_api
-        firm_memory_api.init_db(db)
-        logger.info("✅ Firm Memory API initialized!")
+    init_admin_security_db(db)
+    logger.info("✅ Admin Security (RBAC) initialized!")
 
-        init_admin_security_db(db)
-        logger.info("✅ Admin Security (RBAC) initialized!")
+    set_auth_db(db)
 
-        await initialize_products_in_db(db)
-        logger.info("✅ Products initialized in MongoDB!")
+    from backend.case.finalizer_complete import case_finalizer_complete
+    case_finalizer_complete.set_db(db.get())
+    logger.info("✅ Case Finalizer job store initialized!")
 
-        await _create_indexes(db)
+    from backend.documents.metrics import document_metrics
+    document_metrics.set_db(db.get())
 
-        await _start_visa_scheduler(db)
-        await _start_backup_scheduler()
-        await _start_rate_limiter_cleanup()
 
-        # Start reminders worker
-        try:
-            from reminders_worker import start_reminders_worker
-            start_reminders_worker(db)
-            logger.info("✅ Reminders Worker started!")
-        except Exception as rw_err:
-            logger.warning(f"⚠️ Reminders Worker not started: {rw_err}")
+async def _precompile_report_templates():
+    """Aquece o bytecode cache dos templates de relatório (fora do event loop)"""
+    from backend.core.report_engine import report_engine
 
-        set_auth_db(db)
-    except Exception as e:
-        logger.error(f"Error connecting to MongoDB: {str(e)}")
-        raise
+    if not report_engine.available:
+        return "jinja2_not_installed"
+    return await asyncio.to_thread(report_engine.precompile)
+
+
+async def _backfill_kb_search_index():
+    """Indexa documentos da KB sem chunks (busca vazia até alguém chamar o reindex)"""
+    from backend.knowledge.search_index import KnowledgeSearchIndex
+
+    return await KnowledgeSearchIndex(db).backfill()
+
+
+async def _prune_page_text_cache():
+    """Remove do disco texto de páginas expirado (TTL) deixado por execuções anteriores"""
+    from backend.compliance.page_extraction import prune_page_text_cache
+
+    return {"removed": await asyncio.to_thread(prune_page_text_cache)}
+
+
+async def _initialize_products():
+    await initialize_products_in_db(db)
+    logger.info("✅ Products initialized in MongoDB!")
+
+
+def _start_workers():
+    """Loops de fundo (um de cada; antes o reminders worker subia duas vezes)"""
+    from backend.reminders_worker import reminders_loop
+
+    lifecycle.start_background("reminders_worker", lambda: reminders_loop(db), long_running=True)
+    logger.info("✅ Reminders Worker started!")
+
+    from backend.case.finalizer_complete import case_finalizer_complete
+
+    lifecycle.start_background(
+        "finalizer_recovery", case_finalizer_complete.job_runner.recover_loop, long_running=True
+    )
+
+    from backend.core.invalidation import invalidation_bus
+
+    lifecycle.start_background(
+        "invalidation_bus", lambda: invalidation_bus.run(db), long_running=True
+    )
+
+    from backend import firm_reports_api
+
+    lifecycle.start_background("report_templates", _precompile_report_templates)
+    lifecycle.start_background(
+        "firm_report_precompute", firm_reports_api.precompute_loop, long_running=True
+    )
+
+    from backend.documents.metrics import document_metrics
+
+    lifecycle.start_background(
+        "document_kpi_flush", document_metrics.flush_loop, long_running=True
+    )
+
+    _start_backup_scheduler()
+    _start_rate_limiter_cleanup()
 
 
 async def shutdown_db_client():
     """Shutdown event to close connections."""
     global client, visa_scheduler
+    await lifecycle.shutdown()
+    from backend.case.finalizer_jobs import shutdown_finalizer_pool
+    from backend.compliance.page_extraction import shutdown_extraction_pool
+    from backend.documents.metrics import document_metrics
+
+    await document_metrics.flush()
+    shutdown_finalizer_pool()
+    shutdown_extraction_pool()
     try:
         if visa_scheduler:
             visa_scheduler.stop()
@@ -122,102 +210,18 @@ async def shutdown_db_client():
         logger.info("✅ MongoDB connection closed")
 
 
-async def _create_indexes(db):
-    try:
-
-        async def safe_create_index(collection, keys, **kwargs):
-            try:
-                await collection.create_index(keys, **kwargs)
-            except Exception as e:
-                error_msg = str(e)
-                if (
-                    "already exists" not in error_msg.lower()
-                    and "IndexOptionsConflict" not in error_msg
-                    and "IndexKeySpecsConflict" not in error_msg
-                ):
-                    logger.warning(f"Error creating index {keys} on {collection.name}: {error_msg}")
-
-        await safe_create_index(db.auto_cases, "case_id", unique=True)
-        await safe_create_index(db.auto_cases, "user_id")
-        await safe_create_index(db.auto_cases, "session_token")
-        await safe_create_index(db.auto_cases, "status")
-        await safe_create_index(db.auto_cases, "created_at")
-        await safe_create_index(db.auto_cases, [("user_id", 1), ("status", 1)])
-
-        await safe_create_index(db.users, "email", unique=True)
-        await safe_create_index(db.users, "id", unique=True)
-
-        await safe_create_index(db.documents, "user_id")
-        await safe_create_index(db.documents, "document_type")
-        await safe_create_index(db.documents, "case_id")
-        await safe_create_index(db.documents, [("user_id", 1), ("document_type", 1)])
-
-        await safe_create_index(db.chat_history, "user_id")
-        await safe_create_index(db.chat_history, "session_id")
-        await safe_create_index(db.chat_history, "created_at")
-
-        await safe_create_index(db.owl_sessions, "session_id", unique=True)
-        await safe_create_index(db.owl_sessions, "case_id")
-        await safe_create_index(db.owl_sessions, "status")
-        await safe_create_index(db.owl_sessions, "created_at")
-
-        await safe_create_index(db.owl_responses, "session_id")
-        await safe_create_index(db.owl_responses, "field_id")
-        await safe_create_index(db.owl_responses, "timestamp")
-
-        await safe_create_index(db.owl_generated_forms, "session_id")
-        await safe_create_index(db.owl_generated_forms, "case_id")
-        await safe_create_index(db.owl_generated_forms, "visa_type")
-        await safe_create_index(db.owl_generated_forms, "created_at")
-
-        await safe_create_index(db.owl_users, "email", unique=True)
-        await safe_create_index(db.owl_users, "user_id", unique=True)
-        await safe_create_index(db.owl_users, "created_at")
-
-        await safe_create_index(
-            db.payment_transactions, "stripe_session_id", unique=True, sparse=True
-        )
-        await safe_create_index(db.payment_transactions, "owl_session_id")
-        await safe_create_index(db.payment_transactions, "user_email")
-        await safe_create_index(db.payment_transactions, "payment_status")
-        await safe_create_index(db.payment_transactions, "created_at")
-
-        await safe_create_index(db.owl_downloads, "download_id", unique=True)
-        await safe_create_index(db.owl_downloads, "stripe_session_id")
-        await safe_create_index(db.owl_downloads, "owl_session_id")
-
-        await safe_create_index(db.maria_conversations, "conversation_id")
-        await safe_create_index(db.maria_conversations, "user_id")
-        await safe_create_index(db.maria_conversations, "timestamp")
-        await safe_create_index(db.maria_conversations, [("conversation_id", 1), ("timestamp", 1)])
-        await safe_create_index(db.owl_downloads, "expires_at")
-
-        # B2B Multi-tenant indexes
-        await safe_create_index(db.offices, "office_id", unique=True)
-        await safe_create_index(db.offices, "is_active")
-        await safe_create_index(db.b2b_users, "email", unique=True)
-        await safe_create_index(db.b2b_users, "office_id")
-        await safe_create_index(db.b2b_users, "user_id", unique=True)
-        await safe_create_index(db.b2b_cases, "case_id", unique=True)
-        await safe_create_index(db.b2b_cases, "office_id")
-        await safe_create_index(db.b2b_cases, "status")
-        await safe_create_index(db.b2b_cases, [("office_id", 1), ("status", 1)])
-        await safe_create_index(db.osprey_chat_conversations, "office_id")
-
-        # Letters
-        await safe_create_index(db.letters, "letter_id", unique=True)
-        await safe_create_index(db.letters, "case_id")
-        await safe_create_index(db.letters, "office_id")
-
-        # Rate limits per office per day
-        await safe_create_index(db.rate_limits, [("office_id", 1), ("date", 1)], unique=True)
-
-        logger.info("Database indexes created successfully for optimized performance!")
-    except Exception as index_error:
-        logger.warning(f"Some indexes may already exist: {str(index_error)}")
+async def _create_indexes(db) -> dict:
+    """Cria só os índices do manifesto que faltam, em paralelo por collection"""
+    summary = await reconcile_indexes(db, manifest_specs())
+    logger.info(
+        f"✅ Database indexes reconciled: {summary['created']} created, "
+        f"{summary['unchanged']} unchanged"
+    )
+    return summary
 
 
 async def _start_visa_scheduler(db):
+    """Sobe o scheduler de atualizações de visto; retorna o estado (detalhe da fase)"""
     try:
         from backend.utils.scheduler import get_visa_update_scheduler
 
@@ -227,20 +231,24 @@ async def _start_visa_scheduler(db):
             visa_scheduler = get_visa_update_scheduler(db, llm_key)
             visa_scheduler.start()
             logger.info("✅ Visa Update Scheduler started successfully!")
-        else:
-            logger.warning("⚠️ EMERGENT_LLM_KEY not found - Visa update scheduler not started")
+            return "started"
+        logger.warning("⚠️ EMERGENT_LLM_KEY not found - Visa update scheduler not started")
+        return "not_configured"
     except Exception as scheduler_error:
         logger.error(f"❌ Failed to start visa update scheduler: {str(scheduler_error)}")
+        raise
 
 
-async def _start_backup_scheduler():
+def _start_backup_scheduler():
     try:
         mongo_url = os.environ.get("MONGODB_URI") or os.environ.get("MONGO_URL", "")
         if "localhost" in mongo_url or "127.0.0.1" in mongo_url:
             from backend.scripts.mongodb_backup import mongodb_backup
 
             if mongodb_backup.enabled:
-                asyncio.create_task(mongodb_backup.schedule_daily_backup())
+                lifecycle.start_background(
+                    "backup_scheduler", mongodb_backup.schedule_daily_backup, long_running=True
+                )
                 logger.info("✅ MongoDB Backup Scheduler started (daily at 3AM UTC)")
             else:
                 logger.warning("⚠️ MongoDB Backup Scheduler not started: backup dir not writable")
@@ -250,11 +258,13 @@ async def _start_backup_scheduler():
         logger.warning(f"⚠️ MongoDB Backup Scheduler not started: {str(backup_error)}")
 
 
-async def _start_rate_limiter_cleanup():
+def _start_rate_limiter_cleanup():
     try:
         from backend.utils.rate_limiter import rate_limiter
 
-        asyncio.create_task(rate_limiter.cleanup_old_entries())
+        lifecycle.start_background(
+            "rate_limiter_cleanup", rate_limiter.cleanup_old_entries, long_running=True
+        )
         logger.info("✅ Rate Limiter cleanup task started")
     except Exception as rate_limiter_error:
         logger.warning(f"⚠️ Rate Limiter cleanup not started: {str(rate_limiter_error)}")
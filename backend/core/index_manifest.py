@@ -0,0 +1,348 @@
+"""
+Index manifest — índices desejados e formatos de consulta quentes
+
+``INDEX_MANIFEST`` declara, por collection, os índices que o app espera
+(chaves + opções); ``core.indexes`` reconcilia o manifesto com
+``list_indexes`` no boot e no script ``scripts/fix_indexes.py``.
+
+``QUERY_SHAPES`` lista os formatos das consultas frequentes dos endpoints,
+workers e ferramentas do chat. O checker (``check_query_plans``) roda cada
+um com ``explain()`` contra um mongod local e falha em COLLSCAN — endpoint
+novo com consulta sem índice entra aqui junto com o índice que a atende.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from backend.core.indexes import IndexSpec, KeySpec, normalize_keys
+
+IndexEntry = Tuple[KeySpec, Dict[str, Any]]
+
+
+def ix(keys: KeySpec, **options: Any) -> IndexEntry:
+    """Uma entrada do manifesto: ``ix("case_id", unique=True)``"""
+    return keys, options
+
+
+INDEX_MANIFEST: Dict[str, List[IndexEntry]] = {
+    "auto_cases": [
+        ix("case_id", unique=True),
+        ix("user_id"),
+        ix("session_token"),
+        ix("status"),
+        ix("created_at"),
+        ix([("user_id", 1), ("status", 1)]),
+        ix("updated_at"),
+    ],
+    "users": [ix("email", unique=True), ix("id", unique=True)],
+    "documents": [
+        ix("user_id"),
+        ix("document_type"),
+        ix("case_id"),
+        ix([("user_id", 1), ("document_type", 1)]),
+    ],
+    "chat_history": [ix("user_id"), ix("session_id"), ix("created_at")],
+    "owl_sessions": [
+        ix("session_id", unique=True),
+        ix("case_id"),
+        ix("status"),
+        ix("created_at"),
+    ],
+    "owl_responses": [ix("session_id"), ix("field_id"), ix("timestamp")],
+    "owl_generated_forms": [ix("session_id"), ix("case_id"), ix("visa_type"), ix("created_at")],
+    "owl_users": [ix("email", unique=True), ix("user_id", unique=True), ix("created_at")],
+    "payment_transactions": [
+        ix("stripe_session_id", unique=True, sparse=True),
+        ix("owl_session_id"),
+        ix("user_email"),
+        ix("payment_status"),
+        ix("created_at"),
+    ],
+    "owl_downloads": [
+        ix("download_id", unique=True),
+        ix("stripe_session_id"),
+        ix("owl_session_id"),
+        ix("expires_at"),
+    ],
+    "maria_conversations": [
+        ix("conversation_id"),
+        ix("user_id"),
+        ix("timestamp"),
+        ix([("conversation_id", 1), ("timestamp", 1)]),
+    ],
+    # B2B multi-tenant
+    "offices": [ix("office_id", unique=True), ix("is_active")],
+    "b2b_users": [ix("email", unique=True), ix("office_id"), ix("user_id", unique=True)],
+    "b2b_cases": [
+        ix("case_id", unique=True),
+        ix("office_id"),
+        ix("status"),
+        ix([("office_id", 1), ("status", 1)]),
+        # Resolução de clientes por trigramas do nome (core/case_name_index.py)
+        ix([("office_id", 1), ("name_trigrams", 1)]),
+        # Busca nas notas do caso (search_cases)
+        ix([("office_id", 1), ("notes", "text")], default_language="none"),
+        # Listagens com paginação keyset (updated_at desc, case_id desc)
+        ix([("office_id", 1), ("updated_at", -1), ("case_id", -1)]),
+        ix([("office_id", 1), ("status", 1), ("updated_at", -1), ("case_id", -1)]),
+        # Polling do invalidation bus (mongod sem change streams)
+        ix("updated_at"),
+    ],
+    # Log de eventos do caso (append-only; o caso guarda só recent_activity)
+    "case_events": [
+        ix([("case_id", 1), ("ts", -1)]),
+        # get_case_events: ordena e pagina por (ts, event_id) sem SORT em memória
+        ix([("office_id", 1), ("case_id", 1), ("ts", -1), ("event_id", -1)]),
+    ],
+    "qa_readiness_reports": [ix([("office_id", 1), ("generated_at", -1)])],
+    "osprey_chat_conversations": [
+        ix("office_id"),
+        ix([("conversation_id", 1), ("timestamp", 1)]),
+    ],
+    # Estado por conversa (resumo + turnos recentes); expira se a conversa esfria
+    "osprey_chat_state": [
+        ix("office_id"),
+        ix("updated_at", expireAfterSeconds=90 * 24 * 3600),
+    ],
+    # Lembretes disparados pelo reminders_worker (pendentes com remind_at vencido)
+    "reminders": [
+        ix([("status", 1), ("remind_at", 1)]),
+        ix("reminder_id"),
+        ix("sent_at", sparse=True),
+    ],
+    # Memória do escritório: listagem por tipo e busca do agente por confiança
+    "firm_memory": [
+        ix("memory_id"),
+        ix([("office_id", 1), ("active", 1), ("memory_type", 1)]),
+        ix([("office_id", 1), ("active", 1), ("confidence", -1)]),
+    ],
+    # Base jurídica (legal_indexer / legal_research_api)
+    "legal_knowledge": [
+        ix([("text", "text")]),
+        ix("source"),
+        ix("visa_types"),
+        ix("doc_id", unique=True),
+    ],
+    # Documentos recebidos pelo WhatsApp ainda sem caso
+    "document_uploads": [ix("doc_id"), ix([("office_id", 1), ("created_at", -1)])],
+    "reports": [ix("report_id"), ix([("office_id", 1), ("created_at", -1)])],
+    # Relatórios do escritório (firm_reports_api): versão dos dados e lista por prazo
+    "cases": [
+        ix([("office_id", 1), ("updated_at", -1)]),
+        ix([("office_id", 1), ("deadline", 1)]),
+    ],
+    # Metadados dos artefatos HTML no blob store (core/report_engine)
+    "report_artifacts": [
+        ix("artifact_key", unique=True),
+        ix("expires_at", expireAfterSeconds=0),
+    ],
+    # Jobs do CaseFinalizerComplete (expiram por TTL; leases para retomada)
+    "finalizer_jobs": [
+        ix("job_id", unique=True),
+        ix("expires_at", expireAfterSeconds=0),
+        ix([("status", 1), ("lease_until", 1)]),
+    ],
+    # Feedback analytics (rollups diários por dia/tipo)
+    "feedback": [
+        ix([("type", 1), ("timestamp", -1)]),
+        ix([("timestamp", -1)]),
+        ix([("user_id", 1), ("timestamp", -1)]),
+    ],
+    "feedback_daily_rollups": [ix([("day", 1), ("type", 1)])],
+    # KPIs de análise de documentos (um bucket por dia, retidos por 400 dias)
+    "document_kpi_buckets": [ix("day", expireAfterSeconds=400 * 24 * 3600)],
+    "letters": [ix("letter_id", unique=True), ix("case_id"), ix("office_id")],
+    # Knowledge base search index (inverted index over chunk terms)
+    "knowledge_base": [ix("document_id")],
+    "knowledge_base_chunks": [
+        ix([("document_id", 1), ("chunk_index", 1)]),
+        ix([("terms", 1), ("category", 1)]),
+    ],
+    # LLM response cache (second tier, expired by TTL)
+    "llm_response_cache": [ix("expires_at", expireAfterSeconds=0)],
+    # LLM metric rollups (retained for 90 days)
+    "llm_metrics_rollups": [
+        ix("period_end", expireAfterSeconds=90 * 24 * 3600),
+        ix([("agent", 1), ("period_end", -1)]),
+        ix([("model", 1), ("period_end", -1)]),
+    ],
+    # Rate limits per office per day
+    "rate_limits": [ix([("office_id", 1), ("date", 1)], unique=True)],
+}
+
+
+def manifest_specs(collections: Optional[Iterable[str]] = None) -> List[IndexSpec]:
+    """Especificações do manifesto (todas ou só das collections informadas)"""
+    names = list(collections) if collections is not None else list(INDEX_MANIFEST)
+    return [
+        IndexSpec(name, normalize_keys(keys), dict(options))
+        for name in names
+        for keys, options in INDEX_MANIFEST.get(name, [])
+    ]
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """Formato de uma consulta do app (valores são apenas exemplos)"""
+
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+    projection: Optional[Dict[str, Any]] = field(default=None)
+    limit: Optional[int] = None
+    # Paginação keyset: o sort tem de vir do índice (SORT em memória reprova)
+    indexed_sort: bool = False
+
+    def explain_command(self) -> Dict[str, Any]:
+        find: Dict[str, Any] = {"find": self.collection, "filter": self.filter}
+        if self.sort:
+            find["sort"] = dict(self.sort)
+        if self.projection:
+            find["projection"] = self.projection
+        if self.limit:
+            find["limit"] = self.limit
+        return {"explain": find, "verbosity": "queryPlanner"}
+
+
+_OFFICE = "OFF-CHECK"
+_CASE = "CASE-CHECK"
+_SINCE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+_OID = ObjectId.from_datetime(_SINCE)
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("case_by_id", "b2b_cases", {"case_id": _CASE}),
+    QueryShape(
+        "case_list",
+        "b2b_cases",
+        {"office_id": _OFFICE},
+        sort=[("updated_at", -1), ("case_id", -1)],
+        limit=51,
+    ),
+    QueryShape(
+        "case_list_by_status",
+        "b2b_cases",
+        {"office_id": _OFFICE, "status": "in_progress"},
+        sort=[("updated_at", -1), ("case_id", -1)],
+        limit=51,
+    ),
+    QueryShape(
+        "case_name_trigrams",
+        "b2b_cases",
+        {"office_id": _OFFICE, "name_trigrams": {"$all": ["  s", " si", "sil"]}},
+        limit=200,
+    ),
+    QueryShape(
+        "case_notes_search",
+        "b2b_cases",
+        {"office_id": _OFFICE, "$text": {"$search": "rfe"}},
+        limit=20,
+    ),
+    QueryShape(
+        "case_events_page",
+        "case_events",
+        {"case_id": _CASE, "office_id": _OFFICE},
+        sort=[("ts", -1), ("event_id", -1)],
+        limit=51,
+        indexed_sort=True,
+    ),
+    QueryShape(
+        "qa_latest_report",
+        "qa_readiness_reports",
+        {"office_id": _OFFICE},
+        sort=[("generated_at", -1)],
+        limit=1,
+    ),
+    QueryShape(
+        "reminders_due",
+        "reminders",
+        {"status": "pending", "remind_at": {"$lte": "2026-01-01T00:00:00+00:00"}},
+    ),
+    QueryShape("reminder_by_id", "reminders", {"reminder_id": "REM-CHECK"}),
+    QueryShape(
+        "firm_memory_list",
+        "firm_memory",
+        {"office_id": _OFFICE, "active": True, "memory_type": "preference"},
+        sort=[("confidence", -1)],
+        limit=200,
+    ),
+    QueryShape(
+        "firm_memory_relevant",
+        "firm_memory",
+        {"office_id": _OFFICE, "active": True, "confidence": {"$gte": 0.5}},
+        sort=[("confidence", -1)],
+        limit=50,
+    ),
+    QueryShape("firm_memory_by_id", "firm_memory", {"memory_id": "MEM-CHECK"}),
+    QueryShape(
+        "legal_text_search",
+        "legal_knowledge",
+        {"$text": {"$search": "specialty occupation"}},
+        limit=50,
+    ),
+    QueryShape("legal_by_visa_type", "legal_knowledge", {"visa_types": "H-1B"}, limit=100),
+    QueryShape(
+        "pending_uploads",
+        "document_uploads",
+        {"office_id": _OFFICE, "attached_to_case": None},
+        sort=[("created_at", -1)],
+        limit=50,
+    ),
+    QueryShape(
+        "chat_recent_turns",
+        "osprey_chat_conversations",
+        {"conversation_id": "CONV-CHECK", "office_id": _OFFICE},
+        sort=[("timestamp", -1)],
+        limit=10,
+    ),
+    QueryShape("report_by_id", "reports", {"report_id": "RPT-CHECK"}),
+    QueryShape(
+        "firm_report_data_version",
+        "cases",
+        {"office_id": _OFFICE},
+        sort=[("updated_at", -1)],
+        projection={"_id": 0, "updated_at": 1},
+        limit=1,
+    ),
+    QueryShape(
+        "firm_report_cases",
+        "cases",
+        {"office_id": _OFFICE, "status": "ready_to_file"},
+        sort=[("deadline", 1)],
+        limit=200,
+    ),
+    QueryShape(
+        "report_artifact_by_key",
+        "report_artifacts",
+        {"artifact_key": "reports/OFF-CHECK/firm/0.html"},
+    ),
+    QueryShape("active_offices", "offices", {"is_active": True}),
+    QueryShape("finalizer_job_by_id", "finalizer_jobs", {"job_id": "JOB-CHECK"}),
+    QueryShape(
+        "finalizer_stale_jobs",
+        "finalizer_jobs",
+        {
+            "status": "running",
+            "lease_until": {"$lt": "2026-01-01T00:00:00+00:00"},
+            "attempts": {"$lt": 3},
+        },
+    ),
+    QueryShape("letters_by_case", "letters", {"case_id": _CASE}),
+    QueryShape(
+        "invalidation_poll_cases",
+        "b2b_cases",
+        {"$or": [{"_id": {"$gt": _OID}}, {"updated_at": {"$gt": _SINCE}}]},
+        limit=500,
+    ),
+    QueryShape(
+        "invalidation_poll_reminders",
+        "reminders",
+        {"$or": [{"_id": {"$gt": _OID}}, {"sent_at": {"$gt": _SINCE}}]},
+        limit=500,
+    ),
+    QueryShape("document_kpi_window", "document_kpi_buckets", {"day": {"$gte": _SINCE}}),
+    QueryShape("rate_limit_today", "rate_limits", {"office_id": _OFFICE, "date": "2026-01-01"}),
+]
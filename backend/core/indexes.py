@@ -0,0 +1,294 @@
+"""
+Índices do MongoDB — reconciliação concorrente e verificação de planos
+
+Compara o manifesto (``core.index_manifest``) com ``index_information()`` de
+cada collection e só cria o que falta. As collections são reconciliadas em
+paralelo (uma chamada ``create_indexes`` por collection), então o boot não
+espera ~60 ``create_index`` sequenciais nem reconstruções desnecessárias.
+``drift_report`` lista índices faltando, com opções divergentes ou fora do
+manifesto; ``check_query_plans`` roda os formatos de consulta do app com
+``explain()`` e aponta COLLSCANs.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Collections reconciliadas ao mesmo tempo
+RECONCILE_CONCURRENCY = 8
+
+# Opções que distinguem um índice de outro com as mesmas chaves
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds")
+
+KeySpec = Union[str, Sequence[Tuple[str, Any]]]
+
+
+def normalize_keys(keys: KeySpec) -> List[Tuple[str, Any]]:
+    """``"case_id"`` -> ``[("case_id", 1)]``"""
+    if isinstance(keys, str):
+        return [(keys, 1)]
+    return [(k, v) for k, v in keys]
+
+
+@dataclass
+class IndexSpec:
+    collection: str
+    keys: List[Tuple[str, Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_text(self) -> bool:
+        return any(v == "text" for _, v in self.keys)
+
+    def key_signature(self) -> Tuple:
+        if self.is_text:
+            # Mongo guarda índices de texto como _fts/_ftsx (um por collection)
+            prefix = tuple((k, v) for k, v in self.keys if v != "text")
+            return prefix + (("_fts", "text"),)
+        return tuple(self.keys)
+
+    def option_signature(self) -> Tuple:
+        return tuple(self.options.get(o) or None for o in COMPARED_OPTIONS)
+
+    def to_model(self) -> IndexModel:
+        return IndexModel(self.keys, **self.options)
+
+    def describe(self) -> str:
+        return f"{self.collection}{self.keys}"
+
+
+def _existing_signature(info: Dict[str, Any]) -> Tuple[Tuple, Tuple]:
+    keys = [(k, v) for k, v in info["key"]]
+    if any(k == "_fts" for k, _ in keys):
+        prefix = tuple((k, v) for k, v in keys if k not in ("_fts", "_ftsx"))
+        key_sig = prefix + (("_fts", "text"),)
+    else:
+        key_sig = tuple(keys)
+    options = tuple(info.get(o) or None for o in COMPARED_OPTIONS)
+    return key_sig, options
+
+
+@dataclass
+class CollectionDrift:
+    """Diferença entre o manifesto e os índices existentes de uma collection"""
+
+    collection: str
+    missing: List[IndexSpec] = field(default_factory=list)
+    # (spec desejado, nome do índice existente com as mesmas chaves)
+    conflicts: List[Tuple[IndexSpec, str]] = field(default_factory=list)
+    unmanaged: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def clean(self) -> bool:
+        return not self.missing and not self.conflicts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "missing": [s.describe() for s in self.missing],
+            "conflicts": [f"{s.describe()} (existing: {name})" for s, name in self.conflicts],
+            "unmanaged": self.unmanaged,
+            "unchanged": self.unchanged,
+        }
+
+
+async def diff_collection(db, name: str, specs: List[IndexSpec]) -> CollectionDrift:
+    """Compara os specs de uma collection com ``index_information()``"""
+    try:
+        existing = await db[name].index_information()
+    except Exception:
+        # Collection ainda não existe
+        existing = {}
+    current: Dict[Tuple, Tuple[Tuple, str]] = {}
+    for index_name, info in existing.items():
+        key_sig, options = _existing_signature(info)
+        current[key_sig] = (options, index_name)
+
+    drift = CollectionDrift(name)
+    wanted = set()
+    for spec in specs:
+        key_sig = spec.key_signature()
+        wanted.add(key_sig)
+        if key_sig not in current:
+            drift.missing.append(spec)
+        elif current[key_sig][0] != spec.option_signature():
+            drift.conflicts.append((spec, current[key_sig][1]))
+        else:
+            drift.unchanged += 1
+    drift.unmanaged = sorted(
+        index_name
+        for key_sig, (_, index_name) in current.items()
+        if key_sig not in wanted and index_name != "_id_"
+    )
+    return drift
+
+
+async def _create_missing(collection, specs: List[IndexSpec]) -> List[str]:
+    failed = []
+    try:
+        await collection.create_indexes([s.to_model() for s in specs])
+    except Exception:
+        # Um índice inválido derruba o lote; cria um a um para isolar a falha
+        for spec in specs:
+            try:
+                await collection.create_indexes([spec.to_model()])
+            except Exception as e:
+                failed.append(f"{spec.describe()}: {e}")
+                logger.warning(f"Error creating index {spec.describe()}: {e}")
+    return failed
+
+
+async def _reconcile_collection(
+    db, name: str, specs: List[IndexSpec], fix_conflicts: bool = False
+) -> Dict[str, Any]:
+    collection = db[name]
+    drift = await diff_collection(db, name, specs)
+
+    failed = await _create_missing(collection, drift.missing) if drift.missing else []
+    created = len(drift.missing) - len(failed)
+
+    conflicts = []
+    for spec, index_name in drift.conflicts:
+        if not fix_conflicts:
+            conflicts.append(spec.describe())
+            logger.warning(
+                f"⚠️ Index {spec.describe()} exists with different options (left as is)"
+            )
+            continue
+        # Reconstrução explícita (scripts/fix_indexes.py --fix-conflicts)
+        try:
+            await collection.drop_index(index_name)
+        except Exception as e:
+            failed.append(f"{spec.describe()}: drop {index_name}: {e}")
+            continue
+        errors = await _create_missing(collection, [spec])
+        failed.extend(errors)
+        if not errors:
+            created += 1
+            logger.info(f"🔁 {name}: rebuilt index {index_name} with manifest options")
+
+    if created:
+        logger.info(f"🗂️  {name}: created {created} index(es)")
+
+    return {
+        "created": created,
+        "unchanged": drift.unchanged,
+        "conflicts": conflicts,
+        "errors": failed,
+    }
+
+
+def _group(specs: List[IndexSpec]) -> Dict[str, List[IndexSpec]]:
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+    return by_collection
+
+
+async def reconcile_indexes(
+    db,
+    specs: List[IndexSpec],
+    concurrency: int = RECONCILE_CONCURRENCY,
+    fix_conflicts: bool = False,
+) -> Dict[str, Any]:
+    """
+    Cria os índices que faltam, em paralelo por collection
+
+    Args:
+        fix_conflicts: Derruba e recria índices com as mesmas chaves e opções
+            diferentes do manifesto (por padrão só são reportados)
+
+    Returns:
+        Resumo com totais criados/inalterados, conflitos de opções e falhas
+    """
+    by_collection = _group(specs)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(name: str, collection_specs: List[IndexSpec]):
+        async with semaphore:
+            return await _reconcile_collection(db, name, collection_specs, fix_conflicts)
+
+    names = list(by_collection)
+    results = await asyncio.gather(
+        *(run(n, by_collection[n]) for n in names), return_exceptions=True
+    )
+
+    summary: Dict[str, Any] = {
+        "created": 0, "unchanged": 0, "conflicts": [], "errors": [], "failed": {}
+    }
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            summary["failed"][name] = str(result)
+            logger.warning(f"Error reconciling indexes on {name}: {result}")
+            continue
+        summary["created"] += result["created"]
+        summary["unchanged"] += result["unchanged"]
+        summary["conflicts"].extend(result["conflicts"])
+        summary["errors"].extend(result["errors"])
+    return summary
+
+
+async def drift_report(db, specs: List[IndexSpec]) -> Dict[str, CollectionDrift]:
+    """Diferenças por collection (sem alterar nada); só collections com drift"""
+    by_collection = _group(specs)
+    drifts = await asyncio.gather(
+        *(diff_collection(db, name, s) for name, s in by_collection.items())
+    )
+    return {d.collection: d for d in drifts if d.missing or d.conflicts or d.unmanaged}
+
+
+# ── Verificação de planos de consulta ────────────────────────────
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Todos os ``stage`` de um plano do explain (inputStage(s), queryPlan do SBE)"""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for value in plan.values():
+            if isinstance(value, (dict, list)):
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+async def explain_stages(db, shape) -> List[str]:
+    """Estágios do plano vencedor de um ``QueryShape``"""
+    result = await db.command(shape.explain_command())
+    return plan_stages(result.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+async def check_query_plans(db, shapes) -> Dict[str, Any]:
+    """
+    Roda cada formato de consulta com ``explain()``
+
+    Returns:
+        ``{"collscans": [...], "blocking_sorts": [...], "sort_failures": [...],
+        "errors": {...}, "checked": n}``; COLLSCAN significa consulta sem índice
+        (o checker falha), SORT em memória é só reportado, exceto nos formatos
+        com ``indexed_sort`` (vai para ``sort_failures`` e o checker falha).
+    """
+    report: Dict[str, Any] = {
+        "checked": 0, "collscans": [], "blocking_sorts": [], "sort_failures": [], "errors": {}
+    }
+    for shape in shapes:
+        try:
+            stages = await explain_stages(db, shape)
+        except Exception as e:
+            report["errors"][shape.name] = str(e)
+            continue
+        report["checked"] += 1
+        if "COLLSCAN" in stages:
+            report["collscans"].append(f"{shape.name} ({shape.collection})")
+        elif "SORT" in stages:
+            key = "sort_failures" if shape.indexed_sort else "blocking_sorts"
+            report[key].append(f"{shape.name} ({shape.collection})")
+    return report
@@ -0,0 +1,339 @@
+"""
+Invalidation bus — avisos de "caso/escritório mudou" para caches derivados
+
+Um loop por processo acompanha ``b2b_cases``, ``letters``, ``reminders``,
+``document_uploads`` e ``auto_cases`` via change streams do MongoDB e publica
+``Invalidation(collection, office_id, case_id)`` no bus. Em mongod standalone
+(sem replica set não há change streams) cai para polling por ``_id`` e pelos
+campos de atualização de cada collection.
+
+Caches em processo (``DerivedCache``) assinam o bus e descartam as entradas do
+``(office_id, case_id)`` afetado, então visões derivadas (overview do
+escritório, estatísticas, status de QA, alertas, relatórios) podem ficar em
+cache e continuar corretas com vários workers da API. Escritas locais também
+publicam direto (``invalidation_bus.publish``), sem esperar o stream.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 2.0
+POLL_BATCH = 500
+RETRY_SECONDS = 5.0
+# Code 40573: "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = {40573}
+
+
+@dataclass(frozen=True)
+class WatchedCollection:
+    name: str
+    case_key: str = "case_id"
+    office_key: Optional[str] = "office_id"
+    # Campos com data de alteração (polling); inserts são vistos pelo _id
+    changed_at_fields: Tuple[str, ...] = ()
+
+
+WATCHED_COLLECTIONS: List[WatchedCollection] = [
+    WatchedCollection("b2b_cases", changed_at_fields=("updated_at",)),
+    WatchedCollection("letters"),
+    WatchedCollection("reminders", changed_at_fields=("sent_at",)),
+    WatchedCollection("document_uploads"),
+    # Casos B2C (alertas proativos): chave "id", sem escritório
+    WatchedCollection(
+        "auto_cases", case_key="id", office_key=None, changed_at_fields=("updated_at",)
+    ),
+]
+
+
+@dataclass(frozen=True)
+class Invalidation:
+    """Mudança em um documento; ``None`` = desconhecido (invalida de forma ampla)"""
+
+    collection: str
+    office_id: Optional[str] = None
+    case_id: Optional[str] = None
+    operation: str = "update"
+
+
+Subscriber = Callable[[Invalidation], None]
+
+
+class InvalidationBus:
+    """Pub/sub em processo, alimentado por change streams ou polling"""
+
+    def __init__(self, watched: Optional[List[WatchedCollection]] = None):
+        self.watched = {w.name: w for w in (watched or WATCHED_COLLECTIONS)}
+        self._subscribers: Dict[Tuple[Optional[str], Optional[str]], List[Subscriber]] = {}
+        self.mode = "stopped"
+        self.published = 0
+        self.last_event_at: Optional[datetime] = None
+        self._resume_token = None
+
+    def subscribe(
+        self, callback: Subscriber, office_id: Optional[str] = None, case_id: Optional[str] = None
+    ) -> Callable[[], None]:
+        """
+        Assina mudanças de um caso, de um escritório ou de tudo (sem filtros)
+
+        Returns:
+            Função que cancela a assinatura
+        """
+        key = (office_id, case_id)
+        self._subscribers.setdefault(key, []).append(callback)
+
+        def unsubscribe() -> None:
+            callbacks = self._subscribers.get(key, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+        return unsubscribe
+
+    def _targets(self, event: Invalidation) -> List[Subscriber]:
+        if event.office_id is None and event.case_id is None:
+            # Origem desconhecida (ex.: delete): avisa todos
+            return [cb for callbacks in self._subscribers.values() for cb in callbacks]
+        targets = list(self._subscribers.get((None, None), []))
+        for (office_id, case_id), callbacks in self._subscribers.items():
+            if (office_id, case_id) == (None, None):
+                continue
+            if office_id is not None and event.office_id is not None:
+                if office_id != event.office_id:
+                    continue
+            if case_id is not None and case_id != event.case_id:
+                continue
+            targets.extend(callbacks)
+        return targets
+
+    def publish(self, event: Invalidation) -> None:
+        self.published += 1
+        self.last_event_at = datetime.now(timezone.utc)
+        for callback in self._targets(event):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(f"Invalidation subscriber failed: {e}")
+
+    def _from_document(
+        self, collection: str, doc: Optional[Dict[str, Any]], operation: str
+    ) -> Invalidation:
+        watched = self.watched.get(collection)
+        if not doc or not watched:
+            return Invalidation(collection, operation=operation)
+        office_id = doc.get(watched.office_key) if watched.office_key else None
+        return Invalidation(collection, office_id, doc.get(watched.case_key), operation)
+
+    # ── Fontes ────────────────────────────────────────────────────
+
+    async def run(self, db) -> None:
+        """Loop de longa duração: change streams; polling se não houver replica set"""
+        from pymongo.errors import OperationFailure
+
+        resume_token = None
+        while True:
+            try:
+                await self._watch(db, resume_token)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("ℹ️ Change streams unavailable (standalone mongod) - polling")
+                    await self._poll(db)
+                    return
+                logger.warning(f"Change stream error, reopening: {e}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change stream error, reopening: {e}")
+            resume_token = self._resume_token
+            self.mode = "reconnecting"
+            await asyncio.sleep(RETRY_SECONDS)
+
+    async def _watch(self, db, resume_token=None) -> None:
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": list(self.watched)}}},
+            {
+                "$project": {
+                    "operationType": 1,
+                    "ns": 1,
+                    **{
+                        f"fullDocument.{key}": 1
+                        for w in self.watched.values()
+                        for key in (w.case_key, w.office_key)
+                        if key
+                    },
+                }
+            },
+        ]
+        async with db.watch(
+            pipeline, full_document="updateLookup", resume_after=resume_token
+        ) as stream:
+            self.mode = "change_stream"
+            logger.info(f"✅ Invalidation bus watching {len(self.watched)} collections")
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                self.publish(
+                    self._from_document(
+                        change["ns"]["coll"], change.get("fullDocument"), change["operationType"]
+                    )
+                )
+
+    async def _poll(self, db, interval: float = POLL_INTERVAL_SECONDS) -> None:
+        self.mode = "polling"
+        now = datetime.now(timezone.utc)
+        last_oid = {name: ObjectId.from_datetime(now) for name in self.watched}
+        last_changed = {name: now for name in self.watched}
+        while True:
+            for name, watched in self.watched.items():
+                try:
+                    await self._poll_collection(db, watched, last_oid, last_changed)
+                except Exception as e:
+                    logger.warning(f"Invalidation polling failed on {name}: {e}")
+            await asyncio.sleep(interval)
+
+    async def _poll_collection(
+        self,
+        db,
+        watched: WatchedCollection,
+        last_oid: Dict[str, ObjectId],
+        last_changed: Dict[str, datetime],
+    ) -> None:
+        """
+        Publica inserts (por ``_id``) e alterações (por cada campo de data)
+
+        Cada fonte é lida em ordem e paginada até um lote vir incompleto, então
+        rajadas maiores que POLL_BATCH não pulam invalidações.
+        """
+        name = watched.name
+        projection = {watched.case_key: 1, **{f: 1 for f in watched.changed_at_fields}}
+        if watched.office_key:
+            projection[watched.office_key] = 1
+
+        async for doc in self._paged(db[name], "_id", last_oid[name], projection):
+            last_oid[name] = doc["_id"]
+            self.publish(self._from_document(name, doc, "poll"))
+
+        # Todos os campos partem da mesma marca; ela só avança no fim
+        since = last_changed[name]
+        for f in watched.changed_at_fields:
+            async for doc in self._paged(db[name], f, since, projection):
+                value = doc[f]
+                if value.tzinfo is None:
+                    value = value.replace(tzinfo=timezone.utc)
+                last_changed[name] = max(last_changed[name], value)
+                self.publish(self._from_document(name, doc, "poll"))
+
+    @staticmethod
+    async def _paged(collection, field: str, after: Any, projection: Dict[str, Any]):
+        """Documentos com ``field > after`` em ordem de (field, _id), em lotes"""
+        query: Dict[str, Any] = {field: {"$gt": after}}
+        sort = [(field, 1)] if field == "_id" else [(field, 1), ("_id", 1)]
+        while True:
+            docs = await collection.find(query, projection).sort(sort).to_list(length=POLL_BATCH)
+            for doc in docs:
+                yield doc
+            if len(docs) < POLL_BATCH:
+                return
+            last = docs[-1]
+            if field == "_id":
+                query = {"_id": {"$gt": last["_id"]}}
+            else:
+                # Empates no mesmo instante continuam pelo _id
+                query = {
+                    "$or": [
+                        {field: {"$gt": last[field]}},
+                        {field: last[field], "_id": {"$gt": last["_id"]}},
+                    ]
+                }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "collections": list(self.watched),
+            "subscribers": sum(len(c) for c in self._subscribers.values()),
+            "published": self.published,
+            "last_event_at": self.last_event_at.isoformat() if self.last_event_at else None,
+        }
+
+
+invalidation_bus = InvalidationBus()
+
+
+class DerivedCache:
+    """
+    Cache em processo de dados derivados, chaveado por (office_id, case_id, key)
+
+    Mudança num caso descarta as entradas do caso e as do escritório inteiro
+    (agregados); ``ttl_seconds`` limita dados que dependem do relógio
+    (prazos "nos próximos 7 dias", casos parados).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sources: FrozenSet[str] = frozenset({"b2b_cases"}),
+        ttl_seconds: float = 300.0,
+        max_entries: int = 2000,
+        bus: Optional[InvalidationBus] = None,
+    ):
+        self.name = name
+        self.sources = frozenset(sources)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[Optional[str], Optional[str], str], Tuple[float, Any]] = {}
+        # Incrementado a cada invalidação: resultado calculado antes dela não é gravado
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        (bus or invalidation_bus).subscribe(self.invalidate)
+
+    def invalidate(self, event: Invalidation) -> None:
+        if event.collection not in self.sources:
+            return
+        self._generation += 1
+        if event.office_id is None and event.case_id is None:
+            self._entries.clear()
+            return
+        for entry_key in list(self._entries):
+            office_id, case_id, _ = entry_key
+            same_office = event.office_id is None or office_id in (None, event.office_id)
+            if not same_office:
+                continue
+            # Agregados do escritório (case_id None) sempre; entradas de caso só do caso
+            if case_id is None or event.case_id is None or case_id == event.case_id:
+                del self._entries[entry_key]
+
+    async def get_or_compute(
+        self,
+        office_id: Optional[str],
+        case_id: Optional[str],
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        entry_key = (office_id, case_id, key)
+        entry = self._entries.get(entry_key)
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        generation = self._generation
+        value = await compute()
+        if generation == self._generation:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[entry_key] = (time.monotonic(), value)
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
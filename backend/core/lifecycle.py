@@ -0,0 +1,147 @@
+"""
+Lifecycle — fases do startup e tarefas de fundo rastreadas
+
+O caminho crítico do boot (conectar no Mongo, ligar os módulos ao db) roda
+com ``run_phase`` e define a prontidão; o resto — reconciliação de índices,
+seed de produtos, warmups de modelos, workers e loops periódicos — entra com
+``start_background`` e roda depois que o app já aceita tráfego. Cada fase
+tem estado, duração e erro, expostos em ``/api/health`` e no probe ``/ready``.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+OK = "ok"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class Phase:
+    name: str
+    critical: bool = False
+    # Loops de longa duração ficam "running" enquanto o processo vive
+    long_running: bool = False
+    state: str = PENDING
+    started_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+    detail: Any = None
+    _started: float = field(default=0.0, repr=False)
+
+    def begin(self) -> None:
+        self.state = RUNNING
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+
+    def finish(self, state: str, error: Optional[str] = None) -> None:
+        self.state = state
+        self.error = error
+        self.duration_ms = round((time.perf_counter() - self._started) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "state": self.state,
+            "critical": self.critical,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "duration_ms": self.duration_ms,
+        }
+        if self.long_running:
+            data["long_running"] = True
+        if self.error:
+            data["error"] = self.error
+        if self.detail is not None:
+            data["detail"] = self.detail
+        return data
+
+
+class LifecycleManager:
+    """Registro das fases do boot e das tarefas de fundo do processo"""
+
+    def __init__(self):
+        self.phases: Dict[str, Phase] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def run_phase(self, name: str, coro: Awaitable, critical: bool = True) -> Any:
+        """Roda uma fase no caminho do boot; falha em fase crítica propaga"""
+        phase = self.phases[name] = Phase(name, critical=critical)
+        phase.begin()
+        try:
+            result = await coro
+        except Exception as e:
+            phase.finish(FAILED, str(e))
+            if critical:
+                raise
+            logger.warning(f"⚠️ Startup phase {name} failed: {e}")
+            return None
+        phase.finish(OK)
+        return result
+
+    def start_background(
+        self,
+        name: str,
+        factory: Callable[[], Awaitable],
+        long_running: bool = False,
+        after: Optional[str] = None,
+    ) -> asyncio.Task:
+        """
+        Agenda uma tarefa de fundo rastreada
+
+        Args:
+            name: Nome da fase (único)
+            factory: Função que cria a coroutine
+            long_running: Loop que só termina no shutdown (worker, scheduler)
+            after: Espera outra fase de fundo terminar antes de começar
+        """
+        phase = self.phases[name] = Phase(name, long_running=long_running)
+        task = asyncio.create_task(self._run_background(phase, factory, after), name=name)
+        self._tasks[name] = task
+        return task
+
+    async def _run_background(
+        self, phase: Phase, factory: Callable[[], Awaitable], after: Optional[str]
+    ) -> None:
+        if after and after in self._tasks:
+            await asyncio.wait([self._tasks[after]])
+        phase.begin()
+        try:
+            phase.detail = await factory()
+        except asyncio.CancelledError:
+            phase.finish(CANCELLED)
+            raise
+        except Exception as e:
+            phase.finish(FAILED, str(e))
+            logger.error(f"❌ Background phase {phase.name} failed: {e}")
+            return
+        phase.finish(OK)
+
+    @property
+    def ready(self) -> bool:
+        """Pronto para tráfego: todas as fases críticas concluídas"""
+        critical = [p for p in self.phases.values() if p.critical]
+        return bool(critical) and all(p.state == OK for p in critical)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "phases": {name: phase.to_dict() for name, phase in self.phases.items()},
+        }
+
+    async def shutdown(self, timeout: float = 10.0) -> None:
+        """Cancela as tarefas de fundo e espera (com limite) que terminem"""
+        tasks = [t for t in self._tasks.values() if not t.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+
+lifecycle = LifecycleManager()
@@ -0,0 +1,247 @@
+"""
+Report engine — templates Jinja2 pré-compilados e artefatos HTML em cache
+
+- Templates em ``core/report_templates``; o bytecode compilado fica em disco
+  (``FileSystemBytecodeCache``), então só o primeiro processo paga a
+  compilação e o boot aquece o cache (``precompile``).
+- ``stream`` renderiza em pedaços (``template.generate``), sem montar a
+  página inteira em memória — relatórios de escritórios grandes começam a
+  sair antes de terminar.
+- ``ReportArtifacts`` guarda o HTML renderizado no blob store, chaveado por
+  (escritório, relatório, parâmetros, versão dos dados, versão do template,
+  janela de frescor). Metadados ficam em ``report_artifacts`` (TTL), então
+  qualquer worker reaproveita um artefato gerado por outro e responde
+  ``304`` para ``If-None-Match`` com o mesmo ETag.
+
+Configuração:
+    REPORT_BYTECODE_CACHE_DIR=/tmp/osprey_report_bytecode
+    REPORT_FRESHNESS_SECONDS=86400   janela de frescor (padrão: dia UTC)
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from backend.core.blob_store import BlobNotFound, create_blob_store
+
+logger = logging.getLogger(__name__)
+
+try:
+    from jinja2 import (
+        Environment,
+        FileSystemBytecodeCache,
+        FileSystemLoader,
+        StrictUndefined,
+        select_autoescape,
+    )
+
+    JINJA2_AVAILABLE = True
+except ImportError:
+    JINJA2_AVAILABLE = False
+
+TEMPLATES_DIR = Path(__file__).parent / "report_templates"
+BYTECODE_CACHE_DIR = Path(
+    os.environ.get("REPORT_BYTECODE_CACHE_DIR", "/tmp/osprey_report_bytecode")
+)
+REPORT_FRESHNESS_SECONDS = int(os.environ.get("REPORT_FRESHNESS_SECONDS", "86400"))
+
+ARTIFACTS_COLLECTION = "report_artifacts"
+ARTIFACT_PREFIX = "reports/"
+STREAM_CHUNK_CHARS = 64 * 1024
+HTML_CONTENT_TYPE = "text/html; charset=utf-8"
+
+
+class ReportEngineUnavailable(RuntimeError):
+    """Jinja2 não instalado"""
+
+
+class ReportEngine:
+    """Ambiente Jinja2 compartilhado pelos relatórios"""
+
+    def __init__(self, templates_dir: Path = TEMPLATES_DIR, cache_dir: Path = BYTECODE_CACHE_DIR):
+        self.templates_dir = Path(templates_dir)
+        self.cache_dir = Path(cache_dir)
+        self._env = None
+        self._versions: Dict[str, str] = {}
+
+    @property
+    def available(self) -> bool:
+        return JINJA2_AVAILABLE
+
+    @property
+    def env(self):
+        if not JINJA2_AVAILABLE:
+            raise ReportEngineUnavailable("Jinja2 not installed - report rendering unavailable")
+        if self._env is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._env = Environment(
+                loader=FileSystemLoader(str(self.templates_dir)),
+                bytecode_cache=FileSystemBytecodeCache(str(self.cache_dir)),
+                autoescape=select_autoescape(["html"]),
+                undefined=StrictUndefined,
+                trim_blocks=True,
+                lstrip_blocks=True,
+                auto_reload=False,
+            )
+        return self._env
+
+    def template_version(self, name: str) -> str:
+        """Hash do fonte do template (mudou o template = artefatos novos)"""
+        if name not in self._versions:
+            source = (self.templates_dir / name).read_bytes()
+            self._versions[name] = hashlib.sha1(source).hexdigest()[:12]
+        return self._versions[name]
+
+    def precompile(self) -> Dict[str, Any]:
+        """Compila todos os templates (grava o bytecode em disco)"""
+        started = time.perf_counter()
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+            self.template_version(name)
+        return {"templates": len(names), "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def render(self, name: str, context: Dict[str, Any]) -> str:
+        return self.env.get_template(name).render(**context)
+
+    async def stream(
+        self, name: str, context: Dict[str, Any], chunk_chars: int = STREAM_CHUNK_CHARS
+    ) -> AsyncIterator[bytes]:
+        """Renderiza em pedaços, devolvendo o event loop entre eles"""
+        template = self.env.get_template(name)
+        buffer: List[str] = []
+        size = 0
+        for part in template.generate(**context):
+            buffer.append(part)
+            size += len(part)
+            if size >= chunk_chars:
+                yield "".join(buffer).encode("utf-8")
+                buffer, size = [], 0
+                await asyncio.sleep(0)
+        if buffer:
+            yield "".join(buffer).encode("utf-8")
+
+
+report_engine = ReportEngine()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def freshness_window(now: Optional[datetime] = None) -> int:
+    """Janela atual; artefatos de janelas anteriores não são mais servidos"""
+    return int((now or _now()).timestamp() // REPORT_FRESHNESS_SECONDS)
+
+
+def etag_for(key: str) -> str:
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+class ReportArtifacts:
+    """HTML renderizado no blob store + metadados em ``report_artifacts``"""
+
+    def __init__(self, db, engine: ReportEngine = report_engine):
+        self.collection = db[ARTIFACTS_COLLECTION]
+        self.blobs = create_blob_store(db)
+        self.engine = engine
+
+    def key(
+        self,
+        office_id: str,
+        report: str,
+        template: str,
+        params: Dict[str, Any],
+        data_version: str,
+        now: Optional[datetime] = None,
+    ) -> str:
+        digest = hashlib.sha1(
+            json.dumps(
+                [
+                    params,
+                    data_version,
+                    self.engine.template_version(template),
+                    freshness_window(now),
+                ],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        ).hexdigest()[:24]
+        return f"{ARTIFACT_PREFIX}{office_id}/{report}/{digest}.html"
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"artifact_key": key}, {"_id": 0})
+
+    async def _save_meta(self, key: str, size: int, meta: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now()
+        doc = {
+            **meta,
+            "artifact_key": key,
+            "etag": etag_for(key),
+            "size": size,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=2 * REPORT_FRESHNESS_SECONDS),
+        }
+        await self.collection.replace_one({"artifact_key": key}, doc, upsert=True)
+        return doc
+
+    async def render_to_store(
+        self, key: str, template: str, context: Dict[str, Any], meta: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        chunks = [chunk async for chunk in self.engine.stream(template, context)]
+        data = b"".join(chunks)
+        await self.blobs.put(key, data, content_type=HTML_CONTENT_TYPE)
+        return await self._save_meta(key, len(data), meta)
+
+    async def render_streaming(
+        self, key: str, template: str, context: Dict[str, Any], meta: Dict[str, Any]
+    ) -> AsyncIterator[bytes]:
+        """Envia os pedaços ao cliente enquanto renderiza; grava o artefato no fim"""
+        chunks: List[bytes] = []
+        async for chunk in self.engine.stream(template, context):
+            chunks.append(chunk)
+            yield chunk
+        data = b"".join(chunks)
+        try:
+            await self.blobs.put(key, data, content_type=HTML_CONTENT_TYPE)
+            await self._save_meta(key, len(data), meta)
+        except Exception as e:
+            logger.warning(f"Report artifact not stored ({key}): {e}")
+
+    async def stream(self, key: str) -> AsyncIterator[bytes]:
+        """Bytes de um artefato; ``BlobNotFound`` se já foi removido"""
+        async for chunk in self.blobs.stream(key):
+            yield chunk
+
+    async def open(self, key: str) -> Optional[AsyncIterator[bytes]]:
+        """Iterador do artefato já com o primeiro pedaço lido (None se sumiu)"""
+        stream = self.stream(key)
+        try:
+            first = await stream.__anext__()
+        except (BlobNotFound, StopAsyncIteration):
+            return None
+
+        async def chained() -> AsyncIterator[bytes]:
+            yield first
+            async for chunk in stream:
+                yield chunk
+
+        return chained()
+
+    async def purge_expired(self) -> int:
+        """Remove blobs de janelas antigas (os metadados expiram por TTL)"""
+        cutoff = _now() - timedelta(seconds=2 * REPORT_FRESHNESS_SECONDS)
+        return await self.blobs.purge_older_than(cutoff, prefix=ARTIFACT_PREFIX)
@@ -0,0 +1,219 @@
+"""
+Router registry — carregamento sob demanda dos routers da API
+
+Cada router é declarado uma vez em ``ROUTER_SPECS`` (módulo + atributo) e só
+é importado se estiver habilitado, então os routers B2C desligados e suas
+dependências (voz, pagamentos, ML) não entram no boot. O tempo de import de
+cada módulo fica no ``startup_profile``, exposto em
+``/api/system/startup-profile``.
+
+Configuração por ambiente (nomes separados por vírgula):
+    OSPREY_ENABLE_B2C=true        habilita todos os routers do grupo "b2c"
+    OSPREY_ROUTERS_ENABLE=a,b     habilita routers específicos
+    OSPREY_ROUTERS_DISABLE=c      desliga routers específicos
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RouterSpec:
+    name: str
+    module: str
+    attr: str = "router"
+    group: str = "core"
+    enabled: bool = True
+    # Falha de import só desliga o router (dependências opcionais)
+    optional: bool = False
+    # Função do módulo que pré-carrega modelos pesados (rodada em background)
+    warmup: Optional[str] = None
+    # Pacotes importados só sob demanda: sem eles o router não é registrado
+    requires: Tuple[str, ...] = ()
+
+
+# Ordem de registro = ordem de include_router (importa para rotas sobrepostas)
+ROUTER_SPECS: List[RouterSpec] = [
+    RouterSpec("auth", "backend.api.auth"),
+    RouterSpec("auto_application", "backend.api.auto_application", group="b2c", enabled=False),
+    RouterSpec(
+        "auto_application_ai", "backend.api.auto_application_ai", group="b2c", enabled=False
+    ),
+    RouterSpec(
+        "auto_application_packages",
+        "backend.api.auto_application_packages",
+        group="b2c",
+        enabled=False,
+    ),
+    RouterSpec(
+        "auto_application_downloads",
+        "backend.api.auto_application_downloads",
+        group="b2c",
+        enabled=False,
+    ),
+    RouterSpec("agents", "backend.api.agents"),
+    RouterSpec("completeness", "backend.api.completeness"),
+    RouterSpec("friendly_form", "backend.api.friendly_form", group="b2c", enabled=False),
+    RouterSpec("voice", "backend.api.voice", group="b2c", enabled=False),
+    RouterSpec("voice_ws", "backend.api.voice", attr="ws_router", group="b2c", enabled=False),
+    RouterSpec("downloads", "backend.api.downloads"),
+    RouterSpec("email_packages", "backend.api.email_packages"),
+    RouterSpec("knowledge_base", "backend.api.knowledge_base"),
+    RouterSpec("llm_metrics", "backend.api.llm_metrics"),
+    RouterSpec("oracle", "backend.api.oracle"),
+    RouterSpec("specialized_agents", "backend.api.specialized_agents"),
+    RouterSpec("visa_updates_admin", "backend.api.visa_updates_admin"),
+    RouterSpec("uscis_forms", "backend.api.uscis_forms", group="b2b"),
+    RouterSpec("packages", "backend.packages_api", group="b2b"),
+    RouterSpec("qa_pipeline", "backend.qa_pipeline_api", group="b2b"),
+    RouterSpec("intake_wizard", "backend.intake_wizard_api", group="b2b"),
+    RouterSpec("document_extractor", "backend.document_extractor_api", group="b2b"),
+    RouterSpec(
+        "legal_research",
+        "backend.legal_research_api",
+        group="b2b",
+        optional=True,
+        warmup="warmup",
+        requires=("sentence_transformers",),
+    ),
+    RouterSpec("claude_agents", "backend.claude_agents_api", group="b2b", optional=True),
+    RouterSpec("education", "backend.api.education", group="b2c", enabled=False),
+    RouterSpec("documents", "backend.api.documents", group="b2c", enabled=False),
+    RouterSpec("payments", "backend.api.payments", group="b2c", enabled=False),
+    RouterSpec("admin_products", "backend.api.admin_products", group="b2c", enabled=False),
+    RouterSpec("owl_agent", "backend.api.owl_agent", group="b2c", enabled=False),
+    RouterSpec("visa", "visa.api", optional=True),
+    RouterSpec("maria", "backend.agents.maria.api", group="b2c", enabled=False),
+    RouterSpec("osprey_chat", "osprey_chat_api", group="b2b"),
+    RouterSpec("b2b_auth", "backend.b2b_auth_api", group="b2b"),
+    RouterSpec("offices", "backend.offices_api", group="b2b"),
+    RouterSpec("cases", "backend.cases_api", group="b2b"),
+    RouterSpec("letters", "backend.letters_api", group="b2b"),
+    RouterSpec("documents_b2b", "backend.documents_api", group="b2b"),
+    RouterSpec("settings", "backend.settings_api", group="b2b"),
+    RouterSpec("reports", "backend.reports_api", group="b2b"),
+    RouterSpec("firm_reports", "backend.firm_reports_api", group="b2b"),
+    RouterSpec("firm_memory", "backend.firm_memory_api", group="b2b"),
+    RouterSpec("whatsapp_sessions", "backend.whatsapp_sessions_api", group="b2b"),
+]
+
+
+def _env_names(var: str) -> Set[str]:
+    return {n.strip() for n in os.environ.get(var, "").split(",") if n.strip()}
+
+
+def is_enabled(spec: RouterSpec) -> bool:
+    """Habilitação do router: padrão do spec, grupo B2C e listas do ambiente"""
+    if spec.name in _env_names("OSPREY_ROUTERS_DISABLE"):
+        return False
+    if spec.name in _env_names("OSPREY_ROUTERS_ENABLE"):
+        return True
+    if spec.group == "b2c" and os.environ.get("OSPREY_ENABLE_B2C", "").lower() == "true":
+        return True
+    return spec.enabled
+
+
+@dataclass
+class StartupProfile:
+    """Tempos de import por módulo e estado de cada router no boot"""
+
+    started_at: float = field(default_factory=time.perf_counter)
+    imports: Dict[str, float] = field(default_factory=dict)
+    routers: Dict[str, str] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    marks: Dict[str, float] = field(default_factory=dict)
+
+    def mark(self, label: str) -> None:
+        """Marca um ponto do boot (ms desde o início do processo do servidor)"""
+        self.marks[label] = round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def import_module(self, module: str):
+        if module in self.imports:
+            return importlib.import_module(module)
+        started = time.perf_counter()
+        try:
+            return importlib.import_module(module)
+        finally:
+            self.imports[module] = round((time.perf_counter() - started) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        slowest = sorted(self.imports.items(), key=lambda kv: kv[1], reverse=True)
+        return {
+            "marks_ms": self.marks,
+            "router_imports_ms": dict(slowest),
+            "router_imports_total_ms": round(sum(self.imports.values()), 1),
+            "routers": self.routers,
+            "errors": self.errors,
+        }
+
+
+startup_profile = StartupProfile()
+
+
+def missing_requirements(spec: RouterSpec) -> List[str]:
+    """Pacotes de ``spec.requires`` que não estão instalados (sem importá-los)"""
+    return [name for name in spec.requires if importlib.util.find_spec(name) is None]
+
+
+def register_routers(app, specs: Optional[List[RouterSpec]] = None) -> List[str]:
+    """
+    Importa e inclui os routers habilitados; retorna os nomes registrados
+
+    Routers ``optional`` que falham no import (ou sem os pacotes de
+    ``requires``) são desligados com aviso; os demais propagam o erro
+    (boot deve falhar, como no import direto).
+    """
+    registered = []
+    for spec in specs or ROUTER_SPECS:
+        if not is_enabled(spec):
+            startup_profile.routers[spec.name] = "disabled"
+            continue
+        try:
+            missing = missing_requirements(spec)
+            if missing:
+                raise ImportError(f"missing packages: {', '.join(missing)}")
+            module = startup_profile.import_module(spec.module)
+            router = getattr(module, spec.attr)
+        except Exception as e:
+            if not spec.optional:
+                raise
+            startup_profile.routers[spec.name] = "unavailable"
+            startup_profile.errors[spec.name] = str(e)
+            logger.warning(f"⚠️  Router {spec.name} not available: {e}")
+            continue
+        app.include_router(router)
+        startup_profile.routers[spec.name] = "enabled"
+        registered.append(spec.name)
+
+    startup_profile.mark("routers_registered")
+    logger.info(
+        f"✅ {len(registered)} routers registered "
+        f"({startup_profile.to_dict()['router_imports_total_ms']}ms of imports)"
+    )
+    return registered
+
+
+async def run_warmups(specs: Optional[List[RouterSpec]] = None) -> Dict[str, str]:
+    """Roda as funções de warmup dos routers habilitados (em threads, uma por vez)"""
+    results = {}
+    for spec in specs or ROUTER_SPECS:
+        if not spec.warmup or startup_profile.routers.get(spec.name) != "enabled":
+            continue
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(spec.module)
+            await asyncio.to_thread(getattr(module, spec.warmup))
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            results[spec.name] = f"ok ({elapsed}ms)"
+        except Exception as e:
+            results[spec.name] = f"failed: {e}"
+            logger.warning(f"Warmup of {spec.name} failed: {e}")
+    return results
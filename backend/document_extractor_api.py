@@ -4,6 +4,7 @@ Extracts structured data from uploaded documents (passport, I-20, etc.)
 and auto-populates case basic_data fields.
 """
 
+import asyncio
 import base64
 import logging
 from datetime import datetime, timezone
@@ -11,11 +12,16 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
 
+from backend.core.case_events import record_case_event
+from backend.core.case_name_index import name_index_fields
 from backend.core.database import db
 from backend.b2b_auth_api import get_b2b_user
+from backend.documents.quality_checker import DocumentQualityChecker
 
 logger = logging.getLogger(__name__)
 
+quality_checker = DocumentQualityChecker()
+
 router = APIRouter(prefix="/api/extractor", tags=["document-extractor"])
 
 # Max 20MB uploads
@@ -82,6 +88,20 @@ async def extract_document(
         f"({len(file_bytes)} bytes, type={document_type})"
     )
 
+    # Quality gate: imagens ilegíveis são recusadas antes do OCR (pago)
+    if SUPPORTED_TYPES[content_type] == "image":
+        # Análise de imagem é CPU (NumPy): fora do event loop
+        precheck = await asyncio.to_thread(quality_checker.precheck_for_ocr, file_bytes, filename)
+        if not precheck["proceed"]:
+            logger.info(f"🚫 Quality gate rejected {filename}: {precheck['reasons']}")
+            return {
+                "success": False,
+                "case_id": case_id,
+                "error": "Image quality too low for extraction",
+                "quality_issues": precheck["reasons"],
+                "suggestion": "Try uploading a clearer image or PDF.",
+            }
+
     # Use Google Document AI / Vision for OCR
     try:
         from backend.integrations.google import hybrid_validator
@@ -142,21 +162,17 @@ async def extract_document(
             updates_applied[f"{section}.{field}"] = value
 
         now = datetime.now(timezone.utc)
-        await db.b2b_cases.update_one(
-            {"case_id": case_id, "office_id": office_id},
-            {
-                "$set": update_set,
-                "$push": {
-                    "history": {
-                        "action": "document_extracted",
-                        "timestamp": now.isoformat(),
-                        "detail": (
-                            f"Extracted {len(updates_applied)} fields from {document_type}: "
-                            f"{', '.join(updates_applied.keys())}"
-                        ),
-                    }
-                },
-            },
+        await record_case_event(
+            db,
+            case_id,
+            office_id,
+            "document_extracted",
+            (
+                f"Extracted {len(updates_applied)} fields from {document_type}: "
+                f"{', '.join(updates_applied.keys())}"
+            ),
+            set_fields=update_set,
+            ts=now,
         )
 
         # Update client_name if we got a full name
@@ -167,7 +183,13 @@ async def extract_document(
                 full_name = f"{first} {last}".strip()
                 await db.b2b_cases.update_one(
                     {"case_id": case_id, "office_id": office_id},
-                    {"$set": {"client_name": full_name, "basic_data.beneficiary.full_name": full_name}},
+                    {
+                        "$set": {
+                            "client_name": full_name,
+                            "basic_data.beneficiary.full_name": full_name,
+                            **name_index_fields(full_name),
+                        }
+                    },
                 )
                 updates_applied["client_name"] = full_name
 
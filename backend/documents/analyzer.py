@@ -179,7 +179,10 @@ class DocumentAnalyzerAgent(BaseAgent):
             ]
 
             llm_response = await self._call_llm(
-                messages=[msg.dict() for msg in messages], model="gpt-4o", temperature=0.1
+                messages=[msg.dict() for msg in messages],
+                model="gpt-4o",
+                temperature=0.1,
+                cache=True,
             )
 
             # Try to parse LLM response as JSON
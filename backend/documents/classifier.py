@@ -725,7 +725,10 @@ class DocumentClassifier(BaseAgent):
             ]
 
             llm_response = await self._call_llm(
-                messages=[msg.dict() for msg in messages], model="gpt-4o", temperature=0.1
+                messages=[msg.dict() for msg in messages],
+                model="gpt-4o",
+                temperature=0.1,
+                cache=True,
             )
 
             # Try to parse LLM response
@@ -3,13 +3,17 @@ Document Analysis Metrics System
 Sistema de métricas e KPIs para análise de documentos com alta precisão
 """
 
+import asyncio
+import bisect
 import logging
+import os
 import re
-import statistics
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +46,7 @@ class DocumentMetrics:
     document_id: str
     doc_type: str
     classification_confidence: float
-    classification_correct: bool
+    classification_correct: Optional[bool]  # None: tipo não foi detectado, só assumido
     field_extractions: List[FieldExtractionResult]
     quality_score: float
     decision: DecisionType
@@ -51,13 +55,153 @@ class DocumentMetrics:
     analysis_timestamp: datetime
 
 
+# Buckets do histograma de tempo de processamento (ms), progressão geométrica
+PROCESSING_BUCKETS_MS: Tuple[float, ...] = tuple(float(round(5 * 1.5**i)) for i in range(28))
+
+FIELD_CATEGORIES: Dict[str, List[str]] = {
+    "identity": ["full_name", "date_of_birth", "passport_number", "ssn"],
+    "dates": ["expiry_date", "issue_date", "valid_from", "valid_to", "birth_date"],
+    "formatted_numbers": [
+        "receipt_number",
+        "uscis_number",
+        "i94_number",
+        "case_number",
+        "ssn",
+    ],
+}
+
+KPI_COLLECTION = "document_kpi_buckets"
+KPI_FLUSH_BATCH = int(os.environ.get("DOCUMENT_KPI_FLUSH_BATCH", "100"))
+KPI_FLUSH_INTERVAL_SECONDS = float(os.environ.get("DOCUMENT_KPI_FLUSH_INTERVAL", "5"))
+
+
+def _day(ts: datetime) -> datetime:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _key_part(value: str) -> str:
+    """Nome seguro para caminho de campo no MongoDB"""
+    return str(value).replace(".", "_").replace("$", "_") or "unknown"
+
+
+def _merge_counts(total: Dict[str, Any], doc: Dict[str, Any]) -> None:
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            _merge_counts(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+
+
+class KPIWindow:
+    """Soma dos buckets de um período; KPIs calculados em O(1) a partir dela"""
+
+    def __init__(self, buckets: List[Dict[str, Any]]):
+        self.buckets = len(buckets)
+        self.counts: Dict[str, Any] = {}
+        self.max_processing_ms = 0.0
+        for bucket in buckets:
+            _merge_counts(
+                self.counts,
+                {k: v for k, v in bucket.items() if k not in ("_id", "day", "processing_max_ms")},
+            )
+            self.max_processing_ms = max(
+                self.max_processing_ms, bucket.get("processing_max_ms", 0.0)
+            )
+
+    @property
+    def documents(self) -> int:
+        return self.counts.get("documents", 0)
+
+    def classification_f1(self) -> Optional[float]:
+        # Acurácia como proxy de F1 (sem FP/FN por classe), só sobre análises
+        # em que o tipo foi de fato detectado; None se nenhuma foi
+        classified = self.counts.get("classified", 0)
+        if not classified:
+            return None
+        return self.counts.get("classification_correct", 0) / classified
+
+    def exact_match_rate(self, category: str) -> Optional[float]:
+        """None se nenhum campo da categoria foi medido no período"""
+        field = self.counts.get("fields", {}).get(category, {})
+        total = field.get("total", 0)
+        return field.get("exact", 0) / total if total else None
+
+    def false_fail_rate(self) -> float:
+        # FAILs que exigiram revisão humana, sobre o total analisado
+        if not self.documents:
+            return 0.0
+        return self.counts.get("false_fail_candidates", 0) / self.documents
+
+    def processing_percentile(self, q: float) -> float:
+        """Percentil ``q`` (0-100) estimado por interpolação dentro do bucket"""
+        processing = self.counts.get("processing", {})
+        count = processing.get("count", 0)
+        if not count:
+            return 0.0
+        histogram = processing.get("buckets", {})
+        rank = q / 100 * count
+        seen = 0
+        for i in range(len(PROCESSING_BUCKETS_MS) + 1):
+            bucket_count = histogram.get(str(i), 0)
+            if bucket_count and seen + bucket_count >= rank:
+                lower = PROCESSING_BUCKETS_MS[i - 1] if i > 0 else 0.0
+                upper = (
+                    PROCESSING_BUCKETS_MS[i]
+                    if i < len(PROCESSING_BUCKETS_MS)
+                    else self.max_processing_ms
+                )
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, self.max_processing_ms)
+            seen += bucket_count
+        return self.max_processing_ms
+
+    def processing_performance(self) -> Dict[str, float]:
+        processing = self.counts.get("processing", {})
+        count = processing.get("count", 0)
+        if not count:
+            return {}
+        return {
+            "avg_processing_time_ms": processing.get("sum_ms", 0.0) / count,
+            "p50_processing_time_ms": self.processing_percentile(50),
+            "p95_processing_time_ms": self.processing_percentile(95),
+            "p99_processing_time_ms": self.processing_percentile(99),
+            "max_processing_time_ms": self.max_processing_ms,
+            "within_target_percentage": processing.get("within_target", 0) / count,
+        }
+
+    def by_doc_type(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            doc_type: {
+                "documents": counts.get("documents", 0),
+                "classification_accuracy": (
+                    counts.get("correct", 0) / counts["classified"]
+                    if counts.get("classified")
+                    else 0.0
+                ),
+            }
+            for doc_type, counts in self.counts.get("doc_types", {}).items()
+        }
+
+
 class DocumentAnalysisKPIs:
     """
     Sistema de KPIs baseado no plano de alta precisão
+
+    Cada análise (``record``) vira incrementos no bucket diário em
+    ``document_kpi_buckets``; os incrementos ficam num buffer e são gravados
+    em lote (``flush``, por tamanho ou pelo loop periódico). Os endpoints
+    somam só os buckets do período, então respondem em O(dias) e igual em
+    qualquer worker.
     """
 
-    def __init__(self):
-        self.metrics_history: List[DocumentMetrics] = []
+    def __init__(self, db=None):
+        self.collection = db[KPI_COLLECTION] if db is not None else None
+        self._pending: Dict[datetime, Dict[str, float]] = {}
+        self._pending_max: Dict[datetime, float] = {}
+        self._pending_count = 0
+        self._flush_task: Optional[asyncio.Task] = None
 
         # KPI Targets from the plan
         self.targets = {
@@ -69,174 +213,185 @@ class DocumentAnalysisKPIs:
             "processing_time_target_ms": 5000,
         }
 
-    def calculate_classification_f1(self, timeframe_days: int = 30) -> float:
+    def set_db(self, db) -> None:
+        self.collection = db[KPI_COLLECTION]
+
+    # ── Escrita ───────────────────────────────────────────────────
+
+    def record(self, metrics: DocumentMetrics) -> None:
+        """Acumula uma análise no buffer (gravado em lote no MongoDB)"""
+        day = _day(metrics.analysis_timestamp)
+        inc = self._pending.setdefault(day, {})
+
+        def add(path: str, value: float = 1) -> None:
+            inc[path] = inc.get(path, 0) + value
+
+        doc_type = _key_part(metrics.doc_type)
+        add("documents")
+        add(f"doc_types.{doc_type}.documents")
+        if metrics.classification_correct is not None:
+            add("classified")
+            add(f"doc_types.{doc_type}.classified")
+        if metrics.classification_correct:
+            add("classification_correct")
+            add(f"doc_types.{doc_type}.correct")
+        # Compara pelo valor: o enum pode vir de ``documents.metrics`` (import sem backend.)
+        decision = getattr(metrics.decision, "value", metrics.decision)
+        add(f"decisions.{decision}")
+        if metrics.human_review_required:
+            add("human_review")
+            if decision == DecisionType.FAIL.value:
+                add("false_fail_candidates")
+        add("quality_score_sum", metrics.quality_score)
+
+        for extraction in metrics.field_extractions:
+            for category, fields in FIELD_CATEGORIES.items():
+                if extraction.field_name in fields:
+                    add(f"fields.{category}.total")
+                    if extraction.exact_match:
+                        add(f"fields.{category}.exact")
+
+        elapsed = metrics.processing_time_ms
+        add("processing.count")
+        add("processing.sum_ms", elapsed)
+        if elapsed <= self.targets["processing_time_target_ms"]:
+            add("processing.within_target")
+        add(f"processing.buckets.{bisect.bisect_left(PROCESSING_BUCKETS_MS, elapsed)}")
+        self._pending_max[day] = max(self._pending_max.get(day, 0.0), elapsed)
+
+        self._pending_count += 1
+        if self._pending_count >= KPI_FLUSH_BATCH:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            pass  # sem event loop: o loop periódico grava
+
+    async def flush(self) -> int:
+        """Grava os incrementos pendentes (um upsert por dia, em um bulk_write)"""
+        if self.collection is None or not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        pending_max, self._pending_max = self._pending_max, {}
+        count, self._pending_count = self._pending_count, 0
+        operations = [
+            UpdateOne(
+                {"_id": f"{day:%Y-%m-%d}"},
+                {
+                    "$inc": inc,
+                    "$max": {"processing_max_ms": pending_max.get(day, 0.0)},
+                    "$setOnInsert": {"day": day},
+                },
+                upsert=True,
+            )
+            for day, inc in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Devolve ao buffer para a próxima tentativa
+            for day, inc in pending.items():
+                target = self._pending.setdefault(day, {})
+                for path, value in inc.items():
+                    target[path] = target.get(path, 0) + value
+                self._pending_max[day] = max(
+                    self._pending_max.get(day, 0.0), pending_max.get(day, 0.0)
+                )
+            self._pending_count += count
+            logger.warning(f"Failed to persist document KPI buckets: {e}")
+            return 0
+        return count
+
+    async def flush_loop(self, interval: float = KPI_FLUSH_INTERVAL_SECONDS) -> None:
+        """Flush periódico do buffer (executar como task de background)"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    # ── Leitura ───────────────────────────────────────────────────
+
+    async def window(self, timeframe_days: int = 30) -> KPIWindow:
+        """Buckets dos últimos N dias (inclui hoje), somados"""
+        if self.collection is None:
+            return KPIWindow([])
+        await self.flush()
+        since = _day(datetime.now(timezone.utc)) - timedelta(days=max(timeframe_days, 1) - 1)
+        buckets = await self.collection.find({"day": {"$gte": since}}).to_list(length=None)
+        return KPIWindow(buckets)
+
+    async def calculate_classification_f1(self, timeframe_days: int = 30) -> Optional[float]:
         """
         Calcula F1 score para classificação de tipos de documento
         """
-        recent_metrics = self._get_recent_metrics(timeframe_days)
+        return (await self.window(timeframe_days)).classification_f1()
 
-        if not recent_metrics:
-            return 0.0
-
-        true_positives = sum(1 for m in recent_metrics if m.classification_correct)
-        total_predictions = len(recent_metrics)
-
-        # Simplified F1 calculation (assuming balanced dataset)
-        accuracy = true_positives / total_predictions if total_predictions > 0 else 0
-
-        # For detailed F1, we'd need false positives/negatives per class
-        # Using accuracy as proxy for now
-        return accuracy
-
-    def calculate_field_exact_match_rate(
+    async def calculate_field_exact_match_rate(
         self, field_category: str, timeframe_days: int = 30
-    ) -> float:
+    ) -> Optional[float]:
         """
         Calcula exact match rate para categoria de campos
         """
-        recent_metrics = self._get_recent_metrics(timeframe_days)
-
-        category_fields = self._get_fields_by_category(field_category)
-        all_extractions = []
-
-        for metric in recent_metrics:
-            for extraction in metric.field_extractions:
-                if extraction.field_name in category_fields:
-                    all_extractions.append(extraction)
-
-        if not all_extractions:
-            return 0.0
-
-        exact_matches = sum(1 for e in all_extractions if e.exact_match)
-        return exact_matches / len(all_extractions)
+        return (await self.window(timeframe_days)).exact_match_rate(field_category)
 
-    def calculate_false_fail_rate(self, timeframe_days: int = 30) -> float:
+    async def calculate_false_fail_rate(self, timeframe_days: int = 30) -> float:
         """
         Calcula taxa de falsos FAILs (documentos válidos rejeitados)
         """
-        recent_metrics = self._get_recent_metrics(timeframe_days)
-
-        failed_decisions = [m for m in recent_metrics if m.decision == DecisionType.FAIL]
-
-        if not failed_decisions:
-            return 0.0
-
-        # False fails are FAILs that required human review and were overturned
-        false_fails = sum(1 for m in failed_decisions if m.human_review_required)
+        return (await self.window(timeframe_days)).false_fail_rate()
 
-        # This is a simplified calculation - in practice, need human review results
-        return false_fails / len(recent_metrics) if recent_metrics else 0.0
-
-    def calculate_processing_performance(self, timeframe_days: int = 30) -> Dict[str, float]:
+    async def calculate_processing_performance(self, timeframe_days: int = 30) -> Dict[str, float]:
         """
         Calcula métricas de performance de processamento
         """
-        recent_metrics = self._get_recent_metrics(timeframe_days)
-
-        if not recent_metrics:
-            return {}
-
-        processing_times = [m.processing_time_ms for m in recent_metrics]
-
-        return {
-            "avg_processing_time_ms": statistics.mean(processing_times),
-            "p95_processing_time_ms": (
-                statistics.quantiles(processing_times, n=20)[18]
-                if len(processing_times) >= 20
-                else max(processing_times)
-            ),
-            "within_target_percentage": sum(
-                1 for t in processing_times if t <= self.targets["processing_time_target_ms"]
-            )
-            / len(processing_times),
-        }
-
-    def generate_kpi_report(self, timeframe_days: int = 30) -> Dict[str, Any]:
+        return (await self.window(timeframe_days)).processing_performance()
+
+    def _kpi(
+        self, value: Optional[float], target_key: str, lower_is_better: bool = False
+    ) -> Dict[str, Any]:
+        target = self.targets[target_key]
+        if value is None:
+            # Nada medido no período: não é FAIL
+            return {"value": None, "target": target, "status": "NO_DATA"}
+        passed = value <= target if lower_is_better else value >= target
+        return {"value": value, "target": target, "status": "PASS" if passed else "FAIL"}
+
+    async def generate_kpi_report(self, timeframe_days: int = 30) -> Dict[str, Any]:
         """
         Gera relatório completo de KPIs
         """
+        window = await self.window(timeframe_days)
         return {
             "report_period": f"Last {timeframe_days} days",
             "generated_at": datetime.now(timezone.utc).isoformat(),
-            "total_documents_analyzed": len(self._get_recent_metrics(timeframe_days)),
+            "total_documents_analyzed": window.documents,
             "kpis": {
-                "classification_f1_score": {
-                    "value": self.calculate_classification_f1(timeframe_days),
-                    "target": self.targets["classification_f1"],
-                    "status": (
-                        "PASS"
-                        if self.calculate_classification_f1(timeframe_days)
-                        >= self.targets["classification_f1"]
-                        else "FAIL"
-                    ),
-                },
-                "identity_fields_exact_match": {
-                    "value": self.calculate_field_exact_match_rate("identity", timeframe_days),
-                    "target": self.targets["identity_exact_match"],
-                    "status": (
-                        "PASS"
-                        if self.calculate_field_exact_match_rate("identity", timeframe_days)
-                        >= self.targets["identity_exact_match"]
-                        else "FAIL"
-                    ),
-                },
-                "dates_exact_match": {
-                    "value": self.calculate_field_exact_match_rate("dates", timeframe_days),
-                    "target": self.targets["dates_exact_match"],
-                    "status": (
-                        "PASS"
-                        if self.calculate_field_exact_match_rate("dates", timeframe_days)
-                        >= self.targets["dates_exact_match"]
-                        else "FAIL"
-                    ),
-                },
-                "formatted_numbers_exact_match": {
-                    "value": self.calculate_field_exact_match_rate(
-                        "formatted_numbers", timeframe_days
-                    ),
-                    "target": self.targets["formatted_numbers_exact_match"],
-                    "status": (
-                        "PASS"
-                        if self.calculate_field_exact_match_rate(
-                            "formatted_numbers", timeframe_days
-                        )
-                        >= self.targets["formatted_numbers_exact_match"]
-                        else "FAIL"
-                    ),
-                },
-                "false_fail_rate": {
-                    "value": self.calculate_false_fail_rate(timeframe_days),
-                    "target": self.targets["false_fail_rate"],
-                    "status": (
-                        "PASS"
-                        if self.calculate_false_fail_rate(timeframe_days)
-                        <= self.targets["false_fail_rate"]
-                        else "FAIL"
-                    ),
-                },
+                "classification_f1_score": self._kpi(
+                    window.classification_f1(), "classification_f1"
+                ),
+                "identity_fields_exact_match": self._kpi(
+                    window.exact_match_rate("identity"), "identity_exact_match"
+                ),
+                "dates_exact_match": self._kpi(
+                    window.exact_match_rate("dates"), "dates_exact_match"
+                ),
+                "formatted_numbers_exact_match": self._kpi(
+                    window.exact_match_rate("formatted_numbers"), "formatted_numbers_exact_match"
+                ),
+                "false_fail_rate": self._kpi(
+                    window.false_fail_rate(), "false_fail_rate", lower_is_better=True
+                ),
             },
-            "performance_metrics": self.calculate_processing_performance(timeframe_days),
+            "performance_metrics": window.processing_performance(),
+            "by_document_type": window.by_doc_type(),
         }
 
-    def _get_recent_metrics(self, days: int) -> List[DocumentMetrics]:
-        """Obtém métricas dos últimos N dias"""
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
-        return [m for m in self.metrics_history if m.analysis_timestamp >= cutoff_date]
-
     def _get_fields_by_category(self, category: str) -> List[str]:
         """Categoriza campos por tipo"""
-        field_categories = {
-            "identity": ["full_name", "date_of_birth", "passport_number", "ssn"],
-            "dates": ["expiry_date", "issue_date", "valid_from", "valid_to", "birth_date"],
-            "formatted_numbers": [
-                "receipt_number",
-                "uscis_number",
-                "i94_number",
-                "case_number",
-                "ssn",
-            ],
-        }
-        return field_categories.get(category, [])
+        return FIELD_CATEGORIES.get(category, [])
 
 
 class AdvancedFieldValidators:
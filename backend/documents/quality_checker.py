@@ -6,13 +6,26 @@ Análise básica de qualidade de documentos conforme especificação técnica
 import io
 import logging
 import mimetypes
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import PyPDF2
-from PIL import Image, ImageStat
+
+from backend.documents.image_quality import compute_image_quality
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_QUALITY_REQUIREMENTS = {
+    "min_dpi": 150,
+    "max_skew_deg": 5,
+    "min_blur_var": 100,
+    "min_file_size_kb": 20,
+    "max_file_size_mb": 15,
+    "supported_formats": ["pdf", "jpg", "jpeg", "png"],
+}
+
+# Abaixo desta fração do mínimo da política o OCR nem é tentado
+OCR_GATE_FACTOR = 0.5
+
 
 class DocumentQualityChecker:
     """
@@ -27,10 +40,16 @@ class DocumentQualityChecker:
             "image/tiff": [".tiff", ".tif"],
         }
 
-    def analyze_quality(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    def analyze_quality(
+        self, file_content: bytes, filename: str, requirements: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Analisa qualidade básica do documento
+
+        Args:
+            requirements: Seção ``quality`` da política YAML (opcional)
         """
+        requirements = self.get_quality_requirements(policy_quality=requirements)
         try:
             result = {"status": "ok", "checks": {}, "warnings": [], "errors": [], "metadata": {}}
 
@@ -47,7 +66,7 @@ class DocumentQualityChecker:
                 pdf_check = self._check_pdf_quality(file_content)
                 result["checks"]["pdf_specific"] = pdf_check
             elif format_check["mime_type"].startswith("image/"):
-                image_check = self._check_image_quality(file_content)
+                image_check = self._check_image_quality(file_content, requirements)
                 result["checks"]["image_specific"] = image_check
 
             # 4. Determinar status geral
@@ -171,53 +190,14 @@ class DocumentQualityChecker:
                 "warnings": [],
             }
 
-    def _check_image_quality(self, file_content: bytes) -> Dict[str, Any]:
+    def _check_image_quality(
+        self, file_content: bytes, requirements: Dict[str, Any]
+    ) -> Dict[str, Any]:
         """
-        Análise específica para imagens
+        Análise específica para imagens (nitidez, inclinação e DPI)
         """
         try:
-            image = Image.open(io.BytesIO(file_content))
-
-            width, height = image.size
-            mode = image.mode
-
-            # Calcular DPI estimado (assumindo tamanho padrão de documento)
-            estimated_dpi = min(width, height) / 8.5 if min(width, height) > 0 else 0
-
-            # Análise de qualidade básica
-            status = "pass"
-            warnings = []
-
-            # Verificar resolução mínima
-            if estimated_dpi < 150:
-                status = "alert"
-                warnings.append(f"Resolução baixa (est. {estimated_dpi:.0f} DPI)")
-
-            # Verificar tamanho mínimo
-            if width < 800 or height < 600:
-                status = "alert"
-                warnings.append(f"Dimensões pequenas ({width}x{height})")
-
-            # Análise de blur básica (usando variância)
-            if mode in ["RGB", "L"]:
-                blur_score = self._estimate_blur(image)
-                if blur_score < 100:
-                    status = "alert"
-                    warnings.append(f"Imagem pode estar desfocada (score: {blur_score:.1f})")
-            else:
-                blur_score = None
-
-            return {
-                "status": status,
-                "message": f"Imagem {width}x{height}, {mode}",
-                "width": width,
-                "height": height,
-                "mode": mode,
-                "estimated_dpi": estimated_dpi,
-                "blur_score": blur_score,
-                "warnings": warnings,
-            }
-
+            metrics = compute_image_quality(file_content)
         except Exception as e:
             return {
                 "status": "fail",
@@ -227,24 +207,52 @@ class DocumentQualityChecker:
                 "mode": None,
                 "estimated_dpi": 0,
                 "blur_score": None,
+                "skew_deg": None,
                 "warnings": [],
             }
 
-    def _estimate_blur(self, image: Image) -> float:
-        """
-        Estimativa básica de blur usando variância dos pixels
-        """
-        try:
-            # Converter para escala de cinza se necessário
-            if image.mode != "L":
-                image = image.convert("L")
+        width, height = metrics.width, metrics.height
+        min_dpi = requirements["min_dpi"]
+        min_blur_var = requirements["min_blur_var"]
+        max_skew_deg = requirements["max_skew_deg"]
+
+        status = "pass"
+        warnings = []
+
+        # Verificar resolução mínima
+        if metrics.dpi < min_dpi:
+            status = "alert"
+            warnings.append(f"Resolução baixa (est. {metrics.dpi:.0f} DPI)")
+
+        # Verificar tamanho mínimo
+        if width < 800 or height < 600:
+            status = "alert"
+            warnings.append(f"Dimensões pequenas ({width}x{height})")
+
+        # Nitidez (variância do Laplaciano)
+        if metrics.blur_var < min_blur_var:
+            status = "alert"
+            warnings.append(f"Imagem pode estar desfocada (score: {metrics.blur_var:.1f})")
 
-            # Calcular variância dos pixels como indicador de nitidez
-            stat = ImageStat.Stat(image)
-            return stat.var[0]
+        # Inclinação do texto
+        if metrics.skew_deg is not None and abs(metrics.skew_deg) > max_skew_deg:
+            status = "alert"
+            warnings.append(f"Documento inclinado ({metrics.skew_deg:.1f}°)")
 
-        except Exception:
-            return 0.0
+        return {
+            "status": status,
+            "message": f"Imagem {width}x{height}, {metrics.mode}",
+            "width": width,
+            "height": height,
+            "mode": metrics.mode,
+            "estimated_dpi": metrics.dpi,
+            "dpi_source": metrics.dpi_source,
+            "blur_score": metrics.blur_var,
+            "blur_method": "laplacian_variance",
+            "skew_deg": metrics.skew_deg,
+            "analysis_ms": metrics.analysis_ms,
+            "warnings": warnings,
+        }
 
     def _determine_overall_status(self, checks: Dict[str, Any]) -> str:
         """
@@ -262,17 +270,55 @@ class DocumentQualityChecker:
         else:
             return "ok"
 
-    def get_quality_requirements(self, doc_type: str) -> Dict[str, Any]:
+    def get_quality_requirements(
+        self, doc_type: str = None, policy_quality: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Retorna requisitos de qualidade para um tipo específico de documento
-        Pode ser expandido para usar as políticas YAML
+
+        ``policy_quality`` é a seção ``quality`` da política YAML; valores
+        ausentes usam os padrões.
+        """
+        requirements = dict(DEFAULT_QUALITY_REQUIREMENTS)
+        if policy_quality:
+            requirements.update({k: v for k, v in policy_quality.items() if v is not None})
+        return requirements
+
+    def precheck_for_ocr(
+        self, file_content: bytes, filename: str, requirements: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
-        # Requisitos padrão (podem ser customizados por doc_type)
+        Gate de qualidade executado antes de qualquer chamada de OCR paga
+
+        Bloqueia apenas imagens ilegíveis: inválidas ou com nitidez/DPI muito
+        abaixo do mínimo da política. Inclinação só gera aviso (o OCR corrige).
+        DPI estimado sem metadados (``page_size`` supõe uma página carta) também
+        só gera aviso: recortes de passaporte/ID são pequenos e legíveis.
+        PDFs passam direto.
+        """
+        quality = self.analyze_quality(file_content, filename, requirements)
+        requirements = self.get_quality_requirements(policy_quality=requirements)
+        image_check = quality["checks"].get("image_specific")
+
+        reasons: List[str] = []
+        warnings: List[str] = []
+        if image_check:
+            if image_check["status"] == "fail":
+                reasons.append(image_check["message"])
+            else:
+                blur_score = image_check["blur_score"]
+                dpi = image_check["estimated_dpi"]
+                if blur_score < requirements["min_blur_var"] * OCR_GATE_FACTOR:
+                    reasons.append(f"Imagem desfocada demais para leitura (score: {blur_score:.1f})")
+                if dpi < requirements["min_dpi"] * OCR_GATE_FACTOR:
+                    if image_check.get("dpi_source") == "metadata":
+                        reasons.append(f"Resolução insuficiente para leitura ({dpi:.0f} DPI)")
+                    else:
+                        warnings.append(f"Resolução baixa (est. {dpi:.0f} DPI, sem metadados)")
+
         return {
-            "min_dpi": 150,
-            "max_skew_deg": 5,
-            "min_blur_var": 100,
-            "min_file_size_kb": 20,
-            "max_file_size_mb": 15,
-            "supported_formats": ["pdf", "jpg", "jpeg", "png"],
+            "proceed": not reasons,
+            "reasons": reasons,
+            "warnings": warnings,
+            "quality": quality,
         }
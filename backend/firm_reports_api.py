@@ -1,29 +1,54 @@
 """
 Firm Reports API — Relatórios visuais do escritório inteiro.
 Gera HTML com lista filtrada de casos e retorna link temporário.
+
+O HTML sai do template ``firm_report.html`` (core/report_engine) e vira um
+artefato no blob store, chaveado por (escritório, filtro, versão dos dados);
+links gerados para o mesmo filtro sem mudança nos casos reaproveitam o mesmo
+artefato, e o relatório da manhã de cada escritório é pré-calculado.
 """
 
 from fastapi import APIRouter, HTTPException, Header
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
 import uuid
 import os
 
+from backend.core.report_engine import (
+    HTML_CONTENT_TYPE,
+    ReportArtifacts,
+    ReportEngineUnavailable,
+    etag_for,
+    etag_matches,
+)
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/firm-reports", tags=["firm-reports"])
 
 INTERNAL_TOKEN = os.getenv("BACKEND_INTERNAL_TOKEN", "imigrai-internal-2024")
-REPORTS_DIR = "/var/www/visa-application/reports"
 BASE_URL = os.getenv("BASE_URL", "https://app.imigrai.app")
-
-os.makedirs(REPORTS_DIR, exist_ok=True)
+FIRM_REPORT_MAX_CASES = int(os.getenv("FIRM_REPORT_MAX_CASES", "200"))
+# Relatório da manhã: hora (UTC) e filtros pré-calculados por escritório ativo
+PRECOMPUTE_HOUR_UTC = int(os.getenv("FIRM_REPORT_PRECOMPUTE_HOUR", "11"))
+PRECOMPUTE_FILTERS = [
+    f.strip()
+    for f in os.getenv("FIRM_REPORT_PRECOMPUTE_FILTERS", "firm_overview,deadlines_week").split(",")
+    if f.strip()
+]
+TEMPLATE = "firm_report.html"
 
 db = None
+artifacts: Optional[ReportArtifacts] = None
 
 def init_db(database):
-    global db
+    global db, artifacts
     db = database
+    artifacts = ReportArtifacts(database)
 
 
 class FirmReportRequest(BaseModel):
@@ -121,41 +146,131 @@ FILTER_CONFIGS = {
 }
 
 
-@router.post("/generate")
-async def generate_firm_report(
-    req: FirmReportRequest,
-    x_internal_token: str = Header(None)
-):
-    if x_internal_token != INTERNAL_TOKEN:
-        raise HTTPException(status_code=401, detail="Unauthorized")
+STATUS_CONFIG = {
+    "active":         {"label": "Active",           "color": "#3B82F6", "bg": "rgba(59,130,246,0.1)"},
+    "pending_docs":   {"label": "Pending Docs",     "color": "#F59E0B", "bg": "rgba(245,158,11,0.1)"},
+    "ready_to_file":  {"label": "Ready to File",    "color": "#10B981", "bg": "rgba(16,185,129,0.1)"},
+    "filed":          {"label": "Filed",             "color": "#8B5CF6", "bg": "rgba(139,92,246,0.1)"},
+    "rfe_pending":    {"label": "RFE Pending",       "color": "#EF4444", "bg": "rgba(239,68,68,0.1)"},
+    "approved":       {"label": "Approved",          "color": "#10B981", "bg": "rgba(16,185,129,0.1)"},
+    "closed":         {"label": "Closed",            "color": "#6B7280", "bg": "rgba(107,114,128,0.1)"},
+}
+
+FLAG_RFE = {"label": "RFE", "bg": "rgba(239,68,68,0.15)", "color": "#EF4444"}
+FLAG_DOCS_OK = {"label": "DOCS ✓", "bg": "rgba(16,185,129,0.12)", "color": "#10B981"}
+FLAG_DOCS_MISSING = {"label": "DOCS MISSING", "bg": "rgba(245,158,11,0.12)", "color": "#F59E0B"}
+
+
+def _status_cfg(status: str) -> Dict[str, str]:
+    return STATUS_CONFIG.get(
+        status, {"label": status, "color": "#6B7280", "bg": "rgba(107,114,128,0.1)"}
+    )
 
-    now = datetime.utcnow()
-    config = FILTER_CONFIGS.get(req.filter_type)
-    if not config:
-        raise HTTPException(status_code=400, detail=f"Unknown filter: {req.filter_type}")
 
-    # Montar query
-    base_query = {"office_id": req.office_id}
+def _resolve_filter(filter_type: str, filter_value: Optional[str], now: datetime):
+    """(config, query do filtro) — config None para filtro desconhecido"""
+    config = FILTER_CONFIGS.get(filter_type)
+    if not config:
+        return None, None
     filter_query = config["query"](now)
 
     # Filtros especiais com valor
-    if req.filter_type == "by_visa_type" and req.filter_value:
-        filter_query = {"visa_type": {"$regex": req.filter_value, "$options": "i"},
+    if filter_type == "by_visa_type" and filter_value:
+        filter_query = {"visa_type": {"$regex": filter_value, "$options": "i"},
                         "status": {"$nin": ["closed"]}}
-        config = {**config, "title": f"Cases — {req.filter_value}"}
+        config = {**config, "title": f"Cases — {filter_value}"}
 
-    if req.filter_type == "by_assignee" and req.filter_value:
-        filter_query = {"assigned_to": {"$regex": req.filter_value, "$options": "i"},
+    if filter_type == "by_assignee" and filter_value:
+        filter_query = {"assigned_to": {"$regex": filter_value, "$options": "i"},
                         "status": {"$nin": ["closed"]}}
-        config = {**config, "title": f"Cases — {req.filter_value}"}
+        config = {**config, "title": f"Cases — {filter_value}"}
+
+    return config, filter_query
+
+
+async def _data_version(office_id: str) -> str:
+    """Versão dos casos do escritório: total + último updated_at (dois lookups indexados)"""
+    latest = await db.cases.find_one(
+        {"office_id": office_id}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)]
+    )
+    count = await db.cases.count_documents({"office_id": office_id})
+    return f"{count}:{latest.get('updated_at') if latest else ''}"
+
+
+def _case_rows(cases: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    rows = []
+    for c in cases:
+        status = c.get("status", "active")
+        deadline = c.get("deadline", "")
+        docs_req = len(c.get("documents_required", []))
+        docs_rec = len(c.get("documents_received", []))
+        docs_pct = int(docs_rec / docs_req * 100) if docs_req > 0 else 0
 
-    full_query = {**base_query, **filter_query}
+        # Deadline urgency
+        dl_str = ""
+        dl_color = "#4B5563"
+        dl_icon = ""
+        if deadline:
+            try:
+                dl_date = datetime.fromisoformat(deadline) if isinstance(deadline, str) else deadline
+                days = (dl_date - now).days
+                dl_str = dl_date.strftime("%b %d")
+                if days < 0:
+                    dl_color = "#EF4444"
+                    dl_icon = "🚨"
+                    dl_str = f"OVERDUE {dl_str}"
+                elif days <= 7:
+                    dl_color = "#F59E0B"
+                    dl_icon = "⚠️"
+                    dl_str = f"{dl_str} ({days}d)"
+                elif days <= 14:
+                    dl_color = "#FBBF24"
+                    dl_str = f"{dl_str} ({days}d)"
+                    dl_icon = "📅"
+                else:
+                    dl_color = "#6B7280"
+                    dl_str = f"{dl_str} ({days}d)"
+            except:
+                dl_str = str(deadline)[:10]
 
-    # Buscar casos
-    cases = await db.cases.find(full_query).sort("deadline", 1).to_list(length=200)
+        # Flags especiais
+        flags = []
+        if status == "rfe_pending":
+            flags.append(FLAG_RFE)
+        if docs_pct == 100:
+            flags.append(FLAG_DOCS_OK)
+        elif docs_pct < 50 and status in ["active", "pending_docs"]:
+            flags.append(FLAG_DOCS_MISSING)
+
+        rows.append({
+            "client": c.get("client_name", "Unknown"),
+            "case_id": c.get("case_id", ""),
+            "visa": c.get("visa_type", "—"),
+            "status": _status_cfg(status),
+            "assigned": c.get("assigned_to", "—") or "—",
+            "notes_count": len(c.get("notes", [])),
+            "docs_req": docs_req,
+            "docs_rec": docs_rec,
+            "docs_pct": docs_pct,
+            "dl_str": dl_str,
+            "dl_color": dl_color,
+            "dl_icon": dl_icon,
+            "flags": flags,
+        })
+    return rows
+
+
+async def _load_report(
+    office_id: str, config: Dict[str, Any], filter_query: Dict[str, Any], title: str,
+    artifact_id: str, now: datetime
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Busca os casos e monta (contexto do template, metadados do artefato)"""
+    full_query = {"office_id": office_id, **filter_query}
+    cases = await (
+        db.cases.find(full_query).sort("deadline", 1).to_list(length=FIRM_REPORT_MAX_CASES)
+    )
 
-    # Buscar escritório
-    office = await db.offices.find_one({"office_id": req.office_id})
+    office = await db.offices.find_one({"office_id": office_id})
     firm_name = office.get("name", "Immigration Law Firm") if office else "Law Firm"
 
     # Stats agregadas
@@ -178,316 +293,206 @@ async def generate_firm_report(
             except:
                 pass
 
-    # Gerar HTML
-    report_id = str(uuid.uuid4())[:12]
-    expires_at = now + timedelta(hours=req.expires_in_hours)
-    title = req.title or config["title"]
-
-    html = build_firm_report_html(
-        cases=cases,
-        firm_name=firm_name,
-        title=title,
-        icon=config["icon"],
-        filter_type=req.filter_type,
-        total=total,
-        by_status=by_status,
-        by_visa=by_visa,
-        urgent_count=urgent_count,
-        report_id=report_id,
-        expires_at=expires_at,
-        generated_at=now
+    status_rows = []
+    for status, count in sorted(by_status.items(), key=lambda x: -x[1]):
+        cfg = _status_cfg(status)
+        status_rows.append({
+            "label": cfg["label"],
+            "color": cfg["color"],
+            "count": count,
+            "pct": int(count / total * 100) if total > 0 else 0,
+        })
+
+    context = {
+        "firm_name": firm_name,
+        "title": title,
+        "icon": config["icon"],
+        "total": total,
+        "urgent_count": urgent_count,
+        "status_rows": status_rows,
+        "visa_rows": sorted(by_visa.items(), key=lambda x: -x[1]),
+        "case_rows": _case_rows(cases, now),
+        "report_id": artifact_id,
+        "generated_str": now.strftime("%B %d, %Y at %I:%M %p UTC"),
+    }
+    meta = {
+        "office_id": office_id,
+        "report": "firm",
+        "title": title,
+        "total_cases": total,
+        "urgent_cases": urgent_count,
+    }
+    return context, meta
+
+
+async def _artifact_key(
+    office_id: str, filter_type: str, filter_value: Optional[str], title: Optional[str],
+    now: datetime
+):
+    config, filter_query = _resolve_filter(filter_type, filter_value, now)
+    if not config:
+        raise HTTPException(status_code=400, detail=f"Unknown filter: {filter_type}")
+    title = title or config["title"]
+    key = artifacts.key(
+        office_id,
+        "firm",
+        TEMPLATE,
+        {"filter_type": filter_type, "filter_value": filter_value, "title": title},
+        await _data_version(office_id),
+    )
+    return key, config, filter_query, title
+
+
+def _artifact_id(key: str) -> str:
+    return key.rsplit("/", 1)[-1][:12]
+
+
+async def ensure_firm_report(
+    office_id: str, filter_type: str, filter_value: Optional[str] = None,
+    title: Optional[str] = None
+) -> Dict[str, Any]:
+    """Artefato atual do relatório (reaproveitado se os dados não mudaram)"""
+    now = datetime.utcnow()
+    key, config, filter_query, title = await _artifact_key(
+        office_id, filter_type, filter_value, title, now
+    )
+    meta = await artifacts.get(key)
+    if meta:
+        return {**meta, "cached": True}
+
+    context, meta = await _load_report(
+        office_id, config, filter_query, title, _artifact_id(key), now
     )
+    meta = await artifacts.render_to_store(key, TEMPLATE, context, meta)
+    return {**meta, "cached": False}
+
+
+@router.post("/generate")
+async def generate_firm_report(
+    req: FirmReportRequest,
+    x_internal_token: str = Header(None)
+):
+    if x_internal_token != INTERNAL_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
 
-    filepath = os.path.join(REPORTS_DIR, f"{report_id}.html")
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write(html)
+    try:
+        artifact = await ensure_firm_report(
+            req.office_id, req.filter_type, req.filter_value, req.title
+        )
+    except ReportEngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    now = datetime.utcnow()
+    report_id = str(uuid.uuid4())[:12]
+    expires_at = now + timedelta(hours=req.expires_in_hours)
 
     await db.reports.insert_one({
         "report_id": report_id,
         "report_type": "firm",
         "filter_type": req.filter_type,
+        "filter_value": req.filter_value,
+        "title": req.title,
         "office_id": req.office_id,
-        "filepath": filepath,
+        "artifact_key": artifact["artifact_key"],
         "expires_at": expires_at,
         "created_at": now,
-        "total_cases": total
+        "total_cases": artifact["total_cases"]
     })
 
     return {
         "success": True,
         "report_id": report_id,
-        "report_url": f"{BASE_URL}/reports/{report_id}",
-        "title": title,
-        "total_cases": total,
-        "urgent_cases": urgent_count,
-        "expires_at": expires_at.isoformat()
+        "report_url": f"{BASE_URL}/api/firm-reports/{report_id}",
+        "title": artifact["title"],
+        "total_cases": artifact["total_cases"],
+        "urgent_cases": artifact["urgent_cases"],
+        "expires_at": expires_at.isoformat(),
+        "cached": artifact["cached"]
     }
 
 
 @router.get("/{report_id}", response_class=HTMLResponse)
-async def serve_firm_report(report_id: str):
-    filepath = os.path.join(REPORTS_DIR, f"{report_id}.html")
-    if not os.path.exists(filepath):
+async def serve_firm_report(report_id: str, if_none_match: Optional[str] = Header(None)):
+    report_meta = await db.reports.find_one({"report_id": report_id})
+    if not report_meta:
         raise HTTPException(status_code=404, detail="Report not found or expired")
 
-    report_meta = await db.reports.find_one({"report_id": report_id})
-    if report_meta:
-        expires_at = report_meta.get("expires_at")
-        if expires_at and datetime.utcnow() > expires_at:
-            os.remove(filepath)
-            raise HTTPException(status_code=410, detail="Report expired")
-
-    with open(filepath, "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
-
-
-def build_firm_report_html(cases, firm_name, title, icon, filter_type,
-                            total, by_status, by_visa, urgent_count,
-                            report_id, expires_at, generated_at):
-
-    STATUS_CONFIG = {
-        "active":         {"label": "Active",           "color": "#3B82F6", "bg": "rgba(59,130,246,0.1)"},
-        "pending_docs":   {"label": "Pending Docs",     "color": "#F59E0B", "bg": "rgba(245,158,11,0.1)"},
-        "ready_to_file":  {"label": "Ready to File",    "color": "#10B981", "bg": "rgba(16,185,129,0.1)"},
-        "filed":          {"label": "Filed",             "color": "#8B5CF6", "bg": "rgba(139,92,246,0.1)"},
-        "rfe_pending":    {"label": "RFE Pending",       "color": "#EF4444", "bg": "rgba(239,68,68,0.1)"},
-        "approved":       {"label": "Approved",          "color": "#10B981", "bg": "rgba(16,185,129,0.1)"},
-        "closed":         {"label": "Closed",            "color": "#6B7280", "bg": "rgba(107,114,128,0.1)"},
-    }
+    legacy_path = report_meta.get("filepath")
+    expires_at = report_meta.get("expires_at")
+    if expires_at and datetime.utcnow() > expires_at:
+        raise HTTPException(status_code=410, detail="Report expired")
 
-    now = datetime.utcnow()
+    # Links antigos: HTML gravado em disco antes do blob store (só leitura)
+    if "artifact_key" not in report_meta:
+        if not legacy_path or not os.path.exists(legacy_path):
+            raise HTTPException(status_code=404, detail="Report not found or expired")
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            return HTMLResponse(content=f.read())
 
-    # Stats bar HTML
-    stats_html = ""
-    for status, count in sorted(by_status.items(), key=lambda x: -x[1]):
-        cfg = STATUS_CONFIG.get(status, {"label": status, "color": "#6B7280", "bg": "rgba(107,114,128,0.1)"})
-        pct = int(count / total * 100) if total > 0 else 0
-        stats_html += f"""
-        <div style="display:flex;align-items:center;gap:12px;margin-bottom:8px;">
-          <div style="width:110px;font-size:11px;color:#6B7280;text-align:right;flex-shrink:0;">{cfg['label']}</div>
-          <div style="flex:1;height:6px;background:rgba(255,255,255,0.05);border-radius:3px;overflow:hidden;">
-            <div style="height:100%;width:{pct}%;background:{cfg['color']};border-radius:3px;"></div>
-          </div>
-          <div style="width:30px;font-size:12px;font-weight:600;color:{cfg['color']};">{count}</div>
-        </div>"""
-
-    # Visa breakdown
-    visa_html = ""
-    for vtype, count in sorted(by_visa.items(), key=lambda x: -x[1])[:8]:
-        visa_html += f"""
-        <div style="display:flex;justify-content:space-between;align-items:center;
-                    padding:7px 0;border-bottom:1px solid rgba(255,255,255,0.04);">
-          <span style="font-size:13px;color:#9CA3AF;">{vtype}</span>
-          <span style="font-size:13px;font-weight:600;color:#C9A84C;">{count}</span>
-        </div>"""
-
-    # Cases table HTML
-    cases_html = ""
-    for i, c in enumerate(cases):
-        client = c.get("client_name", "Unknown")
-        case_id = c.get("case_id", "")
-        visa = c.get("visa_type", "—")
-        status = c.get("status", "active")
-        assigned = c.get("assigned_to", "—") or "—"
-        deadline = c.get("deadline", "")
-        notes_count = len(c.get("notes", []))
-        docs_req = len(c.get("documents_required", []))
-        docs_rec = len(c.get("documents_received", []))
-        docs_pct = int(docs_rec / docs_req * 100) if docs_req > 0 else 0
+    key = report_meta["artifact_key"]
+    headers = {"ETag": etag_for(key), "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-        # Deadline urgency
-        dl_str = ""
-        dl_color = "#4B5563"
-        dl_icon = ""
-        if deadline:
-            try:
-                dl_date = datetime.fromisoformat(deadline) if isinstance(deadline, str) else deadline
-                days = (dl_date - now).days
-                dl_str = dl_date.strftime("%b %d")
-                if days < 0:
-                    dl_color = "#EF4444"
-                    dl_icon = "🚨"
-                    dl_str = f"OVERDUE {dl_str}"
-                elif days <= 7:
-                    dl_color = "#F59E0B"
-                    dl_icon = "⚠️"
-                    dl_str = f"{dl_str} ({days}d)"
-                elif days <= 14:
-                    dl_color = "#FBBF24"
-                    dl_str = f"{dl_str} ({days}d)"
-                    dl_icon = "📅"
-                else:
-                    dl_color = "#6B7280"
-                    dl_str = f"{dl_str} ({days}d)"
-            except:
-                dl_str = str(deadline)[:10]
-
-        status_cfg = STATUS_CONFIG.get(status, {"label": status, "color": "#6B7280", "bg": "rgba(107,114,128,0.1)"})
+    body = await artifacts.open(key)
+    if body is not None:
+        return StreamingResponse(body, media_type=HTML_CONTENT_TYPE, headers=headers)
 
-        # Flags especiais
-        flags = ""
-        if status == "rfe_pending":
-            flags += '<span style="font-size:10px;padding:2px 8px;border-radius:10px;background:rgba(239,68,68,0.15);color:#EF4444;font-weight:700;margin-left:6px;">RFE</span>'
-        if docs_pct == 100:
-            flags += '<span style="font-size:10px;padding:2px 8px;border-radius:10px;background:rgba(16,185,129,0.12);color:#10B981;font-weight:700;margin-left:6px;">DOCS ✓</span>'
-        elif docs_pct < 50 and status in ["active", "pending_docs"]:
-            flags += '<span style="font-size:10px;padding:2px 8px;border-radius:10px;background:rgba(245,158,11,0.12);color:#F59E0B;font-weight:700;margin-left:6px;">DOCS MISSING</span>'
-
-        row_bg = "rgba(255,255,255,0.015)" if i % 2 == 0 else "transparent"
-
-        cases_html += f"""
-        <div style="display:grid;grid-template-columns:1fr auto;align-items:center;
-                    padding:14px 18px;background:{row_bg};
-                    border-bottom:1px solid rgba(255,255,255,0.04);">
-          <div>
-            <div style="display:flex;align-items:center;flex-wrap:wrap;gap:6px;margin-bottom:5px;">
-              <span style="font-size:15px;font-weight:600;color:#F3F4F6;">{client}</span>
-              <span style="font-size:10px;color:#4B5563;font-family:monospace;">{case_id}</span>
-              {flags}
-            </div>
-            <div style="display:flex;flex-wrap:wrap;gap:10px;align-items:center;">
-              <span style="font-size:11px;font-weight:700;letter-spacing:0.06em;
-                           padding:2px 8px;border-radius:10px;
-                           background:{status_cfg['bg']};color:{status_cfg['color']};">
-                {status_cfg['label']}
-              </span>
-              <span style="font-size:11px;color:#6B7280;">📁 {visa}</span>
-              <span style="font-size:11px;color:#6B7280;">👤 {assigned}</span>
-              <span style="font-size:11px;color:#6B7280;">📝 {notes_count} notes</span>
-            </div>
-            <div style="margin-top:8px;display:flex;align-items:center;gap:8px;">
-              <div style="flex:1;max-width:120px;height:4px;background:rgba(255,255,255,0.06);border-radius:2px;overflow:hidden;">
-                <div style="height:100%;width:{docs_pct}%;background:{'#10B981' if docs_pct==100 else '#C9A84C'};border-radius:2px;"></div>
-              </div>
-              <span style="font-size:10px;color:#4B5563;">{docs_rec}/{docs_req} docs</span>
-            </div>
-          </div>
-          <div style="text-align:right;padding-left:16px;">
-            {f'<div style="font-size:13px;font-weight:600;color:{dl_color};">{dl_icon} {dl_str}</div>' if dl_str else '<div style="font-size:12px;color:#374151;">No deadline</div>'}
-          </div>
-        </div>"""
-
-    if not cases_html:
-        cases_html = """
-        <div style="padding:48px;text-align:center;color:#374151;">
-          <div style="font-size:32px;margin-bottom:12px;">🔍</div>
-          <p style="font-size:14px;">No cases found for this filter.</p>
-        </div>"""
-
-    expires_str = expires_at.strftime("%b %d, %Y at %I:%M %p UTC")
-    generated_str = generated_at.strftime("%B %d, %Y at %I:%M %p UTC")
-
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width,initial-scale=1.0">
-<title>{title} | Imigrai</title>
-<link href="https://fonts.googleapis.com/css2?family=Playfair+Display:wght@500;700&family=DM+Sans:wght@300;400;500;600&display=swap" rel="stylesheet">
-<style>
-  *{{box-sizing:border-box;margin:0;padding:0;}}
-  body{{font-family:'DM Sans',sans-serif;background:#080809;color:#E5E7EB;min-height:100vh;}}
-  .grain{{position:fixed;inset:0;pointer-events:none;z-index:0;opacity:0.3;
-    background-image:url("data:image/svg+xml,%3Csvg viewBox='0 0 256 256' xmlns='http://www.w3.org/2000/svg'%3E%3Cfilter id='n'%3E%3CfeTurbulence type='fractalNoise' baseFrequency='0.9' numOctaves='4' stitchTiles='stitch'/%3E%3C/filter%3E%3Crect width='100%25' height='100%25' filter='url(%23n)' opacity='0.05'/%3E%3C/svg%3E");}}
-  .wrap{{max-width:860px;margin:0 auto;padding:36px 20px 80px;position:relative;z-index:1;}}
-  .brand{{display:flex;align-items:center;gap:10px;margin-bottom:28px;}}
-  .brand-icon{{width:30px;height:30px;background:linear-gradient(135deg,#C9A84C,#E8C76A);
-    border-radius:7px;display:flex;align-items:center;justify-content:center;font-size:14px;}}
-  .brand-name{{font-family:'Playfair Display',serif;font-size:16px;font-weight:700;color:#C9A84C;}}
-  h1{{font-family:'Playfair Display',serif;font-size:30px;font-weight:700;color:#F9FAFB;
-    margin-bottom:6px;line-height:1.2;}}
-  .subtitle{{font-size:13px;color:#4B5563;margin-bottom:32px;}}
-  .grid{{display:grid;grid-template-columns:1fr 1fr 1fr;gap:14px;margin-bottom:28px;}}
-  @media(max-width:600px){{.grid{{grid-template-columns:1fr 1fr;}}}}
-  .stat-card{{background:linear-gradient(160deg,#111113,#0D0D10);
-    border:1px solid rgba(255,255,255,0.07);border-radius:12px;padding:18px 20px;}}
-  .stat-label{{font-size:10px;font-weight:700;letter-spacing:0.1em;text-transform:uppercase;
-    color:#4B5563;margin-bottom:6px;}}
-  .stat-val{{font-size:30px;font-weight:700;color:#F9FAFB;font-family:'Playfair Display',serif;}}
-  .stat-sub{{font-size:11px;color:#6B7280;margin-top:3px;}}
-  .panel{{background:linear-gradient(160deg,#111113,#0D0D10);
-    border:1px solid rgba(255,255,255,0.07);border-radius:14px;
-    overflow:hidden;margin-bottom:20px;}}
-  .panel-header{{padding:16px 20px;border-bottom:1px solid rgba(255,255,255,0.06);
-    display:flex;justify-content:space-between;align-items:center;}}
-  .panel-title{{font-size:13px;font-weight:600;color:#D1D5DB;letter-spacing:0.02em;}}
-  .panel-count{{font-size:11px;color:#6B7280;}}
-  .footer{{margin-top:40px;text-align:center;}}
-  .footer p{{font-size:11px;color:#374151;line-height:1.9;}}
-  @keyframes fadeUp{{from{{opacity:0;transform:translateY(12px)}}to{{opacity:1;transform:translateY(0)}}}}
-  .stat-card,.panel{{animation:fadeUp 0.4s ease both;}}
-  .stat-card:nth-child(2){{animation-delay:.05s;}}
-  .stat-card:nth-child(3){{animation-delay:.1s;}}
-  .panel:nth-child(2){{animation-delay:.05s;}}
-  .panel:nth-child(3){{animation-delay:.1s;}}
-</style>
-</head>
-<body>
-<div class="grain"></div>
-<div class="wrap">
-
-  <div class="brand">
-    <div class="brand-icon">⚖️</div>
-    <span class="brand-name">Imigrai</span>
-    <span style="color:#374151;font-size:12px;margin-left:4px;">/ {firm_name}</span>
-  </div>
-
-  <h1>{icon} {title}</h1>
-  <p class="subtitle">Generated {generated_str} · Link expires {expires_str}</p>
-
-  <!-- Stats -->
-  <div class="grid">
-    <div class="stat-card">
-      <div class="stat-label">Total Cases</div>
-      <div class="stat-val">{total}</div>
-      <div class="stat-sub">in this report</div>
-    </div>
-    <div class="stat-card">
-      <div class="stat-label">Urgent Deadlines</div>
-      <div class="stat-val" style="color:{'#EF4444' if urgent_count > 0 else '#10B981'};">{urgent_count}</div>
-      <div class="stat-sub">within 7 days</div>
-    </div>
-    <div class="stat-card">
-      <div class="stat-label">Visa Types</div>
-      <div class="stat-val">{len(by_visa)}</div>
-      <div class="stat-sub">in this filter</div>
-    </div>
-  </div>
-
-  <!-- Status breakdown -->
-  <div class="panel" style="margin-bottom:20px;">
-    <div class="panel-header">
-      <span class="panel-title">Status Breakdown</span>
-    </div>
-    <div style="padding:18px 20px;">
-      {stats_html}
-    </div>
-  </div>
-
-  <!-- Visa breakdown -->
-  <div class="panel" style="margin-bottom:20px;">
-    <div class="panel-header">
-      <span class="panel-title">By Visa Type</span>
-    </div>
-    <div style="padding:4px 20px 12px;">
-      {visa_html}
-    </div>
-  </div>
-
-  <!-- Cases list -->
-  <div class="panel">
-    <div class="panel-header">
-      <span class="panel-title">Cases</span>
-      <span class="panel-count">{total} records · sorted by deadline</span>
-    </div>
-    {cases_html}
-  </div>
-
-  <div class="footer">
-    <p>Generated by <strong style="color:#C9A84C;">Imigrai Chief of Staff</strong> for <strong style="color:#C9A84C;">{firm_name}</strong></p>
-    <p>Report ID: {report_id} · This report is confidential</p>
-  </div>
-
-</div>
-</body>
-</html>"""
+    # Artefato já purgado: renderiza com os dados atuais, transmitindo enquanto gera
+    now = datetime.utcnow()
+    try:
+        key, config, filter_query, title = await _artifact_key(
+            report_meta["office_id"], report_meta["filter_type"],
+            report_meta.get("filter_value"), report_meta.get("title"), now
+        )
+        context, meta = await _load_report(
+            report_meta["office_id"], config, filter_query, title, _artifact_id(key), now
+        )
+        body = artifacts.render_streaming(key, TEMPLATE, context, meta)
+    except ReportEngineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    await db.reports.update_one({"report_id": report_id}, {"$set": {"artifact_key": key}})
+    headers["ETag"] = etag_for(key)
+    return StreamingResponse(body, media_type=HTML_CONTENT_TYPE, headers=headers)
+
+
+# ── Relatório da manhã ────────────────────────────────────────────
+
+
+async def precompute_morning_reports() -> Dict[str, int]:
+    """Renderiza os filtros da manhã de cada escritório ativo (se os dados mudaram)"""
+    offices = await db.offices.find(
+        {"is_active": True}, {"_id": 0, "office_id": 1}
+    ).to_list(length=None)
+    summary = {"offices": len(offices), "rendered": 0, "reused": 0, "failed": 0}
+    for office in offices:
+        for filter_type in PRECOMPUTE_FILTERS:
+            try:
+                artifact = await ensure_firm_report(office["office_id"], filter_type)
+                summary["reused" if artifact["cached"] else "rendered"] += 1
+            except Exception as e:
+                summary["failed"] += 1
+                logger.warning(
+                    f"Morning report failed ({office['office_id']}, {filter_type}): {e}"
+                )
+    summary["purged"] = await artifacts.purge_expired()
+    return summary
+
+
+def _seconds_until_hour(hour: int) -> float:
+    now = datetime.now(timezone.utc)
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def precompute_loop():
+    """Loop diário (lifecycle ``firm_report_precompute``)"""
+    while True:
+        await asyncio.sleep(_seconds_until_hour(PRECOMPUTE_HOUR_UTC))
+        try:
+            summary = await precompute_morning_reports()
+            logger.info(f"✅ Morning firm reports: {summary}")
+        except Exception as e:
+            logger.error(f"Morning firm report precompute error: {e}")
@@ -26,6 +26,10 @@ class FieldExtractionEngine:
 
     def __init__(self):
         self.extraction_patterns = self._initialize_patterns()
+        self._compiled_patterns = {
+            field_type: [self._compile(p, field_type) for p in config["patterns"]]
+            for field_type, config in self.extraction_patterns.items()
+        }
         self.field_validators = self._initialize_validators()
 
     def _initialize_patterns(self) -> Dict[str, Dict]:
@@ -112,6 +116,14 @@ class FieldExtractionEngine:
             },
         }
 
+    @staticmethod
+    def _compile(pattern: str, field_type: str):
+        try:
+            return re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        except re.error as e:
+            logger.warning(f"Invalid regex pattern for {field_type}: {pattern} - {e}")
+            return None
+
     def _initialize_validators(self) -> Dict[str, callable]:
         """
         Inicializa validadores específicos para tipos de campos
@@ -167,9 +179,16 @@ class FieldExtractionEngine:
         # Verificar se há contexto relevante no texto
         context_score = self._calculate_context_score(text, keywords)
 
+        compiled_patterns = self._compiled_patterns.get(field_type) or [
+            self._compile(p, field_type) for p in patterns
+        ]
+
         for i, pattern in enumerate(patterns):
+            compiled = compiled_patterns[i]
+            if compiled is None:
+                continue
             try:
-                matches = list(re.finditer(pattern, text, re.IGNORECASE | re.MULTILINE))
+                matches = list(compiled.finditer(text))
 
                 for match in matches:
                     extracted_value = match.group(1) if match.groups() else match.group()
@@ -229,8 +248,12 @@ class FieldExtractionEngine:
                 continue
 
             try:
-                # Aplicar regex da política
-                matches = list(re.finditer(field_regex, text, re.IGNORECASE | re.MULTILINE))
+                # Aplicar regex da política (pré-compilado pelo PolicyBundle quando houver)
+                compiled = field_def.get("compiled")
+                if compiled is not None:
+                    matches = list(compiled.finditer(text))
+                else:
+                    matches = list(re.finditer(field_regex, text, re.IGNORECASE | re.MULTILINE))
 
                 field_results = []
                 for match in matches:
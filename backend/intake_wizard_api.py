@@ -12,6 +12,13 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
+from backend.core.case_events import (
+    log_case_event,
+    new_case_event,
+    record_case_event,
+    recent_activity_push,
+)
+from backend.core.case_name_index import name_index_fields
 from backend.core.database import db
 from backend.b2b_auth_api import get_b2b_user
 
@@ -135,11 +142,20 @@ async def start_intake(
     office_id = current_user["office_id"]
     case_id = "CASE-" + str(uuid.uuid4())[:8].upper()
     now = datetime.now(timezone.utc)
+    event = new_case_event(
+        case_id,
+        office_id,
+        "intake_started",
+        f"Intake wizard started by {current_user.get('name', current_user['user_id'])}",
+        actor=current_user["user_id"],
+        ts=now,
+    )
 
     case_doc = {
         "case_id": case_id,
         "office_id": office_id,
         "client_name": body.client_name,
+        **name_index_fields(body.client_name),
         "visa_type": (body.visa_type or "").upper() if body.visa_type else "",
         "status": "intake",
         "priority": "normal",
@@ -156,19 +172,14 @@ async def start_intake(
         },
         "documents": [],
         "notes": [],
-        "history": [
-            {
-                "action": "intake_started",
-                "timestamp": now.isoformat(),
-                "detail": f"Intake wizard started by {current_user.get('name', current_user['user_id'])}",
-            }
-        ],
+        "recent_activity": recent_activity_push(event)["recent_activity"]["$each"],
         "created_at": now,
         "created_by": current_user["user_id"],
         "updated_at": now,
     }
 
     await db.b2b_cases.insert_one(case_doc)
+    await log_case_event(db, event)
 
     logger.info(f"📋 Intake started: {case_id} for {body.client_name} by office {office_id}")
 
@@ -241,13 +252,6 @@ async def submit_intake_step(
             "intake_progress.completed_steps": completed,
             "updated_at": now,
         },
-        "$push": {
-            "history": {
-                "action": "intake_step_completed",
-                "timestamp": now.isoformat(),
-                "detail": f"Step '{body.step}' completed ({progress}%)",
-            }
-        },
     }
 
     # If the case step provides visa_type, update top-level
@@ -259,14 +263,22 @@ async def submit_intake_step(
     # If beneficiary provides full_name, update client_name
     if body.step == "beneficiary" and body.data.get("full_name"):
         update["$set"]["client_name"] = body.data["full_name"]
+        update["$set"].update(name_index_fields(body.data["full_name"]))
 
     # If all steps complete, change status to active
     if not next_step:
         update["$set"]["status"] = "active"
         update["$set"]["intake_progress.completed_at"] = now
 
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id}, update
+    await record_case_event(
+        db,
+        case_id,
+        office_id,
+        "intake_step_completed",
+        f"Step '{body.step}' completed ({progress}%)",
+        set_fields=update["$set"],
+        actor=current_user["user_id"],
+        ts=now,
     )
 
     result = {
@@ -11,9 +11,11 @@ from .manager import (
     SUPPORTED_FORM_TYPES,
     KnowledgeBaseManager,
 )
+from .search_index import KnowledgeSearchIndex
 
 __all__ = [
     "KnowledgeBaseManager",
+    "KnowledgeSearchIndex",
     "KNOWLEDGE_BASE_CATEGORIES",
     "SUPPORTED_FORM_TYPES",
     "AgentKnowledgeHelper",
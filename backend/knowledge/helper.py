@@ -32,37 +32,29 @@ class AgentKnowledgeHelper:
             search_query: Busca por texto específico
 
         Returns:
-            Lista de documentos relevantes com texto extraído
+            Lista de documentos relevantes (metadados, sem ``extracted_text``);
+            com ``search_query``, o trecho encontrado vem em ``relevant_snippet``
         """
         try:
-            documents = []
+            categories = (
+                [category]
+                if category
+                else ["uscis_instructions", "formatting_guides", "document_requirements"]
+            )
 
-            # Buscar por categoria e form_type
-            if category:
-                docs = await self.kb_manager.get_documents_by_category(
-                    category=category, form_type=form_type
+            # Com query de busca, usar o índice (ranking + snippet pré-calculado)
+            if search_query:
+                documents = await self.kb_manager.search_documents(
+                    search_query, categories=categories, form_type=form_type, limit=20
                 )
-                documents.extend(docs)
             else:
-                # Buscar em todas as categorias
-                for cat in ["uscis_instructions", "formatting_guides", "document_requirements"]:
+                documents = []
+                for cat in categories:
                     docs = await self.kb_manager.get_documents_by_category(
                         category=cat, form_type=form_type
                     )
                     documents.extend(docs)
 
-            # Se tem query de busca, filtrar por relevância
-            if search_query and documents:
-                filtered_docs = []
-                for doc in documents:
-                    # Buscar no texto extraído
-                    text = doc.get("extracted_text", "").lower()
-                    if search_query.lower() in text:
-                        # Adicionar snippet relevante
-                        doc["relevant_snippet"] = self._extract_snippet(text, search_query)
-                        filtered_docs.append(doc)
-                documents = filtered_docs
-
             logger.info(
                 f"Documentos encontrados para {form_type}",
                 extra={"form_type": form_type, "category": category, "count": len(documents)},
@@ -74,29 +66,6 @@ class AgentKnowledgeHelper:
             logger.error(f"Erro ao buscar documentos: {str(e)}")
             return []
 
-    def _extract_snippet(self, text: str, query: str, context_chars: int = 300) -> str:
-        """Extrai snippet relevante do texto"""
-        try:
-            query_lower = query.lower()
-            text_lower = text.lower()
-
-            index = text_lower.find(query_lower)
-            if index == -1:
-                return text[:context_chars] + "..."
-
-            start = max(0, index - context_chars // 2)
-            end = min(len(text), index + len(query) + context_chars // 2)
-
-            snippet = text[start:end]
-            if start > 0:
-                snippet = "..." + snippet
-            if end < len(text):
-                snippet = snippet + "..."
-
-            return snippet
-        except:
-            return text[:300] + "..."
-
     async def get_checklist(self, form_type: str) -> Optional[str]:
         """
         Obtém checklist específico para um tipo de formulário
@@ -196,13 +165,7 @@ class AgentKnowledgeHelper:
             Lista de resultados relevantes
         """
         try:
-            results = await self.kb_manager.search_documents(query)
-
-            # Filtrar por form_type se fornecido
-            if form_type:
-                results = [r for r in results if form_type in r.get("form_types", [])]
-
-            return results
+            return await self.kb_manager.search_documents(query, form_type=form_type)
 
         except Exception as e:
             logger.error(f"Erro na busca: {str(e)}")
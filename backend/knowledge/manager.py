@@ -10,6 +10,8 @@ from typing import Dict, List, Optional
 
 import PyPDF2
 
+from backend.knowledge.search_index import KnowledgeSearchIndex
+
 
 class KnowledgeBaseManager:
     """Gerenciador da Base de Conhecimento Interna"""
@@ -17,6 +19,7 @@ class KnowledgeBaseManager:
     def __init__(self, db):
         self.db = db
         self.collection = db.knowledge_base
+        self.search_index = KnowledgeSearchIndex(db)
 
     async def upload_document(
         self,
@@ -73,6 +76,7 @@ class KnowledgeBaseManager:
 
         # Inserir no banco
         await self.collection.insert_one(document)
+        await self.search_index.index_document(document)
 
         return {
             "success": True,
@@ -184,11 +188,20 @@ class KnowledgeBaseManager:
     async def update_document(self, document_id: str, updates: Dict) -> Dict:
         """Atualiza documento existente"""
         updates["last_updated"] = datetime.now(timezone.utc)
-        updates["$inc"] = {"version": 1}
 
-        result = await self.collection.update_one({"document_id": document_id}, {"$set": updates})
+        result = await self.collection.update_one(
+            {"document_id": document_id}, {"$set": updates, "$inc": {"version": 1}}
+        )
 
         if result.modified_count > 0:
+            if {"extracted_text", "filename", "description", "status"} & updates.keys():
+                document = await self.collection.find_one(
+                    {"document_id": document_id}, {"file_data": 0, "_id": 0}
+                )
+                if document:
+                    await self.search_index.index_document(document)
+            else:
+                await self.search_index.update_metadata(document_id, updates)
             return {"success": True, "message": "Document updated successfully"}
         else:
             return {"success": False, "message": "Document not found or no changes made"}
@@ -201,31 +214,48 @@ class KnowledgeBaseManager:
         )
 
         if result.modified_count > 0:
+            await self.search_index.remove_document(document_id)
             return {"success": True, "message": "Document deleted successfully"}
         else:
             return {"success": False, "message": "Document not found"}
 
-    async def search_documents(self, query: str) -> List[Dict]:
-        """Busca documentos por texto"""
-        # Busca no filename, description e extracted_text
-        # Use string pattern directly with MongoDB
-        documents = await self.collection.find(
-            {
-                "$or": [
-                    {"filename": {"$regex": query, "$options": "i"}},
-                    {"description": {"$regex": query, "$options": "i"}},
-                    {"extracted_text": {"$regex": query, "$options": "i"}},
-                ],
-                "status": "active",
-            }
-        ).to_list(length=50)
+    async def search_documents(
+        self,
+        query: str,
+        categories: Optional[List[str]] = None,
+        form_type: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """Busca documentos por texto usando o índice de chunks"""
+        hits = await self.search_index.search(
+            query, categories=categories, form_type=form_type, limit=limit
+        )
+        if not hits:
+            return []
 
-        for doc in documents:
+        documents = await self.collection.find(
+            {"document_id": {"$in": [h["document_id"] for h in hits]}, "status": "active"},
+            {"file_data": 0, "extracted_text": 0},
+        ).to_list(length=len(hits))
+        by_id = {doc["document_id"]: doc for doc in documents}
+
+        # Mantém a ordem do ranking
+        results = []
+        for hit in hits:
+            doc = by_id.get(hit["document_id"])
+            if not doc:
+                continue
             doc["_id"] = str(doc["_id"])
-            doc.pop("file_data", None)
-            doc.pop("extracted_text", None)
+            doc["relevant_snippet"] = hit["snippet"]
+            doc["search_score"] = hit["score"]
+            doc["snippet_offset"] = hit["start"]
+            results.append(doc)
 
-        return documents
+        return results
+
+    async def rebuild_search_index(self) -> Dict:
+        """Reconstrói o índice de busca a partir dos documentos ativos"""
+        return await self.search_index.rebuild()
 
     async def get_statistics(self) -> Dict:
         """Obtém estatísticas da base de conhecimento"""
@@ -0,0 +1,393 @@
+"""
+Índice de busca da Base de Conhecimento
+
+Divide o texto extraído de cada documento em chunks, grava um índice
+invertido (termos normalizados por chunk, com offsets pré-calculados) na
+collection ``knowledge_base_chunks`` e ranqueia trechos por BM25.
+Opcionalmente reordena os candidatos com os mesmos embeddings MiniLM
+usados pela pesquisa jurídica (``KB_SEMANTIC_SEARCH=true``).
+
+O índice é mantido pelo KnowledgeBaseManager em upload, update e delete,
+então nenhuma busca precisa varrer ``extracted_text`` com $regex.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+MAX_CANDIDATES = 500
+SNIPPET_CHARS = 300
+CORPUS_STATS_TTL_SECONDS = 300
+
+# Parâmetros BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+SEMANTIC_WEIGHT = 0.4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_WORD_RE = re.compile(r"\S+")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from has have in is it its of on or that the this to was
+    were will with o os as um uma uns umas e de do da dos das em no na nos nas para por
+    com que se ao aos ou mais sua seu suas seus
+    """.split()
+)
+
+_embedding_model = None
+# (monotonic, (total de chunks, comprimento médio))
+_corpus_stats_cache: Optional[Tuple[float, Tuple[int, float]]] = None
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos (``Petição`` -> ``peticao``)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza texto normalizado, descartando stopwords e tokens de 1 caractere."""
+    return [
+        t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def chunk_with_offsets(
+    text: str, chunk_words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP
+) -> List[Tuple[int, int]]:
+    """Retorna (start, end) em caracteres de cada chunk com overlap de palavras."""
+    spans = [m.span() for m in _WORD_RE.finditer(text)]
+    if not spans:
+        return []
+
+    chunks = []
+    step = max(1, chunk_words - overlap)
+    for i in range(0, len(spans), step):
+        window = spans[i : i + chunk_words]
+        chunks.append((window[0][0], window[-1][1]))
+        if i + chunk_words >= len(spans):
+            break
+    return chunks
+
+
+def _term_offsets(chunk_text: str) -> Tuple[Counter, Dict[str, int]]:
+    """Frequência de cada termo e offset (no chunk) da primeira ocorrência."""
+    tf: Counter = Counter()
+    first: Dict[str, int] = {}
+    # A normalização NFKD + remoção de combinantes preserva o comprimento
+    # para texto latino, então os offsets valem também no texto original.
+    normalized = normalize_text(chunk_text)
+    aligned = len(normalized) == len(chunk_text)
+    for match in _TOKEN_RE.finditer(normalized):
+        term = match.group()
+        if len(term) <= 1 or term in STOPWORDS:
+            continue
+        tf[term] += 1
+        if term not in first:
+            first[term] = match.start() if aligned else 0
+    return tf, first
+
+
+def _semantic_enabled() -> bool:
+    return os.environ.get("KB_SEMANTIC_SEARCH", "false").lower() == "true"
+
+
+def _get_embedding_model():
+    """Carrega o modelo MiniLM sob demanda (dependência opcional)."""
+    global _embedding_model
+    if _embedding_model is None:
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+        except Exception as e:
+            logger.warning(f"Embeddings indisponíveis para a KB: {e}")
+            _embedding_model = False
+    return _embedding_model or None
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / (norm + 1e-10)
+
+
+def _bm25_expression(
+    terms: List[str], df: Dict[str, int], total_chunks: int, avg_len: float
+) -> Dict:
+    """Expressão de agregação com o score BM25 de um chunk (``tf`` e ``length``)"""
+    norm = {
+        "$add": [BM25_K1 * (1 - BM25_B), {"$multiply": [BM25_K1 * BM25_B / avg_len, "$length"]}]
+    }
+    parts = []
+    for term in terms:
+        idf = math.log(1 + (max(total_chunks, df[term]) - df[term] + 0.5) / (df[term] + 0.5))
+        parts.append(
+            {
+                "$let": {
+                    "vars": {"freq": {"$ifNull": [f"$tf.{term}", 0]}},
+                    "in": {
+                        "$divide": [
+                            {"$multiply": [idf * (BM25_K1 + 1), "$$freq"]},
+                            {"$add": ["$$freq", norm]},
+                        ]
+                    },
+                }
+            }
+        )
+    return {"$add": parts}
+
+
+def make_snippet(text: str, offset: int, context_chars: int = SNIPPET_CHARS) -> str:
+    """Recorta um trecho de ``text`` centrado em ``offset``."""
+    start = max(0, offset - context_chars // 2)
+    end = min(len(text), offset + context_chars // 2)
+    snippet = text[start:end]
+    if start > 0:
+        snippet = "..." + snippet
+    if end < len(text):
+        snippet = snippet + "..."
+    return snippet
+
+
+class KnowledgeSearchIndex:
+    """Índice invertido de chunks da base de conhecimento em MongoDB"""
+
+    def __init__(self, db):
+        self.db = db
+        self.chunks = db.knowledge_base_chunks
+
+    async def _corpus_stats(self) -> Tuple[int, float]:
+        """Total de chunks e comprimento médio (cache curto por processo)"""
+        global _corpus_stats_cache
+        now = time.monotonic()
+        if _corpus_stats_cache and now - _corpus_stats_cache[0] < CORPUS_STATS_TTL_SECONDS:
+            return _corpus_stats_cache[1]
+
+        rows = await self.chunks.aggregate(
+            [{"$group": {"_id": None, "count": {"$sum": 1}, "avg_len": {"$avg": "$length"}}}]
+        ).to_list(length=1)
+        stats = (rows[0]["count"], rows[0]["avg_len"] or 1.0) if rows else (0, 1.0)
+        _corpus_stats_cache = (now, stats)
+        return stats
+
+    async def index_document(self, document: Dict) -> int:
+        """
+        (Re)indexa um documento da KB
+
+        Args:
+            document: Documento com document_id, extracted_text e metadados
+
+        Returns:
+            Número de chunks gravados
+        """
+        document_id = document["document_id"]
+        await self.chunks.delete_many({"document_id": document_id})
+
+        if document.get("status", "active") != "active":
+            return 0
+
+        # Nome e descrição entram como chunk 0 para que a busca por título funcione
+        header = f"{document.get('filename', '')}\n{document.get('description', '')}"
+        text = document.get("extracted_text") or ""
+
+        sources = [(header, 0, len(header), "header")]
+        sources.extend((text[s:e], s, e, "body") for s, e in chunk_with_offsets(text))
+
+        model = _get_embedding_model() if _semantic_enabled() else None
+        embeddings = None
+        if model is not None:
+            try:
+                embeddings = model.encode([s[0] for s in sources]).tolist()
+            except Exception as e:
+                logger.warning(f"Falha ao gerar embeddings para {document_id}: {e}")
+
+        now = datetime.now(timezone.utc)
+        records = []
+        for idx, (chunk_text, start, end, kind) in enumerate(sources):
+            tf, first = _term_offsets(chunk_text)
+            if not tf:
+                continue
+            record = {
+                "document_id": document_id,
+                "chunk_index": idx,
+                "kind": kind,
+                "text": chunk_text,
+                "start": start,
+                "end": end,
+                "terms": list(tf.keys()),
+                "tf": dict(tf),
+                "offsets": first,
+                "length": sum(tf.values()),
+                "category": document.get("category"),
+                "form_types": document.get("form_types", []),
+                "indexed_at": now,
+            }
+            if embeddings is not None:
+                record["embedding"] = embeddings[idx]
+            records.append(record)
+
+        if records:
+            await self.chunks.insert_many(records)
+
+        logger.info(
+            "KB document indexed",
+            extra={"document_id": document_id, "chunks": len(records)},
+        )
+        return len(records)
+
+    async def update_metadata(self, document_id: str, fields: Dict) -> None:
+        """Propaga category/form_types para os chunks sem reindexar o texto."""
+        propagated = {k: v for k, v in fields.items() if k in ("category", "form_types")}
+        if propagated:
+            await self.chunks.update_many({"document_id": document_id}, {"$set": propagated})
+
+    async def remove_document(self, document_id: str) -> None:
+        await self.chunks.delete_many({"document_id": document_id})
+
+    async def search(
+        self,
+        query: str,
+        categories: Optional[List[str]] = None,
+        form_type: Optional[str] = None,
+        limit: int = 10,
+        per_document: int = 1,
+    ) -> List[Dict]:
+        """
+        Busca ranqueada por BM25 (com rerank semântico opcional)
+
+        Args:
+            query: Texto de busca livre
+            categories: Restringe às categorias informadas
+            form_type: Restringe a documentos aplicáveis ao formulário
+            limit: Número máximo de resultados
+            per_document: Máximo de chunks por documento
+
+        Returns:
+            Lista de hits com document_id, score, snippet e offsets
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        match: Dict = {"terms": {"$in": terms}}
+        if categories:
+            match["category"] = {"$in": categories}
+        if form_type:
+            match["form_types"] = {"$in": [form_type, "ALL"]}
+
+        projection = {"_id": 0, "terms": 0, "indexed_at": 0}
+        if not _semantic_enabled():
+            projection["embedding"] = 0
+
+        # BM25 calculado no servidor sobre todos os chunks que casam; só os
+        # MAX_CANDIDATES melhores voltam (truncar antes distorcia o ranking)
+        total_chunks, avg_len = await self._corpus_stats()
+        df = dict(
+            zip(
+                terms,
+                await asyncio.gather(*(self.chunks.count_documents({"terms": t}) for t in terms)),
+            )
+        )
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"score": _bm25_expression(terms, df, total_chunks, avg_len)}},
+            {"$sort": {"score": -1}},
+            {"$limit": MAX_CANDIDATES},
+            {"$project": projection},
+        ]
+        candidates = await self.chunks.aggregate(pipeline).to_list(length=MAX_CANDIDATES)
+        if not candidates:
+            return []
+
+        await self._semantic_rerank(query, candidates)
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+
+        results = []
+        seen: Counter = Counter()
+        for chunk in candidates:
+            if seen[chunk["document_id"]] >= per_document:
+                continue
+            seen[chunk["document_id"]] += 1
+
+            offsets = [chunk["offsets"][t] for t in terms if t in chunk["offsets"]]
+            offset = min(offsets) if offsets else 0
+            results.append(
+                {
+                    "document_id": chunk["document_id"],
+                    "chunk_index": chunk["chunk_index"],
+                    "score": round(chunk["score"], 4),
+                    "snippet": make_snippet(chunk["text"], offset),
+                    "start": chunk["start"] + offset,
+                    "category": chunk.get("category"),
+                    "form_types": chunk.get("form_types", []),
+                }
+            )
+            if len(results) >= limit:
+                break
+
+        return results
+
+    async def _semantic_rerank(self, query: str, candidates: List[Dict]) -> None:
+        """Mistura similaridade de embeddings ao score BM25 quando disponível."""
+        if not _semantic_enabled() or not any("embedding" in c for c in candidates):
+            return
+        model = _get_embedding_model()
+        if model is None:
+            return
+
+        query_embedding = model.encode(query).tolist()
+        top = max(c["score"] for c in candidates) or 1.0
+        for chunk in candidates:
+            embedding = chunk.pop("embedding", None)
+            similarity = max(0.0, _cosine(query_embedding, embedding)) if embedding else 0.0
+            chunk["score"] = (1 - SEMANTIC_WEIGHT) * chunk["score"] / top + (
+                SEMANTIC_WEIGHT * similarity
+            )
+
+    async def rebuild(self) -> Dict:
+        """Reindexa todos os documentos ativos (backfill / mudança de chunking)."""
+        # Chunks de documentos apagados/inativos saem antes de reindexar
+        active_ids = await self.db.knowledge_base.distinct("document_id", {"status": "active"})
+        orphans = await self.chunks.delete_many({"document_id": {"$nin": active_ids}})
+        indexed = 0
+        chunks = 0
+        cursor = self.db.knowledge_base.find({"status": "active"}, {"file_data": 0, "_id": 0})
+        async for document in cursor:
+            chunks += await self.index_document(document)
+            indexed += 1
+        return {
+            "success": True,
+            "documents": indexed,
+            "chunks": chunks,
+            "orphan_chunks_removed": orphans.deleted_count,
+        }
+
+    async def backfill(self) -> Dict:
+        """Indexa só os documentos ativos que ainda não têm chunks (boot)"""
+        indexed_ids = set(await self.chunks.distinct("document_id"))
+        indexed = 0
+        chunks = 0
+        cursor = self.db.knowledge_base.find({"status": "active"}, {"file_data": 0, "_id": 0})
+        async for document in cursor:
+            if document["document_id"] in indexed_ids:
+                continue
+            chunks += await self.index_document(document)
+            indexed += 1
+        if indexed:
+            logger.info(f"KB search index backfilled: {indexed} documents, {chunks} chunks")
+        return {"documents": indexed, "chunks": chunks}
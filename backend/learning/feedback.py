@@ -2,6 +2,9 @@
 Feedback System
 Sistema completo de coleta e análise de feedback dos usuários
 Suporta thumbs up/down, ratings 1-5, e comentários
+
+Analytics (stats, trending, NPS) leem rollups diários por (dia, tipo)
+mantidos no submit, então o custo é O(dias) e não O(feedbacks).
 """
 
 import logging
@@ -32,12 +35,55 @@ class FeedbackRating(str, Enum):
     EXCELLENT = "excellent"  # 5 estrelas
 
 
+def _type_value(feedback_type) -> Optional[str]:
+    if feedback_type is None:
+        return None
+    return feedback_type.value if isinstance(feedback_type, FeedbackType) else feedback_type
+
+
+def _day(ts: datetime) -> datetime:
+    """Início do dia (UTC) — chave dos rollups"""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def _is_negative(rating: Optional[int], thumbs: Optional[str]) -> bool:
+    return (rating is not None and rating <= 2) or thumbs == "down"
+
+
+def _rollup_increments(rating: Optional[int], thumbs: Optional[str], comment) -> Dict[str, int]:
+    """Contadores de um feedback no rollup diário"""
+    inc = {"total": 1}
+    if thumbs == "up":
+        inc["thumbs_up"] = 1
+    elif thumbs == "down":
+        inc["thumbs_down"] = 1
+    if rating:
+        inc[f"ratings.{rating}"] = 1
+        inc["rating_sum"] = rating
+        inc["rating_count"] = 1
+    if _is_negative(rating, thumbs) and comment:
+        inc["negative_commented"] = 1
+    return inc
+
+
+ROLLUP_COUNTERS = ("total", "thumbs_up", "thumbs_down", "rating_sum", "rating_count",
+                   "negative_commented")
+
+ROLLUP_BACKFILL_MARKER = "_backfilled"
+
+
 class FeedbackSystem:
     """Sistema de gerenciamento de feedback"""
 
+    # Rollups já conferidos/reconstruídos neste processo
+    _rollups_ready = False
+
     def __init__(self, db):
         self.db = db
         self.collection = db.feedback
+        self.rollups = db.feedback_daily_rollups
 
     async def submit_feedback(
         self,
@@ -95,6 +141,11 @@ class FeedbackSystem:
             result = await self.collection.insert_one(feedback_doc)
             feedback_id = str(result.inserted_id)
 
+            # Rollup diário (dia, tipo) para os dashboards
+            await self._increment_rollup(
+                feedback_doc["timestamp"], feedback_doc["type"], rating, thumbs, comment
+            )
+
             logger.info(
                 f"✅ Feedback submitted: type={feedback_type}, rating={rating}, thumbs={thumbs}"
             )
@@ -130,47 +181,25 @@ class FeedbackSystem:
             }
         """
         try:
-            # Construir query
-            query = {}
-            if feedback_type:
-                query["type"] = feedback_type.value
-            if start_date or end_date:
-                query["timestamp"] = {}
-                if start_date:
-                    query["timestamp"]["$gte"] = start_date
-                if end_date:
-                    query["timestamp"]["$lte"] = end_date
-
-            # Buscar todos os feedbacks
-            feedbacks = await self.collection.find(query).to_list(length=None)
-
-            if not feedbacks:
+            rollup = await self._sum_rollups(feedback_type, start_date, end_date)
+            by_type = {t: r["total"] for t, r in rollup["by_type"].items()}
+            total = rollup["total"]
+
+            if not total:
                 return {"total_feedback": 0, "message": "No feedback data available"}
 
-            # Calcular estatísticas
-            total = len(feedbacks)
-            thumbs_up = sum(1 for f in feedbacks if f.get("thumbs") == "up")
-            thumbs_down = sum(1 for f in feedbacks if f.get("thumbs") == "down")
+            thumbs_up = rollup["thumbs_up"]
+            thumbs_down = rollup["thumbs_down"]
 
             # Ratings
-            ratings = [f.get("rating") for f in feedbacks if f.get("rating")]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-
-            # Distribuição de ratings
-            rating_dist = {i: 0 for i in range(1, 6)}
-            for r in ratings:
-                if r in rating_dist:
-                    rating_dist[r] += 1
-
-            # Feedback por tipo
-            by_type = {}
-            for f in feedbacks:
-                t = f.get("type", "unknown")
-                by_type[t] = by_type.get(t, 0) + 1
+            rating_dist = rollup["ratings"]
+            avg_rating = (
+                rollup["rating_sum"] / rollup["rating_count"] if rollup["rating_count"] else 0
+            )
 
             # Sentimento geral (baseado em thumbs + ratings)
-            positive = thumbs_up + sum(1 for r in ratings if r >= 4)
-            negative = thumbs_down + sum(1 for r in ratings if r <= 2)
+            positive = thumbs_up + rating_dist[4] + rating_dist[5]
+            negative = thumbs_down + rating_dist[1] + rating_dist[2]
             sentiment = (
                 "positive"
                 if positive > negative
@@ -214,7 +243,7 @@ class FeedbackSystem:
             query = {"$or": [{"rating": {"$lte": threshold}}, {"thumbs": "down"}]}
 
             if feedback_type:
-                query["type"] = feedback_type.value
+                query["type"] = _type_value(feedback_type)
 
             feedbacks = (
                 await self.collection.find(query)
@@ -302,39 +331,39 @@ class FeedbackSystem:
         try:
             start_date = datetime.now(timezone.utc) - timedelta(days=days)
 
-            # Buscar feedback negativo recente
-            query = {
-                "timestamp": {"$gte": start_date},
-                "$or": [{"rating": {"$lte": 2}}, {"thumbs": "down"}],
-                "comment": {"$exists": True, "$ne": ""},
+            # Contagem de feedback negativo com comentário, por tipo (rollups)
+            rollup = await self._sum_rollups(start_date=start_date)
+            counts = {
+                t: r["negative_commented"]
+                for t, r in rollup["by_type"].items()
+                if r["negative_commented"] >= min_occurrences
             }
 
-            feedbacks = await self.collection.find(query).to_list(length=None)
-
-            if not feedbacks:
-                return []
-
-            # Agrupar por tipo e contar
-            issues = {}
-            for f in feedbacks:
-                f_type = f.get("type", "unknown")
-                if f_type not in issues:
-                    issues[f_type] = {"type": f_type, "count": 0, "comments": []}
-                issues[f_type]["count"] += 1
-                if f.get("comment"):
-                    issues[f_type]["comments"].append(f["comment"])
-
-            # Filtrar por min_occurrences e ordenar
-            trending = [
-                {
-                    "type": issue["type"],
-                    "count": issue["count"],
-                    "severity": "high" if issue["count"] >= min_occurrences * 2 else "medium",
-                    "sample_comments": issue["comments"][:5],
-                }
-                for issue in issues.values()
-                if issue["count"] >= min_occurrences
-            ]
+            trending = []
+            for f_type, count in counts.items():
+                # Amostra dos comentários mais recentes (índice type + timestamp)
+                samples = (
+                    await self.collection.find(
+                        {
+                            "type": f_type,
+                            "timestamp": {"$gte": start_date},
+                            "$or": [{"rating": {"$lte": 2}}, {"thumbs": "down"}],
+                            "comment": {"$nin": [None, ""]},
+                        },
+                        {"_id": 0, "comment": 1},
+                    )
+                    .sort("timestamp", -1)
+                    .limit(5)
+                    .to_list(length=5)
+                )
+                trending.append(
+                    {
+                        "type": f_type,
+                        "count": count,
+                        "severity": "high" if count >= min_occurrences * 2 else "medium",
+                        "sample_comments": [f["comment"] for f in samples],
+                    }
+                )
 
             trending.sort(key=lambda x: x["count"], reverse=True)
 
@@ -344,6 +373,148 @@ class FeedbackSystem:
             logger.error(f"Error getting trending issues: {str(e)}")
             return []
 
+    # ------------------------------------------------------------------
+    # Rollups diários
+    # ------------------------------------------------------------------
+
+    async def _increment_rollup(
+        self,
+        timestamp: datetime,
+        feedback_type: str,
+        rating: Optional[int],
+        thumbs: Optional[str],
+        comment: Optional[str],
+    ) -> None:
+        day = _day(timestamp)
+        await self.rollups.update_one(
+            {"_id": f"{day:%Y-%m-%d}:{feedback_type}"},
+            {
+                "$inc": _rollup_increments(rating, thumbs, comment),
+                "$setOnInsert": {"day": day, "type": feedback_type},
+            },
+            upsert=True,
+        )
+
+    async def _sum_rollups(
+        self,
+        feedback_type=None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Soma os rollups do período (granularidade de dia) via aggregation
+
+        Returns:
+            Totais gerais + ``ratings`` (1..5) + ``by_type`` com os mesmos contadores
+        """
+        await self.ensure_rollups()
+
+        match: Dict[str, Any] = {}
+        type_value = _type_value(feedback_type)
+        if type_value:
+            match["type"] = type_value
+        # "day" sempre presente: exclui o marcador de reconstrução
+        match["day"] = {"$exists": True}
+        if start_date:
+            match["day"]["$gte"] = _day(start_date)
+        if end_date:
+            match["day"]["$lte"] = _day(end_date)
+
+        group: Dict[str, Any] = {"_id": "$type"}
+        for counter in ROLLUP_COUNTERS:
+            group[counter] = {"$sum": f"${counter}"}
+        for star in range(1, 6):
+            group[f"r{star}"] = {"$sum": f"$ratings.{star}"}
+
+        rows = await self.rollups.aggregate(
+            [{"$match": match}, {"$group": group}]
+        ).to_list(length=None)
+
+        result: Dict[str, Any] = {c: 0 for c in ROLLUP_COUNTERS}
+        result["ratings"] = {star: 0 for star in range(1, 6)}
+        result["by_type"] = {}
+        for row in rows:
+            by_type = {c: row.get(c, 0) for c in ROLLUP_COUNTERS}
+            result["by_type"][row["_id"] or "unknown"] = by_type
+            for counter in ROLLUP_COUNTERS:
+                result[counter] += by_type[counter]
+            for star in range(1, 6):
+                result["ratings"][star] += row.get(f"r{star}", 0)
+        return result
+
+    async def ensure_rollups(self) -> None:
+        """Backfill único: feedback anterior aos rollups é agregado uma vez"""
+        if FeedbackSystem._rollups_ready:
+            return
+        if not await self.rollups.find_one({"_id": ROLLUP_BACKFILL_MARKER}):
+            await self.rebuild_rollups()
+            await self.rollups.update_one(
+                {"_id": ROLLUP_BACKFILL_MARKER},
+                {"$set": {"rebuilt_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+        FeedbackSystem._rollups_ready = True
+
+    async def rebuild_rollups(self, start_date: Optional[datetime] = None) -> int:
+        """
+        Reconstrói os rollups diários a partir da coleção de feedback
+
+        Usa aggregation no servidor (um documento por dia/tipo volta ao Python).
+        """
+        match: Dict[str, Any] = {}
+        if start_date:
+            match["timestamp"] = {"$gte": _day(start_date)}
+
+        negative = {"$or": [{"$lte": [{"$ifNull": ["$rating", 99]}, 2]},
+                            {"$eq": ["$thumbs", "down"]}]}
+        commented = {"$gt": [{"$strLenCP": {"$ifNull": ["$comment", ""]}}, 0]}
+
+        def count_if(condition):
+            return {"$sum": {"$cond": [condition, 1, 0]}}
+
+        group: Dict[str, Any] = {
+            "_id": {
+                "day": {
+                    "$dateFromParts": {
+                        "year": {"$year": "$timestamp"},
+                        "month": {"$month": "$timestamp"},
+                        "day": {"$dayOfMonth": "$timestamp"},
+                    }
+                },
+                "type": "$type",
+            },
+            "total": {"$sum": 1},
+            "thumbs_up": count_if({"$eq": ["$thumbs", "up"]}),
+            "thumbs_down": count_if({"$eq": ["$thumbs", "down"]}),
+            "rating_sum": {"$sum": {"$ifNull": ["$rating", 0]}},
+            "rating_count": count_if({"$gt": [{"$ifNull": ["$rating", 0]}, 0]}),
+            "negative_commented": count_if({"$and": [negative, commented]}),
+        }
+        for star in range(1, 6):
+            group[f"r{star}"] = count_if({"$eq": ["$rating", star]})
+
+        rows = await self.collection.aggregate(
+            [{"$match": match}, {"$group": group}]
+        ).to_list(length=None)
+
+        for row in rows:
+            day = _day(row["_id"]["day"])
+            feedback_type = row["_id"]["type"] or "unknown"
+            doc = {c: row[c] for c in ROLLUP_COUNTERS}
+            doc.update(
+                {
+                    "day": day,
+                    "type": feedback_type,
+                    "ratings": {str(star): row[f"r{star}"] for star in range(1, 6)},
+                }
+            )
+            await self.rollups.replace_one(
+                {"_id": f"{day:%Y-%m-%d}:{feedback_type}"}, doc, upsert=True
+            )
+
+        logger.info(f"📊 Feedback rollups rebuilt: {len(rows)} day/type documents")
+        return len(rows)
+
 
 # Helper functions for quick access
 async def submit_ai_response_feedback(
@@ -390,20 +561,15 @@ async def get_nps_score(db, days: int = 30) -> Dict[str, Any]:
         start_date = datetime.now(timezone.utc) - timedelta(days=days)
         system = FeedbackSystem(db)
 
-        feedbacks = await system.collection.find(
-            {
-                "type": FeedbackType.GENERAL_EXPERIENCE.value,
-                "rating": {"$exists": True},
-                "timestamp": {"$gte": start_date},
-            }
-        ).to_list(length=None)
+        rollup = await system._sum_rollups(FeedbackType.GENERAL_EXPERIENCE, start_date=start_date)
+        total = rollup["rating_count"]
 
-        if not feedbacks:
+        if not total:
             return {"nps": 0, "message": "No data available"}
 
-        total = len(feedbacks)
-        promoters = sum(1 for f in feedbacks if f.get("rating") == 5)
-        detractors = sum(1 for f in feedbacks if f.get("rating") in [1, 2])
+        ratings = rollup["ratings"]
+        promoters = ratings[5]
+        detractors = ratings[1] + ratings[2]
         passives = total - promoters - detractors
 
         nps = ((promoters - detractors) / total) * 100
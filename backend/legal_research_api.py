@@ -3,15 +3,15 @@ Legal Research API — Imigrai
 Busca semântica + texto na base de conhecimento jurídico indexada.
 """
 
+import asyncio
 import logging
 import os
+import threading
 from typing import Optional
 
-import numpy as np
 from fastapi import APIRouter, Header, HTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
@@ -22,18 +22,31 @@ DB_NAME = "osprey_immigration_db"
 COLLECTION = "legal_knowledge"
 INTERNAL_TOKEN = os.getenv("BACKEND_INTERNAL_TOKEN", "imigrai-internal-2024")
 
-# Carregar modelo uma vez na inicialização
+# Modelo carregado no primeiro uso ou no warmup em background (torch não entra no boot)
 _model = None
+# Warmup e a primeira busca podem chegar juntos: carrega uma vez só
+_model_lock = threading.Lock()
 
 
 def get_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+
+                _model = SentenceTransformer("all-MiniLM-L6-v2")
     return _model
 
 
+def warmup() -> None:
+    """Pré-carrega o modelo de embeddings (chamado pelo router registry)"""
+    get_model()
+
+
 def cosine_similarity(a: list, b: list) -> float:
+    import numpy as np
+
     a_arr, b_arr = np.array(a), np.array(b)
     return float(np.dot(a_arr, b_arr) / (np.linalg.norm(a_arr) * np.linalg.norm(b_arr) + 1e-10))
 
@@ -55,7 +68,7 @@ async def legal_research(
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     db = AsyncIOMotorClient(MONGO_URI)[DB_NAME]
-    model = get_model()
+    model = _model or await asyncio.to_thread(get_model)
 
     # 1. Embedding da query
     query_embedding = model.encode([req.query])[0].tolist()
@@ -245,7 +245,7 @@ def _build_case_summary(case: dict) -> str:
     # Any other fields we haven't captured
     known_fields = {
         "case_id", "office_id", "client_name", "visa_type", "status", "notes",
-        "documents", "deadlines", "history", "created_at", "updated_at",
+        "documents", "deadlines", "history", "recent_activity", "created_at", "updated_at",
         "office_name", "basic_data", "client_data", "beneficiary_data",
         "qualifications", "education", "credentials", "experience", "employment",
         "work_history", "achievements", "awards", "publications", "citations",
@@ -25,13 +25,20 @@ from .exceptions import (
 )
 from .helpers import (
     CacheManager,
+    CircuitBreaker,
     FallbackChain,
+    LatencyHistogram,
     MetricsCollector,
+    MongoCacheStore,
+    MongoMetricsSink,
     ProviderRouter,
+    call_with_routing,
     get_cache_manager,
+    get_circuit_breaker,
     get_fallback_chain,
     get_metrics_collector,
     get_provider_router,
+    metrics_labels,
 )
 from .types import (
     ChatMessage,
@@ -65,8 +72,15 @@ __all__ = [
     # Helpers
     "ProviderRouter",
     "FallbackChain",
+    "CircuitBreaker",
+    "call_with_routing",
+    "get_circuit_breaker",
     "CacheManager",
+    "MongoCacheStore",
     "MetricsCollector",
+    "LatencyHistogram",
+    "MongoMetricsSink",
+    "metrics_labels",
     "get_provider_router",
     "get_fallback_chain",
     "get_cache_manager",
@@ -6,6 +6,7 @@ Keeps the same ClaudeClient class name and chat() interface
 so that all agent imports remain unchanged.
 """
 
+import asyncio
 import logging
 import os
 import time
@@ -13,6 +14,8 @@ from typing import Any, Dict, List, Optional
 
 import google.generativeai as genai
 
+from backend.llm.helpers import call_with_routing, get_metrics_collector
+
 logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = (
@@ -27,6 +30,10 @@ if GEMINI_API_KEY:
 DEFAULT_MODEL = "gemini-2.5-flash"
 MAX_TOKENS_DEFAULT = 8192
 
+# Chamadas simultâneas ao Gemini por processo; o excedente espera na fila
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "8"))
+_gemini_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
 
 class ClaudeClient:
     """Async client wrapping Google Gemini (same interface as the old Anthropic client)."""
@@ -44,6 +51,9 @@ class ClaudeClient:
         model: Optional[str] = None,
         temperature: float = 0.5,
         max_tokens: int = MAX_TOKENS_DEFAULT,
+        agent: Optional[str] = None,
+        fallback_models: Optional[List[str]] = None,
+        hedge: bool = False,
     ) -> Dict[str, Any]:
         """
         Send a chat request to Gemini.
@@ -54,55 +64,98 @@ class ClaudeClient:
             model: Model ID (defaults to gemini-2.5-flash)
             temperature: Sampling temperature
             max_tokens: Max tokens to generate
+            agent: Calling agent, used as a metrics label
+            fallback_models: Alternative Gemini models for failover
+            hedge: Fire the next model if the first is slower than its p95
 
         Returns:
-            Dict with "content", "model", "input_tokens", "output_tokens"
+            Dict with "content", "model", "input_tokens", "output_tokens",
+            "latency_ms" and "queue_ms"
         """
         model_name = model or self.default_model
-        start = time.time()
-
-        try:
-            gemini_model = genai.GenerativeModel(
-                model_name=model_name,
-                system_instruction=system,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=max_tokens,
-                    temperature=temperature,
-                ),
-            )
-
-            # Build the user prompt from messages
-            # Gemini expects a single string or list of parts for generate_content
-            user_content = "\n".join(
-                msg["content"] for msg in messages if msg.get("role") == "user"
-            )
-
-            response = gemini_model.generate_content(user_content)
-
-            content = response.text if response.text else ""
-            latency_ms = (time.time() - start) * 1000
-
-            # Extract token counts if available
-            input_tokens = 0
-            output_tokens = 0
-            if hasattr(response, "usage_metadata") and response.usage_metadata:
-                input_tokens = getattr(response.usage_metadata, "prompt_token_count", 0) or 0
-                output_tokens = getattr(response.usage_metadata, "candidates_token_count", 0) or 0
-
-            logger.info(
-                f"Gemini call: model={model_name}, "
-                f"tokens={input_tokens}+{output_tokens}, "
-                f"latency={latency_ms:.0f}ms"
-            )
-
-            return {
-                "content": content,
-                "model": model_name,
-                "input_tokens": input_tokens,
-                "output_tokens": output_tokens,
-                "latency_ms": latency_ms,
-            }
-
-        except Exception as e:
-            logger.error(f"Gemini error: {e}", exc_info=True)
-            raise
+        metrics = get_metrics_collector()
+        queued = time.perf_counter()
+
+        async with _gemini_slots:
+            start = time.perf_counter()
+            queue_ms = (start - queued) * 1000
+            try:
+                # Circuit breaker e EWMA compartilhados com o LLMClient
+                response, model_name = await call_with_routing(
+                    lambda m: self._generate(m, system, messages, temperature, max_tokens),
+                    [model_name] + (fallback_models or []),
+                    hedge=hedge,
+                )
+            except Exception as e:
+                latency_ms = (time.perf_counter() - start) * 1000
+                metrics.record_request(
+                    model_name,
+                    0,
+                    0,
+                    latency_ms,
+                    success=False,
+                    agent=agent,
+                    queue_ms=queue_ms,
+                    error_type=type(e).__name__,
+                )
+                logger.error(f"Gemini error: {e}", exc_info=True)
+                raise
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        response["latency_ms"] = latency_ms
+        response["queue_ms"] = queue_ms
+        metrics.record_request(
+            model_name,
+            response["input_tokens"],
+            response["output_tokens"],
+            latency_ms,
+            agent=agent,
+            queue_ms=queue_ms,
+        )
+
+        logger.info(
+            f"Gemini call: model={model_name}, "
+            f"tokens={response['input_tokens']}+{response['output_tokens']}, "
+            f"latency={latency_ms:.0f}ms, queue={queue_ms:.0f}ms"
+        )
+        return response
+
+    async def _generate(
+        self,
+        model_name: str,
+        system: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+    ) -> Dict[str, Any]:
+        """Chamada ao Gemini (assíncrona, não bloqueia o event loop)"""
+        gemini_model = genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system,
+            generation_config=genai.types.GenerationConfig(
+                max_output_tokens=max_tokens,
+                temperature=temperature,
+            ),
+        )
+
+        # Build the user prompt from messages
+        # Gemini expects a single string or list of parts for generate_content
+        user_content = "\n".join(msg["content"] for msg in messages if msg.get("role") == "user")
+
+        response = await gemini_model.generate_content_async(user_content)
+
+        content = response.text if response.text else ""
+
+        # Extract token counts if available
+        input_tokens = 0
+        output_tokens = 0
+        if hasattr(response, "usage_metadata") and response.usage_metadata:
+            input_tokens = getattr(response.usage_metadata, "prompt_token_count", 0) or 0
+            output_tokens = getattr(response.usage_metadata, "candidates_token_count", 0) or 0
+
+        return {
+            "content": content,
+            "model": model_name,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
@@ -4,12 +4,18 @@ LLM Helper Functions
 Utilities for provider routing, fallback chains, caching, and metrics collection.
 """
 
+import asyncio
+import bisect
+import contextvars
 import hashlib
 import json
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 
 try:
     from backend.config.llm_config import (
@@ -26,20 +32,130 @@ except ImportError:
         llm_settings,
     )
 
+from .exceptions import LLMCircuitBreakerError, LLMTimeoutError
+
 logger = logging.getLogger(__name__)
 
 
+# Roteamento adaptativo
+ROUTER_EWMA_ALPHA = 0.2
+ROUTER_ERROR_PENALTY = 4.0  # score = latência EWMA * (1 + penalidade * taxa de erro EWMA)
+ROUTER_PRIOR_LATENCY_MS = 3000.0  # score assumido para modelos ainda sem amostras
+ROUTER_MAX_ERROR_RATE = 0.5  # acima disso o modelo pedido perde a primeira posição
+HEDGE_DEFAULT_DELAY_MS = 4000.0
+HEDGE_MIN_DELAY_MS = 1000.0
+HEDGE_MAX_DELAY_MS = 10000.0
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for failing providers
+
+    Prevents cascading failures by temporarily disabling providers
+    that are experiencing repeated errors. A single instance
+    (get_circuit_breaker) is shared by LLMClient and ClaudeClient.
+    """
+
+    def __init__(
+        self, failure_threshold: int = 5, timeout_seconds: int = 60, half_open_attempts: int = 1
+    ):
+        self.failure_threshold = failure_threshold
+        self.timeout_seconds = timeout_seconds
+        self.half_open_attempts = half_open_attempts
+
+        self._failure_count: Dict[str, int] = {}
+        self._last_failure_time: Dict[str, datetime] = {}
+        self._state: Dict[str, str] = {}  # "closed", "open", "half_open"
+        self._half_open_count: Dict[str, int] = {}
+
+    def record_success(self, provider: str) -> None:
+        """Record successful call"""
+        self._failure_count[provider] = 0
+        self._state[provider] = "closed"
+        self._half_open_count[provider] = 0
+
+    def record_failure(self, provider: str) -> None:
+        """Record failed call"""
+        self._failure_count[provider] = self._failure_count.get(provider, 0) + 1
+        self._last_failure_time[provider] = datetime.now()
+
+        if self._failure_count[provider] >= self.failure_threshold:
+            self._state[provider] = "open"
+            logger.warning(
+                f"Circuit breaker opened for provider {provider} "
+                f"after {self._failure_count[provider]} failures"
+            )
+
+    def can_attempt(self, provider: str) -> bool:
+        """Check if provider can be attempted"""
+        state = self._state.get(provider, "closed")
+
+        if state == "closed":
+            return True
+
+        if state == "open":
+            # Check if timeout has elapsed
+            last_failure = self._last_failure_time.get(provider)
+            if last_failure:
+                elapsed = (datetime.now() - last_failure).total_seconds()
+                if elapsed >= self.timeout_seconds:
+                    self._state[provider] = "half_open"
+                    self._half_open_count[provider] = 1
+                    logger.info(f"Circuit breaker entering half-open state for {provider}")
+                    return True
+            return False
+
+        if state == "half_open":
+            # Allow limited attempts in half-open state
+            count = self._half_open_count.get(provider, 0)
+            if count < self.half_open_attempts:
+                self._half_open_count[provider] = count + 1
+                return True
+            return False
+
+        return False
+
+    def release_attempt(self, provider: str) -> None:
+        """Devolve uma tentativa half-open que foi cancelada sem resultado"""
+        if self._state.get(provider) == "half_open":
+            self._half_open_count[provider] = max(0, self._half_open_count.get(provider, 0) - 1)
+
+    def is_open(self, provider: str) -> bool:
+        """Aberto e ainda dentro do timeout (sem alterar o estado)"""
+        if self._state.get(provider) != "open":
+            return False
+        last_failure = self._last_failure_time.get(provider)
+        if not last_failure:
+            return True
+        return (datetime.now() - last_failure).total_seconds() < self.timeout_seconds
+
+    def get_state(self, provider: str) -> str:
+        """Get current circuit breaker state"""
+        return self._state.get(provider, "closed")
+
+
 class ProviderRouter:
     """
     Provider routing logic for LLM requests
 
     Handles intelligent routing of requests to appropriate providers
-    based on model availability, cost, and performance.
+    based on model availability, cost, and performance. Each model keeps
+    an EWMA of latency and error rate; rank_models keeps the requested
+    model first while it is healthy and orders the fallbacks by score.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        alpha: float = ROUTER_EWMA_ALPHA,
+    ):
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.alpha = alpha
         self.provider_health: Dict[str, bool] = defaultdict(lambda: True)
-        self.provider_latency: Dict[str, List[float]] = defaultdict(list)
+        self.provider_latency: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=100))
+        self._ewma_latency: Dict[str, float] = {}
+        self._ewma_error: Dict[str, float] = {}
 
     def get_provider_for_model(self, model: str) -> Tuple[LLMProvider, Optional[str]]:
         """
@@ -77,10 +193,82 @@ class ProviderRouter:
 
     def record_provider_latency(self, provider: str, latency_ms: float) -> None:
         """Record provider latency"""
+        # deque(maxlen=100): mantém só as últimas 100 medições
         self.provider_latency[provider].append(latency_ms)
-        # Keep only last 100 measurements
-        if len(self.provider_latency[provider]) > 100:
-            self.provider_latency[provider] = self.provider_latency[provider][-100:]
+
+    def record_result(
+        self, model: str, latency_ms: float, success: bool, censored: bool = False
+    ) -> None:
+        """
+        Atualiza o EWMA de latência e de erro do modelo
+
+        Falhas também entram na latência (um timeout custa o tempo inteiro);
+        só sucessos alimentam a janela usada para o p95 do hedge.
+        ``censored``: chamada cancelada (perdeu o hedge) — o tempo decorrido
+        é um limite inferior da latência e atualiza só o EWMA de latência.
+        """
+        alpha = self.alpha
+        previous = self._ewma_latency.get(model)
+        if censored and previous is not None and latency_ms <= previous:
+            return
+        self._ewma_latency[model] = (
+            latency_ms if previous is None else alpha * latency_ms + (1 - alpha) * previous
+        )
+        if censored:
+            return
+        error = 0.0 if success else 1.0
+        self._ewma_error[model] = alpha * error + (1 - alpha) * self._ewma_error.get(model, 0.0)
+        if success:
+            self.record_provider_latency(model, latency_ms)
+
+    def score(self, model: str) -> float:
+        """Custo esperado (ms) de mandar a chamada para o modelo; menor é melhor"""
+        latency = self._ewma_latency.get(model, ROUTER_PRIOR_LATENCY_MS)
+        return latency * (1 + ROUTER_ERROR_PENALTY * self._ewma_error.get(model, 0.0))
+
+    def is_degraded(self, model: str) -> bool:
+        """Circuito aberto, provedor fora ou taxa de erro EWMA acima do limite"""
+        return (
+            self.circuit_breaker.is_open(model)
+            or not self.is_provider_healthy(model)
+            or self._ewma_error.get(model, 0.0) > ROUTER_MAX_ERROR_RATE
+        )
+
+    def rank_models(self, models: List[str]) -> List[str]:
+        """
+        Ordena candidatos: o modelo pedido (primeiro da lista) fica na frente
+        enquanto não estiver degradado; os alternativos vêm pelo score
+
+        Latência sozinha não rebaixa o modelo pedido (isso trocaria o modelo
+        do chamador por outro mais barato); lentidão é tratada pelo hedge.
+        Empates mantêm a ordem de preferência recebida.
+        """
+        unique = list(dict.fromkeys(models))
+        if not unique:
+            return []
+
+        def key(m: str):
+            return (self.is_degraded(m), self.score(m), unique.index(m))
+
+        primary = unique[0]
+        if self.is_degraded(primary):
+            return sorted(unique, key=key)
+        return [primary] + sorted(unique[1:], key=key)
+
+    def latency_percentile(self, model: str, q: float) -> Optional[float]:
+        """Percentil da latência recente (None com poucas amostras)"""
+        samples = self.provider_latency.get(model)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def hedge_delay_ms(self, model: str) -> float:
+        """Espera antes de disparar a requisição de hedge: p95 recente do modelo"""
+        p95 = self.latency_percentile(model, 95)
+        if p95 is None:
+            return HEDGE_DEFAULT_DELAY_MS
+        return min(max(p95, HEDGE_MIN_DELAY_MS), HEDGE_MAX_DELAY_MS)
 
     def get_average_latency(self, provider: str) -> float:
         """Get average latency for provider"""
@@ -93,6 +281,121 @@ class ProviderRouter:
         """Check if provider is healthy"""
         return self.provider_health.get(provider, True)
 
+    def get_routing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estado de roteamento por modelo (EWMA, p95 e circuito)"""
+        return {
+            model: {
+                "ewma_latency_ms": round(latency, 1),
+                "ewma_error_rate": round(self._ewma_error.get(model, 0.0), 3),
+                "score": round(self.score(model), 1),
+                "p95_ms": self.latency_percentile(model, 95),
+                "circuit": self.circuit_breaker.get_state(model),
+            }
+            for model, latency in self._ewma_latency.items()
+        }
+
+
+async def call_with_routing(
+    call: Callable[[str], Awaitable[Any]],
+    models: List[str],
+    hedge: bool = False,
+    attempt_timeout: Optional[float] = None,
+    track_health: bool = True,
+    router: Optional[ProviderRouter] = None,
+) -> Tuple[Any, str]:
+    """
+    Executa ``call(model)`` no melhor modelo disponível, com failover
+
+    Candidatos são ordenados pelo ProviderRouter; modelos com circuito
+    aberto são pulados. Uma falha dispara imediatamente o próximo
+    candidato. Com ``hedge=True``, se o primeiro não responder dentro do
+    p95 recente dele, um segundo candidato é disparado em paralelo e vale
+    a primeira resposta bem-sucedida (a outra é cancelada).
+
+    Args:
+        call: Corrotina que executa a chamada para um modelo
+        models: Modelo preferido seguido dos alternativos
+        hedge: Habilita a requisição de hedge
+        attempt_timeout: Timeout (s) de cada tentativa
+        track_health: Registra sucesso/falha no router e no circuit breaker
+            (desligue quando ``call`` já registra)
+
+    Returns:
+        Tupla (resultado, modelo que respondeu)
+    """
+    router = router or provider_router
+    breaker = router.circuit_breaker
+    ranked = iter(router.rank_models(models))
+    pending: Dict[asyncio.Task, Tuple[str, float]] = {}
+    last_error: Optional[BaseException] = None
+    hedged = False
+
+    def launch_next() -> bool:
+        for model in ranked:
+            if breaker.can_attempt(model):
+                task = asyncio.ensure_future(asyncio.wait_for(call(model), attempt_timeout))
+                pending[task] = (model, time.perf_counter())
+                return True
+        return False
+
+    if not launch_next():
+        raise LLMCircuitBreakerError(
+            f"Circuit breaker open for all candidate models: {models}",
+            provider=provider_for_model(models[0]),
+            failure_count=breaker._failure_count.get(models[0], 0),
+            threshold=breaker.failure_threshold,
+        )
+
+    try:
+        while pending:
+            wait_timeout = None
+            if hedge and not hedged and len(pending) == 1:
+                model, started = next(iter(pending.values()))
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                wait_timeout = max(0.0, router.hedge_delay_ms(model) - elapsed_ms) / 1000
+
+            done, _ = await asyncio.wait(
+                pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                hedged = True
+                if launch_next():
+                    hedge_model = list(pending.values())[-1][0]
+                    logger.info(f"Hedging slow call to {model} with {hedge_model}")
+                continue
+
+            for task in done:
+                model, started = pending.pop(task)
+                latency_ms = (time.perf_counter() - started) * 1000
+                error = task.exception()
+                if track_health:
+                    router.record_result(model, latency_ms, error is None)
+                    if error is None:
+                        breaker.record_success(model)
+                    else:
+                        breaker.record_failure(model)
+                if error is None:
+                    return task.result(), model
+                last_error = error
+                logger.warning(f"LLM call to {model} failed ({type(error).__name__}): {error}")
+
+            if not pending:
+                launch_next()
+    finally:
+        for task, (model, started) in pending.items():
+            task.cancel()
+            breaker.release_attempt(model)
+            if track_health:
+                router.record_result(
+                    model, (time.perf_counter() - started) * 1000, success=False, censored=True
+                )
+
+    if isinstance(last_error, asyncio.TimeoutError):
+        raise LLMTimeoutError(
+            f"Request timed out after {attempt_timeout}s", timeout_seconds=attempt_timeout
+        )
+    raise last_error
+
 
 class FallbackChain:
     """
@@ -121,6 +424,26 @@ class FallbackChain:
             logger.warning(f"No fallback chain configured for model {model}")
             return []
 
+    def get_routed_chain(
+        self, model: str, allowed_providers: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Modelo primário + fallbacks, ordenados pela saúde atual (ProviderRouter)
+
+        Args:
+            model: Primary model name
+            allowed_providers: Restringe a provedores utilizáveis pelo cliente
+
+        Returns:
+            Model names in order of attempt
+        """
+        chain = [model] + [
+            fallback
+            for fallback in self.get_fallback_chain(model)
+            if allowed_providers is None or provider_for_model(fallback) in allowed_providers
+        ]
+        return provider_router.rank_models(chain)
+
     def get_next_fallback(self, model: str, failed_models: List[str]) -> Optional[str]:
         """
         Get next fallback model
@@ -155,18 +478,107 @@ class FallbackChain:
         return dict(self.fallback_attempts)
 
 
+class MongoCacheStore:
+    """
+    Segundo nível do cache de respostas (MongoDB)
+
+    Documentos ``{_id: key, value, expires_at}``; a expiração física fica a
+    cargo do índice TTL em ``expires_at`` (criado em core.database).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"value": 1}
+        )
+        return doc["value"] if doc else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl_seconds: int) -> None:
+        expires_at = (
+            datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+            if ttl_seconds
+            else datetime.max.replace(tzinfo=timezone.utc)
+        )
+        await self.collection.replace_one(
+            {"_id": key}, {"_id": key, "value": value, "expires_at": expires_at}, upsert=True
+        )
+
+    async def clear(self) -> None:
+        await self.collection.delete_many({})
+
+
 class CacheManager:
     """
     LLM response caching
 
-    Provides semantic caching for LLM responses to reduce costs and latency.
+    LRU limitado por número de entradas e por bytes (JSON serializado), com
+    TTL e um segundo nível opcional (MongoCacheStore). Chamadas idênticas em
+    voo são coalescidas (single-flight): só a primeira vai ao provedor.
     """
 
-    def __init__(self, ttl_seconds: int = 3600):
-        self.cache: Dict[str, Tuple[Any, datetime]] = {}
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        store: Optional[MongoCacheStore] = None,
+    ):
         self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.store = store
+
+        # key -> (value, expires_at monotonic, size_bytes)
+        self.cache: "OrderedDict[str, Tuple[Dict[str, Any], float, int]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.bytes = 0
+
         self.hits = 0
+        self.store_hits = 0
         self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.store_errors = 0
+
+    def attach_store(self, store: Optional[MongoCacheStore]) -> None:
+        self.store = store
+
+    # ------------------------------------------------------------------ keys
+
+    @staticmethod
+    def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Roles como string, conteúdo sem espaços nas bordas, campos None removidos"""
+        normalized = []
+        for message in messages:
+            item = {}
+            for field_name, value in message.items():
+                if value is None:
+                    continue
+                if isinstance(value, Enum):
+                    value = value.value
+                if field_name == "content" and isinstance(value, str):
+                    value = value.strip()
+                item[field_name] = value
+            normalized.append(item)
+        return normalized
+
+    def make_key(
+        self, model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Chave do cache: modelo + mensagens normalizadas + parâmetros de amostragem"""
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        if "temperature" in params:
+            params["temperature"] = round(float(params["temperature"]), 2)
+        cache_data = {
+            "model": model,
+            "messages": self.normalize_messages(messages),
+            "params": params,
+        }
+        cache_str = json.dumps(cache_data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(cache_str.encode()).hexdigest()
 
     def _generate_cache_key(
         self,
@@ -176,15 +588,60 @@ class CacheManager:
         max_tokens: Optional[int],
     ) -> str:
         """Generate cache key from request parameters"""
-        # Create deterministic string representation
-        cache_data = {
-            "model": model,
-            "messages": messages,
-            "temperature": round(temperature, 2),
-            "max_tokens": max_tokens,
-        }
-        cache_str = json.dumps(cache_data, sort_keys=True)
-        return hashlib.sha256(cache_str.encode()).hexdigest()
+        return self.make_key(
+            model, messages, {"temperature": temperature, "max_tokens": max_tokens}
+        )
+
+    # -------------------------------------------------------------- memória
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        value, expires_at, size = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self.cache.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value: Dict[str, Any], size: Optional[int] = None) -> None:
+        if size is None:
+            size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        if key in self.cache:
+            self._remove(key)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        self.cache[key] = (value, expires_at, size)
+        self.bytes += size
+        while len(self.cache) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self.cache))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self.cache.pop(key)
+        self.bytes -= size
+
+    def invalidate(self, key: str) -> bool:
+        """Remove uma chave do nível em memória"""
+        if key not in self.cache:
+            return False
+        self._remove(key)
+        return True
+
+    def purge_expired(self) -> int:
+        """Remove entradas expiradas (a leitura também expira sob demanda)"""
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at, _) in self.cache.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    # --------------------------------------------------------------- API sync
 
     def get(
         self,
@@ -194,7 +651,7 @@ class CacheManager:
         max_tokens: Optional[int],
     ) -> Optional[Any]:
         """
-        Get cached response
+        Get cached response (somente nível em memória)
 
         Returns:
             Cached response if found and not expired, None otherwise
@@ -202,23 +659,12 @@ class CacheManager:
         if not llm_settings.enable_caching:
             return None
 
-        key = self._generate_cache_key(model, messages, temperature, max_tokens)
-
-        if key in self.cache:
-            response, timestamp = self.cache[key]
-
-            # Check if expired
-            if datetime.now() - timestamp < timedelta(seconds=self.ttl_seconds):
-                self.hits += 1
-                logger.debug(f"Cache hit for key {key[:8]}...")
-                return response
-            else:
-                # Remove expired entry
-                del self.cache[key]
-                logger.debug(f"Cache expired for key {key[:8]}...")
-
-        self.misses += 1
-        return None
+        value = self._get_local(self._generate_cache_key(model, messages, temperature, max_tokens))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
 
     def set(
         self,
@@ -233,45 +679,324 @@ class CacheManager:
             return
 
         key = self._generate_cache_key(model, messages, temperature, max_tokens)
-        self.cache[key] = (response, datetime.now())
+        self._set_local(key, response)
         logger.debug(f"Cached response for key {key[:8]}...")
 
+    # -------------------------------------------------------------- API async
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Retorna ``(valor, origem)`` com origem em memory/store/coalesced/computed
+
+        ``compute`` só é chamado se a chave não estiver em nenhum nível nem
+        já estiver sendo calculada por outra chamada. ``cacheable(valor)``
+        falso: o valor é devolvido (também às chamadas coalescidas) sem ser
+        gravado nesta chave.
+        """
+        value = self._get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value, "memory"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                value = await asyncio.shield(inflight)
+                self.coalesced += 1
+                return value, "coalesced"
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # A chamada líder foi cancelada: esta segue por conta própria
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._get_store(key)
+            source = "store"
+            if value is not None:
+                self.store_hits += 1
+                self._set_local(key, value)
+            else:
+                self.misses += 1
+                value = await compute()
+                source = "computed"
+                if cacheable is None or cacheable(value):
+                    await self.put(key, value)
+            future.set_result(value)
+            return value, source
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Quem aguarda recebe o erro; evita aviso de exceção não lida
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Grava nos dois níveis"""
+        self._set_local(key, value)
+        await self._set_store(key, value)
+
+    async def _get_store(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.store:
+            return None
+        try:
+            return await self.store.get(key)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning(f"LLM cache store read failed: {e}")
+            return None
+
+    async def _set_store(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.store:
+            return
+        try:
+            await self.store.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning(f"LLM cache store write failed: {e}")
+
     def clear(self) -> None:
-        """Clear all cached responses"""
+        """Clear all cached responses (nível em memória)"""
         self.cache.clear()
+        self.bytes = 0
         logger.info("Cache cleared")
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        total_requests = self.hits + self.misses
-        hit_rate = (self.hits / total_requests * 100) if total_requests > 0 else 0
+        total_requests = self.hits + self.store_hits + self.coalesced + self.misses
+        served = total_requests - self.misses
+        hit_rate = (served / total_requests * 100) if total_requests > 0 else 0
 
         return {
             "hits": self.hits,
+            "store_hits": self.store_hits,
+            "coalesced": self.coalesced,
             "misses": self.misses,
             "total_requests": total_requests,
             "hit_rate_percent": round(hit_rate, 2),
             "cache_size": len(self.cache),
+            "cache_bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "inflight": len(self._inflight),
+            "store_enabled": self.store is not None,
+            "store_errors": self.store_errors,
         }
 
 
-class MetricsCollector:
+# Limites dos buckets de latência (ms): progressão geométrica 5ms → ~285s
+LATENCY_BUCKETS_MS: Tuple[float, ...] = tuple(float(round(5 * 1.5**i)) for i in range(28))
+
+# Rótulos de uma série de métricas
+METRIC_LABELS = ("model", "provider", "agent", "endpoint")
+
+_metric_labels: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar(
+    "llm_metric_labels", default={}
+)
+
+
+@contextmanager
+def metrics_labels(**labels: Any):
     """
-    LLM metrics collection
+    Define rótulos (agent, endpoint) para as chamadas LLM feitas no bloco
+
+    Os rótulos se propagam para tasks filhas via contextvars; rótulos
+    passados explicitamente a ``record_request`` têm precedência. Um valor
+    pode ser um callable, resolvido só no momento do registro.
+    """
+    current = _metric_labels.get()
+    token = _metric_labels.set({**current, **{k: v for k, v in labels.items() if v}})
+    try:
+        yield
+    finally:
+        _metric_labels.reset(token)
+
+
+def provider_for_model(model: str) -> str:
+    """Provedor de um modelo (config quando conhecido, senão pelo prefixo)"""
+    try:
+        return get_model_config(model).provider.value
+    except ValueError:
+        pass
+    name = model.lower()
+    if name.startswith("gemini"):
+        return "google"
+    if name.startswith("claude"):
+        return "anthropic"
+    if name.startswith(("gpt", "o1", "o3", "text-embedding")):
+        return "openai"
+    return "unknown"
+
+
+class LatencyHistogram:
+    """
+    Histograma de latência com memória fixa
 
-    Collects and aggregates metrics for monitoring and cost tracking.
+    Buckets cumulativos no formato Prometheus; percentis são estimados por
+    interpolação linear dentro do bucket (erro limitado pela largura dele).
     """
 
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # último bucket = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Percentil ``q`` (0-100) estimado"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(estimate, self.max)
+            seen += bucket_count
+        return self.max
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def copy(self) -> "LatencyHistogram":
+        clone = LatencyHistogram(self.bounds)
+        clone.counts = list(self.counts)
+        clone.count = self.count
+        clone.sum = self.sum
+        clone.max = self.max
+        return clone
+
+    def minus(self, previous: Optional["LatencyHistogram"]) -> "LatencyHistogram":
+        """Diferença em relação a um snapshot anterior (para rollups)"""
+        delta = self.copy()
+        if previous is not None:
+            delta.counts = [a - b for a, b in zip(self.counts, previous.counts)]
+            delta.count -= previous.count
+            delta.sum -= previous.sum
+        return delta
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.mean(), 2),
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+class _SeriesStats:
+    """Contadores e histogramas de uma combinação de rótulos"""
+
+    __slots__ = (
+        "requests",
+        "errors",
+        "input_tokens",
+        "output_tokens",
+        "cost_usd",
+        "service",
+        "queue",
+    )
+
     def __init__(self):
-        self.request_count: Dict[str, int] = defaultdict(int)
-        self.token_usage: Dict[str, Dict[str, int]] = defaultdict(
-            lambda: {"input": 0, "output": 0, "total": 0}
-        )
-        self.costs: Dict[str, float] = defaultdict(float)
-        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.requests = 0
         self.errors: Dict[str, int] = defaultdict(int)
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cost_usd = 0.0
+        self.service = LatencyHistogram()
+        self.queue = LatencyHistogram()
+
+    def copy(self) -> "_SeriesStats":
+        clone = _SeriesStats()
+        clone.requests = self.requests
+        clone.errors = defaultdict(int, self.errors)
+        clone.input_tokens = self.input_tokens
+        clone.output_tokens = self.output_tokens
+        clone.cost_usd = self.cost_usd
+        clone.service = self.service.copy()
+        clone.queue = self.queue.copy()
+        return clone
+
+
+def _prometheus_labels(labels: Dict[str, str]) -> str:
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsCollector:
+    """
+    LLM metrics collection
+
+    Séries por (model, provider, agent, endpoint) com memória fixa:
+    contadores de requisições, tokens, custo e erros por classe, e
+    histogramas de tempo de serviço e de espera em fila. O número de séries
+    é limitado (excedentes caem em rótulos "other").
+    """
+
+    def __init__(self, max_series: int = 500):
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], _SeriesStats] = {}
+        self._rollup_snapshot: Dict[Tuple[str, ...], _SeriesStats] = {}
+        self._rollup_started = datetime.utcnow()
+        self._rollup_pending: Optional[Tuple[datetime, Dict[Tuple[str, ...], _SeriesStats]]] = None
+        self._unpriced_models: set = set()
         self.start_time = datetime.now()
 
+    def _labels_for(self, model: str, labels: Dict[str, Optional[str]]) -> Tuple[str, ...]:
+        context = {
+            name: value() if callable(value) else value
+            for name, value in _metric_labels.get().items()
+        }
+        key = (
+            model,
+            labels.get("provider") or provider_for_model(model),
+            labels.get("agent") or context.get("agent") or "none",
+            labels.get("endpoint") or context.get("endpoint") or "none",
+        )
+        if key not in self._series and len(self._series) >= self.max_series:
+            key = (model, key[1], "other", "other")
+        return key
+
+    def _cost(self, model: str, input_tokens: int, output_tokens: int) -> float:
+        try:
+            config = get_model_config(model)
+        except ValueError:
+            if model not in self._unpriced_models:
+                self._unpriced_models.add(model)
+                logger.warning(f"Could not calculate cost for model {model}")
+            return 0.0
+        return (input_tokens / 1000) * config.cost_per_1k_input_tokens + (
+            output_tokens / 1000
+        ) * config.cost_per_1k_output_tokens
+
     def record_request(
         self,
         model: str,
@@ -279,6 +1004,11 @@ class MetricsCollector:
         output_tokens: int,
         latency_ms: float,
         success: bool = True,
+        provider: Optional[str] = None,
+        agent: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        queue_ms: Optional[float] = None,
+        error_type: Optional[str] = None,
     ) -> None:
         """
         Record LLM request metrics
@@ -287,60 +1017,98 @@ class MetricsCollector:
             model: Model name
             input_tokens: Number of input tokens
             output_tokens: Number of output tokens
-            latency_ms: Request latency in milliseconds
+            latency_ms: Service time in milliseconds (excluding queue wait)
             success: Whether request succeeded
+            provider: Provider (derived from the model when omitted)
+            agent: Calling agent (defaults to the metrics_labels context)
+            endpoint: API route (defaults to the metrics_labels context)
+            queue_ms: Time waiting for a concurrency slot, when applicable
+            error_type: Error class for failed requests
         """
-        self.request_count[model] += 1
-
-        if success:
-            # Update token usage
-            self.token_usage[model]["input"] += input_tokens
-            self.token_usage[model]["output"] += output_tokens
-            self.token_usage[model]["total"] += input_tokens + output_tokens
+        key = self._labels_for(model, {"provider": provider, "agent": agent, "endpoint": endpoint})
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _SeriesStats()
 
-            # Calculate cost
-            try:
-                config = get_model_config(model)
-                input_cost = (input_tokens / 1000) * config.cost_per_1k_input_tokens
-                output_cost = (output_tokens / 1000) * config.cost_per_1k_output_tokens
-                self.costs[model] += input_cost + output_cost
-            except ValueError:
-                logger.warning(f"Could not calculate cost for model {model}")
+        series.requests += 1
+        if queue_ms is not None:
+            series.queue.observe(queue_ms)
 
-            # Record latency
-            self.latencies[model].append(latency_ms)
-            if len(self.latencies[model]) > 1000:
-                self.latencies[model] = self.latencies[model][-1000:]
+        if success:
+            series.input_tokens += input_tokens
+            series.output_tokens += output_tokens
+            series.cost_usd += self._cost(model, input_tokens, output_tokens)
+            series.service.observe(latency_ms)
         else:
-            self.errors[model] += 1
+            series.errors[error_type or "unknown"] += 1
+
+    def _aggregate(self, label: str) -> Dict[str, Dict[str, Any]]:
+        """Agrega as séries por um rótulo (model, agent, ...)"""
+        index = METRIC_LABELS.index(label)
+        grouped: Dict[str, _SeriesStats] = {}
+        for key, series in self._series.items():
+            target = grouped.get(key[index])
+            if target is None:
+                grouped[key[index]] = series.copy()
+                continue
+            target.requests += series.requests
+            for error_type, count in series.errors.items():
+                target.errors[error_type] += count
+            target.input_tokens += series.input_tokens
+            target.output_tokens += series.output_tokens
+            target.cost_usd += series.cost_usd
+            for name in ("service", "queue"):
+                merged, other = getattr(target, name), getattr(series, name)
+                merged.counts = [a + b for a, b in zip(merged.counts, other.counts)]
+                merged.count += other.count
+                merged.sum += other.sum
+                merged.max = max(merged.max, other.max)
+        return {name: self._series_summary(series) for name, series in grouped.items()}
+
+    @staticmethod
+    def _series_summary(series: _SeriesStats) -> Dict[str, Any]:
+        errors = sum(series.errors.values())
+        return {
+            "requests": series.requests,
+            "tokens": {
+                "input": series.input_tokens,
+                "output": series.output_tokens,
+                "total": series.input_tokens + series.output_tokens,
+            },
+            "cost_usd": round(series.cost_usd, 4),
+            "avg_latency_ms": round(series.service.mean(), 2),
+            "latency_ms": series.service.summary(),
+            "queue_wait_ms": series.queue.summary(),
+            "errors": errors,
+            "errors_by_type": dict(series.errors),
+            "error_rate_percent": (
+                round(errors / series.requests * 100, 2) if series.requests else 0.0
+            ),
+        }
 
     def get_total_cost(self) -> float:
         """Get total cost across all models"""
-        return sum(self.costs.values())
+        return sum(series.cost_usd for series in self._series.values())
 
     def get_total_tokens(self) -> int:
         """Get total tokens across all models"""
-        return sum(usage["total"] for usage in self.token_usage.values())
+        return sum(s.input_tokens + s.output_tokens for s in self._series.values())
 
     def get_average_latency(self, model: Optional[str] = None) -> float:
         """Get average latency for model or all models"""
-        if model:
-            latencies = self.latencies.get(model, [])
-        else:
-            latencies = [lat for lats in self.latencies.values() for lat in lats]
-
-        if not latencies:
-            return 0.0
-        return sum(latencies) / len(latencies)
+        histograms = [
+            series.service
+            for key, series in self._series.items()
+            if model is None or key[0] == model
+        ]
+        count = sum(h.count for h in histograms)
+        return sum(h.sum for h in histograms) / count if count else 0.0
 
     def get_error_rate(self, model: Optional[str] = None) -> float:
         """Get error rate as percentage"""
-        if model:
-            total = self.request_count.get(model, 0)
-            errors = self.errors.get(model, 0)
-        else:
-            total = sum(self.request_count.values())
-            errors = sum(self.errors.values())
+        selected = [s for k, s in self._series.items() if model is None or k[0] == model]
+        total = sum(s.requests for s in selected)
+        errors = sum(sum(s.errors.values()) for s in selected)
 
         if total == 0:
             return 0.0
@@ -352,40 +1120,182 @@ class MetricsCollector:
 
         return {
             "uptime_seconds": uptime,
-            "total_requests": sum(self.request_count.values()),
+            "total_requests": sum(s.requests for s in self._series.values()),
             "total_tokens": self.get_total_tokens(),
             "total_cost_usd": round(self.get_total_cost(), 4),
             "average_latency_ms": round(self.get_average_latency(), 2),
             "error_rate_percent": round(self.get_error_rate(), 2),
-            "by_model": {
-                model: {
-                    "requests": self.request_count[model],
-                    "tokens": self.token_usage[model],
-                    "cost_usd": round(self.costs[model], 4),
-                    "avg_latency_ms": round(self.get_average_latency(model), 2),
-                    "errors": self.errors[model],
-                    "error_rate_percent": round(self.get_error_rate(model), 2),
-                }
-                for model in self.request_count.keys()
-            },
+            "series": len(self._series),
+            "by_model": self._aggregate("model"),
+            "by_provider": self._aggregate("provider"),
+            "by_agent": self._aggregate("agent"),
+            "by_endpoint": self._aggregate("endpoint"),
         }
 
+    def render_prometheus(self, prefix: str = "osprey_llm") -> str:
+        """Exporta as métricas no formato texto do Prometheus"""
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        series = [(dict(zip(METRIC_LABELS, key)), stats) for key, stats in self._series.items()]
+
+        header("requests_total", "counter", "LLM requests")
+        for labels, stats in series:
+            lines.append(f"{prefix}_requests_total{_prometheus_labels(labels)} {stats.requests}")
+
+        header("errors_total", "counter", "Failed LLM requests by error class")
+        for labels, stats in series:
+            for error_type, count in stats.errors.items():
+                error_labels = _prometheus_labels({**labels, "error_type": error_type})
+                lines.append(f"{prefix}_errors_total{error_labels} {count}")
+
+        header("tokens_total", "counter", "Tokens consumed")
+        for labels, stats in series:
+            for direction, count in (
+                ("input", stats.input_tokens),
+                ("output", stats.output_tokens),
+            ):
+                token_labels = _prometheus_labels({**labels, "direction": direction})
+                lines.append(f"{prefix}_tokens_total{token_labels} {count}")
+
+        header("cost_usd_total", "counter", "Estimated cost in USD")
+        for labels, stats in series:
+            cost = f"{stats.cost_usd:.6f}"
+            lines.append(f"{prefix}_cost_usd_total{_prometheus_labels(labels)} {cost}")
+
+        for name, attr, help_text in (
+            ("service_seconds", "service", "Provider service time"),
+            ("queue_wait_seconds", "queue", "Time waiting for a concurrency slot"),
+        ):
+            header(name, "histogram", help_text)
+            for labels, stats in series:
+                histogram: LatencyHistogram = getattr(stats, attr)
+                if not histogram.count:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound / 1000:g}"
+                    bucket_labels = _prometheus_labels({**labels, "le": le})
+                    lines.append(f"{prefix}_{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(
+                    f"{prefix}_{name}_sum{_prometheus_labels(labels)} {histogram.sum / 1000:.6f}"
+                )
+                lines.append(f"{prefix}_{name}_count{_prometheus_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def rollup(self) -> List[Dict[str, Any]]:
+        """
+        Documentos com o delta de cada série desde o último rollup
+
+        Usado pelo flush periódico para o MongoDB; séries sem atividade no
+        intervalo são omitidas. O snapshot só avança em ``commit_rollup``:
+        se a gravação falhar, o próximo rollup inclui estes deltas.
+        """
+        now = datetime.utcnow()
+        docs = []
+        snapshot = {}
+        for key, series in self._series.items():
+            previous = self._rollup_snapshot.get(key)
+            requests = series.requests - (previous.requests if previous else 0)
+            if requests <= 0:
+                continue
+            errors = {
+                error_type: count - (previous.errors.get(error_type, 0) if previous else 0)
+                for error_type, count in series.errors.items()
+            }
+            service = series.service.minus(previous.service if previous else None)
+            queue = series.queue.minus(previous.queue if previous else None)
+            docs.append(
+                {
+                    **dict(zip(METRIC_LABELS, key)),
+                    "period_start": self._rollup_started,
+                    "period_end": now,
+                    "requests": requests,
+                    "errors": {k: v for k, v in errors.items() if v},
+                    "input_tokens": series.input_tokens
+                    - (previous.input_tokens if previous else 0),
+                    "output_tokens": series.output_tokens
+                    - (previous.output_tokens if previous else 0),
+                    "cost_usd": round(series.cost_usd - (previous.cost_usd if previous else 0), 6),
+                    "latency_ms": {**service.summary(), "buckets": service.counts},
+                    "queue_wait_ms": queue.summary(),
+                }
+            )
+            snapshot[key] = series.copy()
+        self._rollup_pending = (now, snapshot)
+        return docs
+
+    def commit_rollup(self) -> None:
+        """Marca o último rollup como persistido"""
+        if self._rollup_pending is None:
+            return
+        now, snapshot = self._rollup_pending
+        self._rollup_snapshot.update(snapshot)
+        self._rollup_started = now
+        self._rollup_pending = None
+
     def reset(self) -> None:
         """Reset all metrics"""
-        self.request_count.clear()
-        self.token_usage.clear()
-        self.costs.clear()
-        self.latencies.clear()
-        self.errors.clear()
+        self._series.clear()
+        self._rollup_snapshot.clear()
+        self._rollup_pending = None
+        self._rollup_started = datetime.utcnow()
         self.start_time = datetime.now()
         logger.info("Metrics reset")
 
 
+class MongoMetricsSink:
+    """
+    Persistência dos rollups de métricas LLM (MongoDB)
+
+    Um documento por série e intervalo em ``llm_metrics_rollups``; a
+    retenção fica a cargo do índice TTL em ``period_end`` (core.database).
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def write(self, docs: List[Dict[str, Any]]) -> None:
+        if docs:
+            await self.collection.insert_many(docs, ordered=False)
+
+
+async def run_metrics_rollups(
+    collector: "MetricsCollector", sink: MongoMetricsSink, interval_seconds: int = 60
+) -> None:
+    """Loop de flush periódico dos rollups (executar como task de background)"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        docs = collector.rollup()
+        try:
+            await sink.write(docs)
+        except Exception as e:
+            # Deltas não gravados entram no próximo intervalo
+            logger.warning(f"Failed to persist {len(docs)} LLM metric rollups: {e}")
+            continue
+        collector.commit_rollup()
+
+
 # Global instances
-provider_router = ProviderRouter()
+circuit_breaker = CircuitBreaker()
+provider_router = ProviderRouter(circuit_breaker=circuit_breaker)
 fallback_chain = FallbackChain()
-cache_manager = CacheManager(ttl_seconds=llm_settings.portkey_config.cache_ttl)
-metrics_collector = MetricsCollector()
+cache_manager = CacheManager(
+    ttl_seconds=llm_settings.portkey_config.cache_ttl,
+    max_entries=llm_settings.cache_max_entries,
+    max_bytes=llm_settings.cache_max_bytes,
+)
+metrics_collector = MetricsCollector(max_series=llm_settings.metrics_max_series)
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get global circuit breaker instance (shared by all LLM clients)"""
+    return circuit_breaker
 
 
 def get_provider_router() -> ProviderRouter:
@@ -8,11 +8,11 @@ and multi-provider routing.
 import asyncio
 import logging
 import os
-from datetime import datetime
+import time
 from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 try:
-    from portkey_ai import Portkey
+    from portkey_ai import AsyncPortkey
 
     PORTKEY_AVAILABLE = True
 except ImportError:
@@ -27,6 +27,18 @@ from .exceptions import (
     LLMTimeoutError,
     PromptNotFoundError,
 )
+from .helpers import (
+    CacheManager,
+    CircuitBreaker,
+    call_with_routing,
+    get_cache_manager,
+    get_circuit_breaker,
+    get_fallback_chain,
+    get_metrics_collector,
+    get_provider_router,
+    llm_settings,
+    provider_for_model,
+)
 from .types import (
     ChatMessage,
     LLMResponse,
@@ -36,78 +48,6 @@ from .types import (
 logger = logging.getLogger(__name__)
 
 
-class CircuitBreaker:
-    """
-    Circuit breaker for failing providers
-
-    Prevents cascading failures by temporarily disabling providers
-    that are experiencing repeated errors.
-    """
-
-    def __init__(
-        self, failure_threshold: int = 5, timeout_seconds: int = 60, half_open_attempts: int = 1
-    ):
-        self.failure_threshold = failure_threshold
-        self.timeout_seconds = timeout_seconds
-        self.half_open_attempts = half_open_attempts
-
-        self._failure_count: Dict[str, int] = {}
-        self._last_failure_time: Dict[str, datetime] = {}
-        self._state: Dict[str, str] = {}  # "closed", "open", "half_open"
-        self._half_open_count: Dict[str, int] = {}
-
-    def record_success(self, provider: str) -> None:
-        """Record successful call"""
-        self._failure_count[provider] = 0
-        self._state[provider] = "closed"
-        self._half_open_count[provider] = 0
-
-    def record_failure(self, provider: str) -> None:
-        """Record failed call"""
-        self._failure_count[provider] = self._failure_count.get(provider, 0) + 1
-        self._last_failure_time[provider] = datetime.now()
-
-        if self._failure_count[provider] >= self.failure_threshold:
-            self._state[provider] = "open"
-            logger.warning(
-                f"Circuit breaker opened for provider {provider} "
-                f"after {self._failure_count[provider]} failures"
-            )
-
-    def can_attempt(self, provider: str) -> bool:
-        """Check if provider can be attempted"""
-        state = self._state.get(provider, "closed")
-
-        if state == "closed":
-            return True
-
-        if state == "open":
-            # Check if timeout has elapsed
-            last_failure = self._last_failure_time.get(provider)
-            if last_failure:
-                elapsed = (datetime.now() - last_failure).total_seconds()
-                if elapsed >= self.timeout_seconds:
-                    self._state[provider] = "half_open"
-                    self._half_open_count[provider] = 0
-                    logger.info(f"Circuit breaker entering half-open state for {provider}")
-                    return True
-            return False
-
-        if state == "half_open":
-            # Allow limited attempts in half-open state
-            count = self._half_open_count.get(provider, 0)
-            if count < self.half_open_attempts:
-                self._half_open_count[provider] = count + 1
-                return True
-            return False
-
-        return False
-
-    def get_state(self, provider: str) -> str:
-        """Get current circuit breaker state"""
-        return self._state.get(provider, "closed")
-
-
 class LLMClient:
     """
     Unified LLM client with Portkey integration
@@ -130,6 +70,7 @@ class LLMClient:
         timeout: float = 60.0,
         enable_circuit_breaker: bool = True,
         fallback_to_openai: bool = True,
+        response_cache: Optional[CacheManager] = None,
     ):
         """
         Initialize LLM client
@@ -143,6 +84,7 @@ class LLMClient:
             timeout: Request timeout in seconds
             enable_circuit_breaker: Enable circuit breaker for failing providers
             fallback_to_openai: If True, fall back to direct OpenAI when Portkey unavailable
+            response_cache: Response cache (defaults to the shared CacheManager)
         """
         self.api_key = api_key or os.getenv("PORTKEY_API_KEY")
         self.fallback_mode = False
@@ -218,14 +160,24 @@ class LLMClient:
             if base_url:
                 portkey_kwargs["base_url"] = base_url
 
-            self.portkey = Portkey(**portkey_kwargs)
+            # Cliente assíncrono: a chamada não bloqueia o event loop (hedge e
+            # timeouts do roteamento dependem disso)
+            self.portkey = AsyncPortkey(**portkey_kwargs)
             self.openai_client = None
             logger.info("LLMClient initialized with Portkey integration")
 
-        # Circuit breaker
-        self.circuit_breaker = CircuitBreaker() if enable_circuit_breaker else None
+        # Circuit breaker (compartilhado com o ClaudeClient) e roteamento adaptativo
+        self.circuit_breaker: Optional[CircuitBreaker] = (
+            get_circuit_breaker() if enable_circuit_breaker else None
+        )
+        self.router = get_provider_router()
+
+        # Response cache (opt-in por chamada, ver chat_completion(cache=True))
+        self.response_cache = response_cache or get_cache_manager()
 
         # Metrics
+        self.metrics_collector = get_metrics_collector()
+        self._cache_served_requests = 0
         self._total_requests = 0
         self._total_tokens = 0
         self._total_cost = 0.0
@@ -241,6 +193,8 @@ class LLMClient:
         presence_penalty: Optional[float] = None,
         stop: Optional[List[str]] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        cache: bool = False,
+        hedge: bool = False,
         **kwargs,
     ) -> LLMResponse:
         """
@@ -256,6 +210,11 @@ class LLMClient:
             presence_penalty: Presence penalty (-2.0 to 2.0)
             stop: Stop sequences
             metadata: Additional metadata for tracking
+            cache: Reuse responses for identical requests. Only honored for
+                deterministic calls (temperature <= cache_max_temperature)
+            hedge: For latency-critical calls: if the best model does not
+                answer within its recent p95, also fire the next model in
+                the fallback chain and take the first answer
             **kwargs: Additional provider-specific parameters
 
         Returns:
@@ -275,15 +234,6 @@ class LLMClient:
             else:
                 formatted_messages.append(msg)
 
-        # Check circuit breaker
-        if self.circuit_breaker and not self.circuit_breaker.can_attempt(model):
-            raise LLMCircuitBreakerError(
-                f"Circuit breaker open for model {model}",
-                provider=model.split("-")[0] if "-" in model else "unknown",
-                failure_count=self.circuit_breaker._failure_count.get(model, 0),
-                threshold=self.circuit_breaker.failure_threshold,
-            )
-
         # Build request parameters
         request_params = {
             "model": model,
@@ -309,13 +259,117 @@ class LLMClient:
         # Add any additional kwargs
         request_params.update(kwargs)
 
+        if cache and self._is_cacheable(request_params):
+            return await self._cached_chat_completion(model, request_params, hedge)
+
+        return await self._routed_chat_completion(model, request_params, hedge)
+
+    async def _routed_chat_completion(
+        self, model: str, request_params: Dict[str, Any], hedge: bool = False
+    ) -> LLMResponse:
+        """
+        Escolhe o modelo pela saúde atual e faz failover pela cadeia de fallback
+
+        O modelo pedido vai primeiro (com os retries normais) enquanto não
+        estiver degradado; os alternativos recebem uma única tentativa cada e
+        só entram em falha ou como hedge.
+        """
+        chain = [model]
+        if llm_settings.enable_fallbacks:
+            # Sem Portkey só há cliente OpenAI
+            allowed = ["openai"] if self.fallback_mode else None
+            chain = get_fallback_chain().get_routed_chain(model, allowed_providers=allowed)
+        if len(chain) == 1 and not hedge:
+            return await self._chat_completion_with_retries(model, request_params)
+
+        async def attempt(candidate: str) -> LLMResponse:
+            return await self._chat_completion_with_retries(
+                candidate,
+                {**request_params, "model": candidate},
+                max_attempts=None if candidate == model else 1,
+                check_breaker=False,
+            )
+
+        response, used_model = await call_with_routing(
+            attempt, chain, hedge=hedge, track_health=False, router=self.router
+        )
+        if used_model != model:
+            response.metadata = {
+                **response.metadata,
+                "requested_model": model,
+                "answered_by": used_model,
+            }
+        return response
+
+    def _is_cacheable(self, request_params: Dict[str, Any]) -> bool:
+        """Só chamadas determinísticas e não-streaming entram no cache"""
+        return (
+            llm_settings.enable_caching
+            and not request_params.get("stream")
+            and request_params["temperature"] <= llm_settings.cache_max_temperature
+        )
+
+    async def _cached_chat_completion(
+        self, model: str, request_params: Dict[str, Any], hedge: bool = False
+    ) -> LLMResponse:
+        """chat_completion via cache (LRU/TTL + Mongo opcional, com single-flight)"""
+        sampling = {
+            k: v for k, v in request_params.items() if k not in ("model", "messages", "metadata")
+        }
+        key = self.response_cache.make_key(model, request_params["messages"], sampling)
+
+        def answered_by_requested(value: Dict[str, Any]) -> bool:
+            return "requested_model" not in (value.get("metadata") or {})
+
+        async def compute() -> Dict[str, Any]:
+            response = await self._routed_chat_completion(model, request_params, hedge)
+            value = response.model_dump(mode="json")
+            if not answered_by_requested(value):
+                # Resposta de um fallback: fica na chave do modelo que respondeu
+                used_key = self.response_cache.make_key(
+                    value["metadata"]["answered_by"], request_params["messages"], sampling
+                )
+                await self.response_cache.put(used_key, value)
+            return value
+
+        value, source = await self.response_cache.get_or_compute(
+            key, compute, cacheable=answered_by_requested
+        )
+        response = LLMResponse(**value)
+        if source != "computed":
+            self._cache_served_requests += 1
+            response.metadata = {**response.metadata, "cache_hit": True, "cache_source": source}
+        return response
+
+    async def _chat_completion_with_retries(
+        self,
+        model: str,
+        request_params: Dict[str, Any],
+        max_attempts: Optional[int] = None,
+        check_breaker: bool = True,
+    ) -> LLMResponse:
+        """
+        Executa a chamada ao provedor com circuit breaker e retries
+
+        ``check_breaker=False`` quando o chamador (call_with_routing) já
+        reservou a tentativa no circuit breaker.
+        """
+        max_attempts = max_attempts or self.max_retries
+        # Check circuit breaker
+        if check_breaker and self.circuit_breaker and not self.circuit_breaker.can_attempt(model):
+            raise LLMCircuitBreakerError(
+                f"Circuit breaker open for model {model}",
+                provider=provider_for_model(model),
+                failure_count=self.circuit_breaker._failure_count.get(model, 0),
+                threshold=self.circuit_breaker.failure_threshold,
+            )
+
         # Execute with retry logic
         last_exception = None
-        for attempt in range(self.max_retries):
+        for attempt in range(max_attempts):
+            started = time.perf_counter()
             try:
-                logger.debug(
-                    f"LLM request attempt {attempt + 1}/{self.max_retries} " f"to model {model}"
-                )
+                logger.debug(f"LLM request attempt {attempt + 1}/{max_attempts} to model {model}")
 
                 response = await asyncio.wait_for(
                     self._execute_chat_completion(request_params), timeout=self.timeout
@@ -329,6 +383,14 @@ class LLMClient:
                 self._total_requests += 1
                 if hasattr(response, "usage"):
                     self._total_tokens += response.usage.total_tokens
+                latency_ms = (time.perf_counter() - started) * 1000
+                self.router.record_result(model, latency_ms, success=True)
+                self.metrics_collector.record_request(
+                    model,
+                    response.usage.prompt_tokens,
+                    response.usage.completion_tokens,
+                    latency_ms,
+                )
 
                 return response
 
@@ -339,9 +401,15 @@ class LLMClient:
                     model=model,
                 )
                 logger.warning(f"Timeout on attempt {attempt + 1}: {e}")
+                self._record_failure_metrics(model, started, last_exception)
+
+                # Timeout também conta para o circuit breaker
+                if self.circuit_breaker:
+                    self.circuit_breaker.record_failure(model)
 
             except Exception as e:
                 last_exception = self._handle_exception(e, model, attempt)
+                self._record_failure_metrics(model, started, last_exception)
 
                 # Record failure for circuit breaker
                 if self.circuit_breaker:
@@ -352,13 +420,13 @@ class LLMClient:
                     break
 
                 # Exponential backoff
-                if attempt < self.max_retries - 1:
+                if attempt < max_attempts - 1:
                     backoff_time = min(2**attempt, 10)  # Max 10 seconds
                     logger.info(f"Retrying in {backoff_time}s...")
                     await asyncio.sleep(backoff_time)
 
         # All retries exhausted
-        logger.error(f"All {self.max_retries} retry attempts failed")
+        logger.error(f"All {max_attempts} attempts to model {model} failed")
         raise last_exception
 
     async def _execute_chat_completion(self, request_params: Dict[str, Any]) -> LLMResponse:
@@ -369,7 +437,7 @@ class LLMClient:
                 response = await self.openai_client.chat.completions.create(**request_params)
             else:
                 # Use Portkey client
-                response = self.portkey.chat.completions.create(**request_params)
+                response = await self.portkey.chat.completions.create(**request_params)
 
             # Extract response data
             choice = response.choices[0]
@@ -459,8 +527,8 @@ class LLMClient:
                             yield delta.content
             else:
                 # Use Portkey streaming
-                stream = self.portkey.chat.completions.create(**request_params)
-                for chunk in stream:
+                stream = await self.portkey.chat.completions.create(**request_params)
+                async for chunk in stream:
                     if chunk.choices and len(chunk.choices) > 0:
                         delta = chunk.choices[0].delta
                         if hasattr(delta, "content") and delta.content:
@@ -513,7 +581,7 @@ class LLMClient:
 
             request_params.update(kwargs)
 
-            response = self.portkey.prompts.completions.create(**request_params)
+            response = await self.portkey.prompts.completions.create(**request_params)
 
             # Extract response data
             choice = response.choices[0]
@@ -574,6 +642,20 @@ class LLMClient:
             details={"attempt": attempt + 1, "error": str(exception)},
         )
 
+    def _record_failure_metrics(
+        self, model: str, started: float, exception: LLMException
+    ) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.router.record_result(model, latency_ms, success=False)
+        self.metrics_collector.record_request(
+            model,
+            0,
+            0,
+            latency_ms,
+            success=False,
+            error_type=type(exception).__name__,
+        )
+
     def _should_retry(self, exception: LLMException, attempt: int) -> bool:
         """Determine if request should be retried"""
         # Don't retry on last attempt
@@ -597,6 +679,8 @@ class LLMClient:
             "total_requests": self._total_requests,
             "total_tokens": self._total_tokens,
             "total_cost": self._total_cost,
+            "cache_served_requests": self._cache_served_requests,
+            "cache": self.response_cache.get_stats(),
             "circuit_breaker_states": (
                 {
                     provider: self.circuit_breaker.get_state(provider)
@@ -605,4 +689,5 @@ class LLMClient:
                 if self.circuit_breaker
                 else {}
             ),
+            "routing": self.router.get_routing_stats(),
         }
@@ -0,0 +1,229 @@
+"""
+Prompt Assembly - montagem de prompts com orçamento de tokens
+
+- Histórico recortado a um orçamento de tokens; turnos antigos são
+  condensados num resumo incremental guardado na conversa
+- Cache de contexto do provedor (Gemini explicit caching) para prefixos
+  estáveis: system prompt + schema de ferramentas
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import google.generativeai as genai
+    from google.generativeai import caching as genai_caching
+
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Status HTTP que indicam que o modelo/prefixo não aceita context caching;
+# cota (429) e erros 5xx/timeouts são transitórios e só pulam esta chamada
+CACHE_UNSUPPORTED_STATUS = {400, 404, 501}
+
+# Heurística de tokens (~4 caracteres por token em PT/EN)
+CHARS_PER_TOKEN = 4
+
+SUMMARY_MAX_TOKENS = 400
+
+SUMMARY_PROMPT = """Você mantém o resumo de uma conversa entre um advogado de imigração e o
+Chief of Staff (assistente) do escritório. Atualize o resumo anterior incorporando os novos
+turnos. Preserve fatos operacionais: casos e clientes citados, prazos, decisões, instruções
+pendentes e o que já foi executado. Seja conciso (no máximo ~{max_words} palavras), em tópicos,
+no idioma da conversa. Responda apenas com o resumo atualizado."""
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Estimativa barata de tokens (sem tokenizer do provedor)"""
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def prompt_fingerprint(*parts: Any) -> str:
+    """Hash curto de um prefixo estável (chave de cache)"""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode())
+    return digest.hexdigest()[:16]
+
+
+@dataclass
+class ChatTurn:
+    """Um turno (mensagem do usuário + resposta) da conversa"""
+
+    user: str
+    assistant: str
+    timestamp: Optional[datetime] = None
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.user) + estimate_tokens(self.assistant)
+
+
+@dataclass
+class TrimmedHistory:
+    """Histórico pronto para o provedor + turnos que ficaram de fora"""
+
+    history: List[Dict[str, Any]] = field(default_factory=list)
+    kept: List[ChatTurn] = field(default_factory=list)
+    dropped: List[ChatTurn] = field(default_factory=list)
+    tokens: int = 0
+
+
+def trim_history(
+    turns: List[ChatTurn], budget_tokens: int, summary: Optional[str] = None
+) -> TrimmedHistory:
+    """
+    Recorta o histórico ao orçamento de tokens, mantendo os turnos mais recentes
+
+    O resumo (quando existe) entra como primeiro par de mensagens e conta no
+    orçamento; os turnos mais antigos que não couberem vão em ``dropped``
+    para serem incorporados ao resumo.
+
+    Args:
+        turns: Turnos em ordem cronológica
+        budget_tokens: Orçamento total de tokens do histórico
+        summary: Resumo dos turnos anteriores a ``turns``
+
+    Returns:
+        TrimmedHistory com o histórico no formato Gemini (role/parts)
+    """
+    result = TrimmedHistory()
+    used = estimate_tokens(summary)
+
+    kept: List[ChatTurn] = []
+    for index in range(len(turns) - 1, -1, -1):
+        turn = turns[index]
+        if used + turn.tokens > budget_tokens and kept:
+            result.dropped = turns[: index + 1]
+            break
+        kept.append(turn)
+        used += turn.tokens
+    kept.reverse()
+
+    if summary:
+        result.history.append(
+            {"role": "user", "parts": [f"[Resumo da conversa até aqui]\n{summary}"]}
+        )
+        result.history.append({"role": "model", "parts": ["Entendido."]})
+    for turn in kept:
+        result.history.append({"role": "user", "parts": [turn.user]})
+        result.history.append({"role": "model", "parts": [turn.assistant]})
+
+    result.kept = kept
+    result.tokens = used
+    return result
+
+
+def build_summary_request(previous_summary: Optional[str], turns: List[ChatTurn]) -> str:
+    """Mensagem para o modelo atualizar o resumo incremental"""
+    lines = [f"RESUMO ANTERIOR:\n{previous_summary or '(nenhum)'}", "", "NOVOS TURNOS:"]
+    for turn in turns:
+        lines.append(f"Advogado: {turn.user}")
+        lines.append(f"Assistente: {turn.assistant}")
+    return "\n".join(lines)
+
+
+def summary_system_prompt() -> str:
+    return SUMMARY_PROMPT.format(max_words=int(SUMMARY_MAX_TOKENS * 0.7))
+
+
+@dataclass
+class _CachedContext:
+    cached_content: Any
+    expires_at: float
+
+
+class GeminiContextCache:
+    """
+    Cache de contexto do Gemini para prefixos estáveis (system + tools)
+
+    Cria um ``CachedContent`` por (modelo, prefixo) e reutiliza até perto do
+    TTL; prefixos abaixo do mínimo do provedor, ou quando a criação falha,
+    seguem com ``system_instruction`` normal. Só erros de "sem suporte"
+    (``CACHE_UNSUPPORTED_STATUS``) desligam o cache do prefixo de vez.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, min_tokens: int = 1024, max_entries: int = 64):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str], _CachedContext] = {}
+        self._unsupported: Set[Tuple[str, str]] = set()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_model(
+        self,
+        model_name: str,
+        system: str,
+        tools: Any = None,
+        tools_key: str = "",
+        tools_tokens: int = 0,
+    ):
+        """
+        GenerativeModel para o prefixo, a partir do cache quando possível
+
+        Args:
+            model_name: Modelo Gemini
+            system: System prompt estável
+            tools: Ferramentas (protos) estáveis
+            tools_key: Identifica a versão do schema de ferramentas
+            tools_tokens: Tokens estimados das ferramentas (somados ao system)
+        """
+        key = (model_name, prompt_fingerprint(system, tools_key))
+        if key in self._unsupported or estimate_tokens(system) + tools_tokens < self.min_tokens:
+            return genai.GenerativeModel(
+                model_name=model_name, system_instruction=system, tools=tools
+            )
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            # Margem de 5 min para não usar um cache prestes a expirar
+            if entry and entry.expires_at - 300 > time.monotonic():
+                self.hits += 1
+                return genai.GenerativeModel.from_cached_content(entry.cached_content)
+
+            self.misses += 1
+            try:
+                cached_content = await asyncio.to_thread(
+                    genai_caching.CachedContent.create,
+                    model=f"models/{model_name}",
+                    system_instruction=system,
+                    tools=tools,
+                    ttl=timedelta(seconds=self.ttl_seconds),
+                )
+            except Exception as e:
+                if getattr(e, "code", None) in CACHE_UNSUPPORTED_STATUS:
+                    logger.info(f"Context caching unsupported for {model_name}: {e}")
+                    self._unsupported.add(key)
+                else:
+                    logger.warning(f"Context caching failed for {model_name}, will retry: {e}")
+                return genai.GenerativeModel(
+                    model_name=model_name, system_instruction=system, tools=tools
+                )
+
+            if len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k].expires_at)
+                self._entries.pop(oldest, None)
+            self._entries[key] = _CachedContext(
+                cached_content, time.monotonic() + self.ttl_seconds
+            )
+            return genai.GenerativeModel.from_cached_content(cached_content)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "unsupported": len(self._unsupported),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -9,6 +9,9 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+from functools import lru_cache
+import asyncio
+import time
 import uuid
 import os
 import json
@@ -20,9 +23,30 @@ from google.generativeai.types import content_types
 from core.rate_limit import limiter
 from tools.definitions import TOOL_DECLARATIONS
 from tools.executor import execute_tool
+from backend.llm.helpers import call_with_routing, get_metrics_collector
+from backend.services.conversation_state import ConversationState, ConversationStateStore
+from backend.llm.prompt_assembly import (
+    ChatTurn,
+    GeminiContextCache,
+    build_summary_request,
+    estimate_tokens,
+    prompt_fingerprint,
+    summary_system_prompt,
+    trim_history,
+)
 
 router = APIRouter(prefix="/api/osprey-chat", tags=["osprey-chat"])
 
+# Modelo preferido + alternativo. Turnos de chat usam hedge: se o preferido
+# passar do seu p95 recente, o alternativo é disparado e vale a 1ª resposta.
+CHAT_MODELS = ["gemini-2.0-flash", "gemini-2.5-flash"]
+CHAT_ATTEMPT_TIMEOUT = 25  # segundos por tentativa (antes: sem limite)
+
+# Histórico: orçamento de tokens; o que não cabe vira resumo incremental
+CHAT_HISTORY_TOKEN_BUDGET = 6000
+CHAT_HISTORY_FETCH_LIMIT = 40  # turnos não resumidos guardados no estado da conversa
+SUMMARY_MODELS = ["gemini-2.0-flash", "gemini-2.5-flash"]
+
 # Support both key names
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') or os.environ.get('EMERGENT_LLM_KEY') or os.environ.get('GOOGLE_API_KEY')
 
@@ -35,10 +59,14 @@ else:
 # MongoDB reference
 db = None
 
+# Estado por conversa (resumo + turnos recentes); WhatsApp fica no cache quente
+conversation_store = ConversationStateStore(max_turns=CHAT_HISTORY_FETCH_LIMIT)
+
 def init_db(database):
     """Initialize database reference"""
     global db
     db = database
+    conversation_store.bind(database)
 
 
 # ============================================================================
@@ -302,80 +330,7 @@ Nunca diga que não consegue algo que está na lista acima.
 # MODELS
 # ============================================================================
 
-JWT_SECRET = os.environ.get("JWT_SECRET", "osprey-secret-key-change-in-production")
-JWT_ALGORITHM = "HS256"
-
-
-class OspreyChatMessage(BaseModel):
-    message: str
-    conversation_id: Optional[str] = None
-    user_id: Optional[str] = None
-    firm_name: Optional[str] = None
-    office_id: Optional[str] = None
-    channel: Optional[str] = "web"
-
-
-class OspreyChatResponse(BaseModel):
-    response: str
-    conversation_id: str
-    timestamp: str
-
-
-# ============================================================================
-# ENDPOINTS
-# ============================================================================
-
-@router.post("/chat", response_model=OspreyChatResponse)
-@limiter.limit("20/minute")
-@limiter.limit("200/day")
-async def osprey_legal_chat(request: Request, chat_msg: OspreyChatMessage, authorization: Optional[str] = Header(None)):
-    """
-    Chat with Osprey Legal AI — Chief of Staff for immigration attorneys.
-    Uses Google Gemini 2.0 Flash.
-    Supports optional JWT auth for multi-tenant isolation.
-    """
-    try:
-        if not GEMINI_API_KEY:
-            raise HTTPException(status_code=500, detail="Gemini API key not configured")
-
-        # Extract office_id from JWT if present
-        office_id = chat_msg.office_id
-        if authorization and authorization.startswith("Bearer "):
-            try:
-                token = authorization.replace("Bearer ", "")
-                payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-                office_id = payload.get("office_id", office_id)
-                if not chat_msg.user_id:
-                    chat_msg.user_id = payload.get("user_id")
-            except Exception:
-                pass  # Token is optional, continue without it
-
-        # Per-office daily rate limit (500 messages/day)
-        if office_id and db is not None:
-            today = datetime.utcnow().strftime("%Y-%m-%d")
-            rate_doc = await db.rate_limits.find_one({"office_id": office_id, "date": today})
-            if rate_doc and rate_doc.get("message_count", 0) >= 500:
-                return JSONResponse(
-                    status_code=429,
-                    content={"detail": "Limite diário de 500 mensagens atingido. Renova amanhã ou contate o suporte."}
-                )
-            await db.rate_limits.update_one(
-                {"office_id": office_id, "date": today},
-                {"$inc": {"message_count": 1}, "$set": {"last_request": datetime.utcnow()}},
-                upsert=True,
-            )
-
-        conversation_id = chat_msg.conversation_id or str(uuid.uuid4())
-
-        # Build system prompt with firm name if provided
-        firm_name = chat_msg.firm_name or "este escritório"
-        system = SYSTEM_PROMPT + "\n\n" + AGENT_CAPABILITIES.format(office_name=firm_name)
-        if chat_msg.firm_name:
-            system += f"\n\nYou are the Chief of Staff for {chat_msg.firm_name}."
-
-        # WhatsApp channel: attorney-facing mobile command center
-        if chat_msg.channel == "whatsapp":
-            system = """
+WHATSAPP_SYSTEM_PROMPT = """
 WHATSAPP CHANNEL — CHIEF OF STAFF PROTOCOL
 
 === IDENTITY ===
@@ -581,58 +536,233 @@ Chief of Staff: "28 active cases:
 • Other: 3
 5 cases have deadlines in the next 14 days.
 Want the full priority list?"
-""" + AGENT_CAPABILITIES.format(office_name=firm_name)
-
-        # Build conversation history from DB (filtered by office_id if available)
-        gemini_history = []
-        if chat_msg.conversation_id and db is not None:
-            history_query = {"conversation_id": conversation_id}
-            if office_id:
-                history_query["office_id"] = office_id
-            history = await db.osprey_chat_conversations.find(
-                history_query
-            ).sort("timestamp", 1).to_list(length=20)
-
-            for msg in history:
-                gemini_history.append({"role": "user", "parts": [msg.get("user_message", "")]})
-                gemini_history.append({"role": "model", "parts": [msg.get("ai_response", "")]})
+"""
 
-        # WhatsApp channel: use function calling with tools
-        is_whatsapp = chat_msg.channel == "whatsapp" and office_id and db is not None
 
-        if is_whatsapp:
-            # Build Gemini tools from declarations
-            gemini_tools = [genai.protos.Tool(function_declarations=[
-                genai.protos.FunctionDeclaration(
-                    name=t["name"],
-                    description=t["description"],
-                    parameters=genai.protos.Schema(
-                        type=genai.protos.Type.OBJECT,
-                        properties={
-                            k: genai.protos.Schema(
-                                type=genai.protos.Type.STRING if v.get("type") == "string"
-                                else genai.protos.Type.INTEGER if v.get("type") == "integer"
-                                else genai.protos.Type.BOOLEAN if v.get("type") == "boolean"
-                                else genai.protos.Type.STRING,
-                                description=v.get("description", ""),
-                            )
-                            for k, v in t["parameters"].get("properties", {}).items()
-                        },
-                        required=t["parameters"].get("required", []),
-                    ),
+@lru_cache(maxsize=256)
+def build_system_prompt(firm_name: Optional[str], channel: Optional[str]) -> str:
+    """System prompt estável por (escritório, canal) — montado uma vez e reutilizado"""
+    office_name = firm_name or "este escritório"
+    if channel == "whatsapp":
+        return WHATSAPP_SYSTEM_PROMPT + AGENT_CAPABILITIES.format(office_name=office_name)
+
+    system = SYSTEM_PROMPT + "\n\n" + AGENT_CAPABILITIES.format(office_name=office_name)
+    if firm_name:
+        system += f"\n\nYou are the Chief of Staff for {firm_name}."
+    return system
+
+
+def _schema_type(type_name: Optional[str]):
+    return {
+        "integer": genai.protos.Type.INTEGER,
+        "boolean": genai.protos.Type.BOOLEAN,
+    }.get(type_name, genai.protos.Type.STRING)
+
+
+@lru_cache(maxsize=1)
+def get_gemini_tools() -> list:
+    """TOOL_DECLARATIONS convertidas para genai.protos (uma vez por processo)"""
+    return [genai.protos.Tool(function_declarations=[
+        genai.protos.FunctionDeclaration(
+            name=t["name"],
+            description=t["description"],
+            parameters=genai.protos.Schema(
+                type=genai.protos.Type.OBJECT,
+                properties={
+                    k: genai.protos.Schema(
+                        type=_schema_type(v.get("type")),
+                        description=v.get("description", ""),
+                    )
+                    for k, v in t["parameters"].get("properties", {}).items()
+                },
+                required=t["parameters"].get("required", []),
+            ),
+        )
+        for t in TOOL_DECLARATIONS
+    ])]
+
+
+TOOLS_KEY = prompt_fingerprint(json.dumps(TOOL_DECLARATIONS, sort_keys=True, default=str))
+TOOLS_TOKENS = estimate_tokens(json.dumps(TOOL_DECLARATIONS, default=str))
+
+
+JWT_SECRET = os.environ.get("JWT_SECRET", "osprey-secret-key-change-in-production")
+JWT_ALGORITHM = "HS256"
+
+
+class OspreyChatMessage(BaseModel):
+    message: str
+    conversation_id: Optional[str] = None
+    user_id: Optional[str] = None
+    firm_name: Optional[str] = None
+    office_id: Optional[str] = None
+    channel: Optional[str] = "web"
+
+
+class OspreyChatResponse(BaseModel):
+    response: str
+    conversation_id: str
+    timestamp: str
+
+
+# ============================================================================
+# GEMINI CALLS — routed + hedged
+# ============================================================================
+
+# Prefixo estável (system + tools) em cache de contexto do Gemini
+context_cache = GeminiContextCache(min_tokens=4096)
+
+# Conversas com resumo em atualização (evita resumir o mesmo trecho 2x)
+_summaries_in_flight: set = set()
+# Referências das tasks de resumo (o event loop só guarda referências fracas)
+_summary_tasks: set = set()
+
+
+async def _generate_turn(model_name: str, system: str, use_tools: bool, contents: list):
+    """Uma chamada ao Gemini (assíncrona), registrando métricas"""
+    metrics = get_metrics_collector()
+    started = time.perf_counter()
+    try:
+        if use_tools:
+            model = await context_cache.get_model(
+                model_name, system, get_gemini_tools(), TOOLS_KEY, TOOLS_TOKENS
+            )
+        else:
+            model = await context_cache.get_model(model_name, system)
+        response = await model.generate_content_async(contents)
+    except BaseException as e:
+        if not isinstance(e, asyncio.CancelledError):
+            metrics.record_request(
+                model_name, 0, 0, (time.perf_counter() - started) * 1000,
+                success=False, agent="osprey_chat", error_type=type(e).__name__,
+            )
+        raise
+    usage = getattr(response, "usage_metadata", None)
+    metrics.record_request(
+        model_name,
+        getattr(usage, "prompt_token_count", 0) or 0,
+        getattr(usage, "candidates_token_count", 0) or 0,
+        (time.perf_counter() - started) * 1000,
+        agent="osprey_chat",
+    )
+    return response
+
+
+async def _chat_turn(system: str, use_tools: bool, contents: list):
+    """Turno de chat roteado pela saúde dos modelos, com hedge e timeout"""
+    response, _ = await call_with_routing(
+        lambda m: _generate_turn(m, system, use_tools, contents),
+        CHAT_MODELS,
+        hedge=True,
+        attempt_timeout=CHAT_ATTEMPT_TIMEOUT,
+    )
+    return response
+
+
+# ============================================================================
+# CONVERSATION HISTORY — state store + token budget + rolling summary
+# ============================================================================
+
+async def _update_summary(
+    conversation_id: str, office_id: Optional[str], summary: Optional[str], dropped: list
+):
+    """Incorpora os turnos que saíram do orçamento ao resumo da conversa"""
+    try:
+        system = summary_system_prompt()
+        contents = [{"role": "user", "parts": [build_summary_request(summary, dropped)]}]
+        response, _ = await call_with_routing(
+            lambda m: _generate_turn(m, system, False, contents),
+            SUMMARY_MODELS,
+            attempt_timeout=CHAT_ATTEMPT_TIMEOUT,
+        )
+        await conversation_store.apply_summary(
+            conversation_id, office_id, response.text.strip(), dropped[-1].timestamp
+        )
+    except Exception as e:
+        # Sem resumo novo, o próximo turno apenas tenta de novo
+        print(f"⚠️ Osprey chat summary update failed ({conversation_id}): {e}")
+    finally:
+        _summaries_in_flight.discard(conversation_id)
+
+
+def _schedule_summary_update(
+    conversation_id: str, office_id: Optional[str], summary: Optional[str], dropped: list
+):
+    if conversation_id in _summaries_in_flight or dropped[-1].timestamp is None:
+        return
+    _summaries_in_flight.add(conversation_id)
+    task = asyncio.create_task(_update_summary(conversation_id, office_id, summary, dropped))
+    _summary_tasks.add(task)
+    task.add_done_callback(_summary_tasks.discard)
+
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@router.post("/chat", response_model=OspreyChatResponse)
+@limiter.limit("20/minute")
+@limiter.limit("200/day")
+async def osprey_legal_chat(request: Request, chat_msg: OspreyChatMessage, authorization: Optional[str] = Header(None)):
+    """
+    Chat with Osprey Legal AI — Chief of Staff for immigration attorneys.
+    Uses Google Gemini 2.0 Flash.
+    Supports optional JWT auth for multi-tenant isolation.
+    """
+    try:
+        if not GEMINI_API_KEY:
+            raise HTTPException(status_code=500, detail="Gemini API key not configured")
+
+        # Extract office_id from JWT if present
+        office_id = chat_msg.office_id
+        if authorization and authorization.startswith("Bearer "):
+            try:
+                token = authorization.replace("Bearer ", "")
+                payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+                office_id = payload.get("office_id", office_id)
+                if not chat_msg.user_id:
+                    chat_msg.user_id = payload.get("user_id")
+            except Exception:
+                pass  # Token is optional, continue without it
+
+        # Per-office daily rate limit (500 messages/day)
+        if office_id and db is not None:
+            today = datetime.utcnow().strftime("%Y-%m-%d")
+            rate_doc = await db.rate_limits.find_one({"office_id": office_id, "date": today})
+            if rate_doc and rate_doc.get("message_count", 0) >= 500:
+                return JSONResponse(
+                    status_code=429,
+                    content={"detail": "Limite diário de 500 mensagens atingido. Renova amanhã ou contate o suporte."}
                 )
-                for t in TOOL_DECLARATIONS
-            ])]
+            await db.rate_limits.update_one(
+                {"office_id": office_id, "date": today},
+                {"$inc": {"message_count": 1}, "$set": {"last_request": datetime.utcnow()}},
+                upsert=True,
+            )
+
+        conversation_id = chat_msg.conversation_id or str(uuid.uuid4())
+
+        # Static prefix (system prompt + tools) is built once per (firm, channel)
+        system = build_system_prompt(chat_msg.firm_name, chat_msg.channel)
 
-            model = genai.GenerativeModel(
-                model_name="gemini-2.0-flash",
-                system_instruction=system,
-                tools=gemini_tools,
+        # Conversation state: one point read (or a hot-cache hit for WhatsApp threads)
+        if chat_msg.conversation_id:
+            state = await conversation_store.load(
+                conversation_id, office_id, hot=chat_msg.channel == "whatsapp"
             )
-            chat = model.start_chat(history=gemini_history)
+        else:
+            state = ConversationState(conversation_id, office_id)
+        trimmed = trim_history(state.turns, CHAT_HISTORY_TOKEN_BUDGET, state.summary)
+        gemini_history = trimmed.history
+
+        # WhatsApp channel: use function calling with tools
+        is_whatsapp = chat_msg.channel == "whatsapp" and office_id and db is not None
+
+        if is_whatsapp:
+            contents = gemini_history + [{"role": "user", "parts": [chat_msg.message]}]
 
             # Function calling loop (max 5 rounds)
-            response = chat.send_message(chat_msg.message)
+            response = await _chat_turn(system, True, contents)
             tool_rounds = 0
             MAX_TOOL_ROUNDS = 5
 
@@ -663,7 +793,9 @@ Want the full priority list?"
                     )
 
                 # Send tool results back to Gemini
-                response = chat.send_message(tool_responses)
+                contents.append(response.candidates[0].content)
+                contents.append({"role": "user", "parts": tool_responses})
+                response = await _chat_turn(system, True, contents)
                 tool_rounds += 1
 
             # Extract final text
@@ -678,12 +810,8 @@ Want the full priority list?"
 
         else:
             # Web channel: simple chat without function calling
-            model = genai.GenerativeModel(
-                model_name="gemini-2.0-flash",
-                system_instruction=system
-            )
-            chat = model.start_chat(history=gemini_history)
-            response = chat.send_message(chat_msg.message)
+            contents = gemini_history + [{"role": "user", "parts": [chat_msg.message]}]
+            response = await _chat_turn(system, False, contents)
             response_text = response.text
 
         now = datetime.utcnow()
@@ -701,6 +829,16 @@ Want the full priority list?"
                 "timestamp": now
             })
 
+            await conversation_store.append_turn(
+                state, ChatTurn(chat_msg.message, response_text, now)
+            )
+
+            # Turns that no longer fit the budget are folded into the summary
+            if trimmed.dropped and not state.foreign:
+                _schedule_summary_update(
+                    conversation_id, office_id, state.summary, trimmed.dropped
+                )
+
         return OspreyChatResponse(
             response=response_text,
             conversation_id=conversation_id,
@@ -721,5 +859,7 @@ async def osprey_chat_health():
         "service": "Osprey Legal Chat — Chief of Staff AI",
         "status": "active" if GEMINI_API_KEY else "unconfigured",
         "model": "gemini-2.0-flash",
-        "version": "1.0"
+        "version": "1.0",
+        "conversation_state": conversation_store.get_stats(),
+        "context_cache": context_cache.get_stats(),
     }
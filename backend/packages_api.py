@@ -15,6 +15,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import Response
 from pydantic import BaseModel
 
+from backend.core.case_events import record_case_event
 from backend.core.database import db
 from backend.b2b_auth_api import get_b2b_user
 
@@ -391,24 +392,22 @@ async def generate_package(
 
     # Update case in DB
     now = datetime.now(timezone.utc)
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$set": {
-                "package_generated": True,
-                "package_id": pkg_id,
-                "package_path": str(zip_path),
-                "package_generated_at": now,
-                "updated_at": now,
-            },
-            "$push": {
-                "history": {
-                    "action": "package_generated",
-                    "timestamp": now.isoformat(),
-                    "detail": f"Filing package generated: {len(files_included)} files",
-                }
-            },
+    await record_case_event(
+        db,
+        case_id,
+        office_id,
+        "package_generated",
+        f"Filing package generated: {len(files_included)} files",
+        set_fields={
+            "package_generated": True,
+            "package_id": pkg_id,
+            "package_path": str(zip_path),
+            "package_generated_at": now,
+            "updated_at": now,
         },
+        actor=current_user.get("user_id"),
+        ts=now,
+        package_id=pkg_id,
     )
 
     logger.info(
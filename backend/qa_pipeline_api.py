@@ -7,12 +7,15 @@ import logging
 from datetime import datetime, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from backend.core.case_events import record_case_event
 from backend.core.database import db
+from backend.core.invalidation import DerivedCache
 from backend.b2b_auth_api import get_b2b_user
-from backend.agents.qa import get_qa_agent
+from backend.agents.qa import build_readiness_report, get_qa_agent, normalize_visa_type
+from core.rate_limit import limiter
 
 logger = logging.getLogger(__name__)
 
@@ -51,12 +54,13 @@ async def validate_case(
     # Normalize form_code for QA agent compatibility
     # The QA agent expects form_code in the case dict
     case_for_qa = dict(case)
-    case_for_qa["form_code"] = _normalize_visa_type(visa_type)
+    case_for_qa["form_code"] = normalize_visa_type(visa_type)
 
     qa_agent = get_qa_agent()
     logger.info(f"🔍 Running QA validation for case {case_id} ({visa_type})")
 
-    qa_report = qa_agent.comprehensive_review(case_for_qa)
+    # Off the event loop; sections unchanged since the last run come from the memo
+    qa_report = await qa_agent.review_async(case_for_qa)
 
     # Adjust threshold for strict mode
     if body.strict and qa_report["overall_score"] < 95:
@@ -67,27 +71,24 @@ async def validate_case(
 
     # Save QA results to case
     now = datetime.now(timezone.utc)
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$set": {
-                "qa_review": qa_report,
-                "qa_approved": qa_report["approval"]["approved"],
-                "qa_score": qa_report["overall_score"],
-                "qa_review_date": now,
-                "updated_at": now,
-            },
-            "$push": {
-                "history": {
-                    "action": "qa_validation",
-                    "timestamp": now.isoformat(),
-                    "detail": (
-                        f"QA score: {qa_report['overall_score']:.1f}% — "
-                        f"{'APPROVED' if qa_report['approval']['approved'] else 'NEEDS REVIEW'}"
-                    ),
-                }
-            },
+    await record_case_event(
+        db,
+        case_id,
+        office_id,
+        "qa_validation",
+        (
+            f"QA score: {qa_report['overall_score']:.1f}% — "
+            f"{'APPROVED' if qa_report['approval']['approved'] else 'NEEDS REVIEW'}"
+        ),
+        set_fields={
+            "qa_review": qa_report,
+            "qa_approved": qa_report["approval"]["approved"],
+            "qa_score": qa_report["overall_score"],
+            "qa_review_date": now,
+            "updated_at": now,
         },
+        actor=current_user.get("user_id"),
+        ts=now,
     )
 
     logger.info(
@@ -113,11 +114,19 @@ async def validate_case(
     }
 
 
+_qa_status_cache = DerivedCache("qa_status", ttl_seconds=900)
+
+
 @router.get("/{case_id}/status")
 async def get_qa_status(case_id: str, current_user: dict = Depends(get_b2b_user)):
     """Get the latest QA validation status for a case."""
     office_id = current_user["office_id"]
+    return await _qa_status_cache.get_or_compute(
+        office_id, case_id, "status", lambda: _load_qa_status(case_id, office_id)
+    )
+
 
+async def _load_qa_status(case_id: str, office_id: str) -> dict:
     case = await db.b2b_cases.find_one(
         {"case_id": case_id, "office_id": office_id},
         {"_id": 0, "qa_review": 1, "qa_approved": 1, "qa_score": 1, "qa_review_date": 1},
@@ -147,32 +156,34 @@ async def get_qa_status(case_id: str, current_user: dict = Depends(get_b2b_user)
     }
 
 
-def _normalize_visa_type(visa_type: str) -> str:
-    """Normalize visa type to QA agent's expected form_code format."""
-    mapping = {
-        "H-1B": "H-1B",
-        "H1B": "H-1B",
-        "O-1": "O-1",
-        "O1": "O-1",
-        "O-1A": "O-1",
-        "O-1B": "O-1",
-        "L-1": "L-1",
-        "L1": "L-1",
-        "L-1A": "L-1",
-        "L-1B": "L-1",
-        "EB-1A": "EB-1A",
-        "EB1A": "EB-1A",
-        "EB-1B": "EB-1A",
-        "EB-2 NIW": "EB-2 NIW",
-        "EB2 NIW": "EB-2 NIW",
-        "EB-2NIW": "EB-2 NIW",
-        "EB2NIW": "EB-2 NIW",
-        "EB-2": "EB-2 NIW",
-        "NIW": "EB-2 NIW",
-        "I-140": "EB-1A",
-        "F-1": "F-1",
-        "F1": "F-1",
-        "I-539": "I-539",
-        "I-589": "I-589",
-    }
-    return mapping.get(visa_type, visa_type)
+@router.post("/readiness")
+@limiter.limit("2/minute")
+@limiter.limit("20/day")
+async def run_readiness_report(request: Request, current_user: dict = Depends(get_b2b_user)):
+    """Validate all active cases of the office now and store a readiness report."""
+    if current_user["role"] not in ("owner", "attorney"):
+        raise HTTPException(
+            status_code=403, detail="Only owners and attorneys can run the readiness report"
+        )
+    report = await build_readiness_report(db, current_user["office_id"])
+    report["generated_at"] = report["generated_at"].isoformat()
+    return report
+
+
+@router.get("/readiness")
+async def get_readiness_report(current_user: dict = Depends(get_b2b_user)):
+    """Latest readiness report for the office (built nightly or on demand)."""
+    report = await db.qa_readiness_reports.find_one(
+        {"office_id": current_user["office_id"]},
+        {"_id": 0},
+        sort=[("generated_at", -1)],
+    )
+    if not report:
+        return {
+            "office_id": current_user["office_id"],
+            "available": False,
+            "message": "No readiness report yet. Call POST /api/qa/readiness to build one.",
+        }
+    if hasattr(report.get("generated_at"), "isoformat"):
+        report["generated_at"] = report["generated_at"].isoformat()
+    return {**report, "available": True}
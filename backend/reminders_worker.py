@@ -347,6 +347,25 @@ async def process_idle_case_alerts(db):
         print(f"📋 Idle case alerts sent to office {office_id}: {len(idle_cases)} cases")
 
 
+async def process_nightly_qa_readiness(db):
+    """Nightly QA readiness report for every office (06:00 UTC)."""
+    now = datetime.now(timezone.utc)
+
+    # Only run at 06:00-06:05 UTC
+    if now.hour != 6 or now.minute > 5:
+        return
+
+    dedup_key = f"qa_readiness_{now.strftime('%Y-%m-%d')}"
+    if dedup_key in _sent_today:
+        return
+    _sent_today.add(dedup_key)
+
+    from backend.agents.qa import run_nightly_readiness
+
+    built = await run_nightly_readiness(db)
+    print(f"📋 Nightly QA readiness reports built for {built} offices")
+
+
 async def reminders_loop(db):
     """Main worker loop — runs as a background asyncio task."""
     print("✅ Reminders Worker started")
@@ -357,6 +376,7 @@ async def reminders_loop(db):
             await process_deadline_alerts(db)
             await process_daily_email_summary(db)
             await process_idle_case_alerts(db)
+            await process_nightly_qa_readiness(db)
         except Exception as e:
             print(f"❌ Reminders Worker error: {e}")
 
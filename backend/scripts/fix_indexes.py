@@ -1,50 +1,123 @@
 """
-Script para remover índices duplicados do MongoDB
+Índices do MongoDB — drift do manifesto e verificação de planos
+
+Uso (a partir da raiz do repositório):
+    python -m backend.scripts.fix_indexes --check          # lista drift (exit 1 se houver)
+    python -m backend.scripts.fix_indexes --apply          # cria os índices que faltam
+    python -m backend.scripts.fix_indexes --apply --fix-conflicts
+                                                          # recria índices com opções divergentes
+    python -m backend.scripts.fix_indexes --explain        # COLLSCAN / SORT checker (exit 1 se houver)
+
+``--explain`` cria os índices do manifesto num banco descartável
+(``<db>_index_check``) do mongod informado, roda ``QUERY_SHAPES`` com
+``explain()`` e apaga o banco no fim — use contra um mongod local/CI.
 """
 
+import argparse
 import asyncio
 import logging
 import os
+import sys
 
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from backend.core.index_manifest import QUERY_SHAPES, manifest_specs
+from backend.core.indexes import check_query_plans, drift_report, reconcile_indexes
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+MONGO_URL = os.environ.get("MONGODB_URI") or os.environ.get(
+    "MONGO_URL", "mongodb://localhost:27017/"
+)
+DB_NAME = os.environ.get("MONGODB_DB") or os.environ.get("DB_NAME", "osprey_immigration_db")
 
-async def fix_indexes():
-    # Conectar ao MongoDB
-    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    db = client.test_database
 
-    logger.info("🔄 Removendo índices antigos da coleção payment_transactions...")
+async def check_drift(db) -> bool:
+    """Loga o drift por collection; True se o banco bate com o manifesto"""
+    drifts = await drift_report(db, manifest_specs())
+    clean = True
+    for name, drift in sorted(drifts.items()):
+        details = drift.to_dict()
+        for spec in details["missing"]:
+            logger.warning(f"❌ missing    {spec}")
+        for conflict in details["conflicts"]:
+            logger.warning(f"⚠️  conflict   {conflict}")
+        for index_name in details["unmanaged"]:
+            logger.info(f"ℹ️  unmanaged  {name}.{index_name}")
+        clean = clean and drift.clean
+    if clean:
+        logger.info("✅ Indexes match the manifest")
+    return clean
 
-    try:
-        # Listar todos os índices
-        indexes = await db.payment_transactions.list_indexes().to_list(length=100)
-        logger.info(f"📋 Índices existentes: {[idx['name'] for idx in indexes]}")
 
-        # Remover o índice problemático (se existir)
-        try:
-            await db.payment_transactions.drop_index("stripe_session_id_1")
-            logger.info("✅ Índice 'stripe_session_id_1' removido com sucesso")
-        except Exception as e:
-            logger.warning(f"⚠️  Índice 'stripe_session_id_1' não encontrado ou já removido: {e}")
+async def apply_manifest(db, fix_conflicts: bool = False) -> bool:
+    summary = await reconcile_indexes(db, manifest_specs(), fix_conflicts=fix_conflicts)
+    logger.info(
+        f"✅ {summary['created']} created, {summary['unchanged']} unchanged, "
+        f"{len(summary['conflicts'])} conflicts left as is"
+    )
+    for error in summary["errors"]:
+        logger.error(f"❌ {error}")
+    for name, error in summary["failed"].items():
+        logger.error(f"❌ {name}: {error}")
+    return not summary["errors"] and not summary["failed"]
 
-        # Recriar o índice corretamente (sparse=True)
-        await db.payment_transactions.create_index("stripe_session_id", unique=True, sparse=True)
-        logger.info("✅ Índice 'stripe_session_id' recriado com sparse=True")
 
-        logger.info("✅ Correção de índices concluída!")
+async def run_query_plan_check(client, db_name: str, keep: bool = False) -> dict:
+    """Índices do manifesto num banco descartável + explain de cada QUERY_SHAPE"""
+    db = client[db_name]
+    try:
+        await reconcile_indexes(db, manifest_specs())
+        return await check_query_plans(db, QUERY_SHAPES)
+    finally:
+        if not keep:
+            await client.drop_database(db_name)
+
 
-    except Exception as e:
-        logger.error(f"❌ Erro ao corrigir índices: {e}")
+async def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--check", action="store_true", help="report drift, change nothing")
+    parser.add_argument("--apply", action="store_true", help="create missing indexes")
+    parser.add_argument(
+        "--fix-conflicts", action="store_true", help="with --apply: rebuild conflicting indexes"
+    )
+    parser.add_argument("--explain", action="store_true", help="fail on COLLSCAN / unindexed keyset sorts")
+    parser.add_argument("--keep", action="store_true", help="with --explain: keep scratch db")
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    client = AsyncIOMotorClient(MONGO_URL)
+    ok = True
+    try:
+        if args.apply:
+            ok = await apply_manifest(client[args.db], args.fix_conflicts) and ok
+        if args.check or not (args.apply or args.explain):
+            ok = await check_drift(client[args.db]) and ok
+        if args.explain:
+            report = await run_query_plan_check(client, f"{args.db}_index_check", args.keep)
+            for shape in report["collscans"]:
+                logger.error(f"❌ COLLSCAN   {shape}")
+            for shape in report["blocking_sorts"]:
+                logger.warning(f"⚠️  in-memory SORT  {shape}")
+            for shape in report["sort_failures"]:
+                logger.error(f"❌ in-memory SORT on keyset page  {shape}")
+            for name, error in report["errors"].items():
+                logger.error(f"❌ explain failed  {name}: {error}")
+            logger.info(f"{report['checked']} query shapes checked")
+            ok = (
+                ok
+                and not report["collscans"]
+                and not report["sort_failures"]
+                and not report["errors"]
+            )
     finally:
         client.close()
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
-    asyncio.run(fix_indexes())
+    sys.exit(asyncio.run(main()))
@@ -20,6 +20,10 @@ project_root = backend_dir.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+# Perfil de boot (tempos de import por router) — importado primeiro para medir tudo
+from backend.core.router_registry import register_routers, run_warmups, startup_profile
+
+import asyncio
 import os
 import uuid
 from uuid import uuid4
@@ -37,7 +41,7 @@ from fastapi import (
     Request,
     UploadFile,
 )
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -60,15 +64,6 @@ from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
-# Import visa API router
-try:
-    from visa.api import router as visa_router
-
-    VISA_API_AVAILABLE = True
-except ImportError:
-    VISA_API_AVAILABLE = False
-    logger.warning("⚠️  Visa API not available")
-
 # Configure JSON encoder for ObjectId (Pydantic v2 compatible)
 # pydantic.json.ENCODERS_BY_TYPE[ObjectId] = str  # This is for Pydantic v1
 
@@ -111,7 +106,6 @@ import stripe
 from admin.security import (
     require_admin,
 )
-from backend.agents.maria.api import router as maria_api_router
 import osprey_chat_api
 
 # Professional QA Agent - Quality Assurance System
@@ -120,49 +114,9 @@ from backend.agents.specialized import (
     DocumentValidationAgent,
     create_document_validator,
 )
-from backend.api.admin_products import router as admin_products_router
-from backend.api.agents import router as agents_router
-from backend.api.auth import router as auth_router
-from backend.api.auto_application import router as auto_application_router
-from backend.api.auto_application_ai import router as auto_application_ai_router
-from backend.api.auto_application_downloads import (
-    router as auto_application_downloads_router,
-)
-from backend.api.auto_application_packages import (
-    router as auto_application_packages_router,
-)
-from backend.api.completeness import router as completeness_router
-from backend.api.documents import router as documents_router
-from backend.api.downloads import router as downloads_router
-from backend.api.education import router as education_router
-from backend.api.email_packages import router as email_packages_router
-from backend.api.friendly_form import router as friendly_form_router
-from backend.api.knowledge_base import router as knowledge_base_router
-from backend.api.oracle import router as oracle_router
-from backend.api.owl_agent import router as owl_agent_router
-from backend.api.payments import router as payments_router
-from backend.api.specialized_agents import router as specialized_agents_router
-from backend.api.uscis_forms import router as uscis_forms_router
-from backend.packages_api import router as packages_router
-from backend.qa_pipeline_api import router as qa_pipeline_router
-from backend.intake_wizard_api import router as intake_wizard_router
-from backend.document_extractor_api import router as document_extractor_router
-try:
-    from backend.legal_research_api import router as legal_router
-    LEGAL_API_AVAILABLE = True
-except Exception as _legal_err:
-    LEGAL_API_AVAILABLE = False
-from backend.api.visa_updates_admin import router as visa_updates_admin_router
-from backend.api.voice import router as voice_router
-from backend.api.voice import ws_router as voice_ws_router
-
-# Claude-powered agents (Carlos, Miguel, Patricia, Dr. Ricardo)
-try:
-    from backend.claude_agents_api import router as claude_agents_router
-    CLAUDE_AGENTS_AVAILABLE = True
-except Exception as _claude_err:
-    CLAUDE_AGENTS_AVAILABLE = False
-    logger.warning(f"Claude agents not available: {_claude_err}")
+from backend.api.llm_metrics import LLMMetricsLabelMiddleware
+
+# Routers da API: importados sob demanda em register_routers (core/router_registry.py)
 
 # Auth helpers
 from backend.core.auth import (
@@ -175,6 +129,8 @@ from backend.core.database import (
     shutdown_db_client,
     startup_db_client,
 )
+from backend.core.invalidation import invalidation_bus
+from backend.core.lifecycle import lifecycle
 from backend.core.serialization import serialize_doc
 
 # Payment and Stripe Integration
@@ -190,16 +146,63 @@ from backend.services.cases import (
 # Create the main app without a prefix
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Caminho crítico: só conexão + init dos módulos; o resto são fases de fundo
     await startup_db_client()
 
-    # Initialize Google Document AI (triggers credential loading and verification)
-    from backend.integrations.google import hybrid_validator
+    # Segundo nível (MongoDB) do cache de respostas LLM
+    from backend.llm.helpers import MongoCacheStore, get_cache_manager, llm_settings
+
+    if llm_settings.cache_mongo_enabled:
+        get_cache_manager().attach_store(MongoCacheStore(db.llm_response_cache))
+
+    # Rollups periódicos das métricas LLM
+    from backend.llm.helpers import MongoMetricsSink, get_metrics_collector, run_metrics_rollups
+
+    if llm_settings.metrics_rollup_enabled:
+        lifecycle.start_background(
+            "metrics_rollups",
+            lambda: run_metrics_rollups(
+                get_metrics_collector(),
+                MongoMetricsSink(db.llm_metrics_rollups),
+                llm_settings.metrics_rollup_interval_seconds,
+            ),
+            long_running=True,
+        )
+
+    # Write-behind do estado das conversas do Osprey Chat (threads WhatsApp)
+    lifecycle.start_background(
+        "conversation_flush",
+        osprey_chat_api.conversation_store.run_flush_loop,
+        long_running=True,
+    )
+
+    # Move arrays history legados para case_events (idempotente)
+    from backend.core.case_events import migrate_legacy_history
+
+    lifecycle.start_background("history_migration", lambda: migrate_legacy_history(db))
+
+    # Índice de trigramas dos nomes de clientes para casos antigos (depois dos índices)
+    from backend.core.case_name_index import backfill_name_index
+
+    lifecycle.start_background(
+        "name_index_backfill", lambda: backfill_name_index(db), after="indexes"
+    )
+
+    # Modelos pesados (embeddings da pesquisa jurídica) carregam fora do caminho do boot
+    if os.environ.get("OSPREY_WARMUP_MODELS", "true").lower() == "true":
+        lifecycle.start_background("model_warmup", run_warmups)
 
-    _ = hybrid_validator.google_processor  # Access property to trigger initialization
+    # Google Document AI (carrega e verifica credenciais) numa thread
+    lifecycle.start_background(
+        "document_ai",
+        lambda: asyncio.to_thread(lambda: bool(hybrid_validator.google_processor)),
+    )
 
+    startup_profile.mark("startup_complete")
     try:
         yield
     finally:
+        # Cancela as fases de fundo (o flush das conversas grava o pendente) e fecha o Mongo
         await shutdown_db_client()
 
 
@@ -858,7 +861,7 @@ async def start_case_finalization(case_id: str, request: dict):
             logger.error(f"❌ Erro ao buscar caso do MongoDB: {db_error}")
 
         # Chamar finalizer com ou sem dados do caso
-        result = case_finalizer_complete.start_finalization(
+        result = await case_finalizer_complete.start_finalization(
             case_id=case_id,
             scenario_key=scenario_key,
             postage=postage,
@@ -897,7 +900,7 @@ async def get_finalization_status(job_id: str):
     try:
         # Importação movida para o topo
 
-        result = case_finalizer_complete.get_job_status(job_id)
+        result = await case_finalizer_complete.get_job_status(job_id)
 
         if result["success"]:
             job = result["job"]
@@ -916,6 +919,20 @@ async def get_finalization_status(job_id: str):
         return {"error": "Erro interno do servidor"}
 
 
+@api_router.get("/cases/finalize/{job_id}/events")
+async def stream_finalization_events(job_id: str):
+    """Eventos de progresso da finalização (SSE) até o job terminar"""
+    runner = case_finalizer_complete.job_runner
+    if runner is None or not await runner.store.get(job_id):
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    async def event_stream():
+        async for event in runner.follow_events(job_id):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @api_router.post("/cases/{case_id}/finalize/accept")
 async def accept_finalization_consent(case_id: str, request: dict):
     """Aceita consentimento para liberação dos downloads"""
@@ -2717,10 +2734,9 @@ async def get_document_analysis_kpis(timeframe_days: int = 30):
     Obtém KPIs de análise de documentos para o período especificado
     """
     try:
-        from backend.documents.metrics import DocumentAnalysisKPIs
+        from backend.documents.metrics import document_metrics
 
-        kpi_system = DocumentAnalysisKPIs()
-        report = kpi_system.generate_kpi_report(timeframe_days)
+        report = await document_metrics.generate_kpi_report(timeframe_days)
 
         return {
             "success": True,
@@ -2739,15 +2755,14 @@ async def get_document_analysis_performance():
     Obtém métricas de performance do sistema de análise
     """
     try:
-        from backend.documents.metrics import DocumentAnalysisKPIs
+        from backend.documents.metrics import document_metrics
 
-        kpi_system = DocumentAnalysisKPIs()
-        performance = kpi_system.calculate_processing_performance()
+        performance = await document_metrics.calculate_processing_performance()
 
         return {
             "success": True,
             "performance_metrics": performance,
-            "targets": kpi_system.targets,
+            "targets": document_metrics.targets,
             "message": "Performance metrics retrieved successfully",
         }
 
@@ -3428,7 +3443,7 @@ async def download_instructions(job_id: str, current_user=Depends(get_current_us
         # Importação movida para o topo
         from fastapi.responses import JSONResponse
 
-        job_status = case_finalizer_complete.get_job_status(job_id)
+        job_status = await case_finalizer_complete.get_job_status(job_id)
 
         if not job_status["success"]:
             raise HTTPException(status_code=404, detail="Job não encontrado")
@@ -3464,7 +3479,7 @@ async def download_checklist(job_id: str, current_user=Depends(get_current_user)
         # Importação movida para o topo
         from fastapi.responses import JSONResponse
 
-        job_status = case_finalizer_complete.get_job_status(job_id)
+        job_status = await case_finalizer_complete.get_job_status(job_id)
 
         if not job_status["success"]:
             raise HTTPException(status_code=404, detail="Job não encontrado")
@@ -3489,14 +3504,9 @@ async def download_checklist(job_id: str, current_user=Depends(get_current_user)
 
 @api_router.get("/download/master-packet/{job_id}")
 async def download_master_packet(job_id: str, current_user=Depends(get_current_user)):
-    """Download do master packet (PDF)"""
+    """Download do master packet (PDF, servido do blob store)"""
     try:
-        # Importação movida para o topo
-        import os
-
-        from fastapi.responses import FileResponse
-
-        job_status = case_finalizer_complete.get_job_status(job_id)
+        job_status = await case_finalizer_complete.get_job_status(job_id)
 
         if not job_status["success"]:
             raise HTTPException(status_code=404, detail="Job não encontrado")
@@ -3511,13 +3521,17 @@ async def download_master_packet(job_id: str, current_user=Depends(get_current_u
         if not master_packet["success"]:
             raise HTTPException(status_code=500, detail="Erro na criação do master packet")
 
-        packet_path = master_packet["packet_path"]
-
-        if not os.path.exists(packet_path):
+        artifact = master_packet.get("artifact")
+        blobs = case_finalizer_complete.job_runner.blobs
+        if not artifact or not await blobs.exists(artifact["key"]):
             raise HTTPException(status_code=404, detail="Arquivo do master packet não encontrado")
 
-        return FileResponse(
-            path=packet_path, filename=f"master_packet_{job_id}.pdf", media_type="application/pdf"
+        return StreamingResponse(
+            blobs.stream(artifact["key"]),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f'attachment; filename="master_packet_{job_id}.pdf"'
+            },
         )
 
     except HTTPException:
@@ -3791,8 +3805,13 @@ app.add_middleware(
     allow_origins=os.environ.get("CORS_ORIGINS", "*").split(","),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Token de paginação keyset das listagens (GET /api/cases)
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Rotula chamadas LLM com o endpoint de origem (métricas por rota)
+app.add_middleware(LLMMetricsLabelMiddleware)
+
 # ===== SECURITY MIDDLEWARES (ATIVADOS) =====
 # Import security middlewares
 try:
@@ -3930,12 +3949,33 @@ async def health_check():
     if services_down > 0:
         health_status["status"] = "degraded"
 
+    # Fases do boot (conexão, índices, workers, warmups)
+    health_status["startup"] = lifecycle.status()
+    health_status["invalidation"] = invalidation_bus.status()
+
     # Return appropriate HTTP status code
     status_code = 200 if health_status["status"] == "healthy" else 503
 
     return health_status
 
 
+@app.get("/ready")
+@api_router.get("/ready")
+async def readiness_probe():
+    """
+    Readiness probe: 200 once the critical startup phases are done, 503 before
+    Background phases (indexes, workers, warmups) are reported but don't gate it.
+    """
+    status = lifecycle.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@api_router.get("/system/startup-profile")
+async def startup_profile_report(admin=Depends(require_admin)):
+    """Boot profile: per-router import times, disabled/unavailable routers and boot marks"""
+    return startup_profile.to_dict()
+
+
 @api_router.get("/system/status")
 async def system_status():
     """
@@ -4253,78 +4293,8 @@ async def get_my_feedback_history(limit: int = 10, current_user=Depends(get_curr
 
 # Include all API routes
 app.include_router(api_router)
-app.include_router(auth_router)
-# DISABLED B2C: app.include_router(auto_application_router)
-# DISABLED B2C: app.include_router(auto_application_ai_router)
-# DISABLED B2C: app.include_router(auto_application_packages_router)
-# DISABLED B2C: app.include_router(auto_application_downloads_router)
-app.include_router(agents_router)
-app.include_router(completeness_router)
-# DISABLED B2C: app.include_router(friendly_form_router)
-# DISABLED B2C: app.include_router(voice_router)
-# DISABLED B2C: app.include_router(voice_ws_router)
-app.include_router(downloads_router)
-app.include_router(email_packages_router)
-app.include_router(knowledge_base_router)
-app.include_router(oracle_router)
-app.include_router(specialized_agents_router)
-app.include_router(visa_updates_admin_router)
-app.include_router(uscis_forms_router)  # RE-ENABLED for B2B form generation
-app.include_router(packages_router)  # B2B filing packages
-app.include_router(qa_pipeline_router)  # B2B QA validation pipeline
-app.include_router(intake_wizard_router)  # B2B guided case intake
-app.include_router(document_extractor_router)  # B2B document extraction
-if LEGAL_API_AVAILABLE:
-    app.include_router(legal_router)  # Legal Research RAG
-if CLAUDE_AGENTS_AVAILABLE:
-    app.include_router(claude_agents_router)  # Claude agents (Carlos, Miguel, Patricia, Ricardo)
-# DISABLED B2C: app.include_router(education_router)
-# DISABLED B2C: app.include_router(documents_router)
-# DISABLED B2C: app.include_router(payments_router)
-# DISABLED B2C: app.include_router(admin_products_router)
-# DISABLED B2C: app.include_router(owl_agent_router)
-
-# Include Visa API router (multi-agent architecture)
-if VISA_API_AVAILABLE:
-    app.include_router(visa_router)
-    logger.info("✅ Visa Multi-Agent API registered")
-
-# Include Maria router
-# DISABLED B2C: app.include_router(maria_api_router)
-
-# Include Osprey Legal Chat router
-app.include_router(osprey_chat_api.router)
-logger.info("✅ Osprey Legal Chat API registered")
-
-# Include B2B Auth and Offices routers
-from backend.b2b_auth_api import router as b2b_auth_router
-from backend.offices_api import router as offices_router
-from backend.cases_api import router as cases_router
-app.include_router(b2b_auth_router)
-app.include_router(offices_router)
-app.include_router(cases_router)
-
-from backend.letters_api import router as letters_router
-app.include_router(letters_router)
-
-from backend.documents_api import router as documents_b2b_router
-app.include_router(documents_b2b_router)
-
-from backend.settings_api import router as settings_router
-app.include_router(settings_router)
-
-from backend.reports_api import router as reports_router
-app.include_router(reports_router)
-
-from backend.firm_reports_api import router as firm_reports_router
-app.include_router(firm_reports_router)
-
-from backend.firm_memory_api import router as firm_memory_router
-from backend.whatsapp_sessions_api import router as whatsapp_sessions_router
-app.include_router(firm_memory_router)
-app.include_router(whatsapp_sessions_router)
-
-logger.info("✅ B2B Auth, Offices, Cases, Letters, Documents, Settings, Reports API registered")
+# Demais routers (B2B, agentes, B2C opcional) conforme OSPREY_* no ambiente
+register_routers(app)
 
 # ============================================================================
 # SIMULATION RESULTS PAGE
@@ -4551,6 +4521,9 @@ async def get_b2_extension_package_pdf():
     )
 
 
+startup_profile.mark("server_imported")
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,287 @@
+"""
+Conversation State Store - estado por conversa do Osprey Chat
+
+Um documento por conversa em ``osprey_chat_state`` guarda o resumo
+incremental e os turnos ainda não resumidos, então montar um turno é uma
+leitura pontual por ``_id`` (sem varrer ``osprey_chat_conversations``).
+Threads ativas do WhatsApp ficam num cache quente em memória com
+persistência write-behind; o canal web grava direto (write-through).
+
+``osprey_chat_conversations`` continua sendo o registro completo das
+mensagens; conversas sem estado (antigas ou expiradas) são reconstruídas a
+partir dele uma única vez.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.llm.prompt_assembly import ChatTurn
+
+logger = logging.getLogger(__name__)
+
+
+def _turn_to_doc(turn: ChatTurn) -> Dict[str, Any]:
+    return {"user": turn.user, "assistant": turn.assistant, "timestamp": turn.timestamp}
+
+
+def _turn_from_doc(doc: Dict[str, Any]) -> ChatTurn:
+    return ChatTurn(doc.get("user", ""), doc.get("assistant", ""), doc.get("timestamp"))
+
+
+@dataclass
+class ConversationState:
+    """Resumo + turnos não resumidos (ordem cronológica) de uma conversa"""
+
+    conversation_id: str
+    office_id: Optional[str] = None
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
+    turns: List[ChatTurn] = field(default_factory=list)
+    dirty: bool = False
+    # Conversa pertence a outro escritório: nada é lido nem gravado
+    foreign: bool = False
+    last_access: float = field(default_factory=time.monotonic)
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {
+            "office_id": self.office_id,
+            "summary": self.summary,
+            "summarized_until": self.summarized_until,
+            "turns": [_turn_to_doc(t) for t in self.turns],
+            "updated_at": datetime.utcnow(),
+        }
+
+
+class ConversationStateStore:
+    """
+    Estado de conversas com cache quente (LRU + ociosidade) e write-behind
+
+    Args:
+        max_turns: Máximo de turnos não resumidos guardados por conversa
+        hot_capacity: Conversas mantidas em memória
+        hot_idle_seconds: Conversa ociosa sai do cache (após flush)
+        flush_interval_seconds: Intervalo do write-behind
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 40,
+        hot_capacity: int = 512,
+        hot_idle_seconds: int = 1800,
+        flush_interval_seconds: float = 5.0,
+    ):
+        self.max_turns = max_turns
+        self.hot_capacity = hot_capacity
+        self.hot_idle_seconds = hot_idle_seconds
+        self.flush_interval_seconds = flush_interval_seconds
+        self.db = None
+        self._hot: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self.hits = 0
+        self.point_reads = 0
+        self.rebuilds = 0
+        self.flushes = 0
+
+    def bind(self, database) -> None:
+        self.db = database
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    async def load(
+        self, conversation_id: str, office_id: Optional[str] = None, hot: bool = False
+    ) -> ConversationState:
+        """
+        Estado da conversa: cache quente → leitura pontual → reconstrução do log
+
+        Args:
+            conversation_id: ID da conversa
+            office_id: Escritório do usuário (isola conversas entre escritórios)
+            hot: Mantém a conversa no cache quente (threads do WhatsApp)
+        """
+        state = self._hot.get(conversation_id)
+        if state is not None:
+            if office_id and state.office_id and state.office_id != office_id:
+                return ConversationState(conversation_id, office_id, foreign=True)
+            self.hits += 1
+            state.last_access = time.monotonic()
+            self._hot.move_to_end(conversation_id)
+            return state
+
+        state = await self._read(conversation_id, office_id)
+        if hot and not state.foreign:
+            await self._admit(state)
+        return state
+
+    async def _read(self, conversation_id: str, office_id: Optional[str]) -> ConversationState:
+        if self.db is None:
+            return ConversationState(conversation_id, office_id)
+
+        self.point_reads += 1
+        doc = await self.db.osprey_chat_state.find_one({"_id": conversation_id})
+        if doc is not None:
+            if office_id and doc.get("office_id") and doc["office_id"] != office_id:
+                return ConversationState(conversation_id, office_id, foreign=True)
+            return ConversationState(
+                conversation_id,
+                doc.get("office_id") or office_id,
+                doc.get("summary"),
+                doc.get("summarized_until"),
+                [_turn_from_doc(t) for t in doc.get("turns", [])],
+            )
+        return await self._rebuild(conversation_id, office_id)
+
+    async def _rebuild(self, conversation_id: str, office_id: Optional[str]) -> ConversationState:
+        """Conversa sem estado: semeia a partir dos turnos mais recentes do log"""
+        query = {"conversation_id": conversation_id}
+        if office_id:
+            query["office_id"] = office_id
+        docs = await self.db.osprey_chat_conversations.find(
+            query, {"user_message": 1, "ai_response": 1, "timestamp": 1}
+        ).sort("timestamp", -1).to_list(length=self.max_turns)
+
+        state = ConversationState(conversation_id, office_id)
+        if not docs:
+            return state
+
+        self.rebuilds += 1
+        docs.reverse()
+        state.turns = [
+            ChatTurn(d.get("user_message", ""), d.get("ai_response", ""), d.get("timestamp"))
+            for d in docs
+        ]
+        await self._persist(state)
+        return state
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    async def append_turn(self, state: ConversationState, turn: ChatTurn) -> None:
+        """Registra um turno; write-behind se a conversa está no cache quente"""
+        if state.foreign:
+            return
+        state.turns.append(turn)
+        if len(state.turns) > self.max_turns:
+            state.turns = state.turns[-self.max_turns:]
+
+        if self._hot.get(state.conversation_id) is state:
+            state.dirty = True
+            return
+        if self.db is None:
+            return
+
+        doc = state.to_doc()
+        await self.db.osprey_chat_state.update_one(
+            {"_id": state.conversation_id},
+            {
+                "$set": {"office_id": doc["office_id"], "updated_at": doc["updated_at"]},
+                "$push": {"turns": {"$each": [_turn_to_doc(turn)], "$slice": -self.max_turns}},
+            },
+            upsert=True,
+        )
+
+    async def apply_summary(
+        self,
+        conversation_id: str,
+        office_id: Optional[str],
+        summary: str,
+        summarized_until: datetime,
+    ) -> None:
+        """Grava o resumo novo e descarta os turnos que ele passou a cobrir"""
+        state = self._hot.get(conversation_id)
+        if state is not None:
+            state.summary = summary
+            state.summarized_until = summarized_until
+            state.turns = [
+                t for t in state.turns if t.timestamp is None or t.timestamp > summarized_until
+            ]
+            state.dirty = True
+            return
+        if self.db is None:
+            return
+
+        await self.db.osprey_chat_state.update_one(
+            {"_id": conversation_id},
+            {
+                "$set": {
+                    "office_id": office_id,
+                    "summary": summary,
+                    "summarized_until": summarized_until,
+                    "updated_at": datetime.utcnow(),
+                },
+                "$pull": {"turns": {"timestamp": {"$lte": summarized_until}}},
+            },
+            upsert=True,
+        )
+
+    async def _persist(self, state: ConversationState) -> None:
+        if self.db is None:
+            return
+        await self.db.osprey_chat_state.update_one(
+            {"_id": state.conversation_id}, {"$set": state.to_doc()}, upsert=True
+        )
+        state.dirty = False
+        self.flushes += 1
+
+    # ------------------------------------------------------------------
+    # Cache quente / write-behind
+    # ------------------------------------------------------------------
+
+    async def _admit(self, state: ConversationState) -> None:
+        self._hot[state.conversation_id] = state
+        self._hot.move_to_end(state.conversation_id)
+        while len(self._hot) > self.hot_capacity:
+            conversation_id, evicted = self._hot.popitem(last=False)
+            if not evicted.dirty:
+                continue
+            try:
+                await self._persist(evicted)
+            except Exception as e:
+                # Não derruba o request de outra conversa nem perde os turnos:
+                # volta ao cache (acima da capacidade) e o write-behind tenta de novo
+                logger.warning(f"Conversation state eviction failed ({conversation_id}): {e}")
+                self._hot[conversation_id] = evicted
+                self._hot.move_to_end(conversation_id, last=False)
+                break
+
+    async def flush(self) -> int:
+        """Persiste conversas sujas e libera as ociosas; retorna quantas gravou"""
+        written = 0
+        now = time.monotonic()
+        for conversation_id, state in list(self._hot.items()):
+            if state.dirty:
+                try:
+                    await self._persist(state)
+                    written += 1
+                except Exception as e:
+                    logger.warning(f"Conversation state flush failed ({conversation_id}): {e}")
+                    continue
+            if now - state.last_access > self.hot_idle_seconds:
+                self._hot.pop(conversation_id, None)
+        return written
+
+    async def run_flush_loop(self) -> None:
+        """Loop do write-behind (iniciado no lifespan do servidor)"""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval_seconds)
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hot_conversations": len(self._hot),
+            "dirty": sum(1 for s in self._hot.values() if s.dirty),
+            "hot_hits": self.hits,
+            "point_reads": self.point_reads,
+            "rebuilds": self.rebuilds,
+            "flushes": self.flushes,
+        }
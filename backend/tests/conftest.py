@@ -1,3 +1,9 @@
+import os
+
 import pytest
 
+# Settings obrigatórios no import de backend.* (valores só para os testes unitários)
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
 pytest_plugins = ["pytest_asyncio"]
@@ -0,0 +1,120 @@
+"""
+Unit tests for the case event log helpers and the legacy history migration.
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from backend.core.case_events import (
+    NOTES_MAX_CHARS,
+    NOTES_SEPARATOR,
+    RECENT_ACTIVITY_LIMIT,
+    _decode_cursor,
+    _encode_cursor,
+    _migrate_case,
+    append_note,
+    legacy_event_id,
+    new_case_event,
+    recent_activity_push,
+)
+
+NOW = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+
+class _Events:
+    """case_events stand-in: upserts keyed by _id."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            doc = request._doc["$setOnInsert"]
+            self.docs.setdefault(request._filter["_id"], doc)
+
+
+class _Cases:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.updates = []
+
+    async def update_one(self, query, update):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        self.updates.append((query, update))
+        return SimpleNamespace(matched_count=1)
+
+
+def test_new_case_event_shape():
+    event = new_case_event("CASE-1", "OFF-1", "note_added", "hi", actor="u1", ts=NOW, size=3)
+    assert event["event_id"].startswith("EVT-")
+    assert event["ts"] == NOW
+    assert event["actor"] == "u1"
+    assert event["data"] == {"size": 3}
+
+
+def test_recent_activity_push_is_bounded():
+    event = new_case_event("CASE-1", "OFF-1", "status_changed", "a → b", ts=NOW)
+    push = recent_activity_push(event)["recent_activity"]
+    assert push["$slice"] == -RECENT_ACTIVITY_LIMIT
+    assert push["$each"] == [
+        {"action": "status_changed", "timestamp": NOW.isoformat(), "detail": "a → b"}
+    ]
+
+
+def test_append_note_trims_oldest_entries():
+    notes = ""
+    for i in range(200):
+        notes = append_note(notes, f"note {i} " + "x" * 80, NOW)
+    assert len(notes) <= NOTES_MAX_CHARS
+    assert notes.split(NOTES_SEPARATOR)[-1].startswith("[01/03/2026 12:30] note 199")
+    assert "note 0 " not in notes
+
+
+def test_append_note_accepts_intake_list():
+    assert append_note(["first"], "second", NOW) == (
+        "first" + NOTES_SEPARATOR + "[01/03/2026 12:30] second"
+    )
+
+
+def test_cursor_round_trip_uses_naive_utc():
+    event = {"ts": NOW, "event_id": "EVT-ABC"}
+    query = _decode_cursor(_encode_cursor(event))
+    naive = NOW.replace(tzinfo=None)
+    assert query == {
+        "$or": [{"ts": {"$lt": naive}}, {"ts": naive, "event_id": {"$lt": "EVT-ABC"}}]
+    }
+
+
+def test_invalid_cursor_raises_value_error():
+    with pytest.raises(ValueError):
+        _decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_migration_is_idempotent_after_partial_failure():
+    case = {
+        "case_id": "CASE-1",
+        "office_id": "OFF-1",
+        "history": [
+            {"action": "case_created", "timestamp": "2025-01-01T10:00:00Z"},
+            {"action": "note_added", "detail": "hi", "timestamp": "2025-01-02T10:00:00Z"},
+        ],
+    }
+    events = _Events()
+    failing = SimpleNamespace(case_events=events, b2b_cases=_Cases(fail=True))
+    with pytest.raises(RuntimeError):
+        await _migrate_case(failing, case)
+
+    cases = _Cases()
+    await _migrate_case(SimpleNamespace(case_events=events, b2b_cases=cases), case)
+
+    assert sorted(events.docs) == [legacy_event_id("CASE-1", 0), legacy_event_id("CASE-1", 1)]
+    query, update = cases.updates[0]
+    assert update["$unset"] == {"history": ""}
+    assert [e["action"] for e in update["$set"]["recent_activity"]] == [
+        "case_created",
+        "note_added",
+    ]
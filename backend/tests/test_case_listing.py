@@ -0,0 +1,111 @@
+"""
+Unit tests for keyset pagination of case listings.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.core.case_listing import (
+    decode_page_token,
+    encode_page_token,
+    fetch_case_page,
+    keyset_filter,
+)
+
+T0 = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = doc.get(key)
+            if value is None or not value < cond["$lt"]:
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+def _sort_key(doc):
+    # updated_at desc (None last), then case_id desc
+    updated = doc.get("updated_at")
+    return (updated is not None, updated or T0, doc["case_id"])
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        self.docs = sorted(self.docs, key=_sort_key, reverse=True)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _Cases:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(d) for d in self.docs if _matches(d, query)])
+
+
+class _Db:
+    def __init__(self, docs):
+        self.b2b_cases = _Cases(docs)
+
+
+def test_token_round_trip_keeps_datetimes():
+    token = encode_page_token({"updated_at": T0, "case_id": "CASE-9"})
+    assert "=" not in token
+    assert decode_page_token(token) == (T0, "CASE-9")
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "e30", "bnVsbA"])
+def test_malformed_tokens_raise_value_error(token):
+    with pytest.raises(ValueError):
+        decode_page_token(token)
+
+
+def test_token_without_updated_at_continues_among_undated_cases():
+    token = encode_page_token({"updated_at": None, "case_id": "CASE-5"})
+    assert keyset_filter(token) == {"updated_at": None, "case_id": {"$lt": "CASE-5"}}
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_every_case_once_in_order():
+    # Pairs share updated_at (tie broken by case_id); two cases were never updated
+    docs = [
+        {
+            "case_id": f"CASE-{i:02d}",
+            "office_id": "OFF-1",
+            "updated_at": T0 - timedelta(hours=i // 2),
+        }
+        for i in range(9)
+    ]
+    docs += [{"case_id": f"CASE-X{i}", "office_id": "OFF-1"} for i in (1, 2)]
+    db = _Db(docs)
+
+    seen, token = [], None
+    while True:
+        page, token = await fetch_case_page(db, {"office_id": "OFF-1"}, 4, token)
+        seen.extend(case["case_id"] for case in page)
+        if token is None:
+            break
+
+    expected = [d["case_id"] for d in sorted(docs, key=_sort_key, reverse=True)]
+    assert seen == expected
+    assert seen[-2:] == ["CASE-X2", "CASE-X1"]
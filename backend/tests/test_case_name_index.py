@@ -0,0 +1,113 @@
+"""
+Unit tests for trigram-based client name resolution.
+"""
+
+import pytest
+
+from backend.core.case_name_index import (
+    AmbiguousCaseMatch,
+    NameMatch,
+    find_cases_by_name,
+    fold_name,
+    name_index_fields,
+    name_trigrams,
+    pick_match,
+    score_name,
+)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class _Cases:
+    """Applies the $match stage of the candidate pipeline ($all / $in)."""
+
+    def __init__(self, names):
+        self.docs = [
+            {
+                "case_id": f"CASE-{i}",
+                "office_id": "OFF-1",
+                "client_name": name,
+                **name_index_fields(name),
+            }
+            for i, name in enumerate(names)
+        ]
+
+    def aggregate(self, pipeline):
+        match = pipeline[0]["$match"]
+        spec = match["name_trigrams"]
+        docs = []
+        for doc in self.docs:
+            grams = set(doc["name_trigrams"])
+            if doc["office_id"] != match["office_id"]:
+                continue
+            if "$all" in spec and set(spec["$all"]) <= grams:
+                docs.append(doc)
+            elif "$in" in spec and set(spec["$in"]) & grams:
+                docs.append(doc)
+        return _Cursor(docs)
+
+
+class _Db:
+    def __init__(self, names):
+        self.b2b_cases = _Cases(names)
+
+
+def _score(query, name):
+    return score_name(fold_name(query), set(name_trigrams(query)), {"client_name": name})
+
+
+def test_fold_name_strips_accents_and_punctuation():
+    assert fold_name("João  Da-Silva") == "joao da silva"
+    assert fold_name(None) == ""
+
+
+def test_trigrams_are_padded_per_word():
+    assert name_trigrams("Ana") == ["  a", " an", "ana", "na "]
+    assert name_trigrams("") == []
+
+
+def test_whole_word_scores_above_prefix_match():
+    assert _score("Silva", "Maria Silva") >= 0.9
+    assert _score("Silva", "Maria Silva") > _score("Silva", "Silvana Costa")
+    assert _score("Silva", "Pedro Souza") < 0.45
+
+
+def _match(case_id, score, exact=False):
+    return NameMatch(case_id, case_id, score, exact=exact)
+
+
+def test_pick_match_prefers_single_exact_match():
+    matches = [_match("A", 0.95), _match("B", 0.94, exact=True)]
+    assert pick_match("b", matches).case_id == "B"
+
+
+def test_pick_match_raises_on_near_ties():
+    with pytest.raises(AmbiguousCaseMatch) as err:
+        pick_match("silva", [_match("A", 0.95), _match("B", 0.9), _match("C", 0.5)])
+    assert [c.case_id for c in err.value.candidates] == ["A", "B"]
+
+
+def test_pick_match_clear_winner_and_empty():
+    assert pick_match("x", [_match("A", 0.95), _match("B", 0.6)]).case_id == "A"
+    assert pick_match("x", []) is None
+
+
+@pytest.mark.asyncio
+async def test_find_cases_by_name_ranks_and_filters():
+    db = _Db(["Maria Silva", "José Silva", "Silvana Costa", "Pedro Souza"])
+    matches = await find_cases_by_name(db, "OFF-1", "maria silva")
+    assert matches[0].client_name == "Maria Silva" and matches[0].exact
+    assert "Pedro Souza" not in {m.client_name for m in matches}
+
+
+@pytest.mark.asyncio
+async def test_find_cases_by_name_falls_back_to_partial_trigrams():
+    db = _Db(["Maria Silva"])
+    matches = await find_cases_by_name(db, "OFF-1", "Maria Silvaa")
+    assert [m.client_name for m in matches] == ["Maria Silva"]
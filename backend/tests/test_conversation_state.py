@@ -0,0 +1,153 @@
+"""
+Unit tests for the per-conversation state store (hot cache and write-behind).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.llm.prompt_assembly import ChatTurn
+from backend.services.conversation_state import ConversationStateStore
+
+T0 = datetime(2026, 3, 1, 12, 0)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class _StateCollection:
+    def __init__(self):
+        self.docs = {}
+        self.fail = False
+        self.writes = 0
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        if self.fail:
+            raise ConnectionError("mongo down")
+        self.writes += 1
+        doc = self.docs.setdefault(query["_id"], {"turns": []})
+        doc.update(update.get("$set", {}))
+        for key, push in update.get("$push", {}).items():
+            doc[key] = (doc.get(key, []) + push["$each"])[push["$slice"]:]
+
+
+class _LogCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query, projection=None):
+        return _Cursor([d for d in self.docs if d["conversation_id"] == query["conversation_id"]])
+
+
+class _Db:
+    def __init__(self, log=()):
+        self.osprey_chat_state = _StateCollection()
+        self.osprey_chat_conversations = _LogCollection(log)
+
+
+def _turn(i):
+    return ChatTurn(f"q{i}", f"a{i}", T0 + timedelta(minutes=i))
+
+
+def _store(db, **kwargs):
+    store = ConversationStateStore(**kwargs)
+    store.bind(db)
+    return store
+
+
+@pytest.mark.asyncio
+async def test_missing_state_is_rebuilt_once_from_the_log():
+    log = [
+        {
+            "conversation_id": "c1",
+            "user_message": f"q{i}",
+            "ai_response": f"a{i}",
+            "timestamp": T0 + timedelta(minutes=i),
+        }
+        for i in range(5)
+    ]
+    db = _Db(log)
+    store = _store(db, max_turns=3)
+
+    state = await store.load("c1", "OFF-1")
+    assert [t.user for t in state.turns] == ["q2", "q3", "q4"]
+    assert store.rebuilds == 1
+
+    again = await _store(db, max_turns=3).load("c1", "OFF-1")
+    assert [t.user for t in again.turns] == ["q2", "q3", "q4"]
+
+
+@pytest.mark.asyncio
+async def test_hot_conversations_write_behind():
+    db = _Db()
+    store = _store(db)
+    state = await store.load("c1", "OFF-1", hot=True)
+    await store.append_turn(state, _turn(1))
+    assert db.osprey_chat_state.writes == 0
+    assert (await store.load("c1", "OFF-1")) is state
+
+    assert await store.flush() == 1
+    assert db.osprey_chat_state.docs["c1"]["turns"][0]["user"] == "q1"
+
+
+@pytest.mark.asyncio
+async def test_web_channel_writes_through():
+    db = _Db()
+    store = _store(db, max_turns=2)
+    state = await store.load("c1", "OFF-1")
+    for i in range(3):
+        await store.append_turn(state, _turn(i))
+    assert [t["user"] for t in db.osprey_chat_state.docs["c1"]["turns"]] == ["q1", "q2"]
+
+
+@pytest.mark.asyncio
+async def test_other_office_conversation_is_foreign():
+    db = _Db()
+    store = _store(db)
+    state = await store.load("c1", "OFF-1", hot=True)
+    await store.append_turn(state, _turn(1))
+
+    foreign = await store.load("c1", "OFF-2")
+    assert foreign.foreign and foreign.turns == []
+    await store.append_turn(foreign, _turn(2))
+    assert [t.user for t in state.turns] == ["q1"]
+
+
+@pytest.mark.asyncio
+async def test_summary_drops_covered_hot_turns():
+    store = _store(_Db())
+    state = await store.load("c1", "OFF-1", hot=True)
+    for i in range(3):
+        await store.append_turn(state, _turn(i))
+    await store.apply_summary("c1", "OFF-1", "resumo", T0 + timedelta(minutes=1))
+    assert state.summary == "resumo"
+    assert [t.user for t in state.turns] == ["q2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_eviction_keeps_dirty_state_for_the_next_flush():
+    db = _Db()
+    store = _store(db, hot_capacity=1)
+    first = await store.load("c1", "OFF-1", hot=True)
+    await store.append_turn(first, _turn(1))
+
+    db.osprey_chat_state.fail = True
+    await store.load("c2", "OFF-1", hot=True)  # eviction of c1 fails: no exception
+    assert (await store.load("c1", "OFF-1")) is first
+    assert first.dirty
+
+    db.osprey_chat_state.fail = False
+    assert await store.flush() == 1
+    assert db.osprey_chat_state.docs["c1"]["turns"][0]["user"] == "q1"
@@ -0,0 +1,109 @@
+"""
+Unit tests for the bucketed document KPIs (KPIWindow and the KPI report).
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.documents.metrics import (
+    PROCESSING_BUCKETS_MS,
+    DecisionType,
+    DocumentAnalysisKPIs,
+    DocumentMetrics,
+    FieldExtractionResult,
+    KPIWindow,
+)
+
+DAY = datetime(2026, 3, 1, 15, 0, tzinfo=timezone.utc)
+
+
+def _metrics(ms, correct=True, fields=(), decision=DecisionType.PASS, review=False):
+    return DocumentMetrics(
+        document_id=f"doc-{ms}",
+        doc_type="passport",
+        classification_confidence=0.9,
+        classification_correct=correct,
+        field_extractions=[
+            FieldExtractionResult(name, "v", "v", 1.0, exact, 1.0) for name, exact in fields
+        ],
+        quality_score=0.8,
+        decision=decision,
+        human_review_required=review,
+        processing_time_ms=ms,
+        analysis_timestamp=DAY,
+    )
+
+
+def _bucket(kpis):
+    """What the day's upsert leaves in Mongo: dotted $inc paths as nested docs."""
+    doc = {"processing_max_ms": max(kpis._pending_max.values())}
+    for path, value in next(iter(kpis._pending.values())).items():
+        node = doc
+        *parents, leaf = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = node.get(leaf, 0) + value
+    return doc
+
+
+def _window(*metrics):
+    kpis = DocumentAnalysisKPIs()
+    for m in metrics:
+        kpis.record(m)
+    return KPIWindow([_bucket(kpis)])
+
+
+def test_percentiles_follow_the_histogram():
+    window = _window(*[_metrics(float(ms)) for ms in range(10, 1010, 10)])
+    p50, p95, p99 = (window.processing_percentile(q) for q in (50, 95, 99))
+    assert p50 <= p95 <= p99 <= window.max_processing_ms == 1000.0
+    # Interpolated within the true value's bucket (geometric 1.5x buckets)
+    assert 500 / 1.5 <= p50 <= 500 * 1.5
+    assert 950 / 1.5 <= p95 <= 1000
+
+
+def test_single_bucket_percentile_is_capped_by_max():
+    window = _window(_metrics(7.0))
+    assert PROCESSING_BUCKETS_MS[0] < 7.0
+    assert window.processing_percentile(99) == 7.0
+
+
+def test_unclassified_and_unmeasured_fields_are_no_data():
+    window = _window(_metrics(100.0, correct=None))
+    assert window.classification_f1() is None
+    assert window.exact_match_rate("identity") is None
+
+
+def test_rates_over_measured_entries():
+    window = _window(
+        _metrics(100.0, correct=True, fields=[("full_name", True), ("ssn", False)]),
+        _metrics(200.0, correct=False, decision=DecisionType.FAIL, review=True),
+        _metrics(300.0, correct=None),
+    )
+    assert window.documents == 3
+    assert window.classification_f1() == 0.5
+    assert window.exact_match_rate("identity") == 0.5
+    assert window.exact_match_rate("formatted_numbers") == 0.0
+    assert window.false_fail_rate() == pytest.approx(1 / 3)
+    assert window.by_doc_type()["passport"] == {"documents": 3, "classification_accuracy": 0.5}
+
+
+@pytest.mark.asyncio
+async def test_report_marks_unmeasured_kpis_as_no_data(monkeypatch):
+    kpis = DocumentAnalysisKPIs()
+    window = _window(_metrics(100.0, correct=True))
+
+    async def fake_window(timeframe_days=30):
+        return window
+
+    monkeypatch.setattr(kpis, "window", fake_window)
+    report = (await kpis.generate_kpi_report())["kpis"]
+    assert report["classification_f1_score"]["status"] == "PASS"
+    for name in (
+        "identity_fields_exact_match",
+        "dates_exact_match",
+        "formatted_numbers_exact_match",
+    ):
+        assert report[name]["value"] is None
+        assert report[name]["status"] == "NO_DATA"
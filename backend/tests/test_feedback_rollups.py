@@ -0,0 +1,174 @@
+"""
+Unit tests for feedback analytics served from daily (day, type) rollups.
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from backend.learning.feedback import (
+    ROLLUP_BACKFILL_MARKER,
+    FeedbackSystem,
+    FeedbackType,
+    _day,
+    _rollup_increments,
+    get_nps_score,
+)
+
+
+def _resolve(doc, path):
+    for part in path.split("."):
+        doc = (doc or {}).get(part)
+    return doc or 0
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _Feedback:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=len(self.docs))
+
+    def find(self, query, projection=None):
+        return _Cursor([{"comment": d["comment"]} for d in self.docs if d["type"] == query["type"]])
+
+
+class _Rollups:
+    """Upserts with $inc/$setOnInsert and the $match/$group stages used by _sum_rollups"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        for key, value in update.get("$setOnInsert", {}).items():
+            doc.setdefault(key, value)
+        doc.update(update.get("$set", {}))
+        for path, step in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + step
+
+    def aggregate(self, pipeline):
+        match, group = pipeline[0]["$match"], pipeline[1]["$group"]
+        rows = {}
+        for doc in self.docs.values():
+            if "day" not in doc or match.get("type", doc["type"]) != doc["type"]:
+                continue
+            if not match["day"].get("$gte", doc["day"]) <= doc["day"]:
+                continue
+            if not doc["day"] <= match["day"].get("$lte", doc["day"]):
+                continue
+            row = rows.setdefault(doc["type"], {"_id": doc["type"]})
+            for field, spec in group.items():
+                if field != "_id":
+                    row[field] = row.get(field, 0) + _resolve(doc, spec["$sum"][1:])
+        return _Cursor(list(rows.values()))
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(FeedbackSystem, "_rollups_ready", False)
+    rollups = _Rollups()
+    rollups.docs[ROLLUP_BACKFILL_MARKER] = {"_id": ROLLUP_BACKFILL_MARKER}
+    return SimpleNamespace(feedback=_Feedback(), feedback_daily_rollups=rollups)
+
+
+def test_day_and_increments():
+    sao_paulo = timezone(timedelta(hours=-3))
+    assert _day(datetime(2026, 3, 1, 23, 30, tzinfo=sao_paulo)) == datetime(2026, 3, 2)
+    assert _rollup_increments(2, None, "slow") == {
+        "total": 1,
+        "ratings.2": 1,
+        "rating_sum": 2,
+        "rating_count": 1,
+        "negative_commented": 1,
+    }
+    assert _rollup_increments(None, "up", "nice") == {"total": 1, "thumbs_up": 1}
+
+
+@pytest.mark.asyncio
+async def test_stats_are_summed_from_rollups(db):
+    system = FeedbackSystem(db)
+    await system.submit_feedback("u1", FeedbackType.AI_RESPONSE, thumbs="up")
+    await system.submit_feedback("u2", FeedbackType.AI_RESPONSE, rating=5, thumbs="up")
+    await system.submit_feedback("u3", "form_usability", rating=1, comment="confuso")
+    # One rollup document per (day, type), not per feedback
+    assert len(db.feedback_daily_rollups.docs) == 3
+
+    stats = await system.get_feedback_stats()
+    assert stats["total_feedback"] == 3
+    assert stats["thumbs_up"] == 2 and stats["thumbs_up_rate"] == 1.0
+    assert stats["average_rating"] == 3.0
+    assert stats["rating_distribution"] == {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}
+    assert stats["feedback_by_type"] == {"ai_response": 2, "form_usability": 1}
+
+    only_forms = await system.get_feedback_stats(FeedbackType.FORM_USABILITY)
+    assert only_forms["total_feedback"] == 1 and only_forms["sentiment"] == "negative"
+
+    future = datetime.now(timezone.utc) + timedelta(days=2)
+    assert (await system.get_feedback_stats(start_date=future))["total_feedback"] == 0
+
+
+@pytest.mark.asyncio
+async def test_trending_counts_negative_commented_feedback(db):
+    system = FeedbackSystem(db)
+    for _ in range(3):
+        await system.submit_feedback("u", "pdf_generation", thumbs="down", comment="falhou")
+    await system.submit_feedback("u", "pdf_generation", thumbs="down")
+    await system.submit_feedback("u", "document_upload", rating=1, comment="lento")
+
+    trending = await system.get_trending_issues(days=1, min_occurrences=2)
+    assert [(t["type"], t["count"]) for t in trending] == [("pdf_generation", 3)]
+    assert trending[0]["severity"] == "medium"
+
+
+@pytest.mark.asyncio
+async def test_nps_counts_only_rated_feedback(db):
+    system = FeedbackSystem(db)
+    for rating in (5, 5, 4, 1):
+        await system.submit_feedback("u", FeedbackType.GENERAL_EXPERIENCE, rating=rating)
+    await system.submit_feedback("u", FeedbackType.GENERAL_EXPERIENCE, thumbs="up")
+
+    nps = await get_nps_score(db)
+    assert nps["total_responses"] == 4
+    assert (nps["promoters"], nps["passives"], nps["detractors"]) == (2, 1, 1)
+    assert nps["nps"] == 25.0
+
+
+@pytest.mark.asyncio
+async def test_missing_marker_triggers_one_backfill(db, monkeypatch):
+    del db.feedback_daily_rollups.docs[ROLLUP_BACKFILL_MARKER]
+    rebuilt = []
+
+    async def rebuild(self, start_date=None):
+        rebuilt.append(start_date)
+        return 0
+
+    monkeypatch.setattr(FeedbackSystem, "rebuild_rollups", rebuild)
+    system = FeedbackSystem(db)
+    await system.ensure_rollups()
+    await system.ensure_rollups()
+    assert rebuilt == [None]
+    assert ROLLUP_BACKFILL_MARKER in db.feedback_daily_rollups.docs
@@ -0,0 +1,132 @@
+"""
+Unit tests for finalizer job persistence: leases, stale-job recovery, events.
+"""
+
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from backend.case import finalizer_jobs
+from backend.case.finalizer_jobs import (
+    EVENTS_MAX,
+    MAX_ATTEMPTS,
+    WORKER_ID,
+    FinalizerJobStore,
+    bson_safe,
+)
+
+
+def _matches(doc, query):
+    for key, cond in query.items():
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            if "$lt" in cond and not value < cond["$lt"]:
+                return False
+            if "$gte" in cond and not value >= cond["$gte"]:
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def _apply(doc, update):
+    doc.update(update.get("$set", {}))
+    for key, step in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + step
+    for key, spec in update.get("$push", {}).items():
+        doc[key] = (doc.get(key, []) + spec["$each"])[spec["$slice"] :]
+
+
+class _Jobs:
+    def __init__(self):
+        self.docs = []
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if _matches(d, query)), None)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                _apply(doc, update)
+                return
+
+    async def update_many(self, query, update):
+        hits = [d for d in self.docs if _matches(d, query)]
+        for doc in hits:
+            _apply(doc, update)
+        return SimpleNamespace(modified_count=len(hits))
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        for doc in self.docs:
+            if _matches(doc, query):
+                _apply(doc, update)
+                return dict(doc)
+        return None
+
+
+@pytest.fixture
+def store():
+    return FinalizerJobStore({finalizer_jobs.JOBS_COLLECTION: _Jobs()})
+
+
+async def _expire_lease(store, job_id):
+    past = finalizer_jobs._now() - timedelta(seconds=1)
+    await store.collection.update_one({"job_id": job_id}, {"$set": {"lease_until": past}})
+
+
+@pytest.mark.asyncio
+async def test_create_takes_the_lease_and_update_renews_it(store):
+    await store.create({"job_id": "JOB-1", "status": "running"})
+    job = await store.get("JOB-1")
+    assert job["lease_owner"] == WORKER_ID and job["attempts"] == 1
+    assert job["expires_at"] > job["lease_until"] > finalizer_jobs._now()
+
+    await _expire_lease(store, "JOB-1")
+    await store.update("JOB-1", {"checklist": ["a"]})
+    assert (await store.get("JOB-1"))["lease_until"] > finalizer_jobs._now()
+
+
+@pytest.mark.asyncio
+async def test_only_stale_running_jobs_are_claimed(store):
+    await store.create({"job_id": "LIVE", "status": "running"})
+    await store.create({"job_id": "DONE", "status": "completed"})
+    await store.create({"job_id": "STALE", "status": "running"})
+    await _expire_lease(store, "DONE")
+    await _expire_lease(store, "STALE")
+
+    claimed = await store.claim_stale()
+    assert claimed["job_id"] == "STALE" and claimed["attempts"] == 2
+    assert claimed["lease_until"] > finalizer_jobs._now()
+    assert await store.claim_stale() is None
+
+
+@pytest.mark.asyncio
+async def test_jobs_past_max_attempts_are_failed_not_claimed(store):
+    await store.create({"job_id": "JOB-1", "status": "running"})
+    for _ in range(MAX_ATTEMPTS - 1):
+        await _expire_lease(store, "JOB-1")
+        assert await store.claim_stale()
+    await _expire_lease(store, "JOB-1")
+
+    assert await store.claim_stale() is None
+    assert await store.fail_exhausted() == 1
+    job = await store.get("JOB-1")
+    assert job["status"] == "failed" and job["attempts"] == MAX_ATTEMPTS
+
+
+@pytest.mark.asyncio
+async def test_events_are_capped(store):
+    await store.create({"job_id": "JOB-1", "status": "running"})
+    for seq in range(1, EVENTS_MAX + 6):
+        await store.push_event("JOB-1", {"seq": seq})
+    events = (await store.get("JOB-1"))["events"]
+    assert len(events) == EVENTS_MAX and events[0]["seq"] == 6
+
+
+def test_bson_safe_stringifies_unknown_objects():
+    assert bson_safe({"path": Path("/tmp/x.pdf"), "n": [1]}) == {"path": "/tmp/x.pdf", "n": [1]}
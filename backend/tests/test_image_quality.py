@@ -0,0 +1,67 @@
+"""
+Unit tests for image quality metrics and the pre-OCR quality gate.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from backend.documents.image_quality import compute_image_quality, effective_dpi
+from backend.documents.quality_checker import DocumentQualityChecker
+
+
+def _text_like(width, height, skew=0.0, blur=0.0, dpi=None, fmt="PNG"):
+    """White page with dark horizontal "text lines" (sharp edges)."""
+    pixels = np.full((height, width), 255, dtype=np.uint8)
+    for top in range(20, height - 20, 24):
+        for left in range(20, width - 60, 50):
+            pixels[top : top + 10, left : left + 40] = 20
+    image = Image.fromarray(pixels, mode="L")
+    if skew:
+        image = image.rotate(skew, expand=False, fillcolor=255)
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **({"dpi": (dpi, dpi)} if dpi else {}))
+    return buffer.getvalue()
+
+
+def test_dpi_uses_plausible_metadata():
+    image = Image.open(io.BytesIO(_text_like(2550, 3300, dpi=300)))
+    dpi, source = effective_dpi(image)
+    assert source == "metadata"
+    assert round(dpi) == 300
+
+
+def test_dpi_without_metadata_is_estimated_from_page_size():
+    image = Image.open(io.BytesIO(_text_like(1275, 1650)))
+    dpi, source = effective_dpi(image)
+    assert source == "page_size"
+    assert round(dpi) == 150
+
+
+def test_sharp_image_scores_higher_than_blurred():
+    sharp = compute_image_quality(_text_like(1000, 800))
+    blurred = compute_image_quality(_text_like(1000, 800, blur=4))
+    assert sharp.blur_var > blurred.blur_var * 5
+
+
+def test_skew_is_detected():
+    metrics = compute_image_quality(_text_like(1200, 900, skew=4))
+    assert metrics.skew_deg is not None
+    assert abs(abs(metrics.skew_deg) - 4) <= 1.0
+
+
+def test_small_id_crop_without_dpi_metadata_is_not_rejected():
+    """A legible 600px passport/ID crop only warns about the estimated DPI."""
+    precheck = DocumentQualityChecker().precheck_for_ocr(_text_like(600, 380), "id.png")
+    assert precheck["proceed"], precheck["reasons"]
+    assert precheck["warnings"]
+
+
+def test_unreadable_blur_is_rejected():
+    precheck = DocumentQualityChecker().precheck_for_ocr(
+        _text_like(1275, 1650, blur=8), "blurry.png"
+    )
+    assert not precheck["proceed"]
@@ -0,0 +1,173 @@
+"""
+Unit tests for the invalidation bus and the derived-data cache.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from backend.core.invalidation import (
+    DerivedCache,
+    Invalidation,
+    InvalidationBus,
+    WatchedCollection,
+)
+
+
+def test_subscribers_receive_only_matching_events():
+    bus = InvalidationBus()
+    seen = {"all": [], "office": [], "case": []}
+    bus.subscribe(seen["all"].append)
+    bus.subscribe(seen["office"].append, office_id="OFF-1")
+    unsubscribe = bus.subscribe(seen["case"].append, office_id="OFF-1", case_id="CASE-1")
+
+    bus.publish(Invalidation("b2b_cases", "OFF-1", "CASE-2"))
+    bus.publish(Invalidation("b2b_cases", "OFF-2", "CASE-9"))
+    unsubscribe()
+    bus.publish(Invalidation("b2b_cases", "OFF-1", "CASE-1"))
+
+    assert len(seen["all"]) == 3
+    assert [e.case_id for e in seen["office"]] == ["CASE-2", "CASE-1"]
+    assert seen["case"] == []
+
+
+def test_unknown_origin_reaches_every_subscriber_and_errors_are_isolated():
+    bus = InvalidationBus()
+    seen = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken, office_id="OFF-1")
+    bus.subscribe(seen.append, office_id="OFF-2", case_id="CASE-3")
+    bus.publish(Invalidation("b2b_cases", operation="delete"))
+    assert len(seen) == 1 and bus.published == 1
+
+
+def test_from_document_uses_collection_keys():
+    bus = InvalidationBus()
+    event = bus._from_document("auto_cases", {"id": "AUTO-1", "office_id": "x"}, "insert")
+    assert (event.office_id, event.case_id) == (None, "AUTO-1")
+    assert bus._from_document("unknown", {"case_id": "C"}, "update").case_id is None
+
+
+@pytest.mark.asyncio
+async def test_cache_drops_case_and_office_aggregates_on_change():
+    bus = InvalidationBus()
+    cache = DerivedCache("test", bus=bus)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    await cache.get_or_compute("OFF-1", None, "overview", compute)
+    await cache.get_or_compute("OFF-1", "CASE-1", "qa", compute)
+    await cache.get_or_compute("OFF-1", "CASE-2", "qa", compute)
+    await cache.get_or_compute("OFF-2", None, "overview", compute)
+
+    bus.publish(Invalidation("letters", "OFF-1", "CASE-1"))  # not a source
+    assert cache.get_stats()["entries"] == 4
+
+    bus.publish(Invalidation("b2b_cases", "OFF-1", "CASE-1"))
+    assert set(cache._entries) == {("OFF-1", "CASE-2", "qa"), ("OFF-2", None, "overview")}
+    assert await cache.get_or_compute("OFF-1", "CASE-2", "qa", compute) == 3
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_result_computed_across_an_invalidation_is_not_stored():
+    bus = InvalidationBus()
+    cache = DerivedCache("test", bus=bus)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow():
+        started.set()
+        await release.wait()
+        return "stale"
+
+    task = asyncio.create_task(cache.get_or_compute("OFF-1", None, "stats", slow))
+    await started.wait()
+    bus.publish(Invalidation("b2b_cases", "OFF-1", "CASE-1"))
+    release.set()
+
+    assert await task == "stale"
+    assert cache.get_stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_respects_ttl_and_size_bound():
+    cache = DerivedCache("test", bus=InvalidationBus(), ttl_seconds=0, max_entries=2)
+
+    async def compute():
+        return "v"
+
+    for key in ("a", "b", "c"):
+        await cache.get_or_compute("OFF-1", None, key, compute)
+    assert [k[2] for k in cache._entries] == ["b", "c"]
+    await cache.get_or_compute("OFF-1", None, "c", compute)
+    assert cache.hits == 0
+
+
+class _PollCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        self.docs.sort(key=lambda d: tuple(d[field] for field, _ in spec))
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class _PollCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        def after(doc, q):
+            if "$or" in q:
+                return any(after(doc, sub) for sub in q["$or"])
+            for field, cond in q.items():
+                if isinstance(cond, dict):
+                    if not doc[field] > cond["$gt"]:
+                        return False
+                elif doc[field] != cond:
+                    return False
+            return True
+
+        return _PollCursor([d for d in self.docs if after(d, query)])
+
+
+@pytest.mark.asyncio
+async def test_polling_pages_through_bursts(monkeypatch):
+    monkeypatch.setattr("backend.core.invalidation.POLL_BATCH", 2)
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    changed = start + timedelta(seconds=5)
+    docs = [
+        {
+            "_id": ObjectId.from_datetime(start + timedelta(seconds=i + 1)),
+            "case_id": f"CASE-{i}",
+            "office_id": "OFF-1",
+            "updated_at": changed,
+        }
+        for i in range(5)
+    ]
+    watched = WatchedCollection("b2b_cases", changed_at_fields=("updated_at",))
+    bus = InvalidationBus([watched])
+    seen = []
+    bus.subscribe(seen.append)
+    last_oid = {"b2b_cases": ObjectId.from_datetime(start)}
+    last_changed = {"b2b_cases": start}
+
+    db = {"b2b_cases": _PollCollection(docs)}
+    await bus._poll_collection(db, watched, last_oid, last_changed)
+
+    # Each document is seen once as an insert and once by its updated_at
+    assert len(seen) == 10
+    assert sorted(e.case_id for e in seen[:5]) == [f"CASE-{i}" for i in range(5)]
+    assert last_oid["b2b_cases"] == docs[-1]["_id"]
+    assert last_changed["b2b_cases"] == changed
@@ -0,0 +1,116 @@
+"""
+Unit tests for the knowledge-base chunk index (tokenizing, chunking, rebuild).
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from backend.knowledge.search_index import (
+    KnowledgeSearchIndex,
+    _term_offsets,
+    chunk_with_offsets,
+    make_snippet,
+    normalize_text,
+    tokenize,
+)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _Documents:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        return _Cursor([d for d in self.docs if d["status"] == query["status"]])
+
+    async def distinct(self, key, query):
+        return [d[key] for d in self.docs if d["status"] == query["status"]]
+
+
+class _Chunks:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    async def delete_many(self, query):
+        spec = query["document_id"]
+        if isinstance(spec, dict):
+            keep = [r for r in self.records if r["document_id"] in spec["$nin"]]
+        else:
+            keep = [r for r in self.records if r["document_id"] != spec]
+        deleted = len(self.records) - len(keep)
+        self.records = keep
+        return SimpleNamespace(deleted_count=deleted)
+
+    async def insert_many(self, records):
+        self.records.extend(records)
+
+
+def test_normalize_and_tokenize():
+    assert normalize_text("Petição ÚNICA") == "peticao unica"
+    assert tokenize("A petição do I-140 e o H-1B") == ["peticao", "i-140", "h-1b"]
+
+
+def test_chunks_overlap_and_cover_the_text():
+    text = " ".join(f"w{i}" for i in range(450))
+    spans = chunk_with_offsets(text, chunk_words=200, overlap=40)
+    assert spans[0][0] == 0 and spans[-1][1] == len(text)
+    assert len(spans) == 3
+    assert text[spans[1][0] : spans[1][1]].split()[0] == "w160"
+    assert chunk_with_offsets("   ") == []
+
+
+def test_term_offsets_point_into_the_original_text():
+    chunk = "Requisitos da Petição: petição inicial"
+    tf, first = _term_offsets(chunk)
+    assert tf["peticao"] == 2
+    assert chunk[first["peticao"] :].startswith("Petição")
+
+
+def test_snippet_is_centred_and_marked():
+    text = "x" * 1000
+    snippet = make_snippet(text, 500, context_chars=100)
+    assert snippet == "..." + "x" * 100 + "..."
+    assert make_snippet("short text", 0) == "short text"
+
+
+@pytest.mark.asyncio
+async def test_rebuild_drops_orphan_chunks_and_reindexes_active_documents():
+    documents = _Documents(
+        [
+            {
+                "document_id": "KB-1",
+                "status": "active",
+                "filename": "guide.pdf",
+                "extracted_text": "Formatting guide for petitions",
+            },
+            {"document_id": "KB-2", "status": "deleted", "filename": "old.pdf"},
+        ]
+    )
+    chunks = _Chunks(
+        [
+            {"document_id": "KB-1", "text": "stale"},
+            {"document_id": "KB-2", "text": "deleted doc"},
+            {"document_id": "KB-GONE", "text": "no parent"},
+        ]
+    )
+    db = SimpleNamespace(knowledge_base=documents, knowledge_base_chunks=chunks)
+    index = KnowledgeSearchIndex(db)
+
+    result = await index.rebuild()
+
+    assert result["orphan_chunks_removed"] == 2
+    assert result["documents"] == 1
+    assert {r["document_id"] for r in chunks.records} == {"KB-1"}
+    assert all(r.get("text") != "stale" for r in chunks.records)
@@ -0,0 +1,82 @@
+"""
+Unit tests for adaptive LLM routing (ProviderRouter, call_with_routing).
+"""
+
+import asyncio
+
+import pytest
+
+from backend.llm.helpers import CircuitBreaker, ProviderRouter, call_with_routing
+
+
+def _router():
+    return ProviderRouter(circuit_breaker=CircuitBreaker(failure_threshold=2))
+
+
+def test_requested_model_stays_first_while_healthy_even_if_slow():
+    router = _router()
+    for _ in range(5):
+        router.record_result("gpt-4o", 4500, success=True)
+        router.record_result("claude-3-5-sonnet", 800, success=True)
+    assert router.rank_models(["gpt-4o", "claude-3-5-sonnet"])[0] == "gpt-4o"
+
+
+def test_requested_model_is_demoted_when_erroring():
+    router = _router()
+    for _ in range(5):
+        router.record_result("gpt-4o", 1000, success=False)
+    assert router.rank_models(["gpt-4o", "claude-3-5-sonnet"]) == ["claude-3-5-sonnet", "gpt-4o"]
+
+
+def test_fallbacks_are_ordered_by_score():
+    router = _router()
+    router.record_result("b", 3000, success=True)
+    router.record_result("c", 500, success=True)
+    assert router.rank_models(["a", "b", "c"]) == ["a", "c", "b"]
+
+
+@pytest.mark.asyncio
+async def test_failure_moves_to_next_candidate():
+    router = _router()
+    calls = []
+
+    async def call(model):
+        calls.append(model)
+        if model == "a":
+            raise RuntimeError("boom")
+        return f"answer from {model}"
+
+    result, model = await call_with_routing(call, ["a", "b"], router=router)
+    assert (result, model) == ("answer from b", "b")
+    assert calls == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_races_a_second_candidate():
+    router = _router()
+
+    async def call(model):
+        await asyncio.sleep(3.0 if model == "slow" else 0.01)
+        return model
+
+    for _ in range(20):
+        router.record_result("slow", 1000, success=True)
+    result, model = await asyncio.wait_for(
+        call_with_routing(call, ["slow", "fast"], hedge=True, router=router), timeout=2.5
+    )
+    assert model == "fast"
+
+
+@pytest.mark.asyncio
+async def test_track_health_false_records_nothing():
+    router = _router()
+
+    async def call(model):
+        await asyncio.sleep(3.0 if model == "slow" else 0.01)
+        return model
+
+    for _ in range(20):
+        router.record_result("slow", 1000, success=True)
+    before = router.get_routing_stats()
+    await call_with_routing(call, ["slow", "fast"], hedge=True, track_health=False, router=router)
+    assert router.get_routing_stats() == before
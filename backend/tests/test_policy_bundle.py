@@ -0,0 +1,58 @@
+"""
+Unit tests for the compiled policy keyword scanner and presence checks.
+"""
+
+from backend.compliance.policy_bundle import KeywordScanner, compile_policy, normalize_for_scan
+from backend.compliance.policy_engine import PolicyEngine
+
+POLICY = {
+    "doc_type": "test_certificate",
+    "language": "en_or_translation_required",
+    "required_text_snippets": ["complete and accurate", "U.S."],
+    "presence_checks": {"official_seal_or_stamp": True, "signature": True},
+}
+
+
+def _scan(text, policy=POLICY):
+    compiled = compile_policy(policy)
+    return compiled, compiled.scanner.scan(normalize_for_scan(text))
+
+
+def _presence_results(text):
+    compiled, hits = _scan(text)
+    engine = PolicyEngine.__new__(PolicyEngine)
+    return {c["rule"]: c["result"] for c in engine._check_presence_requirements(compiled, hits)}
+
+
+def test_scanner_matches_whole_words_and_phrases():
+    scanner = KeywordScanner(["the", "complete and accurate", "U.S."])
+    text = "Other text. COMPLETE  and\naccurate, issued in the U.S."
+    hits = scanner.scan(normalize_for_scan(text))
+    assert hits == {"the", "complete and accurate", "u.s."}
+    assert scanner.scan(normalize_for_scan("others bother")) == frozenset()
+
+
+def test_scanner_prefixes_match_inflections():
+    scanner = KeywordScanner([], prefixes=["seal", "signature"])
+    assert scanner.scan("sealed with signatures") == {"seal", "signature"}
+    assert scanner.scan("unsealed") == frozenset()
+
+
+def test_officially_sealed_and_signed_has_no_presence_alert():
+    results = _presence_results("Officially sealed and signed")
+    assert results == {"presence:official_seal": "pass", "presence:signature": "pass"}
+
+
+def test_portuguese_inflections_count_as_seal_and_signature():
+    results = _presence_results("Documento carimbado e assinada pelo tradutor")
+    assert set(results.values()) == {"pass"}
+
+
+def test_missing_seal_and_signature_alert():
+    results = _presence_results("Plain text without any marks")
+    assert set(results.values()) == {"alert"}
+
+
+def test_snippets_are_reported_under_their_normalized_form():
+    compiled, hits = _scan("I certify it is complete and accurate. Made in the U.S.")
+    assert {normalized for _, normalized in compiled.snippets} <= hits
@@ -0,0 +1,93 @@
+"""
+Unit tests for the Gemini context cache wrapper (provider calls faked).
+"""
+
+import pytest
+
+from backend.llm import prompt_assembly
+from backend.llm.prompt_assembly import GeminiContextCache
+
+SYSTEM = "regras " * 400
+
+
+class _ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+class _Model:
+    def __init__(self, model_name=None, system_instruction=None, tools=None, cached=None):
+        self.cached = cached
+
+    @classmethod
+    def from_cached_content(cls, cached_content):
+        return cls(cached=cached_content)
+
+
+class _Genai:
+    GenerativeModel = _Model
+
+
+class _Caching:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.created = 0
+
+    @property
+    def CachedContent(self):
+        return self
+
+    def create(self, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.created += 1
+        return f"cache-{self.created}"
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+    def install(*errors):
+        caching = _Caching(errors)
+        monkeypatch.setattr(prompt_assembly, "genai", _Genai, raising=False)
+        monkeypatch.setattr(prompt_assembly, "genai_caching", caching, raising=False)
+        return caching
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_cached_prefix_is_reused(fake_genai):
+    caching = fake_genai()
+    cache = GeminiContextCache(min_tokens=100)
+    first = await cache.get_model("gemini", SYSTEM)
+    second = await cache.get_model("gemini", SYSTEM)
+    assert first.cached == second.cached == "cache-1"
+    assert (cache.hits, cache.misses, caching.created) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_short_prefix_skips_caching(fake_genai):
+    caching = fake_genai()
+    model = await GeminiContextCache(min_tokens=100_000).get_model("gemini", SYSTEM)
+    assert model.cached is None and caching.created == 0
+
+
+@pytest.mark.asyncio
+async def test_transient_error_retries_on_next_call(fake_genai):
+    caching = fake_genai(_ApiError(429))
+    cache = GeminiContextCache(min_tokens=100)
+    assert (await cache.get_model("gemini", SYSTEM)).cached is None
+    assert cache.get_stats()["unsupported"] == 0
+    assert (await cache.get_model("gemini", SYSTEM)).cached == "cache-1"
+    assert caching.created == 1
+
+
+@pytest.mark.asyncio
+async def test_unsupported_model_is_remembered(fake_genai):
+    caching = fake_genai(_ApiError(400))
+    cache = GeminiContextCache(min_tokens=100)
+    await cache.get_model("gemini", SYSTEM)
+    assert (await cache.get_model("gemini", SYSTEM)).cached is None
+    assert cache.get_stats()["unsupported"] == 1
+    assert caching.created == 0
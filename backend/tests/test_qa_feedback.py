@@ -0,0 +1,87 @@
+"""
+Unit tests for the QA feedback loop helpers: cycle budget and rescoring.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from backend.agents.qa.feedback_orchestrator import QACycleBudget, QAFeedbackOrchestrator
+from backend.agents.qa.professional_qa import ProfessionalQAAgent
+
+CASE = {
+    "case_id": "CASE-1",
+    "form_code": "H-1B",
+    "basic_data": {"full_name": "Ana Silva", "email": "ana@example.com"},
+    "uploaded_documents": [{"document_type": "passport", "filename": "passport.pdf"}],
+}
+
+
+def test_budget_counts_calls_and_time():
+    budget = QACycleBudget(max_agent_calls=2, max_seconds=60)
+    assert budget.remaining_calls == 2 and not budget.exhausted
+    budget.agent_calls += 2
+    assert budget.remaining_calls == 0 and budget.exhausted
+
+    expired = QACycleBudget(max_agent_calls=5, max_seconds=1)
+    expired.started = time.monotonic() - 2
+    assert expired.remaining_seconds == 0.0 and expired.exhausted
+    assert expired.to_dict()["exhausted"] is True
+
+
+@pytest.mark.asyncio
+async def test_corrections_respect_call_budget_and_time():
+    orchestrator = QAFeedbackOrchestrator.__new__(QAFeedbackOrchestrator)
+
+    async def quick(case_id, problems, case_data, db):
+        return {"agent": "form_filler", "status": "completed"}
+
+    async def slow(case_id, problems, case_data, db):
+        await asyncio.sleep(5)
+
+    orchestrator._fix_form_issues = quick
+    orchestrator._fix_document_issues = slow
+    orchestrator._fix_language_issues = quick
+    problems = {
+        "form_filler": [{"severity": "high"}],
+        "document_analyzer": [{"severity": "critical"}, {"severity": "critical"}],
+        "translation_agent": [{"severity": "medium"}],
+    }
+    budget = QACycleBudget(max_agent_calls=2, max_seconds=0.2)
+
+    actions = await orchestrator._execute_corrections(CASE, problems, None, budget)
+    by_agent = {a["agent"]: a["status"] for a in actions}
+    assert by_agent == {
+        "translation_agent": "skipped",
+        "document_analyzer": "timeout",
+        "form_filler": "completed",
+    }
+    assert budget.agent_calls == 2
+
+
+def test_touched_categories_only_count_fixers_that_ran():
+    problems = {
+        "document_analyzer": [{"category": "completeness"}],
+        "form_filler": [{"category": "personal_data"}],
+        "specialized_agent": [{"category": "critical_criteria"}],
+    }
+    actions = [
+        {"agent": "document_analyzer", "status": "completed"},
+        {"agent": "form_filler", "status": "error"},
+        {"agent": "specialized_agent", "status": "skipped"},
+    ]
+    touched = QAFeedbackOrchestrator._touched_categories(problems, actions)
+    assert touched == {"documents", "personal_data"}
+
+
+def test_fresh_categories_bypass_the_memo():
+    agent = ProfessionalQAAgent()
+    report = agent.comprehensive_review(dict(CASE))
+
+    cached = agent.rescore(dict(CASE), report, ["documents"])
+    assert cached["sections_recomputed"] == []
+
+    forced = agent.rescore(dict(CASE), report, ["documents"], fresh={"documents"})
+    assert forced["sections_recomputed"] == ["documents"]
+    assert forced["overall_score"] == report["overall_score"]
@@ -0,0 +1,83 @@
+"""
+Unit tests for the QA section memo and the bulk readiness report.
+"""
+
+import pytest
+
+from backend.agents.qa import readiness
+from backend.agents.qa.professional_qa import ProfessionalQAAgent
+
+CASE = {
+    "case_id": "CASE-1",
+    "form_code": "H-1B",
+    "basic_data": {"full_name": "Ana Silva", "email": "ana@example.com"},
+    "simplified_form_responses": {},
+    "uploaded_documents": [{"document_type": "passport", "filename": "passport.pdf"}],
+}
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+class _Collection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.inserted = []
+
+    def find(self, query, projection=None):
+        return _Cursor(self.docs)
+
+    async def insert_one(self, doc):
+        self.inserted.append(doc)
+
+
+class _Db:
+    def __init__(self, cases):
+        self.b2b_cases = _Collection(cases)
+        self.qa_readiness_reports = _Collection()
+
+
+def test_unchanged_sections_come_from_memo():
+    agent = ProfessionalQAAgent()
+    first = agent.comprehensive_review(dict(CASE))
+    again = agent.comprehensive_review(dict(CASE))
+    assert len(first["sections_recomputed"]) == 4
+    assert again["sections_recomputed"] == []
+    assert again["overall_score"] == first["overall_score"]
+    assert again["revision"] == first["revision"]
+
+
+def test_changing_one_input_recomputes_only_its_sections():
+    agent = ProfessionalQAAgent()
+    agent.comprehensive_review(dict(CASE))
+    changed = {**CASE, "basic_data": {**CASE["basic_data"], "phone": "+1 555 0100"}}
+    report = agent.comprehensive_review(changed)
+    assert report["sections_recomputed"] == ["personal_data"]
+
+
+def test_case_for_qa_normalizes_visa_type():
+    assert readiness.case_for_qa({"visa_type": "h1b"})["form_code"] == "H-1B"
+    assert readiness.case_for_qa({"visa_type": ""}) is None
+
+
+@pytest.mark.asyncio
+async def test_readiness_report_runs_cases_and_skips_untyped(monkeypatch):
+    monkeypatch.setattr(readiness, "get_qa_agent", ProfessionalQAAgent)
+    cases = [
+        {**CASE, "visa_type": "H-1B", "status": "docs_review"},
+        {**CASE, "case_id": "CASE-2", "visa_type": "O1", "status": "intake"},
+        {"case_id": "CASE-3", "status": "intake"},
+    ]
+    db = _Db(cases)
+    report = await readiness.build_readiness_report(db, "OFF-1")
+
+    assert report["total_cases"] == 3
+    assert report["validated"] == 2
+    assert report["skipped"] == ["CASE-3"]
+    assert [r["score"] for r in report["cases"]] == sorted(r["score"] for r in report["cases"])
+    assert db.qa_readiness_reports.inserted[0]["office_id"] == "OFF-1"
@@ -0,0 +1,59 @@
+"""
+Query-plan check: every known query shape must be served by an index.
+Runs against a local mongod (MONGODB_URI / MONGO_URL, default localhost:27017).
+"""
+
+import os
+
+import pytest
+
+motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+from backend.core.index_manifest import QueryShape  # noqa: E402
+from backend.core.indexes import check_query_plans  # noqa: E402
+from backend.scripts.fix_indexes import run_query_plan_check  # noqa: E402
+
+MONGO_URL = os.environ.get("MONGODB_URI") or os.environ.get(
+    "MONGO_URL", "mongodb://localhost:27017/"
+)
+
+
+class _ExplainDb:
+    """Answers every explain with an in-memory SORT over an index scan."""
+
+    async def command(self, cmd):
+        fetch = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}
+        plan = {"stage": "SORT", "inputStage": fetch}
+        return {"queryPlanner": {"winningPlan": plan}}
+
+
+@pytest.mark.asyncio
+async def test_blocking_sort_fails_only_for_indexed_sort_shapes():
+    """SORT is reported for ordinary shapes and fails keyset-paginated ones."""
+    shapes = [
+        QueryShape("plain", "c", {}, sort=[("a", 1)]),
+        QueryShape("keyset", "c", {}, sort=[("a", 1)], indexed_sort=True),
+    ]
+    report = await check_query_plans(_ExplainDb(), shapes)
+    assert report["blocking_sorts"] == ["plain (c)"]
+    assert report["sort_failures"] == ["keyset (c)"]
+
+
+@pytest.mark.asyncio
+async def test_query_shapes_have_no_collscan():
+    """explain() of QUERY_SHAPES over the manifest indexes has no COLLSCAN."""
+    client = motor_asyncio.AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception:
+        client.close()
+        pytest.skip("no local mongod")
+
+    try:
+        report = await run_query_plan_check(client, "osprey_query_plan_test")
+    finally:
+        client.close()
+
+    assert not report["errors"], report["errors"]
+    assert not report["collscans"], f"unindexed query shapes: {report['collscans']}"
+    assert not report["sort_failures"], f"in-memory keyset sorts: {report['sort_failures']}"
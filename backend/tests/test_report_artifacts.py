@@ -0,0 +1,91 @@
+"""
+Unit tests for report artifact keys, ETags and the blob-backed artifact store.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+from backend.core.blob_store import LocalBlobStore  # noqa: E402
+from backend.core.report_engine import (  # noqa: E402
+    REPORT_FRESHNESS_SECONDS,
+    ReportArtifacts,
+    ReportEngine,
+    etag_for,
+    etag_matches,
+)
+
+NOW = datetime(2026, 3, 1, 9, 0, tzinfo=timezone.utc)
+
+
+class _Collection:
+    def __init__(self):
+        self.docs = {}
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["artifact_key"]] = doc
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["artifact_key"])
+
+
+class _Db(dict):
+    def __missing__(self, name):
+        self[name] = _Collection()
+        return self[name]
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "r.html").write_text(
+        "<h1>{{ title }}</h1>{% for i in items %}<p>{{ i }}</p>{% endfor %}"
+    )
+    store = ReportArtifacts(_Db(), engine=ReportEngine(templates, tmp_path / "bytecode"))
+    store.blobs = LocalBlobStore(tmp_path / "blobs")
+    return store
+
+
+def test_key_is_stable_and_scoped(artifacts):
+    key = artifacts.key("OFF-1", "firm", "r.html", {"filter": "all"}, "v1", now=NOW)
+    assert key == artifacts.key("OFF-1", "firm", "r.html", {"filter": "all"}, "v1", now=NOW)
+    assert key.startswith("reports/OFF-1/firm/") and key.endswith(".html")
+
+
+def test_key_changes_with_params_data_and_window(artifacts):
+    base = artifacts.key("OFF-1", "firm", "r.html", {"filter": "all"}, "v1", now=NOW)
+    later = NOW + timedelta(seconds=REPORT_FRESHNESS_SECONDS)
+    assert base != artifacts.key("OFF-1", "firm", "r.html", {"filter": "rfe"}, "v1", now=NOW)
+    assert base != artifacts.key("OFF-1", "firm", "r.html", {"filter": "all"}, "v2", now=NOW)
+    assert base != artifacts.key("OFF-1", "firm", "r.html", {"filter": "all"}, "v1", now=later)
+
+
+def test_etag_matching():
+    etag = etag_for("reports/OFF-1/firm/abc.html")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+@pytest.mark.asyncio
+async def test_render_to_store_round_trip(artifacts):
+    key = artifacts.key("OFF-1", "firm", "r.html", {}, "v1", now=NOW)
+    meta = await artifacts.render_to_store(
+        key, "r.html", {"title": "T", "items": [1, 2]}, {"office_id": "OFF-1"}
+    )
+    assert meta["etag"] == etag_for(key)
+    assert (await artifacts.get(key))["size"] == meta["size"]
+
+    body = await artifacts.open(key)
+    assert b"".join([chunk async for chunk in body]) == b"<h1>T</h1><p>1</p><p>2</p>"
+
+
+@pytest.mark.asyncio
+async def test_open_missing_artifact_returns_none(artifacts):
+    assert await artifacts.open("reports/OFF-1/firm/missing.html") is None
@@ -44,6 +44,10 @@ TOOL_DECLARATIONS = [
                     "type": "integer",
                     "description": "Max results to return (default 20, max 50)",
                 },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from a previous list_cases result, to get the next page",
+                },
             },
             "required": [],
         },
@@ -8,7 +8,30 @@ import json
 import re
 from datetime import datetime, timedelta, timezone
 
+from core.case_listing import CASE_LIST_PROJECTION, fetch_case_page
+from core.case_name_index import (
+    AmbiguousCaseMatch,
+    find_cases_by_name,
+    name_index_fields,
+    pick_match,
+)
+from core.case_events import (
+    CASE_SLIM_PROJECTION,
+    append_note,
+    log_case_event,
+    new_case_event,
+    record_case_event,
+    recent_activity_push,
+)
 from tools.definitions import REQUIRED_DOCUMENTS, DOC_TYPE_LABELS
+# Caminho completo: o bus é um singleton compartilhado com as APIs
+from backend.core.invalidation import DerivedCache
+
+SEARCH_RESULTS_LIMIT = 20
+
+# Agregados do escritório; invalidados quando um caso do escritório muda
+_overview_cache = DerivedCache("firm_overview")
+_case_stats_cache = DerivedCache("case_stats")
 
 
 async def execute_tool(tool_name: str, args: dict, db, office_id: str) -> str:
@@ -19,6 +42,11 @@ async def execute_tool(tool_name: str, args: dict, db, office_id: str) -> str:
             return json.dumps({"error": f"Unknown tool: {tool_name}"})
         result = await executor(args, db, office_id)
         return json.dumps(result, default=str, ensure_ascii=False)
+    except AmbiguousCaseMatch as e:
+        return json.dumps(
+            {"error": str(e), "candidates": [c.to_dict() for c in e.candidates]},
+            ensure_ascii=False,
+        )
     except Exception as e:
         return json.dumps({"error": str(e)})
 
@@ -28,6 +56,12 @@ async def execute_tool(tool_name: str, args: dict, db, office_id: str) -> str:
 # =============================================================================
 
 async def _get_firm_overview(args: dict, db, office_id: str) -> dict:
+    return await _overview_cache.get_or_compute(
+        office_id, None, "overview", lambda: _compute_firm_overview(db, office_id)
+    )
+
+
+async def _compute_firm_overview(db, office_id: str) -> dict:
     now = datetime.now(timezone.utc)
     week = now + timedelta(days=7)
 
@@ -140,7 +174,7 @@ async def _list_cases(args: dict, db, office_id: str) -> dict:
 
     status = args.get("status")
     visa_type = args.get("visa_type")
-    limit = min(args.get("limit", 20), 50)
+    limit = max(1, min(args.get("limit", 20), 50))
 
     if status:
         query["status"] = status
@@ -150,10 +184,16 @@ async def _list_cases(args: dict, db, office_id: str) -> dict:
     if visa_type:
         query["visa_type"] = {"$regex": re.escape(visa_type), "$options": "i"}
 
-    cases = await db.b2b_cases.find(
-        query,
-        {"_id": 0, "case_id": 1, "client_name": 1, "visa_type": 1, "status": 1, "updated_at": 1, "deadlines": 1},
-    ).sort("updated_at", -1).to_list(length=limit)
+    try:
+        cases, next_cursor = await fetch_case_page(
+            db,
+            query,
+            limit,
+            args.get("cursor"),
+            {**CASE_LIST_PROJECTION, "documents.document_type": 1},
+        )
+    except ValueError:
+        return {"error": "Cursor de paginação inválido."}
 
     now = datetime.now(timezone.utc)
     result = []
@@ -175,7 +215,7 @@ async def _list_cases(args: dict, db, office_id: str) -> dict:
         c.pop("documents", None)
         result.append(c)
 
-    return {"cases": result, "count": len(result)}
+    return {"cases": result, "count": len(result), "next_cursor": next_cursor}
 
 
 async def _get_case(args: dict, db, office_id: str) -> dict:
@@ -191,20 +231,32 @@ async def _search_cases(args: dict, db, office_id: str) -> dict:
     if not query_text:
         return {"error": "Parâmetro 'query' é obrigatório."}
 
-    regex = {"$regex": re.escape(query_text), "$options": "i"}
-    cases = await db.b2b_cases.find(
-        {
-            "office_id": office_id,
-            "$or": [
-                {"client_name": regex},
-                {"notes": regex},
-                {"visa_type": regex},
-                {"case_id": regex},
-            ],
-        },
-        {"_id": 0, "case_id": 1, "client_name": 1, "visa_type": 1, "status": 1},
-    ).to_list(length=20)
+    projection = {"_id": 0, "case_id": 1, "client_name": 1, "visa_type": 1, "status": 1}
+    matches = await find_cases_by_name(db, office_id, query_text, limit=SEARCH_RESULTS_LIMIT)
+    results = {m.case_id: m.to_dict() for m in matches}
+
+    # case_id (prefixo ancorado usa o índice) e tipo de visto exato
+    token = query_text.strip().upper()
+    exact_query = {"office_id": office_id, "$or": [{"visa_type": token}]}
+    if re.fullmatch(r"[A-Z0-9-]{3,}", token):
+        exact_query["$or"].append({"case_id": {"$regex": f"^{re.escape(token)}"}})
+    for case in await db.b2b_cases.find(exact_query, projection).to_list(
+        length=SEARCH_RESULTS_LIMIT
+    ):
+        results.setdefault(case["case_id"], {**case, "score": 1.0})
+
+    # Texto das notas via índice de texto
+    if len(results) < SEARCH_RESULTS_LIMIT:
+        try:
+            noted = await db.b2b_cases.find(
+                {"office_id": office_id, "$text": {"$search": query_text}}, projection
+            ).to_list(length=SEARCH_RESULTS_LIMIT)
+        except Exception:
+            noted = []
+        for case in noted:
+            results.setdefault(case["case_id"], {**case, "score": None})
 
+    cases = list(results.values())[:SEARCH_RESULTS_LIMIT]
     return {"results": cases, "count": len(cases)}
 
 
@@ -300,6 +352,12 @@ async def _get_case_documents(args: dict, db, office_id: str) -> dict:
 
 
 async def _get_case_stats(args: dict, db, office_id: str) -> dict:
+    return await _case_stats_cache.get_or_compute(
+        office_id, None, "stats", lambda: _compute_case_stats(db, office_id)
+    )
+
+
+async def _compute_case_stats(db, office_id: str) -> dict:
     active_statuses = [
         "intake", "docs_pending", "docs_review", "forms_gen",
         "attorney_review", "ready_to_file", "filed",
@@ -353,24 +411,25 @@ async def _create_case(args: dict, db, office_id: str) -> dict:
 
     now = datetime.now(timezone.utc)
     case_id = "CASE-" + str(uuid.uuid4())[:8].upper()
+    event = new_case_event(case_id, office_id, "case_created", "Caso criado via WhatsApp", ts=now)
 
     case_doc = {
         "case_id": case_id,
         "office_id": office_id,
         "client_name": client_name,
+        **name_index_fields(client_name),
         "visa_type": visa_type,
         "status": "intake",
         "notes": notes,
         "documents": [],
         "deadlines": [],
-        "history": [
-            {"action": "case_created", "timestamp": now.isoformat(), "detail": f"Caso criado via WhatsApp"}
-        ],
+        "recent_activity": recent_activity_push(event)["recent_activity"]["$each"],
         "created_at": now,
         "updated_at": now,
     }
 
     await db.b2b_cases.insert_one(case_doc)
+    await log_case_event(db, event)
 
     required = REQUIRED_DOCUMENTS.get(visa_type, [])
     return {
@@ -391,7 +450,8 @@ async def _update_case(args: dict, db, office_id: str) -> dict:
     case_id = case["case_id"]
     update_fields = {}
     now = datetime.now(timezone.utc)
-    history_entry = {"timestamp": now.isoformat()}
+    # Um evento por alteração: status + nota no mesmo pedido não perde a nota
+    events = []
 
     if args.get("status"):
         valid = [
@@ -402,33 +462,26 @@ async def _update_case(args: dict, db, office_id: str) -> dict:
         if args["status"] not in valid:
             return {"error": f"Status inválido. Válidos: {', '.join(valid)}"}
         update_fields["status"] = args["status"]
-        history_entry["action"] = "status_changed"
-        history_entry["detail"] = f"Status: {case.get('status')} → {args['status']}"
+        events.append(("status_changed", f"Status: {case.get('status')} → {args['status']}"))
 
     if args.get("notes"):
-        existing = case.get("notes", "")
-        separator = "\n---\n" if existing else ""
-        update_fields["notes"] = f"{existing}{separator}[{now.strftime('%d/%m/%Y %H:%M')}] {args['notes']}"
-        history_entry["action"] = history_entry.get("action", "note_added")
-        history_entry["detail"] = history_entry.get("detail", args["notes"])
+        update_fields["notes"] = append_note(case.get("notes", ""), args["notes"], now)
+        events.append(("note_added", args["notes"]))
 
     if args.get("visa_type"):
         update_fields["visa_type"] = args["visa_type"]
-        history_entry["action"] = "visa_type_changed"
-        history_entry["detail"] = f"Tipo: {case.get('visa_type')} → {args['visa_type']}"
+        events.append(("visa_type_changed", f"Tipo: {case.get('visa_type')} → {args['visa_type']}"))
 
     if not update_fields:
         return {"error": "Nenhum campo para atualizar."}
 
     update_fields["updated_at"] = now
 
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$set": update_fields,
-            "$push": {"history": history_entry},
-        },
-    )
+    for index, (action, detail) in enumerate(events):
+        await record_case_event(
+            db, case_id, office_id, action, detail,
+            set_fields=update_fields if index == 0 else None, ts=now,
+        )
 
     return {
         "success": True,
@@ -454,19 +507,10 @@ async def _add_deadline(args: dict, db, office_id: str) -> dict:
         "created_at": now.isoformat(),
     }
 
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$push": {
-                "deadlines": deadline_doc,
-                "history": {
-                    "action": "deadline_added",
-                    "timestamp": now.isoformat(),
-                    "detail": f"Prazo: {args['title']} — {args['due_date']}",
-                },
-            },
-            "$set": {"updated_at": now},
-        },
+    await record_case_event(
+        db, case_id, office_id, "deadline_added",
+        f"Prazo: {args['title']} — {args['due_date']}",
+        set_fields={"updated_at": now}, push_fields={"deadlines": deadline_doc}, ts=now,
     )
 
     return {
@@ -486,22 +530,11 @@ async def _add_case_note(args: dict, db, office_id: str) -> dict:
     now = datetime.now(timezone.utc)
     note = args["note"]
 
-    existing = case.get("notes", "")
-    separator = "\n---\n" if existing else ""
-    updated_notes = f"{existing}{separator}[{now.strftime('%d/%m/%Y %H:%M')}] {note}"
+    updated_notes = append_note(case.get("notes", ""), note, now)
 
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$set": {"notes": updated_notes, "updated_at": now},
-            "$push": {
-                "history": {
-                    "action": "note_added",
-                    "timestamp": now.isoformat(),
-                    "detail": note,
-                },
-            },
-        },
+    await record_case_event(
+        db, case_id, office_id, "note_added", note,
+        set_fields={"notes": updated_notes, "updated_at": now}, ts=now,
     )
 
     return {
@@ -529,19 +562,10 @@ async def _attach_document(args: dict, db, office_id: str) -> dict:
         "uploaded_at": now,
     }
 
-    await db.b2b_cases.update_one(
-        {"case_id": case_id, "office_id": office_id},
-        {
-            "$push": {
-                "documents": doc_entry,
-                "history": {
-                    "action": "document_attached",
-                    "timestamp": now.isoformat(),
-                    "detail": f"Documento: {DOC_TYPE_LABELS.get(doc_type, doc_type)}",
-                },
-            },
-            "$set": {"updated_at": now},
-        },
+    await record_case_event(
+        db, case_id, office_id, "document_attached",
+        f"Documento: {DOC_TYPE_LABELS.get(doc_type, doc_type)}",
+        set_fields={"updated_at": now}, push_fields={"documents": doc_entry}, ts=now,
     )
 
     # Calculate completeness
@@ -625,19 +649,11 @@ async def _generate_letter(args: dict, db, office_id: str) -> dict:
             "created_at": now,
         })
 
-        # Log in case history
-        await db.b2b_cases.update_one(
-            {"case_id": case["case_id"], "office_id": office_id},
-            {
-                "$push": {
-                    "history": {
-                        "action": "letter_generated",
-                        "timestamp": now.isoformat(),
-                        "detail": f"Carta gerada: {letter_type} ({letter_id})",
-                    }
-                },
-                "$set": {"updated_at": now},
-            },
+        # Log in case events
+        await record_case_event(
+            db, case["case_id"], office_id, "letter_generated",
+            f"Carta gerada: {letter_type} ({letter_id})",
+            set_fields={"updated_at": now}, ts=now, letter_id=letter_id,
         )
 
         return {
@@ -664,13 +680,15 @@ async def _resolve_case(args: dict, db, office_id: str) -> dict | None:
 
     if case_id:
         return await db.b2b_cases.find_one(
-            {"case_id": case_id, "office_id": office_id}, {"_id": 0}
+            {"case_id": case_id, "office_id": office_id}, CASE_SLIM_PROJECTION
         )
 
     if client_name:
-        regex = {"$regex": re.escape(client_name), "$options": "i"}
+        match = pick_match(client_name, await find_cases_by_name(db, office_id, client_name))
+        if match is None:
+            return None
         return await db.b2b_cases.find_one(
-            {"office_id": office_id, "client_name": regex}, {"_id": 0}
+            {"case_id": match.case_id, "office_id": office_id}, CASE_SLIM_PROJECTION
         )
 
     return None
@@ -734,18 +752,9 @@ async def _generate_form(args: dict, db, office_id: str) -> dict:
         filename = f"{form_name.replace(' ', '_')}_{case_id}.pdf"
 
         now = datetime.now(timezone.utc)
-        await db.b2b_cases.update_one(
-            {"case_id": case_id, "office_id": office_id},
-            {
-                "$push": {
-                    "history": {
-                        "action": "form_generated",
-                        "timestamp": now.isoformat(),
-                        "detail": f"Formulário {form_name} gerado",
-                    }
-                },
-                "$set": {"updated_at": now},
-            },
+        await record_case_event(
+            db, case_id, office_id, "form_generated", f"Formulário {form_name} gerado",
+            set_fields={"updated_at": now}, ts=now,
         )
 
         return {
@@ -769,22 +778,18 @@ async def _validate_case(args: dict, db, office_id: str) -> dict:
         return {"error": "Caso não encontrado."}
 
     try:
-        from agents.qa import get_qa_agent
+        from agents.qa import get_qa_agent, normalize_visa_type
 
         visa_type = (case.get("visa_type") or case.get("form_code") or "").upper()
         if not visa_type:
             return {"error": "Caso sem visa_type definido. Não é possível validar."}
 
         # Normalize for QA agent
-        norm_map = {
-            "H1B": "H-1B", "O1": "O-1", "L1": "L-1", "EB1A": "EB-1A",
-            "F1": "F-1", "O-1A": "O-1", "O-1B": "O-1", "L-1A": "L-1", "L-1B": "L-1",
-        }
         case_for_qa = dict(case)
-        case_for_qa["form_code"] = norm_map.get(visa_type, visa_type)
+        case_for_qa["form_code"] = normalize_visa_type(visa_type)
 
         qa_agent = get_qa_agent()
-        report = qa_agent.comprehensive_review(case_for_qa)
+        report = await qa_agent.review_async(case_for_qa)
 
         strict = args.get("strict", False)
         if strict and report["overall_score"] < 95:
@@ -792,25 +797,18 @@ async def _validate_case(args: dict, db, office_id: str) -> dict:
             report["approval"]["reason"] = f"Strict mode: {report['overall_score']:.1f}% < 95%"
 
         now = datetime.now(timezone.utc)
-        await db.b2b_cases.update_one(
-            {"case_id": case["case_id"], "office_id": office_id},
-            {
-                "$set": {
-                    "qa_review": report,
-                    "qa_approved": report["approval"]["approved"],
-                    "qa_score": report["overall_score"],
-                    "qa_review_date": now,
-                    "updated_at": now,
-                },
-                "$push": {
-                    "history": {
-                        "action": "qa_validation",
-                        "timestamp": now.isoformat(),
-                        "detail": f"QA: {report['overall_score']:.1f}% — "
-                                  f"{'APROVADO' if report['approval']['approved'] else 'PENDENTE'}",
-                    }
-                },
+        await record_case_event(
+            db, case["case_id"], office_id, "qa_validation",
+            f"QA: {report['overall_score']:.1f}% — "
+            f"{'APROVADO' if report['approval']['approved'] else 'PENDENTE'}",
+            set_fields={
+                "qa_review": report,
+                "qa_approved": report["approval"]["approved"],
+                "qa_score": report["overall_score"],
+                "qa_review_date": now,
+                "updated_at": now,
             },
+            ts=now,
         )
 
         return {
@@ -918,24 +916,17 @@ async def _generate_package(args: dict, db, office_id: str) -> dict:
             f.write(zip_bytes)
 
         now = datetime.now(timezone.utc)
-        await db.b2b_cases.update_one(
-            {"case_id": case_id, "office_id": office_id},
-            {
-                "$set": {
-                    "package_generated": True,
-                    "package_id": pkg_id,
-                    "package_path": str(zip_path),
-                    "package_generated_at": now,
-                    "updated_at": now,
-                },
-                "$push": {
-                    "history": {
-                        "action": "package_generated",
-                        "timestamp": now.isoformat(),
-                        "detail": f"Filing package: {len(files_included)} files",
-                    }
-                },
+        await record_case_event(
+            db, case_id, office_id, "package_generated",
+            f"Filing package: {len(files_included)} files",
+            set_fields={
+                "package_generated": True,
+                "package_id": pkg_id,
+                "package_path": str(zip_path),
+                "package_generated_at": now,
+                "updated_at": now,
             },
+            ts=now, package_id=pkg_id,
         )
 
         return {
@@ -997,21 +988,12 @@ async def _send_email(args: dict, db, office_id: str) -> dict:
             result = await send_custom_email(to=to, subject=subject, message=message)
 
         if result.get("success"):
-            # Log in case history if linked
+            # Log in case events if linked
             if case:
                 now = datetime.now(timezone.utc)
-                await db.b2b_cases.update_one(
-                    {"case_id": case["case_id"], "office_id": office_id},
-                    {
-                        "$push": {
-                            "history": {
-                                "action": "email_sent",
-                                "timestamp": now.isoformat(),
-                                "detail": f"Email para {to}: {subject}",
-                            }
-                        },
-                        "$set": {"updated_at": now},
-                    },
+                await record_case_event(
+                    db, case["case_id"], office_id, "email_sent", f"Email para {to}: {subject}",
+                    set_fields={"updated_at": now}, ts=now,
                 )
 
             return {
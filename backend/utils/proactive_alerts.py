@@ -8,6 +8,8 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+from backend.core.invalidation import DerivedCache
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,10 +51,17 @@ class ProactiveAlertSystem:
 
     def __init__(self, db):
         self.db = db
+        # Alertas por caso; recalculados quando o auto_case muda (ou após o TTL,
+        # já que prazos e vencimentos dependem da data)
+        self._cache = DerivedCache("proactive_alerts", sources=frozenset({"auto_cases"}))
 
     async def generate_alerts_for_case(self, case_id: str) -> List[Dict[str, Any]]:
         """Gera todos os alertas relevantes para um caso"""
+        return await self._cache.get_or_compute(
+            None, case_id, "alerts", lambda: self._build_alerts(case_id)
+        )
 
+    async def _build_alerts(self, case_id: str) -> List[Dict[str, Any]]:
         # Buscar caso
         case = await self.db.auto_cases.find_one({"id": case_id})
         if not case:
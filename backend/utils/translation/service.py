@@ -3,17 +3,50 @@ Translation Service - Serviço de Tradução Automática
 Traduz respostas do usuário para inglês usando OpenAI via Portkey
 """
 
+import asyncio
+import copy
+import json
 import logging
 import os
-from typing import Dict
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from openai import AsyncOpenAI
 
+from .agent import translator
+
 logger = logging.getLogger(__name__)
 
 # Get OpenAI API key
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+TRANSLATION_MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = (
+    "You are a professional translator for USCIS immigration forms. "
+    "Translate accurately and formally."
+)
+
+# Lotes de tradução: vários campos por requisição JSON
+BATCH_MAX_FIELDS = 80
+BATCH_MAX_CHARS = 8000
+BATCH_CONCURRENCY = 4
+TRANSLATION_MEMORY_SIZE = 5000
+
+FieldPath = Tuple[Any, ...]
+
+LANGUAGE_NAMES = {
+    "pt": "Portuguese",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "zh": "Chinese",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "ar": "Arabic",
+    "ru": "Russian",
+}
+
 
 class TranslationService:
     """
@@ -26,6 +59,11 @@ class TranslationService:
         self.available = OPENAI_API_KEY is not None
         self.client = AsyncOpenAI(api_key=self.api_key) if self.available else None
 
+        # Glossário (TranslationAgent) + memória de traduções anteriores
+        self.glossary = translator.legal_glossary
+        self._memory: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
         if not self.available:
             logger.warning("⚠️ OPENAI_API_KEY not configured - translation disabled")
         else:
@@ -56,18 +94,26 @@ class TranslationService:
         if not text or not text.strip():
             return {"success": True, "original": text, "translated": text, "skipped": True}
 
+        remembered = self._lookup_memory(text, source_language)
+        if remembered is not None:
+            return {
+                "success": True,
+                "original": text,
+                "translated": remembered,
+                "source_language": source_language,
+                "context": context,
+                "from_memory": True,
+            }
+
         try:
             # Criar prompt para tradução contextualizada
             prompt = self._create_translation_prompt(text, source_language, context)
 
             # Call OpenAI for translation
             response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Fast and cost-effective for translation
+                model=TRANSLATION_MODEL,  # Fast and cost-effective for translation
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional translator for USCIS immigration forms. Translate accurately and formally.",
-                    },
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt},
                 ],
                 temperature=0.3,  # Low temperature for consistent translations
@@ -84,6 +130,7 @@ class TranslationService:
                 translated_text = translated_text[1:-1]
 
             logger.info(f"✅ Tradução: '{text[:50]}...' → '{translated_text[:50]}...'")
+            self._remember(text, source_language, translated_text)
 
             return {
                 "success": True,
@@ -108,6 +155,10 @@ class TranslationService:
         """
         Traduz todos os campos de um formulário
 
+        Os valores (inclusive itens de listas e dicts aninhados) são
+        coletados com um id estável; glossário e memória resolvem os
+        repetidos e o restante vai em lotes JSON, executados em paralelo.
+
         Args:
             form_data: Dicionário com dados do formulário
             source_language: Idioma de origem
@@ -126,51 +177,67 @@ class TranslationService:
             }
 
         try:
-            translated_data = {}
-            translations_log = []
             field_contexts = field_contexts or {}
-
-            for field, value in form_data.items():
-                # Pular campos que não precisam tradução
-                if self._should_skip_translation(field, value):
-                    translated_data[field] = value
+            leaves = self._collect_translatable(form_data, field_contexts)
+
+            # Glossário / memória primeiro; textos repetidos viram uma única entrada
+            translations: Dict[str, str] = {}
+            pending: Dict[str, str] = {}
+            memory_hits = 0
+            for _, text, context in leaves:
+                if text in translations or text in pending:
                     continue
+                remembered = self._lookup_memory(text, source_language)
+                if remembered is not None:
+                    translations[text] = remembered
+                    memory_hits += 1
+                else:
+                    pending[text] = context
 
-                # Se for string, traduzir
-                if isinstance(value, str):
-                    context = field_contexts.get(field, field)
-                    result = await self.translate_field(value, source_language, context)
+            batches = self._build_batches(pending)
+            results = await asyncio.gather(
+                *[self._translate_batch(batch, source_language) for batch in batches]
+            )
 
+            # Campos que um lote bem-sucedido não devolveu: tradução individual
+            # (lotes que falharam mantêm o texto original, como antes)
+            missing = []
+            for batch, batch_result in zip(batches, results):
+                if batch_result is None:
+                    continue
+                translations.update(batch_result)
+                missing.extend(text for text, _ in batch.values() if text not in batch_result)
+
+            if missing:
+                fallback = await asyncio.gather(
+                    *[
+                        self._translate_single(text, source_language, pending[text])
+                        for text in missing
+                    ]
+                )
+                for text, result in zip(missing, fallback):
                     if result.get("success"):
-                        translated_data[field] = result["translated"]
-                        translations_log.append(
-                            {"field": field, "original": value, "translated": result["translated"]}
-                        )
-                    else:
-                        translated_data[field] = value
-
-                # Se for lista, traduzir cada item
-                elif isinstance(value, list):
-                    translated_list = []
-                    for item in value:
-                        if isinstance(item, str):
-                            result = await self.translate_field(item, source_language, field)
-                            translated_list.append(result.get("translated", item))
-                        else:
-                            translated_list.append(item)
-                    translated_data[field] = translated_list
-
-                # Se for dict, processar recursivamente
-                elif isinstance(value, dict):
-                    sub_result = await self.translate_form_data(
-                        value, source_language, field_contexts
-                    )
-                    translated_data[field] = sub_result.get("translated_data", value)
-
-                else:
-                    translated_data[field] = value
+                        translations[text] = result["translated"]
 
-            logger.info(f"✅ Formulário traduzido: {len(translations_log)} campos")
+            translated_data = copy.deepcopy(form_data)
+            translations_log = []
+            for path, text, _ in leaves:
+                translated = translations.get(text)
+                if translated is None:
+                    continue
+                self._set_path(translated_data, path, translated)
+                translations_log.append(
+                    {
+                        "field": ".".join(str(part) for part in path),
+                        "original": text,
+                        "translated": translated,
+                    }
+                )
+
+            logger.info(
+                f"✅ Formulário traduzido: {len(translations_log)} campos "
+                f"({len(batches)} lote(s), {memory_hits} da memória)"
+            )
 
             return {
                 "success": True,
@@ -179,6 +246,8 @@ class TranslationService:
                 "translations_count": len(translations_log),
                 "translations_log": translations_log,
                 "source_language": source_language,
+                "batches": len(batches),
+                "memory_hits": memory_hits,
             }
 
         except Exception as e:
@@ -190,25 +259,161 @@ class TranslationService:
                 "original_data": form_data,
             }
 
+    def _collect_translatable(
+        self, data: Dict, field_contexts: Dict[str, str], prefix: FieldPath = ()
+    ) -> List[Tuple[FieldPath, str, str]]:
+        """Lista (caminho, texto, contexto) de todos os valores a traduzir"""
+        leaves = []
+        for field, value in data.items():
+            if self._should_skip_field(field):
+                continue
+            path = prefix + (field,)
+            context = field_contexts.get(field, field)
+
+            if isinstance(value, str):
+                if not self._should_skip_value(value):
+                    leaves.append((path, value, context))
+            elif isinstance(value, list):
+                for index, item in enumerate(value):
+                    if isinstance(item, str) and not self._should_skip_value(item):
+                        leaves.append((path + (index,), item, field))
+                    elif isinstance(item, dict):
+                        leaves.extend(
+                            self._collect_translatable(item, field_contexts, path + (index,))
+                        )
+            elif isinstance(value, dict):
+                leaves.extend(self._collect_translatable(value, field_contexts, path))
+        return leaves
+
+    @staticmethod
+    def _set_path(data: Any, path: FieldPath, value: str) -> None:
+        for part in path[:-1]:
+            data = data[part]
+        data[path[-1]] = value
+
+    @staticmethod
+    def _build_batches(pending: Dict[str, str]) -> List[Dict[str, Tuple[str, str]]]:
+        """Agrupa textos em lotes ``{id: (texto, contexto)}`` limitados por campos e caracteres"""
+        batches: List[Dict[str, Tuple[str, str]]] = []
+        current: Dict[str, Tuple[str, str]] = {}
+        current_chars = 0
+        for index, (text, context) in enumerate(pending.items(), start=1):
+            size = len(text) + len(context or "")
+            if current and (
+                len(current) >= BATCH_MAX_FIELDS or current_chars + size > BATCH_MAX_CHARS
+            ):
+                batches.append(current)
+                current, current_chars = {}, 0
+            current[str(index)] = (text, context)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _translate_single(self, text: str, source_language: str, context: str) -> Dict:
+        async with self._batch_semaphore:
+            return await self.translate_field(text, source_language, context)
+
+    @staticmethod
+    def _compact_json(payload: Dict[str, Any]) -> str:
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+    async def _translate_batch(
+        self, batch: Dict[str, Tuple[str, str]], source_language: str
+    ) -> Optional[Dict[str, str]]:
+        """
+        Traduz um lote em uma única chamada (resposta JSON ``{id: tradução}``)
+
+        Returns:
+            Dict texto original → tradução (ids ausentes ficam de fora),
+            ou None se a chamada falhar
+        """
+        payload: Dict[str, Any] = {
+            "fields": {
+                field_id: ({"t": text, "c": context} if context else {"t": text})
+                for field_id, (text, context) in batch.items()
+            }
+        }
+        glossary = self._glossary_hints(batch, source_language)
+        if glossary:
+            payload["glossary"] = glossary
+
+        source_lang_name = LANGUAGE_NAMES.get(source_language, source_language)
+        instructions = (
+            f"Translate each field's text (t) from {source_lang_name} to formal English for a "
+            f"USCIS immigration form; c is the field it belongs to. Keep names and proper nouns "
+            f"as they are and use the glossary when it applies. Reply with a JSON object mapping "
+            f"every field id to its translation."
+        )
+        max_tokens = min(4096, 64 + sum(len(text) for text, _ in batch.values()))
+
+        try:
+            async with self._batch_semaphore:
+                response = await self.client.chat.completions.create(
+                    model=TRANSLATION_MODEL,
+                    messages=[
+                        {"role": "system", "content": f"{SYSTEM_PROMPT} {instructions}"},
+                        {"role": "user", "content": self._compact_json(payload)},
+                    ],
+                    temperature=0.1,
+                    max_tokens=max_tokens,
+                    response_format={"type": "json_object"},
+                )
+            translated = json.loads(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"❌ Erro na tradução em lote ({len(batch)} campos): {e}")
+            return None
+
+        results = {}
+        for field_id, (text, _) in batch.items():
+            value = translated.get(field_id)
+            if isinstance(value, dict):
+                value = value.get("t")
+            if isinstance(value, str) and value.strip():
+                results[text] = value.strip()
+                self._remember(text, source_language, results[text])
+        return results
+
+    # ------------------------------------------------------ glossário/memória
+
+    @staticmethod
+    def _memory_key(text: str, source_language: str) -> Tuple[str, str]:
+        return source_language, " ".join(text.split()).casefold()
+
+    def _lookup_memory(self, text: str, source_language: str) -> Optional[str]:
+        """Tradução já conhecida: glossário (termo exato) ou memória de resultados"""
+        key = self._memory_key(text, source_language)
+        glossary = self.glossary.get(f"{source_language}_to_en", {})
+        for term, translation in glossary.items():
+            if term.casefold() == key[1]:
+                return translation
+
+        remembered = self._memory.get(key)
+        if remembered is not None:
+            self._memory.move_to_end(key)
+        return remembered
+
+    def _remember(self, text: str, source_language: str, translated: str) -> None:
+        key = self._memory_key(text, source_language)
+        self._memory[key] = translated
+        self._memory.move_to_end(key)
+        while len(self._memory) > TRANSLATION_MEMORY_SIZE:
+            self._memory.popitem(last=False)
+
+    def _glossary_hints(
+        self, batch: Dict[str, Tuple[str, str]], source_language: str
+    ) -> Dict[str, str]:
+        """Só os termos do glossário que aparecem no lote (prompt compacto)"""
+        glossary = self.glossary.get(f"{source_language}_to_en", {})
+        joined = " ".join(text for text, _ in batch.values()).casefold()
+        return {term: target for term, target in glossary.items() if term.casefold() in joined}
+
     def _create_translation_prompt(
         self, text: str, source_language: str, context: str = None
     ) -> str:
         """Cria prompt para tradução contextualizada"""
 
-        language_names = {
-            "pt": "Portuguese",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "zh": "Chinese",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "ar": "Arabic",
-            "ru": "Russian",
-        }
-
-        source_lang_name = language_names.get(source_language, source_language)
+        source_lang_name = LANGUAGE_NAMES.get(source_language, source_language)
 
         if context:
             prompt = f"""Translate the following {source_lang_name} text to formal English for a USCIS immigration form.
@@ -235,8 +440,17 @@ Return ONLY the translated text, nothing else."""
 
     def _should_skip_translation(self, field: str, value) -> bool:
         """Determina se um campo deve ser pulado na tradução"""
+        if self._should_skip_field(field):
+            return True
 
-        # Campos que não precisam tradução
+        # Pular valores não-string
+        if not isinstance(value, str):
+            return True
+
+        return self._should_skip_value(value)
+
+    def _should_skip_field(self, field) -> bool:
+        """Campos que não precisam tradução (ids, contatos, datas, números)"""
         skip_fields = [
             "id",
             "case_id",
@@ -258,14 +472,13 @@ Return ONLY the translated text, nothing else."""
             "timestamp",
         ]
 
-        field_lower = field.lower()
-
-        # Pular campos específicos
-        if any(skip in field_lower for skip in skip_fields):
-            return True
+        field_lower = str(field).lower()
+        return any(skip in field_lower for skip in skip_fields)
 
-        # Pular valores não-string ou vazios
-        if not isinstance(value, str) or not value.strip():
+    def _should_skip_value(self, value: str) -> bool:
+        """Valores que não precisam tradução (vazios, códigos, emails, URLs)"""
+        # Pular valores vazios
+        if not value.strip():
             return True
 
         # Pular se parecer ser um código, número, data